@@ -0,0 +1,164 @@
+"""
+Orçamento de tempo de inicialização do backend (python -X importtime).
+
+Importa o módulo do app em um processo limpo, lê o relatório do -X importtime
+e mostra:
+  - tempo total do import (mediana de --repeat processos), comparado ao orçamento
+  - módulos com maior tempo próprio
+  - dependências externas puxadas diretamente pelos módulos do app
+  - módulos pesados que devem carregar só no primeiro uso (LAZY_MODULES) e
+    apareceram na inicialização
+
+Uso, a partir de biodiagnostico_app/:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 1800 --repeat 5 --output importtime.json
+
+Termina com código 1 se a mediana passar do orçamento ou se algum módulo de
+LAZY_MODULES for importado na inicialização.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.run_benchmarks import _git_commit
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PACKAGE = "biodiagnostico_app"
+TARGET = "biodiagnostico_app.biodiagnostico_app"
+DEFAULT_BUDGET_MS = 1800
+# Carregados no primeiro uso (upload ProIn, PDFs, Voice-to-Form, cliente Supabase)
+LAZY_MODULES = ("pandas", "reportlab", "google.genai", "supabase", "openpyxl", "pdfplumber")
+
+
+@dataclass
+class ImportRecord:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+    parent: str = ""
+
+
+def parse_importtime(text: str) -> List[ImportRecord]:
+    """Linhas "import time: self | cumulative | nome" -> registros com profundidade e módulo pai"""
+    records = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # cabeçalho
+        name = fields[2].rstrip()
+        indent = len(name) - len(name.lstrip())
+        records.append(ImportRecord(name.strip(), int(fields[0]), int(fields[1]), max(indent - 1, 0) // 2))
+
+    # Saída em pós-ordem: percorrendo de trás para frente, o pai aparece antes dos filhos
+    last_at_depth: Dict[int, str] = {}
+    for record in reversed(records):
+        record.parent = last_at_depth.get(record.depth - 1, "") if record.depth else ""
+        last_at_depth[record.depth] = record.name
+    return records
+
+
+def measure_imports(module: str = TARGET) -> List[ImportRecord]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=APP_ROOT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def _is_app(name: str) -> bool:
+    return name == APP_PACKAGE or name.startswith(APP_PACKAGE + ".")
+
+
+def summarize(records: List[ImportRecord], module: str = TARGET, top: int = 15) -> Dict[str, Any]:
+    root = next((r for r in reversed(records) if r.name == module), None)
+    total_us = root.cumulative_us if root else sum(r.self_us for r in records)
+    # Cada módulo aparece uma vez: no primeiro import, sob quem o importou
+    external = [r for r in records if _is_app(r.parent) and not _is_app(r.name)]
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "app_self_ms": round(sum(r.self_us for r in records if _is_app(r.name)) / 1000, 1),
+        "modules": len(records),
+        "top_self": [
+            {"module": r.name, "self_ms": round(r.self_us / 1000, 1)}
+            for r in sorted(records, key=lambda r: r.self_us, reverse=True)[:top]
+        ],
+        "external_from_app": [
+            {"module": r.name, "imported_by": r.parent, "cumulative_ms": round(r.cumulative_us / 1000, 1)}
+            for r in sorted(external, key=lambda r: r.cumulative_us, reverse=True)[:top]
+        ],
+        "lazy_violations": sorted({
+            lazy for r in records for lazy in LAZY_MODULES if r.name == lazy or r.name.startswith(lazy + ".")
+        }),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tempo de import do backend e orçamento de inicialização")
+    parser.add_argument("--module", default=TARGET)
+    parser.add_argument("--repeat", type=int, default=3, help="processos medidos (mediana do total)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="grava o relatório neste arquivo JSON")
+    args = parser.parse_args(argv)
+
+    # Primeiro import compila os .pyc; não entra na mediana
+    measure_imports(args.module)
+    runs = [summarize(measure_imports(args.module), args.module, args.top) for _ in range(args.repeat)]
+    totals = [run["total_ms"] for run in runs]
+    summary = min(runs, key=lambda run: abs(run["total_ms"] - statistics.median(totals)))
+    median_ms = round(statistics.median(totals), 1)
+
+    print(f"{args.module}: {median_ms:.1f} ms (mediana de {len(totals)}; orçamento {args.budget_ms:.0f} ms)")
+    print(f"  módulos do app (tempo próprio): {summary['app_self_ms']:.1f} ms em {summary['modules']} módulos importados")
+    print("  maior tempo próprio:")
+    for item in summary["top_self"]:
+        print(f"    {item['self_ms']:>8.1f} ms  {item['module']}")
+    print("  dependências externas importadas pelo app:")
+    for item in summary["external_from_app"]:
+        print(f"    {item['cumulative_ms']:>8.1f} ms  {item['module']}  ({item['imported_by']})")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"inicialização {median_ms:.1f} ms acima do orçamento de {args.budget_ms:.0f} ms")
+    if summary["lazy_violations"]:
+        failures.append(f"módulos que deveriam ser lazy importados na inicialização: {', '.join(summary['lazy_violations'])}")
+
+    if args.output:
+        report = {
+            "meta": {
+                "commit": _git_commit(),
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+                "budget_ms": args.budget_ms,
+            },
+            "median_ms": median_ms,
+            "runs_ms": totals,
+            "summary": summary,
+            "failures": failures,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.output}")
+
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
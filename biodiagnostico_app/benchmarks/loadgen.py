@@ -0,0 +1,505 @@
+"""
+Gerador de carga multi-sessão para o backend Reflex (sem navegador).
+
+Abre N sessões websocket simultâneas no endpoint de eventos do Reflex
+(Socket.IO v5 sobre Engine.IO v4, namespace /_event) e repete o fluxo de uma
+bancada de CQ: hidratação da página /proin (restore_session +
+load_data_from_db), login, recarga dos dados, troca de abas, digitação
+do formulário de registro tecla a tecla, save_qc_record e geração do PDF.
+
+Para cada nível de concorrência reporta:
+  - latência de ida e volta por evento (p50/p95/p99/máx), medida do envio
+    até o delta que contém a variável que o handler altera por último
+  - tamanho dos deltas recebidos por evento (bytes do pacote)
+  - atraso do event loop do backend, por uma sessão de sonda que envia o
+    evento "ping" do Reflex em intervalos fixos e mede o "pong"
+  - RSS do(s) processo(s) do backend (--pid, lido de /proc)
+e estima a capacidade: o maior número de sessões com p95 dentro de
+--max-p95-ms e sem timeouts.
+
+Uso, a partir de biodiagnostico_app/:
+    # dados sintéticos para o Supabase em memória (services/supabase_fake.py)
+    python -m benchmarks.loadgen --write-fixture /tmp/qc_fixture.json --rows 10k
+    SUPABASE_FAKE=1 SUPABASE_FAKE_FIXTURE=/tmp/qc_fixture.json reflex run --env prod --backend-only
+    python -m benchmarks.loadgen --url http://localhost:8000 --sessions 5,10,25,50 \\
+        --duration 60 --pid <pid do backend> --output load.json
+
+    # escala horizontal: mesma carga pelo nginx com 1 e com N workers
+    # (BACKEND_WORKERS=N e REDIS_URL no start.sh), depois a comparação
+    python -m benchmarks.loadgen --url http://localhost --workers 1 --output w1.json
+    python -m benchmarks.loadgen --url http://localhost --workers 4 --pid <pids> --output w4.json
+    python -m benchmarks.loadgen --compare w1.json,w4.json
+
+O cliente websocket vem do pacote websockets (dependência do supabase e do
+google-genai); o python-socketio não é usado por exigir aiohttp.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import math
+import random
+import sys
+import time
+import urllib.parse
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import websockets
+from reflex.utils.format import format_event_handler
+
+from benchmarks.run_benchmarks import _git_commit, parse_size
+from benchmarks.synthetic_data import EXAMS, generate_qc_rows, references_by_id
+from biodiagnostico_app.state import State
+
+EVENT_NAMESPACE = "/_event"
+FIELD_MARKER = "_rx_state_"
+ROOT_STATE = "reflex___state____state"
+PAGE = "/proin"
+
+STEP_TIMEOUT_S = 30.0
+PROBE_INTERVAL_S = 0.1
+RSS_INTERVAL_S = 0.5
+DEFAULT_SESSIONS = "1,5,10,25"
+DEFAULT_MAX_P95_MS = 500.0
+
+# Tempo de "pensar" do operador (segundos), multiplicado por --think-scale
+KEYSTROKE_S = (0.08, 0.25)
+STEP_PAUSE_S = (0.5, 2.0)
+
+_ANY = object()
+
+
+@functools.lru_cache(maxsize=None)
+def handler_name(name: str) -> str:
+    """Nome completo do evento, como o frontend envia (estado de definição + handler)"""
+    return format_event_handler(getattr(State, name))
+
+
+def encode_packet(event: str, data: Any = _ANY) -> str:
+    """Pacote Socket.IO EVENT (42) no namespace do Reflex"""
+    args = [event] if data is _ANY else [event, data]
+    return f"42{EVENT_NAMESPACE}," + json.dumps(args, separators=(",", ":"))
+
+
+def decode_packet(text: str) -> Tuple[str, Any]:
+    """
+    Separa tipo e conteúdo de um pacote Engine.IO/Socket.IO em texto.
+
+    Devolve ("ping", None) para o ping do Engine.IO, ("connect"/"connect_error",
+    dados), ("event", [nome, args...]) ou ("other", texto).
+    """
+    if text == "2":
+        return "ping", None
+    if not text.startswith("4"):
+        return "other", text
+    kind = text[1:2]
+    body = text[2:]
+    if body.startswith(EVENT_NAMESPACE):
+        body = body[len(EVENT_NAMESPACE):].lstrip(",")
+    data = json.loads(body) if body else None
+    return {"0": "connect", "2": "event", "4": "connect_error", "1": "disconnect"}.get(kind, "other"), data
+
+
+def delta_has(delta: Dict[str, Dict[str, Any]], var: str, value: Any = _ANY) -> bool:
+    """True se algum subestado do delta traz `var` (com `value`, se informado)"""
+    for substate in delta.values():
+        for key in (var + FIELD_MARKER, var):
+            if key in substate:
+                return value is _ANY or substate[key] == value
+    return False
+
+
+def percentiles(values: List[float]) -> Dict[str, Any]:
+    """p50/p95/p99/máx por posto mais próximo (valores já na unidade desejada)"""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)], 3)
+
+    return {"count": len(ordered), "p50": rank(50), "p95": rank(95), "p99": rank(99), "max": round(ordered[-1], 3)}
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    """VmRSS do processo em MB (Linux); None se o processo não existir"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def capacity(levels: Dict[str, Dict[str, Any]], max_p95_ms: float) -> Optional[int]:
+    """Maior número de sessões com p95 global dentro do limite e sem timeouts/erros"""
+    best = None
+    for level in levels.values():
+        overall = level["latency_ms"]["all"]
+        if level["timeouts"] or level["errors"] or not overall.get("count"):
+            continue
+        if overall["p95"] <= max_p95_ms:
+            best = max(best or 0, level["sessions"])
+    return best
+
+
+def scaling(reports: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Capacidade e vazão por nº de workers, com ganho e eficiência relativos ao menor nº medido"""
+    rows = sorted(
+        (
+            {
+                "workers": report["meta"].get("workers") or 1,
+                "capacity": report.get("capacity"),
+                "events_per_s": max((level["events_per_s"] for level in report["levels"].values()), default=0.0),
+            }
+            for report in reports
+        ),
+        key=lambda row: row["workers"],
+    )
+    if not rows:
+        return rows
+    base = rows[0]
+    for row in rows:
+        ratio = row["workers"] / base["workers"]
+        row["speedup"] = round(row["events_per_s"] / base["events_per_s"], 2) if base["events_per_s"] else None
+        row["efficiency"] = round(row["speedup"] / ratio, 2) if row["speedup"] is not None else None
+    return rows
+
+
+def write_fixture(path: str, rows: int, seed: int) -> None:
+    """Fixture JSON (tabela -> linhas) para SUPABASE_FAKE_FIXTURE"""
+    qc_rows = generate_qc_rows(rows, seed=seed)
+    fixture = {"qc_records": qc_rows, "qc_reference_values": list(references_by_id(qc_rows).values())}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(fixture, f, ensure_ascii=False)
+
+
+@dataclass
+class Step:
+    """Um evento do roteiro e a variável cujo delta marca sua conclusão"""
+    handler: str
+    payload: Dict[str, Any]
+    until: str
+    value: Any = _ANY
+    pause: Tuple[float, float] = STEP_PAUSE_S
+
+
+def bench_terminal_script(rng: random.Random, email: str, password: str) -> List[Step]:
+    """Fluxo de uma bancada: login, carga, abas, registro digitado, gravação e PDF"""
+    exam, target, sd = rng.choice(EXAMS)
+    value = f"{target + rng.gauss(0, sd):.2f}"
+    target_text = f"{target:.2f}"
+
+    def typed(handler: str, var: str, text: str) -> List[Step]:
+        return [Step(handler, {"value": text[:i]}, var, text[:i], KEYSTROKE_S) for i in range(1, len(text) + 1)]
+
+    return [
+        *typed("set_login_email", "login_email", email),
+        *typed("set_login_password", "login_password", password),
+        Step("attempt_login", {}, "is_authenticated", True),
+        Step("load_data_from_db", {"force": True}, "is_loading_data", False),
+        Step("set_proin_tab", {"tab": "dashboard"}, "proin_current_tab", "dashboard"),
+        Step("set_proin_tab", {"tab": "registro"}, "proin_current_tab", "registro"),
+        Step("set_qc_exam_name", {"value": exam}, "qc_exam_name", exam),
+        *typed("update_qc_value", "qc_value", value),
+        *typed("update_qc_target_value", "qc_target_value", target_text),
+        Step("save_qc_record", {}, "is_saving_qc", False),
+        Step("set_proin_tab", {"tab": "relatorios"}, "proin_current_tab", "relatorios"),
+        Step("generate_qc_report_pdf", {}, "is_generating_qc_report", False),
+    ]
+
+
+class Stats:
+    """Amostras de um nível de concorrência (latência e bytes por handler)"""
+
+    def __init__(self):
+        self.latency_ms: Dict[str, List[float]] = {}
+        self.delta_bytes: Dict[str, List[float]] = {}
+        self.loop_lag_ms: List[float] = []
+        self.rss_mb: List[float] = []
+        self.timeouts = 0
+        self.errors = 0
+        self.connect_ms: List[float] = []
+
+    def record(self, handler: str, latency_s: float, size: int):
+        self.latency_ms.setdefault(handler, []).append(latency_s * 1000)
+        self.delta_bytes.setdefault(handler, []).append(size)
+
+    def summary(self, sessions: int, elapsed_s: float) -> Dict[str, Any]:
+        all_latency = [v for values in self.latency_ms.values() for v in values]
+        all_bytes = [v for values in self.delta_bytes.values() for v in values]
+        return {
+            "sessions": sessions,
+            "elapsed_s": round(elapsed_s, 2),
+            "events": len(all_latency),
+            "events_per_s": round(len(all_latency) / elapsed_s, 2) if elapsed_s else 0.0,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "connect_ms": percentiles(self.connect_ms),
+            "latency_ms": {"all": percentiles(all_latency), **{k: percentiles(v) for k, v in sorted(self.latency_ms.items())}},
+            "delta_bytes": {"all": percentiles(all_bytes), **{k: percentiles(v) for k, v in sorted(self.delta_bytes.items())}},
+            "loop_lag_ms": percentiles(self.loop_lag_ms),
+            "rss_mb": {
+                "start": round(self.rss_mb[0], 1) if self.rss_mb else None,
+                "peak": round(max(self.rss_mb), 1) if self.rss_mb else None,
+                "end": round(self.rss_mb[-1], 1) if self.rss_mb else None,
+            },
+        }
+
+
+class ReflexSession:
+    """Uma aba do navegador: conexão no /_event com token próprio e fila de deltas"""
+
+    def __init__(self, url: str, path: str = PAGE):
+        parts = urllib.parse.urlsplit(url)
+        scheme = "wss" if parts.scheme in ("https", "wss") else "ws"
+        self.token = str(uuid.uuid4())
+        self.ws_url = f"{scheme}://{parts.netloc}{EVENT_NAMESPACE}/?EIO=4&transport=websocket&token={self.token}"
+        self.path = path
+        self._ws = None
+        self._reader: Optional[asyncio.Task] = None
+        self._waiter: Optional[Tuple[Callable[[str, Any], bool], asyncio.Future]] = None
+        self._received_bytes = 0
+
+    def _event(self, name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "payload": payload,
+            "router_data": {"pathname": self.path, "asPath": self.path, "query": {}},
+        }
+
+    async def connect(self) -> None:
+        """Handshake Engine.IO + CONNECT do namespace com o hydrate como evento de boot"""
+        self._ws = await websockets.connect(self.ws_url, max_size=None, open_timeout=STEP_TIMEOUT_S)
+        kind, _ = decode_packet(await self._ws.recv())
+        if kind != "other":
+            raise ConnectionError("Handshake Engine.IO inesperado")
+        # O boot do frontend: hydrate_and_load da página, processado no próprio connect
+        auth = {"event": self._event(f"{ROOT_STATE}.hydrate_and_load", {})}
+        ready = self.expect(lambda kind, data: kind == "update" and delta_has(data.get("delta", {}), "is_hydrated", True))
+        await self._ws.send(f"40{EVENT_NAMESPACE}," + json.dumps(auth))
+        while True:
+            message = await self._ws.recv()
+            kind, data = decode_packet(message) if isinstance(message, str) else ("other", None)
+            if kind == "connect":
+                break
+            if kind == "connect_error":
+                raise ConnectionError(f"Conexão recusada: {data}")
+            await self._dispatch(message)
+        self._reader = asyncio.create_task(self._read())
+        await asyncio.wait_for(ready, STEP_TIMEOUT_S)
+
+    def expect(self, predicate: Callable[[str, Any], bool]) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._waiter = (predicate, future)
+        self._received_bytes = 0
+        return future
+
+    async def _dispatch(self, message) -> None:
+        """Responde o ping do Engine.IO e entrega eventos ao waiter corrente"""
+        if isinstance(message, bytes):
+            self._received_bytes += len(message)
+            return
+        kind, data = decode_packet(message)
+        if kind == "ping":
+            await self._ws.send("3")
+            return
+        if kind != "event" or not data:
+            return
+        self._received_bytes += len(message)
+        name, args = data[0], data[1] if len(data) > 1 else None
+        kind = "update" if name == "event" and isinstance(args, dict) else name
+        if self._waiter and not self._waiter[1].done() and self._waiter[0](kind, args):
+            self._waiter[1].set_result(self._received_bytes)
+
+    async def _read(self) -> None:
+        try:
+            async for message in self._ws:
+                await self._dispatch(message)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if self._waiter and not self._waiter[1].done():
+                self._waiter[1].set_exception(ConnectionError("Websocket fechado pelo backend"))
+
+    async def run_step(self, step: Step) -> Tuple[float, int]:
+        """Envia o evento e espera o delta de conclusão; devolve (segundos, bytes recebidos)"""
+        done = self.expect(lambda kind, data: kind == "update" and delta_has(data.get("delta", {}), step.until, step.value))
+        start = time.perf_counter()
+        await self._ws.send(encode_packet("event", self._event(handler_name(step.handler), step.payload)))
+        size = await asyncio.wait_for(done, STEP_TIMEOUT_S)
+        return time.perf_counter() - start, size
+
+    async def ping(self) -> float:
+        """Ida e volta do evento "ping" do Reflex (atendido direto no event loop)"""
+        pong = self.expect(lambda kind, data: kind == "ping" and data == "pong")
+        start = time.perf_counter()
+        await self._ws.send(encode_packet("ping"))
+        await asyncio.wait_for(pong, STEP_TIMEOUT_S)
+        return time.perf_counter() - start
+
+    async def close(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await self._reader
+
+
+async def _terminal(url: str, index: int, args, stats: Stats, stop_at: float) -> None:
+    rng = random.Random(args.seed * 100_003 + index)
+    session = ReflexSession(url)
+    start = time.perf_counter()
+    try:
+        await session.connect()
+    except (OSError, ConnectionError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+        stats.errors += 1
+        logging.warning(f"Sessão {index}: falha ao conectar: {e}")
+        return
+    stats.connect_ms.append((time.perf_counter() - start) * 1000)
+    try:
+        while time.perf_counter() < stop_at:
+            for step in bench_terminal_script(rng, args.email, args.password):
+                if time.perf_counter() >= stop_at:
+                    break
+                try:
+                    latency, size = await session.run_step(step)
+                    stats.record(step.handler, latency, size)
+                except asyncio.TimeoutError:
+                    stats.timeouts += 1
+                except (ConnectionError, websockets.ConnectionClosed) as e:
+                    stats.errors += 1
+                    logging.warning(f"Sessão {index}: {e}")
+                    return
+                await asyncio.sleep(rng.uniform(*step.pause) * args.think_scale)
+    finally:
+        await session.close()
+
+
+async def _probe(url: str, stats: Stats, stop_at: float) -> None:
+    session = ReflexSession(url)
+    try:
+        await session.connect()
+    except (OSError, ConnectionError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+        logging.warning(f"Sonda do event loop sem conexão: {e}")
+        return
+    try:
+        while time.perf_counter() < stop_at:
+            try:
+                stats.loop_lag_ms.append(await session.ping() * 1000)
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+            await asyncio.sleep(PROBE_INTERVAL_S)
+    finally:
+        await session.close()
+
+
+async def _rss(pids: List[int], stats: Stats, stop_at: float) -> None:
+    while time.perf_counter() < stop_at:
+        samples = [read_rss_mb(pid) for pid in pids]
+        if any(s is not None for s in samples):
+            stats.rss_mb.append(sum(s for s in samples if s is not None))
+        await asyncio.sleep(RSS_INTERVAL_S)
+
+
+async def run_level(url: str, sessions: int, args) -> Dict[str, Any]:
+    """Roda `sessions` bancadas por --duration segundos (entrada escalonada em --ramp)"""
+    stats = Stats()
+    start = time.perf_counter()
+    stop_at = start + args.ramp + args.duration
+
+    async def delayed(index: int):
+        await asyncio.sleep(args.ramp * index / max(sessions, 1))
+        await _terminal(url, index, args, stats, stop_at)
+
+    await asyncio.gather(
+        _probe(url, stats, stop_at),
+        _rss(args.pid, stats, stop_at),
+        *(delayed(i) for i in range(sessions)),
+    )
+    return stats.summary(sessions, time.perf_counter() - start)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Carga websocket multi-sessão no backend Reflex")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL do backend (API_URL)")
+    parser.add_argument("--sessions", default=DEFAULT_SESSIONS, help=f"níveis de concorrência (padrão: {DEFAULT_SESSIONS})")
+    parser.add_argument("--duration", type=float, default=60.0, help="segundos de carga por nível, após a rampa")
+    parser.add_argument("--ramp", type=float, default=5.0, help="segundos para abrir todas as sessões")
+    parser.add_argument("--think-scale", type=float, default=1.0, help="multiplica as pausas do operador (0 = sem pausas)")
+    parser.add_argument("--pid", type=lambda s: [int(p) for p in s.split(",")], default=[],
+                        help="PID(s) do backend para medir RSS (separados por vírgula)")
+    parser.add_argument("--max-p95-ms", type=float, default=DEFAULT_MAX_P95_MS, help="p95 aceitável para a capacidade")
+    parser.add_argument("--email", default="bancada@loadgen.local")
+    parser.add_argument("--password", default="loadgen")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="grava os resultados neste arquivo JSON")
+    parser.add_argument("--write-fixture", metavar="PATH", help="só grava a fixture do Supabase em memória e sai")
+    parser.add_argument("--rows", default="10k", help="linhas de qc_records na fixture")
+    parser.add_argument("--workers", type=int, default=1, help="nº de workers do backend medido (só registrado no relatório)")
+    parser.add_argument("--compare", metavar="A.json,B.json", help="só compara relatórios gravados com --output e sai")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        reports = []
+        for path in args.compare.split(","):
+            with open(path.strip(), encoding="utf-8") as f:
+                reports.append(json.load(f))
+        for row in scaling(reports):
+            print(
+                f"  {row['workers']:>2} worker(s): capacidade {row['capacity'] or '-'} sessões  "
+                f"vazão máx. {row['events_per_s']:.1f} eventos/s  "
+                f"ganho {row['speedup'] if row['speedup'] is not None else '-'}x  "
+                f"eficiência {row['efficiency'] if row['efficiency'] is not None else '-'}"
+            )
+        return 0
+
+    if args.write_fixture:
+        write_fixture(args.write_fixture, parse_size(args.rows), args.seed)
+        print(f"Fixture gravada em {args.write_fixture} (SUPABASE_FAKE_FIXTURE)")
+        return 0
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "url": args.url,
+            "duration_s": args.duration,
+            "think_scale": args.think_scale,
+            "seed": args.seed,
+            "workers": args.workers,
+        },
+        "levels": {},
+    }
+    for sessions in (int(s) for s in args.sessions.split(",") if s.strip()):
+        print(f"[{sessions} sessões]")
+        level = asyncio.run(run_level(args.url, sessions, args))
+        report["levels"][str(sessions)] = level
+        overall, lag = level["latency_ms"]["all"], level["loop_lag_ms"]
+        print(
+            f"  eventos {level['events']:>6} ({level['events_per_s']:.1f}/s)  "
+            f"p50 {overall.get('p50', '-')} ms  p95 {overall.get('p95', '-')} ms  p99 {overall.get('p99', '-')} ms  "
+            f"lag p95 {lag.get('p95', '-')} ms  RSS pico {level['rss_mb']['peak']} MB  "
+            f"timeouts {level['timeouts']}  erros {level['errors']}"
+        )
+
+    report["capacity"] = capacity(report["levels"], args.max_p95_ms)
+    if report["capacity"]:
+        print(f"Capacidade estimada (p95 <= {args.max_p95_ms:.0f} ms): {report['capacity']} sessões")
+    else:
+        print(f"Nenhum nível ficou com p95 <= {args.max_p95_ms:.0f} ms sem timeouts")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
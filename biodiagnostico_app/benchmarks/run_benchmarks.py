@@ -0,0 +1,308 @@
+"""
+Benchmarks offline dos caminhos críticos do CQ (sem Supabase, sem navegador).
+
+Mede, para cada tamanho de histórico sintético:
+  - montagem dos QCRecord em load_data_from_db (build_qc_records + ordenação)
+  - WestgardService.check_rules (todos os registros, histórico da série) e evaluate_all
+  - caminho de gravação: filtro do histórico do exame + check_rules
+  - computed vars do dashboard
+  - update_levey_jennings_data
+  - índice do histórico: reconstrução, busca (termo + status + dia) e período de relatório
+  - generate_qc_pdf / generate_area_pdf (registros mais recentes, até --pdf-max-records)
+  - importação ProIn: leitura da planilha (handle_proin_upload) e mapeamento das linhas
+    (até o limite de linhas do upload)
+  - QCService.get_qc_records e load_data_from_db completo contra o Supabase em
+    memória (services/supabase_fake.py), com latência opcional (--latency-ms)
+
+Uso, a partir de biodiagnostico_app/:
+    python -m benchmarks.run_benchmarks --sizes 1k,10k,100k,1M --output bench.json
+    python -m benchmarks.run_benchmarks --sizes 10k --compare bench.json
+
+O JSON traz o commit e o ambiente; --compare aponta regressões acima de
+--threshold (razão entre medianas) e termina com código 1 se houver alguma.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Outbox e detectores de deriva em arquivos temporários, fora do diretório do app
+os.environ.setdefault("QC_OUTBOX_PATH", os.path.join(tempfile.gettempdir(), "bench_qc_outbox.db"))
+os.environ.setdefault("QC_DRIFT_STATE_PATH", os.path.join(tempfile.gettempdir(), "bench_qc_drift_state.db"))
+
+from benchmarks.synthetic_data import generate_qc_rows, hematology_rows, proin_workbook, references_by_id
+from biodiagnostico_app.services.analytics_mirror_service import monthly_summary_from_records
+from biodiagnostico_app.services.qc_history_index_service import QCHistoryIndex, qc_history_index
+from biodiagnostico_app.services.qc_service import QCService
+from biodiagnostico_app.services.quality_planning_service import quality_planner
+from biodiagnostico_app.services.supabase_client import SupabaseClient
+from biodiagnostico_app.services.supabase_fake import InMemorySupabase
+from biodiagnostico_app.services.westgard_service import WestgardService
+from biodiagnostico_app.state import State
+from biodiagnostico_app.states import _import_ops
+from biodiagnostico_app.states.dashboard_state import DashboardState
+from biodiagnostico_app.states.qc_state import QCState, build_qc_records
+from biodiagnostico_app.utils.qc_pdf_report import generate_area_pdf, generate_qc_pdf
+
+DEFAULT_SIZES = "1k,10k,100k,1M"
+PDF_MAX_RECORDS = 5_000
+WESTGARD_HISTORY = 10  # check_rules consulta no máximo os 9 anteriores
+DASHBOARD_VARS = [
+    "dashboard_total_today",
+    "dashboard_total_month",
+    "dashboard_approval_rate",
+    "qc_records_with_alerts",
+    "westgard_violations_month",
+    "recent_qc_records",
+    "top_high_cv_exams",
+]
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def _label(n: int) -> str:
+    if n >= 1_000_000 and n % 1_000_000 == 0:
+        return f"{n // 1_000_000}M"
+    if n >= 1_000 and n % 1_000 == 0:
+        return f"{n // 1_000}k"
+    return str(n)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def measure(fn: Callable[[], Any], repeat: int, n: int) -> Dict[str, Any]:
+    """Executa `fn` `repeat` vezes e devolve melhor/mediana em segundos"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"n": n, "repeat": repeat, "best_s": round(min(times), 6), "median_s": round(statistics.median(times), 6)}
+
+
+class _UploadFile:
+    """Arquivo de upload mínimo (filename + read assíncrono), como o rx.UploadFile"""
+
+    def __init__(self, filename: str, data: bytes):
+        self.filename = filename
+        self._data = data
+
+    async def read(self) -> bytes:
+        return self._data
+
+
+def _offline_state(records) -> State:
+    state = State(_reflex_internal_init=True)
+    state.qc_records = records
+    # Como load_data_from_db: dashboard, gráfico e relatórios consultam o índice do processo
+    qc_history_index.rebuild(records)
+    return state
+
+
+def run_size(n: int, repeat: int, seed: int, pdf_max_records: int, latency_ms: float,
+             log: Callable[[str], None]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+
+    def bench(name: str, fn: Callable[[], Any], count: int, times: Optional[int] = None):
+        results[name] = measure(fn, times or repeat, count)
+        log(f"  {name:<40} {results[name]['median_s'] * 1000:>10.2f} ms  (n={count})")
+
+    rows = generate_qc_rows(n, seed=seed)
+    refs = references_by_id(rows)
+
+    # load_data_from_db: montagem dos registros como o estado faz
+    bench(
+        "load_data_from_db.build_records",
+        lambda: sorted(build_qc_records(rows, refs, set()), key=lambda x: x.date, reverse=True),
+        n,
+    )
+    records = sorted(build_qc_records(rows, refs, set()), key=lambda x: x.date, reverse=True)
+
+    # Westgard: cada registro contra o histórico recente da própria série (mais recente primeiro)
+    by_series: Dict[tuple, List] = {}
+    for r in records:
+        by_series.setdefault((r.exam_name, r.level), []).append(r)
+
+    def check_all():
+        for series in by_series.values():
+            for i, record in enumerate(series):
+                WestgardService.check_rules(record, series[i + 1:i + WESTGARD_HISTORY])
+
+    bench("westgard.check_rules", check_all, n)
+    bench("westgard.evaluate_all", lambda: WestgardService.evaluate_all(records), n)
+
+    newest = records[0]
+
+    def save_path():
+        history = [r for r in records if r.exam_name == newest.exam_name]
+        WestgardService.check_rules(newest, history)
+
+    bench("westgard.save_path", save_path, n)
+
+    state = _offline_state(records)
+    for var in DASHBOARD_VARS:
+        fget = DashboardState.computed_vars[var].fget
+        bench(f"dashboard.{var}", lambda fget=fget: fget(state), n)
+
+    state.levey_jennings_exam = newest.exam_name
+    state.levey_jennings_level = "Todos"
+    state.levey_jennings_period = "90"
+    bench(
+        "levey_jennings.update",
+        lambda: asyncio.run(QCState.update_levey_jennings_data.fn(state)),
+        n,
+    )
+
+    # Índice do histórico: reconstrução, busca sem cache (termo + status + dia) e período de relatório
+    history = QCHistoryIndex()
+    bench("qc_history.rebuild", lambda: history.rebuild(records), n)
+    search_term, search_day = newest.exam_name[:4], (newest.date or "")[:10]
+
+    def search():
+        history._cache.clear()
+        history.query(search_term, "Todos", search_day)
+
+    bench("qc_history.query", search, n)
+    month_start = f"{search_day[:7]}-01"
+    bench("qc_history.month_range", lambda: history.between(month_start, search_day + "T23:59:59"), n)
+
+    # Relatórios: um PDF de período com os registros mais recentes
+    report_records = records[:pdf_max_records]
+
+    def qc_pdf():
+        generate_qc_pdf(
+            report_records, "Benchmark", [],
+            monthly_summary=monthly_summary_from_records(report_records),
+            quality_plan=quality_planner.plan(report_records),
+        )
+
+    pdf_repeat = min(repeat, 3)
+    bench("pdf.generate_qc_pdf", qc_pdf, len(report_records), pdf_repeat)
+    area_rows = hematology_rows(rows[-pdf_max_records:])
+    bench(
+        "pdf.generate_area_pdf",
+        lambda: generate_area_pdf("hematologia", "Hematologia", area_rows),
+        len(area_rows),
+        pdf_repeat,
+    )
+
+    # Importação ProIn: limitada ao máximo de linhas aceito pelo upload
+    import_rows = rows[-_import_ops.MAX_ROWS:]
+    workbook = proin_workbook(import_rows)
+    import_state = State(_reflex_internal_init=True)
+
+    def upload():
+        asyncio.run(_import_ops.handle_proin_upload(import_state, [_UploadFile("proin.xlsx", workbook)]))
+
+    bench("proin.handle_upload", upload, len(import_rows), pdf_repeat)
+    if import_state.qc_error_message:
+        raise RuntimeError(f"Importação ProIn falhou no benchmark: {import_state.qc_error_message}")
+    data = import_state.proin_import_data
+    bench("proin.map_rows", lambda: [_import_ops.proin_row_to_record(r) for r in data], len(data))
+
+    # Services e estado reais contra o Supabase em memória
+    fake = InMemorySupabase(latency_ms=latency_ms)
+    fake.load_rows("qc_records", rows)
+    fake.load_rows("qc_reference_values", refs.values())
+    SupabaseClient.install(fake)
+    try:
+        bench("qc_service.get_qc_records", lambda: asyncio.run(QCService.get_qc_records(limit=10000)), n)
+        load_state = State(_reflex_internal_init=True)
+        bench(
+            "load_data_from_db.full",
+            lambda: asyncio.run(QCState.load_data_from_db.fn(load_state, force=True)),
+            n,
+            pdf_repeat,
+        )
+    finally:
+        SupabaseClient.reset()
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Linhas de regressão: benchmarks cuja mediana cresceu mais que `threshold` vezes"""
+    regressions = []
+    for size, benches in current["results"].items():
+        for name, result in benches.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if not before or not before.get("median_s") or before.get("n") != result["n"]:
+                continue
+            ratio = result["median_s"] / before["median_s"]
+            marker = "REGRESSÃO" if ratio > threshold else ""
+            print(f"{size:>5} {name:<40} {before['median_s'] * 1000:>10.2f} -> {result['median_s'] * 1000:>10.2f} ms  x{ratio:.2f} {marker}")
+            if ratio > threshold:
+                regressions.append(f"{size} {name}: x{ratio:.2f}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks offline do Controle de Qualidade")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"tamanhos do histórico (padrão: {DEFAULT_SIZES})")
+    parser.add_argument("--repeat", type=int, default=5, help="repetições por medição (mediana)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pdf-max-records", type=int, default=PDF_MAX_RECORDS)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latência por chamada ao Supabase em memória")
+    parser.add_argument("--output", help="grava os resultados neste arquivo JSON")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=1.2, help="razão de mediana considerada regressão")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "latency_ms": args.latency_ms,
+        },
+        "results": {},
+    }
+    for size in (parse_size(s) for s in args.sizes.split(",") if s.strip()):
+        print(f"[{_label(size)}]")
+        # Tamanhos grandes: uma repetição basta e mantém o tempo total aceitável
+        repeat = args.repeat if size <= 10_000 else 1
+        report["results"][_label(size)] = run_size(
+            size, repeat, args.seed, args.pdf_max_records, args.latency_ms, print,
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"Comparação com {baseline.get('meta', {}).get('commit') or args.compare}:")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressão(ões) acima de x{args.threshold}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Gerador de históricos sintéticos de CQ para os benchmarks.
+
+Produz linhas no formato da tabela qc_records (como QCService.get_qc_records
+devolve) para vários exames × níveis × lotes, com ruído gaussiano em torno do
+alvo de cada lote e anomalias injetadas por segmento (série × lote):
+deslocamentos (shift de ±2 SD na segunda metade do lote) e tendências
+(deriva linear até ±3 SD). Tudo vetorizado com numpy e determinístico pela
+semente, para que os tempos de commits diferentes sejam comparáveis.
+"""
+import io
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# (exame, alvo do N2, DP do N2)
+EXAMS = [
+    ("GLICOSE", 100.0, 3.0),
+    ("COLESTEROL TOTAL", 190.0, 5.5),
+    ("TRIGLICERIDEOS", 150.0, 6.0),
+    ("CREATININA", 1.0, 0.05),
+    ("UREIA", 40.0, 1.8),
+    ("TGO", 35.0, 2.0),
+    ("TGP", 40.0, 2.2),
+    ("ACIDO URICO", 5.5, 0.25),
+    ("POTASSIO", 4.5, 0.12),
+    ("SODIO", 140.0, 1.5),
+    ("TSH", 2.5, 0.15),
+    ("HEMOGLOBINA GLICADA", 6.0, 0.2),
+]
+LEVELS = {"N1": 0.6, "N2": 1.0, "N3": 1.8}
+EQUIPMENTS = ["COBAS C111", "BS-200"]
+ANALYSTS = ["ANA", "BRUNO", "CARLA"]
+
+SHIFT_PROBABILITY = 0.15
+TREND_PROBABILITY = 0.10
+
+
+def generate_qc_rows(
+    n: int,
+    seed: int = 42,
+    days: int = 365,
+    lot_days: int = 60,
+    now: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Gera `n` linhas de qc_records distribuídas ao longo dos últimos `days` dias.
+
+    Cada série (exame × nível) recebe ~n/36 medições em intervalos regulares;
+    o lote troca a cada `lot_days` dias e cada lote tem alvo próprio (±2%).
+    """
+    rng = np.random.default_rng(seed)
+    now = now or datetime.now().replace(microsecond=0)
+    exams = np.array([e[0] for e in EXAMS], dtype=object)
+    level_names = np.array(list(LEVELS), dtype=object)
+    n_series = len(EXAMS) * len(LEVELS)
+
+    idx = np.arange(n)
+    series = idx % n_series
+    ordinal = idx // n_series
+    per_series = max(int(np.ceil(n / n_series)), 1)
+    exam_idx, level_idx = series // len(LEVELS), series % len(LEVELS)
+
+    # Carimbo de tempo: série espalhada uniformemente no período, mais recente = agora
+    step = days * 86400 / per_series
+    age_seconds = ((per_series - 1 - ordinal) * step).astype("int64")
+    timestamps = np.datetime64(now, "s") - age_seconds.astype("timedelta64[s]")
+    dates = np.datetime_as_string(timestamps, unit="s")
+
+    day_offset = (days - age_seconds / 86400.0).clip(0, None)
+    lot_idx = (day_offset // lot_days).astype("int64")
+    n_lots = int(lot_idx.max()) + 1
+    lot_phase = (day_offset % lot_days) / lot_days
+
+    # Alvo/DP por série e viés do lote
+    base_target = np.array([e[1] for e in EXAMS])[exam_idx] * np.array(list(LEVELS.values()))[level_idx]
+    base_sd = np.array([e[2] for e in EXAMS])[exam_idx] * np.array(list(LEVELS.values()))[level_idx]
+    segment = series * n_lots + lot_idx
+    n_segments = n_series * n_lots
+    lot_bias = rng.uniform(-0.02, 0.02, n_segments)
+    target = np.round(base_target * (1 + lot_bias[segment]), 4)
+    sd = np.round(base_sd, 4)
+
+    # Anomalias por segmento: shift na segunda metade do lote, tendência ao longo do lote
+    direction = rng.choice([-1.0, 1.0], n_segments)
+    has_shift = rng.random(n_segments) < SHIFT_PROBABILITY
+    has_trend = rng.random(n_segments) < TREND_PROBABILITY
+    z = rng.standard_normal(n)
+    z += np.where(has_shift[segment] & (lot_phase >= 0.5), 2.0 * direction[segment], 0.0)
+    z += np.where(has_trend[segment], 3.0 * lot_phase * direction[segment], 0.0)
+
+    value = np.round(target + z * sd, 4)
+    cv = np.round(np.abs(value - target) / target * 100, 4)
+    status = np.where(np.abs(z) > 3, "ALERTA (CV)", "OK")
+    lot_numbers = np.char.add(np.char.add("L", (exam_idx * 100 + level_idx).astype(str)), np.char.add("-", lot_idx.astype(str)))
+    reference_ids = np.char.add("ref-", np.char.add(series.astype(str), np.char.add("-", lot_idx.astype(str))))
+
+    columns = zip(
+        idx.tolist(), dates.tolist(), exams[exam_idx].tolist(), level_names[level_idx].tolist(),
+        lot_numbers.tolist(), value.tolist(), target.tolist(), sd.tolist(), cv.tolist(),
+        status.tolist(), reference_ids.tolist(), (idx % len(EQUIPMENTS)).tolist(), (idx % len(ANALYSTS)).tolist(),
+    )
+    return [
+        {
+            "id": f"bench-{i}",
+            "date": d,
+            "exam_name": e,
+            "level": lv,
+            "lot_number": lot,
+            "value": v,
+            "target_value": t,
+            "target_sd": s,
+            "cv": c,
+            "status": st,
+            "equipment_name": EQUIPMENTS[eq],
+            "analyst_name": ANALYSTS[an],
+            "reference_id": ref,
+            "needs_calibration": False,
+            "post_calibration_id": None,
+        }
+        for i, d, e, lv, lot, v, t, s, c, st, ref, eq, an in columns
+    ]
+
+
+def references_by_id(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Referências (qc_reference_values) de cada lote, como get_references_by_ids devolve"""
+    refs: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        ref_id = r["reference_id"]
+        if ref_id not in refs:
+            refs[ref_id] = {
+                "id": ref_id,
+                "exam_name": r["exam_name"],
+                "level": r["level"],
+                "lot_number": r["lot_number"],
+                "target_value": r["target_value"],
+                "cv_max_threshold": 5.0,
+            }
+    return refs
+
+
+def proin_workbook(rows: List[Dict[str, Any]]) -> bytes:
+    """Planilha ProIn (.xlsx) com cabeçalhos em português, como a exportada pelo laboratório"""
+    df = pd.DataFrame({
+        "DATA": [r["date"] for r in rows],
+        "EXAME": [r["exam_name"] for r in rows],
+        "NIVEL": [r["level"] for r in rows],
+        "LOTE": [r["lot_number"] for r in rows],
+        "VALOR": [r["value"] for r in rows],
+        "ALVO": [r["target_value"] for r in rows],
+        "DP": [r["target_sd"] for r in rows],
+        "EQUIPAMENTO": [r["equipment_name"] for r in rows],
+        "ANALISTA": [r["analyst_name"] for r in rows],
+    })
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def hematology_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Medições CQ Intervalo/% (hematologia) derivadas das linhas sintéticas, para o PDF por área"""
+    return [
+        {
+            "data_medicao": r["date"][:10],
+            "analito": r["exam_name"],
+            "valor_medido": r["value"],
+            "min_aplicado": round(r["target_value"] - 2 * r["target_sd"], 4),
+            "max_aplicado": round(r["target_value"] + 2 * r["target_sd"], 4),
+            "modo_usado": "INTERVALO",
+            "status": "APROVADO" if r["status"] == "OK" else "REPROVADO",
+        }
+        for r in rows
+    ]
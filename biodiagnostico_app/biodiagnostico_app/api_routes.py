@@ -0,0 +1,83 @@
+"""
+Rotas HTTP do backend montadas ao lado do app Reflex (api_transformer).
+Servem transferências que não devem passar pelo estado/websocket e a
+exposição de métricas para o Prometheus e do profiling de estado.
+"""
+import ipaddress
+import logging
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from .services.metrics_service import METRICS_TOKEN, metrics
+from .services.state_profiler import state_profiler
+from .services.voice_spool_service import voice_spool
+
+logger = logging.getLogger(__name__)
+
+
+async def voice_chunk(request: Request) -> JSONResponse:
+    """POST /api/voice/{handle}: corpo binário (bloco do MediaRecorder) gravado direto no spool"""
+    handle = request.path_params["handle"]
+    if not voice_spool.exists(handle):
+        return JSONResponse({"error": "Gravacao desconhecida ou expirada"}, status_code=404)
+    size = 0
+    try:
+        async for part in request.stream():
+            if part:
+                size = voice_spool.append(handle, part)
+    except ValueError as e:
+        voice_spool.discard(handle)
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except KeyError:
+        return JSONResponse({"error": "Gravacao desconhecida ou expirada"}, status_code=404)
+    return JSONResponse({"size": size})
+
+
+def _is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(host.strip()).is_loopback
+    except ValueError:
+        return False
+
+
+def _local_request(request: Request) -> bool:
+    """Conexão local e, se veio pelo nginx, cliente original também local"""
+    if request.client is None or not _is_loopback(request.client.host):
+        return False
+    forwarded = request.headers.get("x-forwarded-for", "")
+    return all(_is_loopback(host) for host in forwarded.split(",")) if forwarded else True
+
+
+def _authorized(request: Request) -> bool:
+    # Sem METRICS_TOKEN, só quem está na própria máquina (ex.: scrape direto nas portas dos workers)
+    if not METRICS_TOKEN:
+        return _local_request(request)
+    return request.headers.get("authorization", "") == f"Bearer {METRICS_TOKEN}"
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    """GET /api/metrics: formato texto do Prometheus (Bearer METRICS_TOKEN; sem token, só acesso local)"""
+    if not _authorized(request):
+        return PlainTextResponse("unauthorized\n", status_code=401)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+async def state_profile_endpoint(request: Request) -> Response:
+    """GET /api/profile/state[?format=folded]: relatório do profiling de estado (STATE_PROFILE=1)"""
+    if not _authorized(request):
+        return PlainTextResponse("unauthorized\n", status_code=401)
+    if not state_profiler.enabled:
+        return JSONResponse({"error": "Profiling desativado (STATE_PROFILE=1)"}, status_code=404)
+    if request.query_params.get("format") == "folded":
+        return PlainTextResponse(state_profiler.folded())
+    return JSONResponse(state_profiler.report())
+
+
+api = Starlette(routes=[
+    Route("/api/voice/{handle}", voice_chunk, methods=["POST"]),
+    Route("/api/metrics", metrics_endpoint, methods=["GET"]),
+    Route("/api/profile/state", state_profile_endpoint, methods=["GET"]),
+])
@@ -3,6 +3,15 @@ Biodiagnóstico Lab - Sistema de Controle de Qualidade
 """
 import reflex as rx
 from .state import State
+from .api_routes import api
+from .services.qc_outbox_service import qc_outbox
+from .services.analytics_mirror_service import analytics_mirror
+from .services.alert_engine_service import alert_engine
+from .services.maintenance_scheduler_service import maintenance_scheduler
+from .services.metrics_service import METRICS_ENABLED, instrument_event_processing, metrics
+from .services.state_profiler import state_profiler
+from .services.cluster_service import cluster
+from .services import supabase_client
 from .components.navbar import navbar, mobile_nav
 from .pages.login import login_page
 from .pages.proin import proin_page
@@ -89,9 +98,40 @@ app = rx.App(
         "https://fonts.googleapis.com/css2?family=Space+Grotesk:wght@400;500;600;700&family=DM+Sans:wght@400;500;600;700&display=swap",
         "/custom.css",
     ],
+    # Rotas HTTP próprias (upload binário de áudio do Voice-to-Form)
+    api_transformer=api,
 )
 
 # Rotas
 app.add_page(index, route="/", title="QC Lab - Login", on_load=[State.restore_session, State.load_data_from_db])
 app.add_page(index_dashboard, route="/dashboard", title="QC Lab - Dashboard", on_load=[State.restore_session, State.load_data_from_db])
 app.add_page(route_proin, route="/proin", title="QC Lab - Controle de Qualidade", on_load=[State.restore_session, State.load_data_from_db])
+
+# Cliente Supabase (import pesado) criado em background, fora do caminho de inicialização
+app.register_lifespan_task(supabase_client.warm_up)
+
+# Eventos entre workers e leases de tarefas exclusivas (multi-worker: REDIS_URL)
+if cluster.enabled:
+    app.register_lifespan_task(cluster.run_forever)
+
+# Flush periódico do outbox local de CQ (escritas pendentes sobrevivem a quedas de rede e restarts)
+app.register_lifespan_task(qc_outbox.run_forever)
+
+# Motor de alertas em processo (CQ pendente, rejeições Westgard, lotes vencendo, manutenções)
+app.register_lifespan_task(alert_engine.run_forever)
+
+# Virada diária da agenda de manutenção (vencidas / a vencer)
+app.register_lifespan_task(maintenance_scheduler.run_forever)
+
+# Espelho analítico local para agregações de dashboard/relatórios (opcional: ANALYTICS_MIRROR_PATH)
+if analytics_mirror.enabled:
+    app.register_lifespan_task(analytics_mirror.run_forever)
+
+# Métricas (GET /api/metrics): latência por event handler e atraso do event loop
+if METRICS_ENABLED:
+    instrument_event_processing()
+    app.register_lifespan_task(metrics.run_forever)
+
+# Profiling de computed vars e deltas por evento (opt-in: STATE_PROFILE=1)
+if state_profiler.enabled:
+    app.register_lifespan_task(state_profiler.run_forever, state_cls=State)
@@ -86,6 +86,10 @@ def manutencao_tab() -> rx.Component:
                         rx.badge(State.maintenance_records.length().to_string() + " registros", color_scheme="blue", variant="soft"),
                         width="100%", align_items="center", margin_bottom=Spacing.MD
                     ),
+                    rx.cond(
+                        State.next_maintenance != "",
+                        ui.text("Próxima: " + State.next_maintenance, size="small", color=Color.TEXT_SECONDARY, margin_bottom=Spacing.SM),
+                    ),
                     rx.cond(
                         State.maintenance_records.length() > 0,
                         rx.vstack(
@@ -425,38 +425,21 @@ def add_name_modal() -> rx.Component:
 
 def voice_recording_modal() -> rx.Component:
     """Modal de gravacao de voz para preenchimento de formulario via IA"""
-    js_start = """
-(async () => {
-    try {
-        const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
-        window._voiceStream = stream;
-        const mimeType = MediaRecorder.isTypeSupported('audio/webm;codecs=opus')
-            ? 'audio/webm;codecs=opus' : 'audio/mp4';
-        window._voiceRecorder = new MediaRecorder(stream, { mimeType });
-        window._voiceChunks = [];
-        window._voiceRecorder.ondataavailable = (e) => {
-            if (e.data.size > 0) window._voiceChunks.push(e.data);
-        };
-        window._voiceRecorder.start();
-        return "ok";
-    } catch(err) {
-        return "error:" + err.message;
-    }
-})()
-"""
+    # O inicio vem do backend (State.start_voice_recording), que abre o spool de upload.
+    # Ao parar, espera os blocos pendentes chegarem ao spool e devolve o tipo MIME.
     js_stop = """
 new Promise((resolve) => {
-    if (window._voiceRecorder && window._voiceRecorder.state === 'recording') {
-        window._voiceRecorder.onstop = async () => {
-            const blob = new Blob(window._voiceChunks, { type: window._voiceRecorder.mimeType });
-            const reader = new FileReader();
-            reader.onloadend = () => resolve(reader.result.split(',')[1]);
-            reader.readAsDataURL(blob);
+    const recorder = window._voiceRecorder;
+    if (recorder && recorder.state === 'recording') {
+        recorder.onstop = () => {
             if (window._voiceStream) {
                 window._voiceStream.getTracks().forEach(t => t.stop());
             }
+            window._voiceUpload.then(() => resolve(
+                window._voiceUploadError ? "error:" + window._voiceUploadError : recorder.mimeType
+            ));
         };
-        window._voiceRecorder.stop();
+        recorder.stop();
     } else {
         resolve("");
     }
@@ -520,10 +503,7 @@ new Promise((resolve) => {
                                     border_radius=Design.RADIUS_FULL,
                                     display="flex", align_items="center", justify_content="center",
                                     cursor="pointer",
-                                    on_click=[
-                                        State.set_voice_recording(True),
-                                        rx.call_script(js_start),
-                                    ],
+                                    on_click=State.start_voice_recording,
                                     _hover={"bg": Color.PRIMARY_HOVER, "transform": "scale(1.05)"},
                                     transition="all 0.2s ease",
                                     box_shadow=Design.SHADOW_MD,
@@ -102,6 +102,7 @@ def reagentes_tab() -> rx.Component:
                                             lot["days_to_rupture"] != None,
                                             rx.badge(
                                                 rx.cond(lot["days_to_rupture"] <= 5, "RISCO RUPTURA", f"Estoque: {lot['days_to_rupture']} dias"),
+                                                title=rx.cond(lot["stockout_date"] != "", "Ruptura prevista em " + lot["stockout_date"], ""),
                                                 color_scheme=rx.cond(lot["days_to_rupture"] <= 5, "red", "gray"),
                                                 variant="outline", margin_top=Spacing.XS
                                             )
@@ -4,6 +4,9 @@ from ...styles import Color, Design, Typography, Spacing
 from ...components import ui
 from .helpers import format_cv, qc_status_label, qc_status_kind
 
+# Pausa na digitação antes de enviar a busca do histórico ao backend
+QC_SEARCH_DEBOUNCE_MS = 400
+
 
 def registro_qc_tab() -> rx.Component:
     """Aba de Registro de Controle de Qualidade (Purificada)"""
@@ -167,13 +170,18 @@ def registro_qc_tab() -> rx.Component:
                 # Barra de busca e filtros
                 rx.hstack(
                     rx.box(
-                        rx.input(
-                            placeholder="Buscar exame...",
-                            value=State.qc_search_term,
-                            on_change=State.set_qc_search_term,
-                            size="2",
-                            width="100%",
-                            max_width="280px",
+                        # Busca só vai ao backend após uma pausa na digitação (ou Enter)
+                        rx.debounce_input(
+                            rx.input(
+                                placeholder="Buscar exame, lote, equipamento...",
+                                value=State.qc_search_term,
+                                on_change=State.set_qc_search_term,
+                                size="2",
+                                width="100%",
+                                max_width="280px",
+                            ),
+                            debounce_timeout=QC_SEARCH_DEBOUNCE_MS,
+                            force_notify_by_enter=True,
                         ),
                         rx.icon(tag="search", size=16, color=Color.TEXT_SECONDARY,
                                 position="absolute", right="10px", top="50%",
@@ -190,6 +198,14 @@ def registro_qc_tab() -> rx.Component:
                         State.paginated_qc_records.length().to_string() + " registros no dia",
                         font_size=Typography.SIZE_SM, color=Color.TEXT_SECONDARY,
                     ),
+                    rx.cond(
+                        State.qc_outbox_pending > 0,
+                        rx.badge(
+                            rx.icon(tag="cloud-upload", size=12),
+                            State.qc_outbox_pending.to_string() + " pendente(s) de sincronização",
+                            color_scheme="amber", variant="soft", size="1",
+                        ),
+                    ),
                     width="100%", align_items="center", gap="3", flex_wrap="wrap",
                     margin_bottom=Spacing.SM,
                 ),
@@ -218,9 +234,24 @@ def registro_qc_tab() -> rx.Component:
                                         rx.table.cell(r.value.to_string()),
                                         rx.table.cell(rx.text(format_cv(r.cv) + "%", font_weight="600", color=rx.cond(r.cv <= r.cv_max_threshold, Color.SUCCESS, Color.ERROR))),
                                         rx.table.cell(
-                                            ui.status_badge(
-                                                qc_status_label(r.status, r.cv, r.cv_max_threshold),
-                                                status=qc_status_kind(r.status, r.cv, r.cv_max_threshold)
+                                            rx.hstack(
+                                                ui.status_badge(
+                                                    qc_status_label(r.status, r.cv, r.cv_max_threshold),
+                                                    status=qc_status_kind(r.status, r.cv, r.cv_max_threshold)
+                                                ),
+                                                rx.match(
+                                                    r.sync_status,
+                                                    ("pending", rx.tooltip(
+                                                        rx.icon(tag="cloud-upload", size=14, color=Color.WARNING),
+                                                        content="Pendente de sincronização com o banco"
+                                                    )),
+                                                    ("failed", rx.tooltip(
+                                                        rx.icon(tag="cloud-off", size=14, color=Color.ERROR),
+                                                        content="Falha ao sincronizar — registro rejeitado pelo banco"
+                                                    )),
+                                                    rx.fragment(),
+                                                ),
+                                                align_items="center", gap="2",
                                             )
                                         ),
                                         rx.table.cell(
@@ -237,6 +237,19 @@ def relatorios_tab() -> rx.Component:
                     spacing="4", width="100%", margin_top=Spacing.LG
                 ),
 
+                # Série do lote atual: baseline de 20 corridas e janela móvel
+                rx.cond(
+                    State.lj_has_lab_baseline,
+                    rx.grid(
+                        ui.stat_card("Média Lab (20 corridas)", State.lj_series_stats["baseline_mean"].to_string(), "crosshair", "primary"),
+                        ui.stat_card("DP Lab (20 corridas)", State.lj_series_stats["baseline_sd"].to_string(), "variable", "primary"),
+                        ui.stat_card("CV% Últimas 30", State.lj_series_stats["last30_cv"].to_string() + "%", "activity", "primary"),
+                        ui.stat_card("CV% do Mês", State.lj_series_stats["month_cv"].to_string() + "%", "calendar", "primary"),
+                        columns={"initial": "1", "sm": "2", "md": "2", "lg": "4"},
+                        spacing="4", width="100%", margin_top=Spacing.MD
+                    ),
+                ),
+
                 # Data Table
                 rx.box(
                     rx.vstack(
@@ -279,5 +292,55 @@ def relatorios_tab() -> rx.Component:
                 bg=Color.BACKGROUND, border=f"2px dashed {Color.BORDER}", border_radius=Design.RADIUS_XL, padding=Spacing.XL, width="100%"
             )
         ),
+
+        # Section: Planejamento da Qualidade (Sigma)
+        rx.cond(State.quality_plan.length() > 0, _quality_plan_card()),
+        width="100%"
+    )
+
+
+def _quality_plan_card() -> rx.Component:
+    """Tabela Sigma por exame/nível (pior desempenho primeiro) com as regras recomendadas"""
+    return ui.card(
+        rx.vstack(
+            rx.hstack(
+                rx.box(rx.icon(tag="gauge", size=20, color=Color.PRIMARY), bg=Color.PRIMARY_LIGHT, p="2", border_radius=Design.RADIUS_SM),
+                ui.heading("Planejamento da Qualidade (Sigma)", level=3),
+                style={"gap": Spacing.SM}, align_items="center", margin_bottom=Spacing.MD, width="100%"
+            ),
+            rx.scroll_area(
+                rx.table.root(
+                    rx.table.header(
+                        rx.table.row(
+                            rx.table.column_header_cell(rx.text("EXAME", style=Typography.CAPTION)),
+                            rx.table.column_header_cell(rx.text("NÍVEL", style=Typography.CAPTION)),
+                            rx.table.column_header_cell(rx.text("N", style=Typography.CAPTION)),
+                            rx.table.column_header_cell(rx.text("BIAS %", style=Typography.CAPTION)),
+                            rx.table.column_header_cell(rx.text("CV %", style=Typography.CAPTION)),
+                            rx.table.column_header_cell(rx.text("TEA %", style=Typography.CAPTION)),
+                            rx.table.column_header_cell(rx.text("SIGMA", style=Typography.CAPTION)),
+                            rx.table.column_header_cell(rx.text("REGRAS", style=Typography.CAPTION)),
+                        )
+                    ),
+                    rx.table.body(
+                        rx.foreach(
+                            State.quality_plan,
+                            lambda row: rx.table.row(
+                                rx.table.cell(rx.text(row["exam_name"], font_weight="600")),
+                                rx.table.cell(row["level"]),
+                                rx.table.cell(row["n"]),
+                                rx.table.cell(row["bias"]),
+                                rx.table.cell(row["cv"]),
+                                rx.table.cell(row["tea"]),
+                                rx.table.cell(rx.text(row["sigma"], font_weight="700")),
+                                rx.table.cell(rx.text(row["rules"], font_size=Typography.H5["font_size"])),
+                            )
+                        )
+                    ), width="100%"
+                ),
+                style={"max_height": "360px"}
+            ),
+            width="100%"
+        ),
         width="100%"
     )
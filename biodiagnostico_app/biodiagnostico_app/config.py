@@ -2,9 +2,18 @@
 Configurações centralizadas da aplicação
 """
 import os
-from dotenv import load_dotenv, find_dotenv
+from dotenv import find_dotenv, load_dotenv
 
-load_dotenv(find_dotenv())
+# Caminho explícito (DOTENV_PATH ou .env da raiz do app) evita percorrer diretórios
+# a cada inicialização; sem esse arquivo, volta à busca de find_dotenv() (ex: .env na
+# raiz do repositório)
+_ENV_FILE = os.getenv("DOTENV_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"
+)
+if not os.path.isfile(_ENV_FILE):
+    _ENV_FILE = find_dotenv()
+if _ENV_FILE:
+    load_dotenv(_ENV_FILE)
 
 class Config:
     """Configurações da aplicação"""
@@ -13,9 +22,13 @@ class Config:
     SUPABASE_URL = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
     SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+    # Banco em memória (services/supabase_fake.py) para carga/benchmarks sem projeto real
+    SUPABASE_FAKE = os.getenv("SUPABASE_FAKE", "").lower() in ("1", "true", "yes")
 
     # Gemini AI (Voice-to-Form)
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+    # Opcional: outro endpoint compatível (proxy ou servidor local de testes)
+    GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")
     @classmethod
     def validate(cls):
         """Valida se todas as configurações obrigatórias estão presentes"""
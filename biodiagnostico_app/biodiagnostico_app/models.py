@@ -44,6 +44,7 @@ class QCRecord(BaseModel):
     reference_id: str = ""
     needs_calibration: bool = False
     post_calibration_id: str = ""
+    sync_status: str = ""  # "pending" | "failed" enquanto está no outbox local; "" = gravado no banco
 
 
 class PostCalibrationRecord(BaseModel):
@@ -75,12 +76,11 @@ class ReagentLot(BaseModel):
     days_left: int = 0
     current_stock: float = 0.0
     estimated_consumption: float = 0.0
-
-    @property
-    def days_to_rupture(self) -> Optional[int]:
-        if self.estimated_consumption > 0:
-            return int(self.current_stock / self.estimated_consumption)
-        return None
+    # Preenchidos pela previsão de consumo (services/reagent_forecast_service.py)
+    days_to_rupture: Optional[int] = None
+    stockout_date: str = ""
+    forecast_daily_consumption: float = 0.0
+    expiry_waste: float = 0.0
 
 
 class MaintenanceRecord(BaseModel):
@@ -137,6 +137,22 @@ def alerts_panel() -> rx.Component:
                 ),
             ),
 
+            # Previsão de consumo: ruptura próxima ou sobra na validade
+            rx.foreach(
+                State.reagent_forecast,
+                lambda f: rx.hstack(
+                    rx.icon(tag="package-x", size=18, color=rx.cond(f["severity"] == "error", Color.ERROR, Color.WARNING)),
+                    rx.vstack(
+                        rx.text(f["name"], font_size=Typography.SIZE_MD_SM, font_weight="600", color=Color.TEXT_PRIMARY),
+                        rx.text(f["detail"], font_size=Typography.SIZE_SM, color=Color.TEXT_SECONDARY),
+                        spacing="0",
+                    ),
+                    width="100%", align_items="center", style={"gap": Spacing.SM_MD},
+                    padding=Spacing.MD, bg=rx.cond(f["severity"] == "error", Color.ERROR_BG, Color.WARNING_BG),
+                    border_radius=Design.RADIUS_LG,
+                ),
+            ),
+
             # Manutenções pendentes
             rx.cond(
                 State.has_pending_maintenances,
@@ -144,7 +160,7 @@ def alerts_panel() -> rx.Component:
                     rx.icon(tag="wrench", size=18, color=Color.PRIMARY),
                     rx.vstack(
                         rx.text("Manutenções pendentes", font_size=Typography.SIZE_MD_SM, font_weight="600", color=Color.TEXT_PRIMARY),
-                        rx.text(State.dashboard_pending_maintenances.to_string() + " equipamentos", font_size=Typography.SIZE_SM, color=Color.TEXT_SECONDARY),
+                        rx.text(State.dashboard_pending_maintenances.to_string() + " vencidas ou para hoje", font_size=Typography.SIZE_SM, color=Color.TEXT_SECONDARY),
                         spacing="0",
                     ),
                     width="100%", align_items="center", style={"gap": Spacing.SM_MD},
@@ -152,6 +168,19 @@ def alerts_panel() -> rx.Component:
                 ),
             ),
 
+            # Agenda: vencidas e a vencer nos próximos dias
+            rx.foreach(
+                State.maintenance_schedule,
+                lambda m: rx.hstack(
+                    rx.icon(tag="calendar-clock", size=16, color=rx.cond(m["status"] == "Vencida", Color.ERROR, Color.PRIMARY)),
+                    rx.text(m["equipment"] + " · " + m["type"], font_size=Typography.SIZE_SM, color=Color.TEXT_PRIMARY),
+                    rx.spacer(),
+                    rx.badge(m["status"] + " " + m["next_date"], color_scheme=rx.cond(m["status"] == "Vencida", "red", "amber"), variant="soft", size="1"),
+                    width="100%", align_items="center", style={"gap": Spacing.SM},
+                    padding_x=Spacing.MD,
+                ),
+            ),
+
             # Violações Westgard
             rx.cond(
                 State.westgard_violations_month != "0",
@@ -167,9 +196,24 @@ def alerts_panel() -> rx.Component:
                 ),
             ),
 
+            # Deriva precoce (EWMA/CUSUM)
+            rx.foreach(
+                State.drift_alerts,
+                lambda a: rx.hstack(
+                    rx.icon(tag="trending-up", size=18, color=Color.WARNING),
+                    rx.vstack(
+                        rx.text("Tendência: " + a["exam_name"], font_size=Typography.SIZE_MD_SM, font_weight="600", color=Color.TEXT_PRIMARY),
+                        rx.text(a["alarm"] + " · " + a["detail"] + " · " + a["last_date"], font_size=Typography.SIZE_SM, color=Color.TEXT_SECONDARY),
+                        spacing="0",
+                    ),
+                    width="100%", align_items="center", style={"gap": Spacing.SM_MD},
+                    padding=Spacing.MD, bg=Color.WARNING_BG, border_radius=Design.RADIUS_LG,
+                ),
+            ),
+
             # Estado sem alertas
             rx.cond(
-                ~State.has_alerts & ~State.has_expiring_lots & ~State.has_pending_maintenances,
+                ~State.has_alerts & ~State.has_expiring_lots & ~State.has_pending_maintenances & ~State.has_drift_alerts & ~State.has_reagent_forecast,
                 rx.center(
                     rx.vstack(
                         rx.box(
@@ -0,0 +1,367 @@
+"""
+Motor de alertas em processo (substitui o polling de 15 min dos workflows n8n).
+
+Os caminhos de escrita do app publicam eventos (registro de CQ salvo/excluído,
+lote salvo/excluído) e a carga do banco semeia o estado; manutenções vêm do
+índice da agenda (maintenance_scheduler_service). O motor mantém esse estado
+em memória, avalia as regras de forma incremental numa task asyncio e entrega
+os alertas novos em lote aos destinos configurados (log e, opcionalmente, um
+webhook — ex.: o n8n repassando ao Telegram). Alertas repetidos são suprimidos pela chave de
+deduplicação durante ALERT_DEDUP_SECONDS.
+
+Com vários workers, os eventos publicados em um processo são repassados aos
+outros (cluster_service) e todos mantêm o mesmo estado, mas só o worker que
+detém o lease "alerts" avalia as regras e entrega os alertas.
+"""
+import asyncio
+import logging
+import os
+import queue
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from .cluster_service import cluster
+from .maintenance_scheduler_service import MaintenanceScheduler, maintenance_scheduler
+
+logger = logging.getLogger(__name__)
+
+ALERT_WEBHOOK_URL = os.environ.get("ALERT_WEBHOOK_URL", "")
+ALERT_BATCH_SECONDS = float(os.environ.get("ALERT_BATCH_SECONDS", "5"))
+ALERT_DEDUP_SECONDS = float(os.environ.get("ALERT_DEDUP_SECONDS", str(12 * 3600)))
+# Mesmo horário do antigo lembrete (cron "0 14 * * 1-5"): depois disso, série sem CQ no dia alerta
+ALERT_QC_DEADLINE_HOUR = int(os.environ.get("ALERT_QC_DEADLINE_HOUR", "14"))
+# Séries com CQ nos últimos N dias são consideradas "em rotina"
+ALERT_QC_ACTIVE_DAYS = int(os.environ.get("ALERT_QC_ACTIVE_DAYS", "7"))
+# Mesma janela do card "lotes vencendo" do dashboard
+ALERT_LOT_EXPIRY_DAYS = int(os.environ.get("ALERT_LOT_EXPIRY_DAYS", "30"))
+
+EVENT_QC_SAVED = "qc_saved"
+EVENT_QC_DELETED = "qc_deleted"
+EVENT_LOT_SAVED = "lot_saved"
+EVENT_LOT_DELETED = "lot_deleted"
+# Envelope dos eventos acima repassados entre workers
+EVENT_CLUSTER_ALERT = "alerts.event"
+
+
+@dataclass
+class Alert:
+    """Alerta disparado por uma regra."""
+    key: str
+    rule: str
+    severity: str  # "critical" | "warning"
+    title: str
+    message: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "rule": self.rule,
+            "severity": self.severity,
+            "title": self.title,
+            "message": self.message,
+            "data": self.data,
+        }
+
+
+class AlertSnapshot:
+    """Estado incremental que as regras consultam (sem ir ao banco)."""
+
+    def __init__(self, maintenances: Optional[MaintenanceScheduler] = None):
+        # (exame, nível) -> data (YYYY-MM-DD) do último CQ
+        self.last_qc: Dict[Tuple[str, str], str] = {}
+        # id -> registro de CQ
+        self.qc_by_id: Dict[str, Dict[str, Any]] = {}
+        # ids de registros com rejeição de Westgard ainda não entregues a todos os destinos
+        self.new_rejections: List[str] = []
+        self.lots: Dict[str, Dict[str, Any]] = {}
+        self.maintenances = maintenances if maintenances is not None else MaintenanceScheduler()
+
+    def add_qc(self, record: Dict[str, Any]):
+        record_id = str(record.get("id") or "")
+        self.qc_by_id[record_id] = record
+        key = ((record.get("exam_name") or "").strip().upper(), record.get("level") or "")
+        day = (record.get("date") or "")[:10]
+        if day > self.last_qc.get(key, ""):
+            self.last_qc[key] = day
+
+    def remove_qc(self, record_id: str):
+        record = self.qc_by_id.pop(str(record_id), None)
+        if record is None:
+            return
+        key = ((record.get("exam_name") or "").strip().upper(), record.get("level") or "")
+        days = [
+            (r.get("date") or "")[:10] for r in self.qc_by_id.values()
+            if ((r.get("exam_name") or "").strip().upper(), r.get("level") or "") == key
+        ]
+        if days:
+            self.last_qc[key] = max(days)
+        else:
+            self.last_qc.pop(key, None)
+
+
+# ── Regras ──
+# Cada regra recebe (snapshot, agora) e devolve os alertas ativos; a deduplicação
+# fica no motor, então as regras podem reportar a mesma condição a cada ciclo.
+
+Rule = Callable[[AlertSnapshot, datetime], List[Alert]]
+
+
+def rule_westgard_rejection(snap: AlertSnapshot, now: datetime) -> List[Alert]:
+    alerts = []
+    for record_id in snap.new_rejections:
+        record = snap.qc_by_id.get(record_id)
+        if record is None:
+            continue
+        rules = [v.get("rule", "") for v in record.get("westgard_violations") or [] if v.get("severity") == "rejection"]
+        if not rules:
+            continue
+        alerts.append(Alert(
+            key=f"westgard:{record_id}",
+            rule="westgard_rejection",
+            severity="critical",
+            title=f"Rejeição Westgard: {record.get('exam_name', '')} ({record.get('level', '')})",
+            message=f"Regras violadas: {', '.join(rules)} — valor {record.get('value')} em {(record.get('date') or '')[:16]}.",
+            data={"record_id": record_id, "rules": rules},
+        ))
+    # new_rejections só é esvaziada pelo dispatch, depois da entrega
+    return alerts
+
+
+def rule_qc_missing_today(snap: AlertSnapshot, now: datetime) -> List[Alert]:
+    if now.weekday() >= 5 or now.hour < ALERT_QC_DEADLINE_HOUR:
+        return []
+    today = now.strftime("%Y-%m-%d")
+    active_since = (now - timedelta(days=ALERT_QC_ACTIVE_DAYS)).strftime("%Y-%m-%d")
+    alerts = []
+    for (exam, level), last_day in sorted(snap.last_qc.items()):
+        if active_since <= last_day < today:
+            alerts.append(Alert(
+                key=f"qc_missing:{exam}:{level}:{today}",
+                rule="qc_missing_today",
+                severity="warning",
+                title=f"CQ pendente hoje: {exam} ({level})",
+                message=f"Nenhum controle registrado hoje; último em {last_day}.",
+                data={"exam_name": exam, "level": level, "last_date": last_day},
+            ))
+    return alerts
+
+
+def rule_lot_expiring(snap: AlertSnapshot, now: datetime) -> List[Alert]:
+    today = now.date()
+    alerts = []
+    for lot_id, lot in snap.lots.items():
+        try:
+            expiry = datetime.strptime(lot.get("expiry_date") or "", "%Y-%m-%d").date()
+        except ValueError:
+            continue
+        days_left = (expiry - today).days
+        if days_left > ALERT_LOT_EXPIRY_DAYS:
+            continue
+        expired = days_left < 0
+        alerts.append(Alert(
+            # Um alerta ao entrar na janela e outro ao vencer
+            key=f"lot:{lot_id}:{'expired' if expired else 'expiring'}",
+            rule="lot_expiring",
+            severity="critical" if expired else "warning",
+            title=f"Lote {'vencido' if expired else 'vencendo'}: {lot.get('name', '')} {lot.get('lot_number', '')}",
+            message=f"Validade {lot.get('expiry_date')} ({days_left} dias).",
+            data={"lot_id": lot_id, "days_left": days_left},
+        ))
+    return alerts
+
+
+def rule_maintenance_overdue(snap: AlertSnapshot, now: datetime) -> List[Alert]:
+    return [
+        Alert(
+            key=f"maintenance:{m['equipment']}:{m['type']}:{m['next_date']}",
+            rule="maintenance_overdue",
+            severity="warning",
+            title=f"Manutenção pendente: {m['equipment']}",
+            message=f"{m['type']} prevista para {m['next_date']}.",
+            data={"record_id": m["id"], "next_date": m["next_date"]},
+        )
+        # Vencidas ou para hoje, direto do índice ordenado da agenda
+        for m in snap.maintenances.pending(now.date())
+    ]
+
+
+DEFAULT_RULES: List[Rule] = [
+    rule_westgard_rejection,
+    rule_qc_missing_today,
+    rule_lot_expiring,
+    rule_maintenance_overdue,
+]
+
+
+# ── Destinos ──
+
+class LogSink:
+    """Registra os alertas no log do backend."""
+
+    async def send(self, alerts: List[Dict[str, Any]]):
+        for a in alerts:
+            logger.warning(f"Alerta [{a['severity']}] {a['title']} — {a['message']}")
+
+
+class WebhookSink:
+    """POST JSON {"source", "sent_at", "alerts": [...]} para um webhook (ex.: n8n)."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    async def send(self, alerts: List[Dict[str, Any]]):
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(self.url, json={
+                "source": "biodiagnostico_app",
+                "sent_at": datetime.now().isoformat(),
+                "alerts": alerts,
+            })
+            response.raise_for_status()
+
+
+def _as_dict(item: Any) -> Dict[str, Any]:
+    return item if isinstance(item, dict) else item.dict()
+
+
+class AlertEngine:
+    """Barramento de eventos + avaliação incremental de regras + entrega em lote."""
+
+    def __init__(self, rules: Optional[List[Rule]] = None, sinks: Optional[List[Any]] = None,
+                 dedup_seconds: float = ALERT_DEDUP_SECONDS,
+                 scheduler: Optional[MaintenanceScheduler] = None):
+        self.rules = list(rules if rules is not None else DEFAULT_RULES)
+        if sinks is None:
+            sinks = [LogSink()]
+            if ALERT_WEBHOOK_URL:
+                sinks.append(WebhookSink(ALERT_WEBHOOK_URL))
+        self.sinks = sinks
+        self.dedup_seconds = dedup_seconds
+        self.snapshot = AlertSnapshot(scheduler if scheduler is not None else maintenance_scheduler)
+        # Fila thread-safe: publish() pode vir de handlers ou de executores
+        self._events: "queue.SimpleQueue[Tuple[str, Any]]" = queue.SimpleQueue()
+        self._sent: Dict[str, float] = {}
+        self.seeded = False
+
+    # ── Entrada ──
+
+    def publish(self, event: str, payload: Any):
+        """Enfileira um evento de escrita (não bloqueia; processado no próximo ciclo)."""
+        self._events.put((event, payload))
+        cluster.publish(EVENT_CLUSTER_ALERT, {
+            "event": event, "payload": payload if isinstance(payload, str) else _as_dict(payload),
+        })
+
+    def seed(self, qc_records: Iterable[Any] = (), lots: Iterable[Any] = ()):
+        """Estado inicial a partir do que a carga do banco já trouxe (sem consultas extras)."""
+        # Cada worker semeia a partir da própria carga; não é repassado aos outros
+        self._events.put(("seed", {
+            "qc": [_as_dict(r) for r in qc_records],
+            "lots": [_as_dict(l) for l in lots],
+        }))
+        self.seeded = True
+
+    def _apply(self, event: str, payload: Any):
+        snap = self.snapshot
+        if event == "seed":
+            fresh = AlertSnapshot(snap.maintenances)
+            fresh.new_rejections = snap.new_rejections
+            for r in payload["qc"]:
+                fresh.add_qc(r)
+            fresh.lots = {str(l.get("id") or ""): l for l in payload["lots"]}
+            self.snapshot = fresh
+        elif event == EVENT_QC_SAVED:
+            record = _as_dict(payload)
+            snap.add_qc(record)
+            if any(v.get("severity") == "rejection" for v in record.get("westgard_violations") or []):
+                snap.new_rejections.append(str(record.get("id") or ""))
+        elif event == EVENT_QC_DELETED:
+            snap.remove_qc(str(payload))
+            if str(payload) in snap.new_rejections:
+                snap.new_rejections.remove(str(payload))
+        elif event == EVENT_LOT_SAVED:
+            lot = _as_dict(payload)
+            snap.lots[str(lot.get("id") or "")] = lot
+        elif event == EVENT_LOT_DELETED:
+            snap.lots.pop(str(payload), None)
+        else:
+            logger.debug(f"Alertas: evento desconhecido {event}")
+
+    # ── Ciclo ──
+
+    def drain(self):
+        """Aplica os eventos pendentes ao snapshot."""
+        while True:
+            try:
+                event, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self._apply(event, payload)
+            except Exception as e:
+                logger.error(f"Alertas: evento {event} ignorado: {e}")
+
+    def evaluate(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Aplica os eventos pendentes e devolve os alertas novos (já deduplicados)."""
+        self.drain()
+        now = now or datetime.now()
+        clock = time.monotonic()
+        self._sent = {k: t for k, t in self._sent.items() if clock - t < self.dedup_seconds}
+        fresh: List[Dict[str, Any]] = []
+        for rule in self.rules:
+            try:
+                triggered = rule(self.snapshot, now)
+            except Exception as e:
+                logger.error(f"Alertas: regra {getattr(rule, '__name__', rule)} falhou: {e}")
+                continue
+            for alert in triggered:
+                if alert.key in self._sent:
+                    continue
+                self._sent[alert.key] = clock
+                fresh.append(alert.as_dict())
+        return fresh
+
+    async def dispatch(self, alerts: List[Dict[str, Any]]):
+        """Entrega um lote a todos os destinos; se um destino falha, o lote volta a valer no próximo ciclo."""
+        if not alerts:
+            return
+        failed = False
+        for sink in self.sinks:
+            try:
+                await sink.send(alerts)
+            except Exception as e:
+                logger.error(f"Alertas: falha no destino {type(sink).__name__}: {e}")
+                failed = True
+        if failed:
+            for a in alerts:
+                self._sent.pop(a["key"], None)
+            return
+        delivered = {a["data"].get("record_id") for a in alerts if a["rule"] == "westgard_rejection"}
+        if delivered:
+            self.snapshot.new_rejections = [i for i in self.snapshot.new_rejections if i not in delivered]
+
+    async def run_forever(self, interval: float = ALERT_BATCH_SECONDS):
+        """Loop de avaliação (registrado como lifespan task do app)."""
+        while True:
+            try:
+                if await cluster.is_leader("alerts", ttl=interval * 3):
+                    await self.dispatch(self.evaluate())
+                else:
+                    # Rejeições ficam com o líder; aqui só o estado acompanha os eventos
+                    self.drain()
+                    self.snapshot.new_rejections = []
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Alertas: erro no loop: {e}")
+            await asyncio.sleep(interval)
+
+
+# Instância do processo
+alert_engine = AlertEngine()
+cluster.on(EVENT_CLUSTER_ALERT, lambda message: alert_engine._events.put((message["event"], message["payload"])))
@@ -0,0 +1,476 @@
+"""
+Espelho analítico local (SQLite) das tabelas de CQ.
+
+Opcional: só é ativado quando ANALYTICS_MIRROR_PATH aponta para um arquivo.
+Mantém uma cópia incremental de qc_records, valores referenciais,
+pós-calibrações e medições das áreas, para que o dashboard faça
+agregações em SQL (GROUP BY exame/nível/mês, janelas) em vez de
+loops Python sobre listas de linhas — só enquanto o espelho estiver em dia
+com os registros em memória (ver AnalyticsMirror.covers).
+
+Com vários workers no mesmo host, todos leem o mesmo arquivo e só o que
+detém o lease "analytics_mirror" (cluster_service) roda o sync periódico.
+"""
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .cluster_service import cluster
+from .supabase_client import SupabaseClient
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_MIRROR_PATH = os.environ.get("ANALYTICS_MIRROR_PATH", "")
+ANALYTICS_MIRROR_SYNC_INTERVAL_SECONDS = float(os.environ.get("ANALYTICS_MIRROR_SYNC_INTERVAL", "60"))
+ANALYTICS_MIRROR_PAGE_SIZE = 1000
+# Linhas sem updated_at (ex: qc_records) mudam logo após criadas (pós-calibração, status):
+# cada sync relê essa janela recente além das linhas novas
+ANALYTICS_MIRROR_LOOKBACK_DAYS = 7
+# Exclusões no banco são propagadas por reconciliação completa de IDs
+ANALYTICS_MIRROR_RECONCILE_SECONDS = 6 * 3600
+
+_AREA_MEASUREMENT_COLUMNS = {
+    "created_at": "TEXT",
+    "data_medicao": "TEXT",
+    "analito": "TEXT",
+    "valor_medido": "REAL",
+    "parameter_id": "TEXT",
+    "modo_usado": "TEXT",
+    "min_aplicado": "REAL",
+    "max_aplicado": "REAL",
+    "status": "TEXT",
+}
+
+AREA_MEASUREMENT_TABLES = [
+    f"{prefix}_qc_measurements"
+    for prefix in ("hematology", "immunology", "parasitology", "microbiology", "urine")
+]
+
+# tabela -> coluna de cursor incremental, colunas espelhadas e índices
+MIRROR_TABLES: Dict[str, Dict[str, Any]] = {
+    "qc_records": {
+        "cursor": "created_at",
+        "lookback": True,
+        "columns": {
+            "created_at": "TEXT",
+            "date": "TEXT",
+            "exam_name": "TEXT",
+            "level": "TEXT",
+            "lot_number": "TEXT",
+            "value": "REAL",
+            "target_value": "REAL",
+            "target_sd": "REAL",
+            "cv": "REAL",
+            "status": "TEXT",
+            "needs_calibration": "INTEGER",
+            "reference_id": "TEXT",
+            "post_calibration_id": "TEXT",
+            "equipment_name": "TEXT",
+            "analyst_name": "TEXT",
+        },
+        "indexes": [("date",), ("exam_name", "level", "date")],
+    },
+    "qc_reference_values": {
+        "cursor": "updated_at",
+        "lookback": False,
+        "columns": {
+            "updated_at": "TEXT",
+            "name": "TEXT",
+            "exam_name": "TEXT",
+            "level": "TEXT",
+            "lot_number": "TEXT",
+            "valid_from": "TEXT",
+            "valid_until": "TEXT",
+            "target_value": "REAL",
+            "cv_max_threshold": "REAL",
+            "is_active": "INTEGER",
+        },
+        "indexes": [("exam_name", "level", "valid_from")],
+    },
+    "post_calibration_records": {
+        "cursor": "created_at",
+        "lookback": True,
+        "columns": {
+            "created_at": "TEXT",
+            "qc_record_id": "TEXT",
+            "date": "TEXT",
+            "exam_name": "TEXT",
+            "original_value": "REAL",
+            "original_cv": "REAL",
+            "post_calibration_value": "REAL",
+            "post_calibration_cv": "REAL",
+            "target_value": "REAL",
+        },
+        "indexes": [("date",), ("qc_record_id",)],
+    },
+    **{
+        table: {
+            "cursor": "created_at",
+            "lookback": False,
+            "columns": _AREA_MEASUREMENT_COLUMNS,
+            "indexes": [("data_medicao",), ("analito", "data_medicao")],
+        }
+        for table in AREA_MEASUREMENT_TABLES
+    },
+}
+
+_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mirror_state (
+    table_name TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL DEFAULT '',
+    last_sync_at REAL NOT NULL DEFAULT 0,
+    last_reconcile_at REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+def _table_schema(table: str, spec: Dict[str, Any]) -> str:
+    columns = ",\n    ".join(f"{name} {sql_type}" for name, sql_type in spec["columns"].items())
+    statements = [f"CREATE TABLE IF NOT EXISTS {table} (\n    id TEXT PRIMARY KEY,\n    {columns}\n);"]
+    for cols in spec["indexes"]:
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_{'_'.join(cols)} ON {table}({', '.join(cols)});"
+        )
+    return "\n".join(statements)
+
+
+def _coerce(value: Any, sql_type: str) -> Any:
+    if value is None or value == "":
+        return None
+    try:
+        if sql_type == "REAL":
+            return float(value)
+        if sql_type == "INTEGER":
+            return int(bool(value))
+    except (ValueError, TypeError):
+        return None
+    return str(value)
+
+
+def _supabase_fetcher(table: str, columns: str, cursor: Optional[str], since: str,
+                      offset: int, limit: int) -> List[Dict[str, Any]]:
+    """Página de linhas do Supabase ordenada pelo cursor (síncrono — fora do event loop)."""
+    # Mesmo cliente dos services: hematologia usa service_role, o resto a anon key
+    if table.startswith("hematology_"):
+        client = SupabaseClient.get_admin_client()
+    else:
+        client = SupabaseClient.get_client()
+    if client is None:
+        raise RuntimeError("Cliente Supabase não inicializado.")
+    query = client.table(table).select(columns)
+    if cursor:
+        if since:
+            query = query.gte(cursor, since)
+        query = query.order(cursor)
+    query = query.order("id").range(offset, offset + limit - 1)
+    return list(query.execute().data or [])
+
+
+def _shift_timestamp(value: str, days: int) -> str:
+    try:
+        return (datetime.fromisoformat(value) - timedelta(days=days)).isoformat()
+    except (ValueError, TypeError):
+        return value
+
+
+def _period_bounds(start_date: Optional[str], end_date: Optional[str]) -> tuple:
+    """Limites inclusivos compatíveis com datas ISO em texto (mesma regra dos relatórios)."""
+    return (start_date or "", (end_date + "T23:59:59") if end_date else "9999")
+
+
+def _finish_summary_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    n = int(row.get("n") or 0)
+    ss = float(row.pop("ss", 0) or 0)
+    sd = math.sqrt(ss / (n - 1)) if n > 1 else 0.0
+    mean = float(row.get("mean_value") or 0)
+    approved = int(row.get("approved") or 0)
+    row["mean_value"] = round(mean, 4)
+    row["sd"] = round(sd, 4)
+    row["cv_pct"] = round(sd / mean * 100, 2) if mean else 0.0
+    row["mean_cv"] = round(float(row.get("mean_cv") or 0), 2)
+    row["approval_rate"] = round(approved / n * 100, 1) if n else 100.0
+    return row
+
+
+def monthly_summary_from_records(records: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Mesmo resumo de AnalyticsMirror.monthly_summary, calculado em Python sobre os registros dados."""
+    groups: Dict[tuple, List[Any]] = {}
+    for r in records:
+        key = (r.exam_name, r.level, (r.date or "")[:7])
+        groups.setdefault(key, []).append(r)
+    rows = []
+    for (exam_name, level, month), items in groups.items():
+        values = [float(r.value or 0) for r in items]
+        mean = sum(values) / len(values)
+        rows.append(_finish_summary_row({
+            "exam_name": exam_name,
+            "level": level,
+            "month": month,
+            "n": len(items),
+            "mean_value": mean,
+            "ss": sum((v - mean) ** 2 for v in values),
+            "mean_cv": sum(float(r.cv or 0) for r in items) / len(items),
+            "approved": sum(1 for r in items if r.status == "OK"),
+        }))
+    rows.sort(key=lambda x: (x["month"], x["exam_name"], x["level"]))
+    return rows
+
+
+class AnalyticsMirror:
+    """Cópia local das tabelas de CQ para consultas analíticas."""
+
+    def __init__(self, path: str = ANALYTICS_MIRROR_PATH, fetcher: Optional[Callable] = None):
+        self.path = path
+        self.fetcher = fetcher or _supabase_fetcher
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._sync_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    # ── Conexão ──
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_STATE_SCHEMA)
+            for table, spec in MIRROR_TABLES.items():
+                conn.executescript(_table_schema(table, spec))
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def is_ready(self) -> bool:
+        """Espelho ativo e com ao menos um sync completo de qc_records."""
+        if not self.enabled:
+            return False
+        return self._state("qc_records")["last_sync_at"] > 0
+
+    def covers(self, records: Iterable[Any]) -> bool:
+        """
+        Espelho pronto e com o mesmo conjunto de registros carregado em memória:
+        nenhum ainda no outbox local, o mais recente já espelhado e a mesma contagem.
+        O sync é periódico — fora disso as agregações devem sair da memória.
+        """
+        records = list(records)
+        if not records or not self.is_ready():
+            return False
+        if any(getattr(r, "sync_status", "") for r in records):
+            return False
+        newest = max(records, key=lambda r: r.date)
+        row = self.query(
+            "SELECT COUNT(*) AS n, SUM(id = ?) AS has_newest FROM qc_records",
+            (str(newest.id),),
+        )[0]
+        return row["n"] == len(records) and bool(row["has_newest"])
+
+    def _state(self, table: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT watermark, last_sync_at, last_reconcile_at FROM mirror_state WHERE table_name = ?",
+                (table,),
+            ).fetchone()
+        if row is None:
+            return {"watermark": "", "last_sync_at": 0.0, "last_reconcile_at": 0.0}
+        return dict(row)
+
+    # ── Escrita ──
+
+    def upsert_rows(self, table: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """Insere/atualiza linhas (por id) e avança o watermark da tabela."""
+        spec = MIRROR_TABLES[table]
+        columns = list(spec["columns"].items())
+        cursor_col = spec["cursor"]
+        names = ["id"] + [name for name, _ in columns]
+        updates = ", ".join(f"{name} = excluded.{name}" for name, _ in columns)
+        sql = (
+            f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}"
+        )
+        params = []
+        watermark = ""
+        for row in rows:
+            if not row.get("id"):
+                continue
+            params.append([str(row["id"])] + [_coerce(row.get(name), sql_type) for name, sql_type in columns])
+            watermark = max(watermark, str(row.get(cursor_col) or ""))
+        if not params:
+            return 0
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            try:
+                db.executemany(sql, params)
+                db.execute(
+                    "INSERT INTO mirror_state (table_name, watermark) VALUES (?, ?) "
+                    "ON CONFLICT(table_name) DO UPDATE SET watermark = MAX(watermark, excluded.watermark)",
+                    (table, watermark),
+                )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return len(params)
+
+    def forget(self, table: str, ids: Iterable[str]) -> int:
+        """Remove linhas excluídas no banco (sem esperar a reconciliação)."""
+        ids = [(str(i),) for i in ids if i]
+        if not ids or not self.enabled:
+            return 0
+        with self._lock:
+            self._db().executemany(f"DELETE FROM {table} WHERE id = ?", ids)
+        return len(ids)
+
+    # ── Sincronização ──
+
+    def _sync_table_blocking(self, table: str) -> int:
+        spec = MIRROR_TABLES[table]
+        since = self._state(table)["watermark"]
+        if since and spec["lookback"]:
+            since = _shift_timestamp(since, ANALYTICS_MIRROR_LOOKBACK_DAYS)
+        total = 0
+        offset = 0
+        while True:
+            page = self.fetcher(table, "*", spec["cursor"], since, offset, ANALYTICS_MIRROR_PAGE_SIZE)
+            total += self.upsert_rows(table, page)
+            if len(page) < ANALYTICS_MIRROR_PAGE_SIZE:
+                break
+            offset += ANALYTICS_MIRROR_PAGE_SIZE
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO mirror_state (table_name, last_sync_at) VALUES (?, ?) "
+                "ON CONFLICT(table_name) DO UPDATE SET last_sync_at = excluded.last_sync_at",
+                (table, time.time()),
+            )
+        return total
+
+    def _reconcile_blocking(self, table: str) -> int:
+        """Apaga do espelho IDs que não existem mais no banco."""
+        remote_ids = set()
+        offset = 0
+        while True:
+            page = self.fetcher(table, "id", None, "", offset, ANALYTICS_MIRROR_PAGE_SIZE)
+            remote_ids.update(str(r.get("id")) for r in page)
+            if len(page) < ANALYTICS_MIRROR_PAGE_SIZE:
+                break
+            offset += ANALYTICS_MIRROR_PAGE_SIZE
+        with self._lock:
+            local_ids = {row[0] for row in self._db().execute(f"SELECT id FROM {table}")}
+        removed = self.forget(table, local_ids - remote_ids)
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO mirror_state (table_name, last_reconcile_at) VALUES (?, ?) "
+                "ON CONFLICT(table_name) DO UPDATE SET last_reconcile_at = excluded.last_reconcile_at",
+                (table, time.time()),
+            )
+        return removed
+
+    async def sync(self, reconcile: Optional[bool] = None) -> Dict[str, int]:
+        """Sync incremental de todas as tabelas. Chamadas concorrentes aguardam a mesma rodada."""
+        if not self.enabled:
+            return {}
+        if self._sync_lock is None:
+            self._sync_lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        synced: Dict[str, int] = {}
+        async with self._sync_lock:
+            for table in MIRROR_TABLES:
+                try:
+                    synced[table] = await loop.run_in_executor(None, self._sync_table_blocking, table)
+                    due = reconcile
+                    if due is None:
+                        last = self._state(table)["last_reconcile_at"]
+                        due = time.time() - last >= ANALYTICS_MIRROR_RECONCILE_SECONDS
+                    if due:
+                        await loop.run_in_executor(None, self._reconcile_blocking, table)
+                except Exception as e:
+                    # Tabela de área ainda não migrada, rede fora etc.: as demais seguem
+                    logger.warning(f"Espelho analítico: falha ao sincronizar {table}: {e}")
+        return synced
+
+    async def run_forever(self, interval: float = ANALYTICS_MIRROR_SYNC_INTERVAL_SECONDS):
+        """Loop de sync periódico (registrado como lifespan task do app)."""
+        while True:
+            try:
+                if await cluster.is_leader("analytics_mirror", ttl=interval * 3):
+                    await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Espelho analítico: erro no loop de sync: {e}")
+            await asyncio.sleep(interval)
+
+    # ── Consultas ──
+
+    def query(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        """Executa SQL somente leitura no espelho."""
+        with self._lock:
+            rows = self._db().execute(sql, tuple(params)).fetchall()
+        return [dict(r) for r in rows]
+
+    def approval_rate(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> float:
+        """Taxa de aprovação (status OK) no período, em %."""
+        start, end = _period_bounds(start_date, end_date)
+        row = self.query(
+            "SELECT COUNT(*) AS n, SUM(status = 'OK') AS ok FROM qc_records WHERE date >= ? AND date <= ?",
+            (start, end),
+        )[0]
+        if not row["n"]:
+            return 100.0
+        return round(row["ok"] / row["n"] * 100, 1)
+
+    def top_high_cv_exams(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Exames com maior CV% médio."""
+        return self.query(
+            """
+            SELECT exam_name, ROUND(AVG(cv), 2) AS avg_cv, COUNT(*) AS count
+            FROM qc_records
+            WHERE exam_name <> '' AND cv > 0
+            GROUP BY exam_name
+            ORDER BY avg_cv DESC
+            LIMIT ?
+            """,
+            (limit,),
+        )
+
+    def monthly_summary(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Resumo por exame/nível/mês: N, média, DP, CV% médio e aprovação."""
+        start, end = _period_bounds(start_date, end_date)
+        rows = self.query(
+            """
+            WITH m AS (
+                SELECT exam_name, level, substr(date, 1, 7) AS month, value, cv, status,
+                       AVG(value) OVER (PARTITION BY exam_name, level, substr(date, 1, 7)) AS mu
+                FROM qc_records
+                WHERE date >= ? AND date <= ?
+            )
+            SELECT exam_name, level, month, COUNT(*) AS n, AVG(value) AS mean_value,
+                   SUM((value - mu) * (value - mu)) AS ss, AVG(cv) AS mean_cv,
+                   SUM(status = 'OK') AS approved
+            FROM m
+            GROUP BY exam_name, level, month
+            ORDER BY month, exam_name, level
+            """,
+            (start, end),
+        )
+        return [_finish_summary_row(r) for r in rows]
+
+
+# Instância do processo — desativada se ANALYTICS_MIRROR_PATH não estiver definido
+analytics_mirror = AnalyticsMirror()
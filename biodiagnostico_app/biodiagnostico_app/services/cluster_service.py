@@ -0,0 +1,158 @@
+"""
+Coordenação entre workers do backend (modo multi-worker: BACKEND_WORKERS > 1).
+
+Com REDIS_URL definido (o mesmo Redis do gerenciador de estado do Reflex):
+  - as escritas que alimentam agregados em memória (estatísticas por série,
+    eventos do motor de alertas, agenda de manutenção, cache de KPIs e
+    mapeamento de nomes) são publicadas no canal CLUSTER_CHANNEL, e os
+    outros workers aplicam o mesmo evento nos seus agregados
+  - tarefas que devem rodar em um só worker (entrega de alertas, sincronização
+    do espelho analítico) checam um lease com TTL antes de cada ciclo; se o
+    worker dono cair, outro assume quando o lease expira
+
+Sem REDIS_URL (um worker) publish() não faz nada e is_leader() é sempre True.
+Arquivos SQLite (outbox, deriva, espelho) ficam no disco do host e são
+compartilhados diretamente pelos workers da mesma máquina.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.environ.get("REDIS_URL", "")
+WORKER_ID = os.environ.get("WORKER_ID", "") or str(os.getpid())
+CLUSTER_CHANNEL = os.environ.get("CLUSTER_CHANNEL", "") or "biodiagnostico:cluster"
+CLUSTER_LEASE_PREFIX = "biodiagnostico:lease:"
+CLUSTER_RECONNECT_MAX_SECONDS = 30.0
+
+# Adquire (se livre) ou renova (se já é do worker) o lease, atomicamente
+_LEASE_SCRIPT = """
+local owner = redis.call('get', KEYS[1])
+if owner == ARGV[1] then
+    redis.call('pexpire', KEYS[1], ARGV[2])
+    return 1
+end
+if not owner then
+    redis.call('set', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class ClusterBus:
+    """Canal de eventos entre workers e leases de tarefas exclusivas (Redis pub/sub)."""
+
+    def __init__(self, url: str = REDIS_URL, worker_id: str = WORKER_ID):
+        self.url = url
+        self.worker_id = worker_id
+        self._handlers: Dict[str, List[Callable[[Any], None]]] = {}
+        # Fila thread-safe: publish() pode vir de handlers ou de executores
+        self._outgoing: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._redis = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    # ── Eventos ──
+
+    def on(self, event: str, handler: Callable[[Any], None]):
+        """Registra como aplicar no processo um evento publicado por outro worker."""
+        self._handlers.setdefault(event, []).append(handler)
+
+    def publish(self, event: str, payload: Any = None):
+        """Enfileira o evento para os outros workers (não bloqueia; enviado pela lifespan task)."""
+        if not self.enabled:
+            return
+        self._outgoing.put(json.dumps(
+            {"origin": self.worker_id, "event": event, "payload": payload}, default=str,
+        ))
+
+    def deliver(self, raw: Any) -> bool:
+        """Aplica uma mensagem recebida do canal. Retorna False se for do próprio worker ou inválida."""
+        try:
+            message = json.loads(raw)
+        except (TypeError, ValueError):
+            logger.warning("Cluster: mensagem inválida descartada")
+            return False
+        if message.get("origin") == self.worker_id:
+            return False
+        for handler in self._handlers.get(message.get("event"), []):
+            try:
+                handler(message.get("payload"))
+            except Exception as e:
+                logger.error(f"Cluster: evento {message.get('event')} ignorado: {e}")
+        return True
+
+    # ── Redis ──
+
+    def _client(self):
+        if self._redis is None:
+            from redis.asyncio import Redis
+            self._redis = Redis.from_url(self.url)
+        return self._redis
+
+    async def is_leader(self, name: str, ttl: float) -> bool:
+        """True se este worker detém (ou acabou de obter) o lease `name` por mais `ttl` segundos."""
+        if not self.enabled:
+            return True
+        try:
+            owned = await self._client().eval(
+                _LEASE_SCRIPT, 1, CLUSTER_LEASE_PREFIX + name, self.worker_id, int(ttl * 1000),
+            )
+        except Exception as e:
+            logger.warning(f"Cluster: lease {name} indisponível: {e}")
+            return False
+        return bool(owned)
+
+    async def _pump(self, pubsub):
+        """Envia a fila de saída e entrega as mensagens recebidas até a conexão cair."""
+        client = self._client()
+        while True:
+            while True:
+                try:
+                    raw = self._outgoing.get_nowait()
+                except queue.Empty:
+                    break
+                await client.publish(CLUSTER_CHANNEL, raw)
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.05)
+            if message is not None:
+                self.deliver(message["data"])
+
+    async def run_forever(self):
+        """Assina o canal e envia os eventos locais (registrado como lifespan task do app)."""
+        if not self.enabled:
+            return
+        delay = 1.0
+        while True:
+            try:
+                pubsub = self._client().pubsub()
+                await pubsub.subscribe(CLUSTER_CHANNEL)
+                logger.info(f"Cluster: worker {self.worker_id} conectado ao canal {CLUSTER_CHANNEL}")
+                delay = 1.0
+                try:
+                    await self._pump(pubsub)
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cluster: conexão com o Redis perdida ({e}); nova tentativa em {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, CLUSTER_RECONNECT_MAX_SECONDS)
+
+
+def worker_suffixed(path: str) -> str:
+    """Caminho próprio do worker (ex.: relatórios de profiling), quando WORKER_ID está definido."""
+    if not os.environ.get("WORKER_ID"):
+        return path
+    return f"{path}-worker{os.environ['WORKER_ID']}"
+
+
+# Instância do processo
+cluster = ClusterBus()
@@ -0,0 +1,278 @@
+"""
+Detecção precoce de deriva (EWMA e CUSUM tabular) por série de CQ.
+
+Cada série (exame, nível, lote, equipamento) guarda estado O(1): contagem,
+EWMA e as somas CUSUM superior/inferior sobre o z-score. O estado fica num
+arquivo SQLite no host do backend, então um restart não precisa reprocessar o
+histórico. A atualização ponto a ponto e a reconstrução em lote usam o mesmo
+passo vetorizado (numpy): em lote, todas as séries avançam juntas, um índice
+de tempo por vez. Leitura, passo e gravação de uma atualização rodam numa
+transação BEGIN IMMEDIATE, então workers que compartilham o arquivo não
+perdem atualizações da mesma série.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DRIFT_STATE_PATH = os.environ.get("QC_DRIFT_STATE_PATH", "qc_drift_state.db")
+
+# EWMA: λ=0.2, limites L=3 (em unidades de SD); CUSUM: k=0.5 SD, h=4 SD
+EWMA_LAMBDA = 0.2
+EWMA_L = 3.0
+CUSUM_K = 0.5
+CUSUM_H = 4.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS detector_state (
+    series TEXT PRIMARY KEY,
+    exam_name TEXT NOT NULL,
+    level TEXT NOT NULL,
+    lot_number TEXT NOT NULL,
+    equipment TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    ewma REAL NOT NULL,
+    cusum_pos REAL NOT NULL,
+    cusum_neg REAL NOT NULL,
+    alarm TEXT NOT NULL DEFAULT '',
+    last_date TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL
+);
+"""
+
+SeriesKey = Tuple[str, str, str, str]
+
+
+def series_of(exam_name: str, level: str, lot_number: str, equipment: str) -> SeriesKey:
+    return tuple((p or "").strip().upper() for p in (exam_name, level, lot_number, equipment))
+
+
+def _step(n: np.ndarray, ewma: np.ndarray, c_pos: np.ndarray, c_neg: np.ndarray, z: np.ndarray):
+    """Um passo EWMA/CUSUM para vários detectores de uma vez."""
+    n = n + 1
+    ewma = EWMA_LAMBDA * z + (1 - EWMA_LAMBDA) * ewma
+    c_pos = np.maximum(0.0, c_pos + z - CUSUM_K)
+    c_neg = np.maximum(0.0, c_neg - z - CUSUM_K)
+    return n, ewma, c_pos, c_neg
+
+
+def _alarms(n: np.ndarray, ewma: np.ndarray, c_pos: np.ndarray, c_neg: np.ndarray) -> List[str]:
+    """Rótulo do alarme de cada detector ('' se sob controle)."""
+    limit = EWMA_L * np.sqrt(EWMA_LAMBDA / (2 - EWMA_LAMBDA) * (1 - (1 - EWMA_LAMBDA) ** (2 * n)))
+    labels = []
+    for i in range(len(n)):
+        flags = []
+        if ewma[i] > limit[i]:
+            flags.append("EWMA+")
+        elif ewma[i] < -limit[i]:
+            flags.append("EWMA-")
+        if c_pos[i] > CUSUM_H:
+            flags.append("CUSUM+")
+        if c_neg[i] > CUSUM_H:
+            flags.append("CUSUM-")
+        labels.append(" ".join(flags))
+    return labels
+
+
+class DriftDetector:
+    """Detectores EWMA/CUSUM persistidos por série."""
+
+    def __init__(self, path: str = DRIFT_STATE_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    # ── Conexão ──
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # timeout: espera a transação de outro worker (ex.: rebuild) em vez de falhar
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @contextmanager
+    def _transaction(self):
+        """Transação de escrita; chamadas aninhadas entram na transação já aberta."""
+        with self._lock:
+            db = self._db()
+            if db.in_transaction:
+                yield db
+                return
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._db().execute("SELECT 1 FROM detector_state LIMIT 1").fetchone() is None
+
+    def _load(self, keys: List[SeriesKey]) -> Dict[SeriesKey, Tuple[int, float, float, float]]:
+        names = ["|".join(k) for k in keys]
+        states = {}
+        with self._lock:
+            db = self._db()
+            for start in range(0, len(names), 500):
+                chunk = names[start:start + 500]
+                rows = db.execute(
+                    f"SELECT series, n, ewma, cusum_pos, cusum_neg FROM detector_state "
+                    f"WHERE series IN ({', '.join('?' for _ in chunk)})",
+                    chunk,
+                ).fetchall()
+                for row in rows:
+                    states[tuple(row["series"].split("|"))] = (row["n"], row["ewma"], row["cusum_pos"], row["cusum_neg"])
+        return states
+
+    def _save(self, rows: List[Tuple]):
+        now = datetime.now().isoformat()
+        with self._transaction() as db:
+            db.executemany(
+                "INSERT INTO detector_state (series, exam_name, level, lot_number, equipment, n, ewma, "
+                "cusum_pos, cusum_neg, alarm, last_date, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(series) DO UPDATE SET n = excluded.n, ewma = excluded.ewma, "
+                "cusum_pos = excluded.cusum_pos, cusum_neg = excluded.cusum_neg, alarm = excluded.alarm, "
+                "last_date = excluded.last_date, updated_at = excluded.updated_at",
+                [row + (now,) for row in rows],
+            )
+
+    # ── Atualização ──
+
+    def update_points(self, points: Iterable[Tuple[SeriesKey, str, float]]) -> List[Dict[str, Any]]:
+        """
+        Avança os detectores com pontos (série, data, z-score) e persiste o estado.
+        Um ponto ou um histórico inteiro seguem o mesmo caminho vetorizado.
+
+        Returns:
+            Séries que estão em alarme após a atualização.
+        """
+        by_series: Dict[SeriesKey, List[Tuple[str, float]]] = {}
+        for key, date, z in points:
+            if np.isfinite(z):
+                by_series.setdefault(key, []).append((date or "", float(z)))
+        if not by_series:
+            return []
+
+        keys = list(by_series)
+        for key in keys:
+            by_series[key].sort(key=lambda p: p[0])
+        with self._transaction():
+            return self._advance(keys, by_series)
+
+    def _advance(self, keys: List[SeriesKey], by_series: Dict[SeriesKey, List[Tuple[str, float]]]) -> List[Dict[str, Any]]:
+        """Passo vetorizado sobre o estado gravado (dentro da transação de update_points)."""
+        stored = self._load(keys)
+        n = np.array([stored.get(k, (0, 0.0, 0.0, 0.0))[0] for k in keys], dtype=float)
+        ewma = np.array([stored.get(k, (0, 0.0, 0.0, 0.0))[1] for k in keys], dtype=float)
+        c_pos = np.array([stored.get(k, (0, 0.0, 0.0, 0.0))[2] for k in keys], dtype=float)
+        c_neg = np.array([stored.get(k, (0, 0.0, 0.0, 0.0))[3] for k in keys], dtype=float)
+
+        length = max(len(v) for v in by_series.values())
+        z = np.full((len(keys), length), np.nan)
+        for i, key in enumerate(keys):
+            z[i, :len(by_series[key])] = [p[1] for p in by_series[key]]
+
+        for t in range(length):
+            active = ~np.isnan(z[:, t])
+            n[active], ewma[active], c_pos[active], c_neg[active] = _step(
+                n[active], ewma[active], c_pos[active], c_neg[active], z[active, t]
+            )
+
+        alarms = _alarms(n, ewma, c_pos, c_neg)
+        self._save([
+            ("|".join(key),) + key + (int(n[i]), float(ewma[i]), float(c_pos[i]), float(c_neg[i]),
+                                      alarms[i], by_series[key][-1][0])
+            for i, key in enumerate(keys)
+        ])
+        return [self._alert(key, alarms[i], by_series[key][-1][0], ewma[i], c_pos[i], c_neg[i])
+                for i, key in enumerate(keys) if alarms[i]]
+
+    def update_records(self, records: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Atualiza a partir de registros QCRecord (ignora os sem DP alvo)."""
+        return self.update_points(
+            (series_of(r.exam_name, r.level, r.lot_number, r.equipment), r.date,
+             (r.value - r.target_value) / r.target_sd)
+            for r in records if r.target_sd and r.target_sd > 0
+        )
+
+    def update_area_measurement(self, area: str, analito: str, date: str, value: float,
+                                min_aplicado: float, max_aplicado: float) -> List[Dict[str, Any]]:
+        """Medições das áreas: alvo no centro do intervalo aceito, que equivale a ±2 SD."""
+        sd = (float(max_aplicado) - float(min_aplicado)) / 4
+        if sd <= 0:
+            return []
+        center = (float(max_aplicado) + float(min_aplicado)) / 2
+        key = series_of(f"{area}:{analito}", "", "", "")
+        return self.update_points([(key, date, (float(value) - center) / sd)])
+
+    def rebuild(self, records: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Recria o estado de todas as séries de CQ a partir do histórico."""
+        with self._transaction() as db:
+            db.execute("DELETE FROM detector_state WHERE exam_name NOT LIKE '%:%'")
+            return self.update_records(records)
+
+    def seed(self, records: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Primeira execução (arquivo sem estado): reconstrói a partir do histórico."""
+        return self.rebuild(records) if self.is_empty() else []
+
+    def rebuild_series(self, records: Iterable[Any], keys: Iterable[SeriesKey]) -> List[Dict[str, Any]]:
+        """Recria só as séries `keys` (ex.: exclusão de um ponto) com os registros delas em `records`."""
+        keys = set(keys)
+        if not keys:
+            return []
+        with self._transaction() as db:
+            db.executemany("DELETE FROM detector_state WHERE series = ?", [("|".join(k),) for k in keys])
+            return self.update_records(
+                r for r in records if series_of(r.exam_name, r.level, r.lot_number, r.equipment) in keys
+            )
+
+    # ── Consulta ──
+
+    @staticmethod
+    def _alert(key: SeriesKey, alarm: str, date: str, ewma: float, c_pos: float, c_neg: float) -> Dict[str, Any]:
+        return {
+            "exam_name": key[0],
+            "level": key[1],
+            "lot_number": key[2],
+            "equipment": key[3],
+            "alarm": alarm,
+            "last_date": date,
+            "ewma": round(float(ewma), 3),
+            "cusum": round(float(max(c_pos, c_neg)), 3),
+        }
+
+    def alerts(self) -> List[Dict[str, Any]]:
+        """Séries atualmente em alarme (mais recentes primeiro)."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT * FROM detector_state WHERE alarm <> '' ORDER BY last_date DESC"
+            ).fetchall()
+        return [
+            self._alert((r["exam_name"], r["level"], r["lot_number"], r["equipment"]), r["alarm"],
+                        r["last_date"], r["ewma"], r["cusum_pos"], r["cusum_neg"])
+            for r in rows
+        ]
+
+
+# Instância do processo — a conexão SQLite só é aberta no primeiro uso
+drift_detector = DriftDetector()
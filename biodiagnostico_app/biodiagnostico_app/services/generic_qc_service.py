@@ -2,8 +2,11 @@
 from typing import Optional
 from datetime import date
 from ..services.supabase_client import supabase
+from ..services.qc_outbox_service import qc_outbox, series_key
+from ..services.metrics_service import instrument_service
 
 
+@instrument_service
 class GenericQCService:
     """Service layer genérico para CQ (Imunologia, Parasitologia, Microbiologia, Uroanálise)."""
 
@@ -125,7 +128,7 @@ class GenericQCService:
             print(f"[{self.area_prefix.upper()}] Erro ao buscar medições:", e)
             return []
 
-    async def register_measurement(
+    def build_measurement_params(
         self,
         data_medicao: date,
         analito: str,
@@ -135,29 +138,45 @@ class GenericQCService:
         nivel_controle: Optional[str] = None,
         observacao: Optional[str] = None,
     ) -> dict:
+        """Monta os parâmetros da RPC de registro de medição."""
+        params = {
+            "p_data_medicao": data_medicao.isoformat(),
+            "p_analito": analito,
+            "p_valor_medido": float(valor_medido),
+        }
+
+        if equipamento:
+            params["p_equipamento"] = equipamento
+        if lote_controle:
+            params["p_lote_controle"] = lote_controle
+        if nivel_controle:
+            params["p_nivel_controle"] = nivel_controle
+        if observacao:
+            params["p_observacao"] = observacao
+        return params
+
+    async def register_measurement(self, **kwargs) -> dict:
         """Registra uma nova medição via RPC."""
         try:
-            params = {
-                "p_data_medicao": data_medicao.isoformat(),
-                "p_analito": analito,
-                "p_valor_medido": float(valor_medido),
-            }
-
-            if equipamento:
-                params["p_equipamento"] = equipamento
-            if lote_controle:
-                params["p_lote_controle"] = lote_controle
-            if nivel_controle:
-                params["p_nivel_controle"] = nivel_controle
-            if observacao:
-                params["p_observacao"] = observacao
-
+            params = self.build_measurement_params(**kwargs)
             response = supabase.rpc(self.rpc_function, params).execute()
             return response.data
         except Exception as e:
             print(f"[{self.area_prefix.upper()}] Erro ao registrar medição:", e)
             raise e
 
+    def enqueue_measurement(self, **kwargs) -> str:
+        """Grava a medição no outbox local (envio ao Supabase em background)."""
+        params = self.build_measurement_params(**kwargs)
+        return qc_outbox.enqueue_rpc(
+            self.rpc_function,
+            params,
+            series=series_key(
+                self.area_prefix, kwargs.get("analito"),
+                kwargs.get("nivel_controle"), kwargs.get("lote_controle"),
+            ),
+        )
+
 
 # ==========================================
 # INSTÂNCIAS ESPECÍFICAS POR ÁREA
@@ -5,7 +5,9 @@ import logging
 from typing import List, Optional, Dict, Any
 from .supabase_client import SupabaseClient
 from .exceptions import ServiceError
+from .qc_outbox_service import qc_outbox, series_key
 from .types import HematologyQCParameterRow, HematologyQCMeasurementRow, HematologyBioRecordRow
+from .metrics_service import instrument_service
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +20,7 @@ def get_supabase():
     return client
 
 
+@instrument_service
 class HematologyQCService:
     """CRUD para parâmetros e medições de CQ Hematologia no Supabase"""
 
@@ -116,8 +119,8 @@ class HematologyQCService:
         return response.data if response.data else []
 
     @staticmethod
-    async def register_measurement(data: Dict[str, Any]) -> Dict[str, Any]:
-        """Registra medição usando a RPC do banco (hematology_register_qc_measurement)"""
+    def build_measurement_params(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Parâmetros da RPC hematology_register_qc_measurement"""
         params = {
             "p_data_medicao": data["data_medicao"],
             "p_analito": data["analito"],
@@ -132,12 +135,27 @@ class HematologyQCService:
             val = data.get(key)
             if val and str(val).strip():
                 params[field] = str(val).strip()
+        return params
 
+    @staticmethod
+    async def register_measurement(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Registra medição usando a RPC do banco (hematology_register_qc_measurement)"""
+        params = HematologyQCService.build_measurement_params(data)
         response = get_supabase().rpc("hematology_register_qc_measurement", params).execute()
         if not response.data:
             raise ServiceError("RPC hematology_register_qc_measurement não retornou dados.")
         return response.data
 
+    @staticmethod
+    def enqueue_measurement(data: Dict[str, Any]) -> str:
+        """Grava a medição no outbox local e retorna o ID da entrada"""
+        params = HematologyQCService.build_measurement_params(data)
+        return qc_outbox.enqueue_rpc(
+            "hematology_register_qc_measurement",
+            params,
+            series=series_key("hematologia", data["analito"], data.get("nivel_controle"), data.get("lote_controle")),
+        )
+
     @staticmethod
     async def delete_measurement(meas_id: str) -> bool:
         """Exclui medição permanentemente"""
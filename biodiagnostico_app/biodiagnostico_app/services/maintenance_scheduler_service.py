@@ -0,0 +1,230 @@
+"""
+Agenda de manutenção de equipamentos: índice ordenado por próxima data.
+
+Para cada par equipamento/tipo vale apenas a manutenção mais recente — uma
+manutenção registrada "fecha" a pendência anterior do mesmo tipo. As datas
+pendentes ficam numa lista ordenada (bisect), então contagens de vencidas /
+a vencer e a próxima manutenção saem em O(log n) sem varrer os registros.
+
+Tipos recorrentes (preventiva, calibração) registrados sem próxima data herdam
+o intervalo da manutenção anterior do mesmo equipamento. Uma task diária vira
+o dia da agenda e guarda o resumo do dia. Com vários workers, inclusões e
+exclusões são repassadas aos outros processos pelo cluster_service.
+"""
+import asyncio
+import bisect
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .cluster_service import cluster
+
+logger = logging.getLogger(__name__)
+
+# Janela "a vencer" do dashboard
+MAINTENANCE_DUE_SOON_DAYS = int(os.environ.get("MAINTENANCE_DUE_SOON_DAYS", "7"))
+RECURRING_TYPES = {"PREVENTIVA", "CALIBRACAO", "CALIBRAÇÃO"}
+
+EVENT_MAINTENANCE_ADD = "maintenance.add"
+EVENT_MAINTENANCE_REMOVE = "maintenance.remove"
+
+ScheduleKey = Tuple[str, str]
+_HIGH = "\U0010ffff"
+
+
+def _key(equipment: str, type_: str) -> ScheduleKey:
+    return ((equipment or "").strip().upper(), (type_ or "").strip().upper())
+
+
+def _as_dict(item: Any) -> Dict[str, Any]:
+    return item if isinstance(item, dict) else item.dict()
+
+
+def _parse(day: str) -> Optional[date]:
+    try:
+        return datetime.strptime((day or "")[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+class MaintenanceScheduler:
+    """Índice de pendências por equipamento/tipo, ordenado por next_date."""
+
+    def __init__(self):
+        # Histórico por equipamento/tipo: (data, id, next_date, equipamento, tipo) em ordem de data
+        self._history: Dict[ScheduleKey, List[Tuple[str, str, str, str, str]]] = {}
+        self._by_id: Dict[str, ScheduleKey] = {}
+        # Pendência vigente de cada equipamento/tipo e o índice ordenado (next_date, chave)
+        self._current: Dict[ScheduleKey, Dict[str, Any]] = {}
+        self._order: List[Tuple[str, ScheduleKey]] = []
+        self.today: date = datetime.now().date()
+        self.summary: Dict[str, Any] = {}
+
+    # ── Manutenção do índice ──
+
+    def rebuild(self, records: Iterable[Any]):
+        self._history, self._by_id, self._current, self._order = {}, {}, {}, []
+        for r in records:
+            self._insert(_as_dict(r))
+        for key in list(self._history):
+            self._reindex(key)
+
+    def add(self, record: Any):
+        record = self._add(_as_dict(record))
+        cluster.publish(EVENT_MAINTENANCE_ADD, record)
+
+    def remove(self, record_id: str) -> bool:
+        removed = self._remove(record_id)
+        cluster.publish(EVENT_MAINTENANCE_REMOVE, str(record_id))
+        return removed
+
+    def _add(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        self._insert(record)
+        self._reindex(self._by_id[str(record.get("id") or "")])
+        return record
+
+    def _remove(self, record_id: str) -> bool:
+        key = self._by_id.pop(str(record_id), None)
+        if key is None:
+            return False
+        self._history[key] = [h for h in self._history[key] if h[1] != str(record_id)]
+        if not self._history[key]:
+            del self._history[key]
+        self._reindex(key)
+        return True
+
+    def _insert(self, record: Dict[str, Any]):
+        record_id = str(record.get("id") or "")
+        if record_id in self._by_id:
+            self._remove(record_id)
+        key = _key(record.get("equipment"), record.get("type"))
+        entry = (
+            (record.get("date") or "")[:10], record_id, (record.get("next_date") or "")[:10],
+            record.get("equipment") or "", record.get("type") or "",
+        )
+        bisect.insort(self._history.setdefault(key, []), entry)
+        self._by_id[record_id] = key
+
+    def _reindex(self, key: ScheduleKey):
+        old = self._current.pop(key, None)
+        if old is not None:
+            i = bisect.bisect_left(self._order, (old["next_date"], key))
+            if i < len(self._order) and self._order[i] == (old["next_date"], key):
+                del self._order[i]
+        history = self._history.get(key)
+        if not history:
+            return
+        last_date, record_id, next_date, equipment, type_ = history[-1]
+        projected = False
+        if not next_date and key[1] in RECURRING_TYPES:
+            next_date = self._project(history)
+            projected = bool(next_date)
+        if not next_date:
+            return
+        self._current[key] = {
+            "id": record_id,
+            "equipment": equipment,
+            "type": type_,
+            "date": last_date,
+            "next_date": next_date,
+            "projected": projected,
+        }
+        bisect.insort(self._order, (next_date, key))
+
+    @staticmethod
+    def _project(history: List[Tuple[str, str, str, str, str]]) -> str:
+        """Próxima data pelo último intervalo informado (data → next_date) ou, sem ele, pela distância entre as duas últimas."""
+        last = _parse(history[-1][0])
+        if last is None:
+            return ""
+        for prev_date, _, prev_next, _, _ in reversed(history[:-1]):
+            start, end = _parse(prev_date), _parse(prev_next)
+            if start and end and end > start:
+                return (last + (end - start)).isoformat()
+        previous = _parse(history[-2][0]) if len(history) > 1 else None
+        if previous and last > previous:
+            return (last + (last - previous)).isoformat()
+        return ""
+
+    def suggest_next_date(self, equipment: str, type_: str, day: str) -> str:
+        """Próxima data sugerida para uma manutenção recorrente registrada em `day`."""
+        key = _key(equipment, type_)
+        if key[1] not in RECURRING_TYPES:
+            return ""
+        history = list(self._history.get(key, []))
+        history.append(((day or "")[:10], "", "", equipment, type_))
+        return self._project(history)
+
+    # ── Consultas (bisect) ──
+
+    def _entries(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        return [dict(self._current[key]) for _, key in self._order[start:stop]]
+
+    def overdue(self, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Vencidas (next_date antes de hoje), mais antigas primeiro."""
+        today = (today or datetime.now().date()).isoformat()
+        return self._entries(0, bisect.bisect_left(self._order, (today,)))
+
+    def pending_count(self, today: Optional[date] = None) -> int:
+        """Vencidas ou para hoje (mesmo critério do KPI do dashboard)."""
+        today = (today or datetime.now().date()).isoformat()
+        return bisect.bisect_right(self._order, (today, (_HIGH,)))
+
+    def pending(self, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        return self._entries(0, self.pending_count(today))
+
+    def due_within(self, days: int = MAINTENANCE_DUE_SOON_DAYS, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """A vencer de hoje até hoje + `days`."""
+        today = today or datetime.now().date()
+        start = bisect.bisect_left(self._order, (today.isoformat(),))
+        stop = bisect.bisect_right(self._order, ((today + timedelta(days=days)).isoformat(), (_HIGH,)))
+        return self._entries(start, stop)
+
+    def next_upcoming(self, today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """Primeira manutenção de hoje em diante."""
+        today = (today or datetime.now().date()).isoformat()
+        i = bisect.bisect_left(self._order, (today,))
+        return dict(self._current[self._order[i][1]]) if i < len(self._order) else None
+
+    def for_equipment(self, equipment: str) -> List[Dict[str, Any]]:
+        name = (equipment or "").strip().upper()
+        return sorted(
+            (dict(v) for k, v in self._current.items() if k[0] == name),
+            key=lambda e: e["next_date"],
+        )
+
+    # ── Virada diária ──
+
+    def rollover(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """Avança o dia da agenda e guarda o resumo (vencidas, a vencer, próxima)."""
+        self.today = today or datetime.now().date()
+        self.summary = {
+            "date": self.today.isoformat(),
+            "overdue": len(self.overdue(self.today)),
+            "pending": self.pending_count(self.today),
+            "due_soon": len(self.due_within(today=self.today)),
+            "next": self.next_upcoming(self.today),
+        }
+        return self.summary
+
+    async def run_forever(self):
+        """Vira a agenda à meia-noite (registrado como lifespan task do app)."""
+        while True:
+            try:
+                summary = self.rollover()
+                if summary["pending"]:
+                    logger.info(f"Manutenções pendentes em {summary['date']}: {summary['pending']}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Agenda de manutenção: erro na virada do dia: {e}")
+            now = datetime.now()
+            midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            await asyncio.sleep(max((midnight - now).total_seconds(), 1) + 1)
+
+
+# Instância do processo — semeada na carga do banco e atualizada pelas escritas
+maintenance_scheduler = MaintenanceScheduler()
+cluster.on(EVENT_MAINTENANCE_ADD, maintenance_scheduler._add)
+cluster.on(EVENT_MAINTENANCE_REMOVE, maintenance_scheduler._remove)
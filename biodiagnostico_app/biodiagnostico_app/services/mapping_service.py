@@ -0,0 +1,103 @@
+"""
+Servico de Mapeamento de Exames
+Nomes de exames entre sistemas (SIMUS -> COMPULAB) da tabela exam_mappings,
+servidos a partir de um ExamNameIndex em memória (busca exata + aproximada).
+"""
+import logging
+from typing import Dict, Optional
+
+import pandas as pd
+
+from .supabase_client import SupabaseClient
+from .exceptions import ServiceError
+from ..utils.exam_name_index import ExamNameIndex, FUZZY_THRESHOLD
+from .cluster_service import cluster
+from .metrics_service import instrument_service
+
+logger = logging.getLogger(__name__)
+
+EVENT_MAPPING_SAVED = "mapping.saved"
+
+
+def get_supabase():
+    client = SupabaseClient.get_client()
+    if client is None:
+        raise Exception("Cliente Supabase nao inicializado.")
+    return client
+
+
+@instrument_service
+class MappingService:
+    """Cache de processo dos mapeamentos original -> canônico"""
+
+    _cache: Dict[str, str] = {}
+    _is_loaded: bool = False
+    _index: Optional[ExamNameIndex] = None
+    _indexed_cache: Optional[Dict[str, str]] = None
+
+    @classmethod
+    def _get_index(cls) -> ExamNameIndex:
+        # Reindexa se o cache foi trocado (carga do banco ou atribuição direta)
+        if cls._index is None or cls._indexed_cache is not cls._cache:
+            cls._index = ExamNameIndex(cls._cache)
+            cls._indexed_cache = cls._cache
+        return cls._index
+
+    @classmethod
+    async def load_mappings(cls, force: bool = False) -> Dict[str, str]:
+        """Carrega exam_mappings uma vez por processo"""
+        if cls._is_loaded and not force:
+            return cls._cache
+        try:
+            response = get_supabase().table("exam_mappings").select("original_name, canonical_name").execute()
+            cls._cache = {
+                r["original_name"]: r["canonical_name"]
+                for r in (response.data or [])
+                if r.get("original_name") and r.get("canonical_name")
+            }
+            cls._is_loaded = True
+            logger.info(f"Mapeamento de exames carregado: {len(cls._cache)} nomes")
+        except Exception as e:
+            logger.error(f"Erro ao carregar exam_mappings: {e}")
+        return cls._cache
+
+    @classmethod
+    def get_canonical_name_sync(cls, name: str, fuzzy: bool = False, threshold: float = FUZZY_THRESHOLD) -> str:
+        """Nome canônico; sem mapeamento, devolve o nome original em maiúsculas"""
+        found = cls._get_index().lookup(name, fuzzy=fuzzy, threshold=threshold)
+        return found if found is not None else (name or "").strip().upper()
+
+    @classmethod
+    async def get_canonical_name(cls, name: str, fuzzy: bool = False) -> str:
+        await cls.load_mappings()
+        return cls.get_canonical_name_sync(name, fuzzy=fuzzy)
+
+    @classmethod
+    def canonical_series(cls, names: pd.Series, fuzzy: bool = False) -> pd.Series:
+        """Versão em lote (coluna inteira de uma planilha)"""
+        return cls._get_index().canonical_series(names, fuzzy=fuzzy)
+
+    @classmethod
+    async def save_mapping(cls, original_name: str, canonical_name: str) -> Dict[str, str]:
+        """Cria ou atualiza um mapeamento (upsert por original_name)"""
+        original_name = (original_name or "").strip().upper()
+        canonical_name = (canonical_name or "").strip().upper()
+        if not original_name or not canonical_name:
+            raise ValueError("Nome original e canônico sao obrigatorios")
+        response = get_supabase().table("exam_mappings").upsert(
+            {"original_name": original_name, "canonical_name": canonical_name},
+            on_conflict="original_name",
+        ).execute()
+        if not response.data:
+            raise ServiceError("Upsert em exam_mappings não retornou dados.")
+        cls._set_cached(original_name, canonical_name)
+        cluster.publish(EVENT_MAPPING_SAVED, [original_name, canonical_name])
+        return response.data[0]
+
+    @classmethod
+    def _set_cached(cls, original_name: str, canonical_name: str):
+        # Dicionário novo: o índice detecta a troca e é reconstruído no próximo uso
+        cls._cache = {**cls._cache, original_name: canonical_name}
+
+
+cluster.on(EVENT_MAPPING_SAVED, lambda names: MappingService._set_cached(*names))
@@ -0,0 +1,316 @@
+"""
+Métricas do processo no formato texto do Prometheus (GET /api/metrics).
+
+Registra, por método de service e por event handler do estado:
+chamadas, erros, linhas devolvidas (quando o resultado é lista) e
+histograma de latência. Também amostra o atraso do event loop (lifespan
+task) e o tamanho serializado do estado de cada sessão — o mesmo pickle que
+o state manager em Redis gravaria —, no máximo uma vez por sessão a cada
+METRICS_STATE_SIZE_INTERVAL segundos, ao fim do evento e ainda sob o lock da
+sessão (nenhum outro evento altera a árvore durante o pickle).
+
+Services entram com o decorator de classe @instrument_service; os event
+handlers, por instrument_event_processing(), que envolve o ponto único em
+que o Reflex despacha cada evento. METRICS_ENABLED=0 desliga tudo.
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import pickle
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+METRICS_LOOP_LAG_INTERVAL = float(os.environ.get("METRICS_LOOP_LAG_INTERVAL") or 0.5)
+METRICS_STATE_SIZE_INTERVAL = float(os.environ.get("METRICS_STATE_SIZE_INTERVAL") or 60)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+STATE_SIZE_BUCKETS = tuple(2 ** k * 1024 for k in range(4, 17, 2))  # 16 KB .. 64 MB
+
+# Sessões sem evento há mais que isto saem do gauge de tamanho de estado
+SESSION_IDLE_SECONDS = 30 * 60
+
+
+class Histogram:
+    """Histograma cumulativo de buckets fixos (semântica do Prometheus)."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def lines(self, name: str, labels: str = "") -> Iterable[str]:
+        cumulative = 0
+        sep = "," if labels else ""
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels}{sep}le="{bound:g}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}'
+        suffix = f"{{{labels}}}" if labels else ""
+        yield f"{name}_sum{suffix} {self.sum:.6f}"
+        yield f"{name}_count{suffix} {self.count}"
+
+
+class _CallStats:
+    __slots__ = ("calls", "errors", "rows", "latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rows(result: Any) -> int:
+    return len(result) if isinstance(result, (list, tuple)) else 0
+
+
+def _resident_memory_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def state_size_bytes(state: Any) -> int:
+    """Soma do pickle de cada subestado da árvore (o que o state manager persistiria)."""
+    total = 0
+    pending = [state]
+    while pending:
+        current = pending.pop()
+        try:
+            total += len(pickle.dumps(current, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            logger.debug(f"Métricas: estado {type(current).__name__} não serializável: {e}")
+        pending.extend(getattr(current, "substates", {}).values())
+    return total
+
+
+class MetricsRegistry:
+    """Contadores e histogramas do processo; seguro para threads (services usam to_thread)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str], _CallStats] = {}
+        self._loop_lag = Histogram(LOOP_LAG_BUCKETS)
+        self._loop_lag_max = 0.0
+        self._state_sizes = Histogram(STATE_SIZE_BUCKETS)
+        # token -> (último tamanho em bytes, momento da amostra)
+        self._sessions: Dict[str, Tuple[int, float]] = {}
+
+    def reset(self):
+        self.__init__()
+
+    def observe_call(self, kind: str, name: str, seconds: float, error: bool = False, rows: int = 0):
+        with self._lock:
+            stats = self._calls.get((kind, name))
+            if stats is None:
+                stats = self._calls[(kind, name)] = _CallStats()
+            stats.calls += 1
+            stats.errors += error
+            stats.rows += rows
+            stats.latency.observe(seconds)
+
+    def observe_loop_lag(self, seconds: float):
+        with self._lock:
+            self._loop_lag.observe(seconds)
+            self._loop_lag_max = max(self._loop_lag_max, seconds)
+
+    def observe_state_size(self, token: str, size: int):
+        with self._lock:
+            self._state_sizes.observe(size)
+            self._sessions[token] = (size, time.monotonic())
+
+    def wants_state_sample(self, token: str) -> bool:
+        """True se a sessão ainda não foi amostrada na janela atual."""
+        last = self._sessions.get(token)
+        return last is None or time.monotonic() - last[1] >= METRICS_STATE_SIZE_INTERVAL
+
+    def snapshot(self, kind: str, name: str) -> Dict[str, Any]:
+        """Contadores de um método/handler (para testes e diagnóstico)."""
+        with self._lock:
+            stats = self._calls.get((kind, name))
+            if stats is None:
+                return {"calls": 0, "errors": 0, "rows": 0, "seconds": 0.0}
+            return {"calls": stats.calls, "errors": stats.errors, "rows": stats.rows, "seconds": stats.latency.sum}
+
+    def render(self) -> str:
+        """Exposição no formato texto do Prometheus (version=0.0.4)."""
+        out: List[str] = []
+        with self._lock:
+            for kind in sorted({k for k, _ in self._calls}):
+                label = "method" if kind == "service" else "handler"
+                entries = sorted((name, s) for (k, name), s in self._calls.items() if k == kind)
+                prefix = f"qc_{kind}"
+                for metric, help_text, attr in (
+                    ("calls_total", "Chamadas concluídas", "calls"),
+                    ("errors_total", "Chamadas que levantaram exceção", "errors"),
+                    ("rows_total", "Linhas devolvidas (resultados em lista)", "rows"),
+                ):
+                    out.append(f"# HELP {prefix}_{metric} {help_text}")
+                    out.append(f"# TYPE {prefix}_{metric} counter")
+                    out.extend(f'{prefix}_{metric}{{{label}="{_label(name)}"}} {getattr(s, attr)}' for name, s in entries)
+                out.append(f"# HELP {prefix}_duration_seconds Latência por chamada")
+                out.append(f"# TYPE {prefix}_duration_seconds histogram")
+                for name, s in entries:
+                    out.extend(s.latency.lines(f"{prefix}_duration_seconds", f'{label}="{_label(name)}"'))
+
+            out.append("# HELP qc_event_loop_lag_seconds Atraso do event loop em relação ao sleep agendado")
+            out.append("# TYPE qc_event_loop_lag_seconds histogram")
+            out.extend(self._loop_lag.lines("qc_event_loop_lag_seconds"))
+            out.append("# TYPE qc_event_loop_lag_max_seconds gauge")
+            out.append(f"qc_event_loop_lag_max_seconds {self._loop_lag_max:.6f}")
+
+            now = time.monotonic()
+            for token in [t for t, (_, at) in self._sessions.items() if now - at > SESSION_IDLE_SECONDS]:
+                del self._sessions[token]
+            sizes = [size for size, _ in self._sessions.values()]
+            out.append("# HELP qc_session_state_bytes Tamanho serializado do estado por sessão (amostras)")
+            out.append("# TYPE qc_session_state_bytes histogram")
+            out.extend(self._state_sizes.lines("qc_session_state_bytes"))
+            out.append("# TYPE qc_sessions_tracked gauge")
+            out.append(f"qc_sessions_tracked {len(sizes)}")
+            out.append("# TYPE qc_session_state_bytes_max gauge")
+            out.append(f"qc_session_state_bytes_max {max(sizes, default=0)}")
+            out.append("# TYPE qc_session_state_bytes_total gauge")
+            out.append(f"qc_session_state_bytes_total {sum(sizes)}")
+
+        rss = _resident_memory_bytes()
+        if rss is not None:
+            out.append("# TYPE process_resident_memory_bytes gauge")
+            out.append(f"process_resident_memory_bytes {rss}")
+        return "\n".join(out) + "\n"
+
+    async def sample_state(self, root_state: Any):
+        """
+        Amostra o tamanho do estado da sessão, se a janela dela já venceu.
+
+        Chamar com o lock da sessão adquirido: o pickle roda numa thread (um dumps por
+        subestado, o loop atende outras sessões entre eles), mas a árvore não pode mudar
+        até a medida terminar.
+        """
+        token = (getattr(root_state, "router_data", None) or {}).get("token")
+        if not token or not self.wants_state_sample(token):
+            return
+        try:
+            size = await asyncio.to_thread(state_size_bytes, root_state)
+        except Exception as e:
+            logger.debug(f"Métricas: falha ao medir estado da sessão: {e}")
+            return
+        self.observe_state_size(token, size)
+
+    async def run_forever(self, interval: float = METRICS_LOOP_LAG_INTERVAL):
+        """Mede o atraso do event loop (registrado como lifespan task do app)."""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.observe_loop_lag(max(time.perf_counter() - start - interval, 0.0))
+
+
+def _timed(kind: str, name: str, fn):
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception:
+                metrics.observe_call(kind, name, time.perf_counter() - start, error=True)
+                raise
+            metrics.observe_call(kind, name, time.perf_counter() - start, rows=_rows(result))
+            return result
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            metrics.observe_call(kind, name, time.perf_counter() - start, error=True)
+            raise
+        metrics.observe_call(kind, name, time.perf_counter() - start, rows=_rows(result))
+        return result
+    return wrapper
+
+
+def instrument_service(cls):
+    """Decorator de classe: mede os métodos públicos (funções, staticmethods e classmethods)."""
+    if not METRICS_ENABLED:
+        return cls
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("_"):
+            continue
+        descriptor = type(value) if isinstance(value, (staticmethod, classmethod)) else None
+        fn = value.__func__ if descriptor else value
+        if not inspect.isfunction(fn) or inspect.isgeneratorfunction(fn) or inspect.isasyncgenfunction(fn):
+            continue
+        wrapped = _timed("service", f"{cls.__name__}.{attr}", fn)
+        setattr(cls, attr, descriptor(wrapped) if descriptor else wrapped)
+    return cls
+
+
+def instrument_event_processing() -> bool:
+    """
+    Mede cada event handler despachado pelo Reflex (inclui yields e eventos em background).
+
+    Envolve reflex_base.event.processor.base_state_processor.process_event; se a
+    versão instalada do Reflex não tiver esse ponto, só registra um aviso.
+    """
+    if not METRICS_ENABLED:
+        return False
+    try:
+        from reflex_base.event.processor import base_state_processor
+    except ImportError:
+        logger.warning("Métricas: versão do Reflex sem base_state_processor; event handlers não serão medidos")
+        return False
+    original = getattr(base_state_processor, "process_event", None)
+    if original is None:
+        logger.warning("Métricas: process_event não encontrado; event handlers não serão medidos")
+        return False
+    if getattr(original, "_qc_metrics", False):
+        return True
+
+    @functools.wraps(original)
+    async def process_event(handler, payload, state, root_state):
+        name = getattr(handler.fn, "__qualname__", str(handler))
+        start = time.perf_counter()
+        try:
+            await original(handler=handler, payload=payload, state=state, root_state=root_state)
+        except Exception:
+            metrics.observe_call("event_handler", name, time.perf_counter() - start, error=True)
+            raise
+        metrics.observe_call("event_handler", name, time.perf_counter() - start)
+        if root_state is not None:
+            # Evento em foreground: o Reflex ainda segura o lock da sessão até retornarmos,
+            # então o pickle não concorre com o próximo evento (o delta já foi emitido)
+            await metrics.sample_state(root_state)
+
+    process_event._qc_metrics = True
+    base_state_processor.process_event = process_event
+    return True
+
+
+# Instância do processo
+metrics = MetricsRegistry()
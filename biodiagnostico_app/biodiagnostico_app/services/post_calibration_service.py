@@ -6,6 +6,7 @@ from typing import List, Optional, Dict, Any
 from .supabase_client import SupabaseClient
 from .exceptions import ServiceError
 from .types import PostCalibrationRow
+from .metrics_service import instrument_service
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,7 @@ def get_supabase():
     return client
 
 
+@instrument_service
 class PostCalibrationService:
     """CRUD para registros de pós-calibração no Supabase"""
 
@@ -7,6 +7,7 @@ from typing import List, Dict, Any
 from .supabase_client import SupabaseClient
 from .exceptions import ServiceError
 from .types import QCExamRow
+from .metrics_service import instrument_service
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +19,7 @@ def get_supabase():
     return client
 
 
+@instrument_service
 class QCExamService:
     """CRUD para exames de CQ no Supabase"""
 
@@ -0,0 +1,227 @@
+"""
+Índice do histórico de CQ do processo: busca textual e tempo.
+
+Serve a caixa "Buscar exame..." e a navegação por dia da aba Registro, os
+relatórios por período, o gráfico Levey-Jennings e as contagens do dashboard.
+
+A busca casa cada termo digitado como substring de exame, lote, equipamento
+ou analista. Em vez de varrer todos os registros a cada tecla:
+  - os valores distintos desses campos (poucos centenas, mesmo com 100k
+    registros) são os tokens do índice, cada um com os IDs dos registros
+  - postings de n-gramas (1 a 3 caracteres) apontam para os tokens que os
+    contêm; um termo é resolvido intersectando os postings dos seus
+    trigramas e confirmando a substring só nesses tokens
+  - com um dia selecionado, os candidatos são só os registros do dia (mapa
+    dia -> IDs do TimeIndex), conferidos contra os tokens de cada termo
+  - a visão filtrada (termo, status, dia) fica em um LRU pequeno,
+    descartado a cada inclusão/exclusão
+
+No tempo, um TimeIndex (utils/time_index.py) mantém as datas ordenadas com
+insort: intervalos, meses/dias e o próximo/anterior dia com dados saem em
+O(log n + k), já em ordem cronológica.
+
+Alimentado nos mesmos pontos que o qc_statistics (carga do banco, gravação,
+exclusão, restauração). Com vários workers, inclusões e exclusões avulsas são
+repassadas pelo cluster_service; a reconstrução é local de cada worker.
+"""
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..models import QCRecord
+from ..utils.time_index import TimeIndex
+from .cluster_service import cluster
+
+logger = logging.getLogger(__name__)
+
+EVENT_HISTORY_ADD = "qc_history.add"
+EVENT_HISTORY_REMOVE = "qc_history.remove"
+
+QC_SEARCH_CACHE_SIZE = int(os.environ.get("QC_SEARCH_CACHE_SIZE", "128"))
+NGRAM = 3
+
+# status da tabela -> condição sobre CV% x limite
+STATUS_FILTERS = {
+    "OK": lambda r: r.cv <= r.cv_max_threshold,
+    "ALERTA": lambda r: r.cv > r.cv_max_threshold,
+    "ERRO": lambda r: r.cv > r.cv_max_threshold,
+}
+
+
+def _fields(record: Any) -> Set[str]:
+    values = (record.exam_name, record.lot_number, record.equipment, record.analyst)
+    return {v.strip().upper() for v in values if v and v.strip()}
+
+
+def _grams(token: str) -> Set[str]:
+    return {token[i:i + n] for n in range(1, NGRAM + 1) for i in range(len(token) - n + 1)}
+
+
+class QCHistoryIndex:
+    """Registros do processo por ID, tokens -> IDs, n-gramas -> tokens e datas."""
+
+    def __init__(self, cache_size: int = QC_SEARCH_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._records: Dict[str, QCRecord] = {}
+        self._ids_by_token: Dict[str, Set[str]] = {}
+        self._tokens_by_gram: Dict[str, Set[str]] = {}
+        self.dates = TimeIndex()
+        self._cache: "OrderedDict[Tuple[str, str, str], List[QCRecord]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    # ── Manutenção ──
+
+    def rebuild(self, records: Iterable[Any]):
+        self._records = {}
+        self._ids_by_token = {}
+        self._tokens_by_gram = {}
+        for r in records:
+            self._add_tokens(r)
+        self.dates.rebuild((record_id, r.date) for record_id, r in self._records.items())
+        self._cache.clear()
+
+    def add_record(self, record: Any):
+        self._add(record)
+        self._cache.clear()
+        cluster.publish(EVENT_HISTORY_ADD, record.model_dump())
+
+    def remove_record(self, record_id: str) -> bool:
+        removed = self._remove(record_id)
+        self._cache.clear()
+        cluster.publish(EVENT_HISTORY_REMOVE, str(record_id))
+        return removed
+
+    def _add(self, record: Any):
+        self._add_tokens(record)
+        self.dates.add(str(record.id), record.date)
+
+    def _add_tokens(self, record: Any):
+        record_id = str(record.id)
+        if record_id in self._records:
+            self._remove(record_id)
+        self._records[record_id] = record
+        for token in _fields(record):
+            ids = self._ids_by_token.get(token)
+            if ids is None:
+                ids = self._ids_by_token[token] = set()
+                for gram in _grams(token):
+                    self._tokens_by_gram.setdefault(gram, set()).add(token)
+            ids.add(record_id)
+
+    def _remove(self, record_id: str) -> bool:
+        record = self._records.pop(str(record_id), None)
+        if record is None:
+            return False
+        self.dates.remove(str(record_id), record.date)
+        for token in _fields(record):
+            ids = self._ids_by_token.get(token)
+            if ids is None:
+                continue
+            ids.discard(str(record_id))
+            if not ids:
+                del self._ids_by_token[token]
+                for gram in _grams(token):
+                    tokens = self._tokens_by_gram.get(gram)
+                    if tokens is not None:
+                        tokens.discard(token)
+                        if not tokens:
+                            del self._tokens_by_gram[gram]
+        return True
+
+    def _apply_remote_add(self, payload: Dict[str, Any]):
+        self._add(QCRecord(**payload))
+        self._cache.clear()
+
+    def _apply_remote_remove(self, record_id: str):
+        self._remove(record_id)
+        self._cache.clear()
+
+    # ── Consulta ──
+
+    def _term_tokens(self, term: str) -> Set[str]:
+        """Tokens (valores de campo) que contêm `term`"""
+        if len(term) <= NGRAM:
+            return self._tokens_by_gram.get(term, set())
+        postings = sorted(
+            (self._tokens_by_gram.get(term[i:i + NGRAM], set()) for i in range(len(term) - NGRAM + 1)),
+            key=len,
+        )
+        return {t for t in postings[0].intersection(*postings[1:]) if term in t}
+
+    def _matching_tokens(self, search: str) -> Optional[List[Set[str]]]:
+        """Tokens que casam com cada termo da busca (do mais seletivo ao menos); None = busca vazia"""
+        terms = set((search or "").upper().split())
+        if not terms:
+            return None
+        return sorted((self._term_tokens(t) for t in terms), key=len)
+
+    def matching_ids(self, search: str) -> Optional[Set[str]]:
+        """IDs que casam com todos os termos da busca; None = busca vazia (todos)"""
+        per_term = self._matching_tokens(search)
+        if per_term is None:
+            return None
+        result: Optional[Set[str]] = None
+        for tokens in per_term:
+            ids: Set[str] = set()
+            for token in tokens:
+                ids |= self._ids_by_token[token]
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result
+
+    def query(self, search: str, status: str = "Todos", day: str = "") -> List[QCRecord]:
+        """Registros da busca/status/dia (day = "AAAA-MM-DD" ou ""), do mais recente ao mais antigo"""
+        key = (" ".join((search or "").upper().split()), status or "Todos", (day or "").strip())
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        if key[2]:
+            # Registros do dia: poucos; confere cada termo pelos tokens do registro
+            records = (self._records[i] for i in self.dates.ids_on(key[2]))
+            per_term = self._matching_tokens(key[0])
+            if per_term is not None:
+                records = (r for r in records if all(not tokens.isdisjoint(_fields(r)) for tokens in per_term))
+        else:
+            ids = self.matching_ids(key[0])
+            records = self._by_ids(self.dates.ids_between()) if ids is None else (self._records[i] for i in ids)
+        status_filter = STATUS_FILTERS.get(key[1])
+        if status_filter is not None:
+            records = (r for r in records if status_filter(r))
+        result = sorted(records, key=lambda r: r.date or "", reverse=True)
+
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+
+    # ── Tempo (registros em ordem crescente de data) ──
+
+    def _by_ids(self, ids: List[str]) -> List[QCRecord]:
+        return [self._records[i] for i in ids]
+
+    def between(self, start: Optional[str] = None, end: Optional[str] = None) -> List[QCRecord]:
+        """Registros com start <= data <= end (strings ISO; None = sem limite)"""
+        return self._by_ids(self.dates.ids_between(start, end))
+
+    def with_date_prefix(self, prefix: str) -> List[QCRecord]:
+        """Registros do dia/mês/ano `prefix` ("AAAA-MM-DD", "AAAA-MM", "AAAA")"""
+        return self._by_ids(self.dates.ids_with_prefix(prefix))
+
+    def next_day(self, day: str) -> Optional[str]:
+        return self.dates.next_day(day)
+
+    def prev_day(self, day: str) -> Optional[str]:
+        return self.dates.prev_day(day)
+
+
+# Instância do processo — reconstruída a cada carga do banco
+qc_history_index = QCHistoryIndex()
+cluster.on(EVENT_HISTORY_ADD, qc_history_index._apply_remote_add)
+cluster.on(EVENT_HISTORY_REMOVE, qc_history_index._apply_remote_remove)
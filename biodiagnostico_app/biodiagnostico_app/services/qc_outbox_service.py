@@ -0,0 +1,404 @@
+"""
+Outbox local (write-ahead) para gravações de CQ.
+
+Cada escrita é persistida num arquivo SQLite no host do backend antes de ir ao
+Supabase, com UUID gerado no cliente. Um flush em segundo plano entrega as
+entradas em lote, com retry/backoff e preservando a ordem dentro de cada série
+(exame/nível/lote ou analito/área).
+
+Workers do mesmo host compartilham o arquivo; o flush é serializado entre
+processos por um lock de arquivo (<path>.lock), então cada entrada é enviada
+por um worker só e a ordem por série se mantém.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos (um worker só)
+    fcntl = None
+
+from .supabase_client import SupabaseClient
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_PATH = os.environ.get("QC_OUTBOX_PATH", "qc_outbox.db")
+OUTBOX_BATCH_SIZE = int(os.environ.get("QC_OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_FLUSH_INTERVAL_SECONDS = float(os.environ.get("QC_OUTBOX_FLUSH_INTERVAL", "5"))
+OUTBOX_MAX_BACKOFF_SECONDS = 300.0
+OUTBOX_SYNCED_RETENTION_SECONDS = 24 * 3600
+# Espera máxima pelo flush de outro worker antes de deixar para o próximo ciclo
+OUTBOX_LOCK_WAIT_SECONDS = 1.0
+
+STATUS_PENDING = "pending"
+STATUS_SYNCED = "synced"
+STATUS_FAILED = "failed"
+
+KIND_INSERT = "insert"
+KIND_RPC = "rpc"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    series TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT NOT NULL DEFAULT '',
+    result TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    synced_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_status_seq ON outbox(status, seq);
+CREATE INDEX IF NOT EXISTS idx_outbox_series ON outbox(series, seq);
+"""
+
+
+def _is_permanent_error(error: Exception) -> bool:
+    """Erro devolvido pelo PostgREST (constraint, RPC com RAISE) — retry não resolve."""
+    try:
+        from postgrest.exceptions import APIError
+    except ImportError:
+        return False
+    return isinstance(error, APIError)
+
+
+def _supabase_sender(kind: str, target: str, payloads: List[Dict[str, Any]]) -> List[Any]:
+    """Envia ao Supabase (síncrono — executado fora do event loop).
+
+    Inserts usam upsert por `id` para que um retry após timeout não duplique a linha.
+    """
+    # Mesmo cliente dos services originais: hematologia usa service_role, o resto a anon key
+    if target.startswith("hematology_"):
+        client = SupabaseClient.get_admin_client()
+    else:
+        client = SupabaseClient.get_client()
+    if client is None:
+        raise RuntimeError("Cliente Supabase não inicializado.")
+    if kind == KIND_INSERT:
+        response = client.table(target).upsert(payloads, on_conflict="id").execute()
+        return list(response.data or [])
+    results = []
+    for params in payloads:
+        response = client.rpc(target, params).execute()
+        results.append(response.data)
+    return results
+
+
+class QCOutbox:
+    """Fila durável de escritas pendentes (arquivo SQLite)."""
+
+    def __init__(self, path: str = OUTBOX_PATH, sender: Optional[Callable] = None):
+        self.path = path
+        self.sender = sender or _supabase_sender
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    # ── Conexão ──
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ── Enfileiramento ──
+
+    def enqueue_insert(self, table: str, row: Dict[str, Any], series: str) -> str:
+        """Enfileira insert em `table`. Atribui UUID ao `row` se ainda não tiver."""
+        row = dict(row)
+        row.setdefault("id", str(uuid.uuid4()))
+        self._enqueue(row["id"], KIND_INSERT, table, series, row)
+        return row["id"]
+
+    def enqueue_rpc(self, function: str, params: Dict[str, Any], series: str) -> str:
+        """Enfileira chamada RPC. Retorna o UUID local da entrada."""
+        entry_id = str(uuid.uuid4())
+        self._enqueue(entry_id, KIND_RPC, function, series, dict(params))
+        return entry_id
+
+    def _enqueue(self, entry_id: str, kind: str, target: str, series: str, payload: Dict[str, Any]):
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO outbox (id, kind, target, series, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (entry_id, kind, target, series, json.dumps(payload, default=str), datetime.now().isoformat()),
+            )
+
+    # ── Consulta ──
+
+    def status(self, entry_id: str) -> str:
+        """Status da entrada ("pending", "synced", "failed") ou "" se desconhecida."""
+        with self._lock:
+            row = self._db().execute("SELECT status FROM outbox WHERE id = ?", (entry_id,)).fetchone()
+        return row["status"] if row else ""
+
+    def last_error(self, entry_id: str) -> str:
+        with self._lock:
+            row = self._db().execute("SELECT last_error FROM outbox WHERE id = ?", (entry_id,)).fetchone()
+        return row["last_error"] if row else ""
+
+    def statuses(self, entry_ids: Iterable[str]) -> Dict[str, str]:
+        ids = [i for i in entry_ids if i]
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._db().execute(
+                f"SELECT id, status FROM outbox WHERE id IN ({placeholders})", ids
+            ).fetchall()
+        return {r["id"]: r["status"] for r in rows}
+
+    def result(self, entry_id: str) -> Any:
+        """Resposta do Supabase para uma entrada já sincronizada (ou None)."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT result FROM outbox WHERE id = ? AND status = ?", (entry_id, STATUS_SYNCED)
+            ).fetchone()
+        if not row or not row["result"]:
+            return None
+        return json.loads(row["result"])
+
+    def pending_count(self) -> int:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT COUNT(*) AS n FROM outbox WHERE status = ?", (STATUS_PENDING,)
+            ).fetchone()
+        return int(row["n"])
+
+    def pending_payloads(self, target: str) -> List[Dict[str, Any]]:
+        """Payloads ainda não sincronizados para uma tabela/RPC (em ordem de chegada)."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT payload FROM outbox WHERE status = ? AND target = ? ORDER BY seq",
+                (STATUS_PENDING, target),
+            ).fetchall()
+        return [json.loads(r["payload"]) for r in rows]
+
+    # ── Cancelamento ──
+
+    def discard(self, entry_ids: Iterable[str]) -> int:
+        """Remove entradas ainda pendentes (registro excluído antes de sincronizar). Retorna quantas saíram."""
+        ids = [i for i in entry_ids if i]
+        if not ids:
+            return 0
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            cursor = self._db().execute(
+                f"DELETE FROM outbox WHERE status = ? AND id IN ({placeholders})", [STATUS_PENDING, *ids]
+            )
+        return cursor.rowcount
+
+    def clear(self, target: Optional[str] = None) -> int:
+        """Remove todas as entradas pendentes (de `target`, se informado). Retorna quantas saíram."""
+        query, params = "DELETE FROM outbox WHERE status = ?", [STATUS_PENDING]
+        if target:
+            query, params = query + " AND target = ?", params + [target]
+        with self._lock:
+            cursor = self._db().execute(query, params)
+        return cursor.rowcount
+
+    # ── Flush ──
+
+    def _due_entries(self) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db().execute(
+                "SELECT * FROM outbox WHERE status = ? ORDER BY seq LIMIT ?",
+                (STATUS_PENDING, OUTBOX_BATCH_SIZE * 4),
+            ).fetchall()
+
+    def _mark_synced(self, entries: List[sqlite3.Row], results: List[Any]):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            for i, entry in enumerate(entries):
+                result = results[i] if i < len(results) else None
+                db.execute(
+                    "UPDATE outbox SET status = ?, result = ?, last_error = '', synced_at = ? WHERE seq = ?",
+                    (STATUS_SYNCED, json.dumps(result, default=str), now, entry["seq"]),
+                )
+
+    def _mark_failed(self, entries: List[sqlite3.Row], error: Exception):
+        """Falha definitiva: a entrada sai da fila e não bloqueia a série."""
+        with self._lock:
+            db = self._db()
+            for entry in entries:
+                db.execute(
+                    "UPDATE outbox SET status = ?, attempts = attempts + 1, last_error = ? WHERE seq = ?",
+                    (STATUS_FAILED, str(error)[:500], entry["seq"]),
+                )
+
+    def _mark_retry(self, entries: List[sqlite3.Row], error: Exception):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            for entry in entries:
+                attempts = entry["attempts"] + 1
+                backoff = min(OUTBOX_MAX_BACKOFF_SECONDS, 2 ** attempts)
+                db.execute(
+                    "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE seq = ?",
+                    (attempts, now + backoff, str(error)[:500], entry["seq"]),
+                )
+
+    def _prune_synced(self):
+        cutoff = time.time() - OUTBOX_SYNCED_RETENTION_SECONDS
+        with self._lock:
+            self._db().execute(
+                "DELETE FROM outbox WHERE status = ? AND synced_at < ?", (STATUS_SYNCED, cutoff)
+            )
+
+    def _plan_batches(self, entries: List[sqlite3.Row], now: float) -> List[List[sqlite3.Row]]:
+        """Agrupa entradas elegíveis em lotes, respeitando a ordem por série.
+
+        Uma série fica bloqueada a partir da primeira entrada ainda em backoff, para que
+        nenhuma escrita posterior seja entregue antes dela.
+        """
+        blocked = set()
+        insert_batches: Dict[str, List[sqlite3.Row]] = {}
+        batches: List[List[sqlite3.Row]] = []
+        for entry in entries:
+            series = entry["series"]
+            if series in blocked:
+                continue
+            if entry["next_attempt_at"] > now:
+                blocked.add(series)
+                continue
+            if entry["kind"] == KIND_INSERT:
+                batch = insert_batches.get(entry["target"])
+                if batch is None or len(batch) >= OUTBOX_BATCH_SIZE:
+                    batch = []
+                    insert_batches[entry["target"]] = batch
+                    batches.append(batch)
+                batch.append(entry)
+            else:
+                batches.append([entry])
+        return batches
+
+    async def _acquire_file_lock(self, wait: float) -> Optional[int]:
+        """Lock exclusivo entre processos; None se outro worker segurou o flush por mais de `wait` s."""
+        if fcntl is None:
+            return -1
+        fd = os.open(self.path + ".lock", os.O_CREAT | os.O_RDWR, 0o644)
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    return None
+                await asyncio.sleep(0.05)
+
+    @staticmethod
+    def _release_file_lock(fd: int):
+        if fd >= 0:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    async def flush(self) -> Dict[str, int]:
+        """Entrega as entradas pendentes. Retorna contagem de sincronizadas/falhas."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        synced = failed = 0
+        async with self._flush_lock:
+            fd = await self._acquire_file_lock(OUTBOX_LOCK_WAIT_SECONDS)
+            if fd is None:
+                # Outro worker está entregando; o que sobrar sai no próximo ciclo
+                return {"synced": 0, "failed": 0}
+            try:
+                loop = asyncio.get_running_loop()
+                now = time.time()
+                entries = await loop.run_in_executor(None, self._due_entries)
+                failed_series = set()
+                for batch in self._plan_batches(entries, now):
+                    batch = [e for e in batch if e["series"] not in failed_series]
+                    if not batch:
+                        continue
+                    ok, bad, retry = await self._send(loop, batch)
+                    synced += ok
+                    failed += bad
+                    if retry:
+                        failed_series.update(entry["series"] for entry in retry)
+                if synced:
+                    await loop.run_in_executor(None, self._prune_synced)
+            finally:
+                self._release_file_lock(fd)
+        return {"synced": synced, "failed": failed}
+
+    async def _send(self, loop, batch: List[sqlite3.Row]):
+        """Envia um lote. Retorna (sincronizadas, falhas definitivas, entradas para retry)."""
+        kind, target = batch[0]["kind"], batch[0]["target"]
+        payloads = [json.loads(e["payload"]) for e in batch]
+        try:
+            results = await loop.run_in_executor(None, self.sender, kind, target, payloads)
+        except Exception as e:
+            if not _is_permanent_error(e):
+                logger.warning(f"Outbox: falha ao enviar {len(batch)} entrada(s) para {target}: {e}")
+                await loop.run_in_executor(None, self._mark_retry, batch, e)
+                return 0, 0, batch
+            if len(batch) > 1:
+                # Uma linha inválida derruba o lote inteiro: reenvia uma a uma
+                ok = bad = 0
+                retry: List[sqlite3.Row] = []
+                for entry in batch:
+                    o, b, r = await self._send(loop, [entry])
+                    ok, bad = ok + o, bad + b
+                    retry.extend(r)
+                return ok, bad, retry
+            logger.error(f"Outbox: entrada {batch[0]['id']} rejeitada por {target}: {e}")
+            await loop.run_in_executor(None, self._mark_failed, batch, e)
+            return 0, 1, []
+        await loop.run_in_executor(None, self._mark_synced, batch, results)
+        return len(batch), 0, []
+
+    async def submit(self, entry_id: str) -> str:
+        """Tenta entregar já (caminho rápido) e retorna o status resultante da entrada."""
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Outbox: erro no flush imediato: {e}")
+        return self.status(entry_id)
+
+    async def run_forever(self, interval: float = OUTBOX_FLUSH_INTERVAL_SECONDS):
+        """Loop de flush periódico (registrado como lifespan task do app)."""
+        while True:
+            try:
+                if self.pending_count():
+                    await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox: erro no loop de flush: {e}")
+            await asyncio.sleep(interval)
+
+
+def series_key(*parts: Any) -> str:
+    """Chave de série para ordenação (ex: exame|nível|lote)."""
+    return "|".join(str(p or "").strip().upper() for p in parts)
+
+
+# Instância do processo — a conexão SQLite só é aberta no primeiro uso
+qc_outbox = QCOutbox()
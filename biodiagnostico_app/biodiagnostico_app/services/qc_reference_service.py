@@ -8,6 +8,7 @@ from datetime import datetime
 from .supabase_client import SupabaseClient
 from .exceptions import ServiceError
 from .types import QCReferenceRow
+from .metrics_service import instrument_service
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +21,7 @@ def get_supabase():
     return client
 
 
+@instrument_service
 class QCReferenceService:
     """Operacoes CRUD para Valores Referenciais de CQ"""
 
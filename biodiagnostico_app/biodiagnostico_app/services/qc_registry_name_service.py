@@ -7,6 +7,7 @@ from typing import List, Dict, Any
 from .supabase_client import SupabaseClient
 from .exceptions import ServiceError
 from .types import QCRegistryNameRow
+from .metrics_service import instrument_service
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +19,7 @@ def get_supabase():
     return client
 
 
+@instrument_service
 class QCRegistryNameService:
     """CRUD para nomes de registro de CQ"""
 
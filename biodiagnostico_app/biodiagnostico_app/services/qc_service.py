@@ -1,15 +1,36 @@
 """
 Serviço de Controle de Qualidade (QC)
 """
+import asyncio
 import logging
+import os
+import time
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from .supabase_client import SupabaseClient
 from .exceptions import ServiceError
-from .types import QCRecordRow
+from .types import QCRecordRow, DashboardKPIs
+from .analytics_mirror_service import analytics_mirror
+from .cluster_service import cluster
+from .metrics_service import instrument_service
 
 logger = logging.getLogger(__name__)
 
+DASHBOARD_KPI_TTL_SECONDS = float(os.environ.get("DASHBOARD_KPI_TTL", "15"))
+EVENT_KPIS_INVALIDATED = "qc.kpis_invalidated"
+
+# Cache do processo compartilhado entre sessões: {"date", "fetched_at", "data"}
+_kpi_cache: Dict[str, Any] = {}
+_kpi_lock: Optional[asyncio.Lock] = None
+
+
+def _cached_kpis(today: str) -> Optional[DashboardKPIs]:
+    if _kpi_cache.get("date") != today:
+        return None
+    if time.monotonic() - _kpi_cache.get("fetched_at", 0.0) > DASHBOARD_KPI_TTL_SECONDS:
+        return None
+    return dict(_kpi_cache["data"])
+
 
 def get_supabase():
     client = SupabaseClient.get_client()
@@ -18,13 +39,15 @@ def get_supabase():
     return client
 
 
+@instrument_service
 class QCService:
     """Operações de banco de dados para QC"""
     
     @staticmethod
-    async def create_qc_record(record_data: Dict[str, Any]) -> QCRecordRow:
-        """Insere novo registro de CQ"""
+    def build_qc_record_row(record_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte dados do formulário para as colunas de qc_records"""
         data = {
+            "id": record_data.get("id"),
             "date": record_data.get("date"),
             "exam_name": record_data.get("exam_name"),
             "level": record_data.get("level"),
@@ -41,7 +64,12 @@ class QCService:
 
         # Remove campos None e strings vazias para evitar erros no Supabase
         # (reference_id vazio "" causa erro pois coluna é UUID com FK)
-        data = {k: v for k, v in data.items() if v is not None and v != ""}
+        return {k: v for k, v in data.items() if v is not None and v != ""}
+
+    @staticmethod
+    async def create_qc_record(record_data: Dict[str, Any]) -> QCRecordRow:
+        """Insere novo registro de CQ"""
+        data = QCService.build_qc_record_row(record_data)
 
         response = get_supabase().table("qc_records").insert(data).execute()
         if not response.data:
@@ -91,70 +119,77 @@ class QCService:
         
         return response.data
     
+    @staticmethod
+    async def get_dashboard_kpis(force: bool = False) -> DashboardKPIs:
+        """KPIs do dashboard em um round-trip (RPC qc_dashboard_kpis), com cache curto compartilhado"""
+        global _kpi_lock
+        today = datetime.now().date().isoformat()
+        if not force:
+            cached = _cached_kpis(today)
+            if cached is not None:
+                return cached
+
+        if _kpi_lock is None:
+            _kpi_lock = asyncio.Lock()
+        async with _kpi_lock:
+            # Cargas concorrentes aguardam aqui e reaproveitam o resultado de quem buscou
+            if not force:
+                cached = _cached_kpis(today)
+                if cached is not None:
+                    return cached
+            try:
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(
+                    None,
+                    lambda: get_supabase().rpc("qc_dashboard_kpis", {"p_today": today}).execute(),
+                )
+            except Exception as e:
+                logger.error(f"Erro ao buscar KPIs do dashboard: {e}")
+                raise ServiceError(f"Erro ao buscar KPIs do dashboard: {e}")
+
+            data = response.data or {}
+            if isinstance(data, list):
+                data = data[0] if data else {}
+            kpis: DashboardKPIs = {
+                "date": today,
+                "total_today": int(data.get("total_today") or 0),
+                "alerts_today": int(data.get("alerts_today") or 0),
+                "total_month": int(data.get("total_month") or 0),
+                "approved_month": int(data.get("approved_month") or 0),
+                "approval_rate_month": float(data.get("approval_rate_month") or 0.0),
+                "expiring_lots": int(data.get("expiring_lots") or 0),
+                "pending_maintenances": int(data.get("pending_maintenances") or 0),
+            }
+            _kpi_cache.update({"date": today, "fetched_at": time.monotonic(), "data": kpis})
+            return dict(kpis)
+
+    @staticmethod
+    def invalidate_dashboard_kpis():
+        """Descarta o cache de KPIs (após gravações/exclusões), também nos outros workers"""
+        _kpi_cache.clear()
+        cluster.publish(EVENT_KPIS_INVALIDATED)
+
     @staticmethod
     async def get_qc_statistics_today() -> Dict[str, int]:
         """Retorna estatísticas de hoje"""
-        today = datetime.now().date().isoformat()
-        
-        # Total de registros hoje
-        total = get_supabase().table("qc_records")\
-            .select("id", count="exact")\
-            .gte("date", today)\
-            .execute()
-        
-        # Registros com alerta (Status != OK) - Ajuste conforme lógica do banco
-        # Supondo que o banco calcule o status ou que a aplicação filtre
-        # Aqui vamos filtrar pelo status gerado se possível, ou calcular na query se não
-        alerts = get_supabase().table("qc_records")\
-            .select("id", count="exact")\
-            .gte("date", today)\
-            .neq("status", "OK")\
-            .execute()
-        
+        kpis = await QCService.get_dashboard_kpis()
         return {
-            "total_today": total.count,
-            "alerts_today": alerts.count
+            "total_today": kpis["total_today"],
+            "alerts_today": kpis["alerts_today"]
         }
-    
+
     @staticmethod
     async def get_qc_statistics_month() -> int:
         """Retorna total de registros do mês atual"""
-        today = datetime.now()
-        first_day = today.replace(day=1).date().isoformat()
-        
-        total = get_supabase().table("qc_records")\
-            .select("id", count="exact")\
-            .gte("date", first_day)\
-            .execute()
-            
-        return total.count
+        kpis = await QCService.get_dashboard_kpis()
+        return kpis["total_month"]
 
     @staticmethod
     async def get_approval_rate_month() -> float:
         """Calcula taxa de aprovação do mês"""
-        today = datetime.now()
-        first_day = today.replace(day=1).date().isoformat()
-        
-        # Total do mês
-        total_response = get_supabase().table("qc_records")\
-            .select("id", count="exact")\
-            .gte("date", first_day)\
-            .execute()
-            
-        total = total_response.count
-        
-        if total == 0:
-            return 0.0
-            
-        # Total aprovado (OK)
-        ok_response = get_supabase().table("qc_records")\
-            .select("id", count="exact")\
-            .gte("date", first_day)\
-            .eq("status", "OK")\
-            .execute()
-            
-        return (ok_response.count / total) * 100.0
-    
+        kpis = await QCService.get_dashboard_kpis()
+        return kpis["approval_rate_month"]
+
     @staticmethod
     async def get_levey_jennings_data(
         exam_name: str,
@@ -221,6 +256,8 @@ class QCService:
             verify = get_supabase().table("qc_records").select("id").eq("id", record_id).execute()
             if not verify.data or len(verify.data) == 0:
                 logger.info(f"Registro {record_id} deletado com sucesso.")
+                analytics_mirror.forget("qc_records", [record_id])
+                QCService.invalidate_dashboard_kpis()
                 return True
 
             logger.warning(f"Delete falhou - registro {record_id} ainda existe.")
@@ -229,3 +266,6 @@ class QCService:
         except Exception as e:
             logger.error(f"Erro ao deletar registro QC {record_id}: {e}")
             return False
+
+
+cluster.on(EVENT_KPIS_INVALIDATED, lambda _: _kpi_cache.clear())
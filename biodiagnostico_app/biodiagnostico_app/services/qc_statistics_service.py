@@ -0,0 +1,233 @@
+"""
+Estatísticas incrementais por série de CQ (exame/nível/lote).
+
+Acumuladores de Welford (n, média, M2) para o histórico completo, janelas
+móveis das últimas 20 e 30 corridas e o mês corrente. Inserções em ordem
+cronológica atualizam tudo em O(1); exclusões e inserções fora de ordem
+recalculam a série exatamente a partir dos pontos guardados.
+
+Com vários workers, inclusões e exclusões avulsas são repassadas aos outros
+processos pelo cluster_service; a reconstrução a partir da carga do banco é
+local de cada worker.
+"""
+import bisect
+import logging
+import math
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .cluster_service import cluster
+
+logger = logging.getLogger(__name__)
+
+EVENT_STATS_ADD = "qc_statistics.add"
+EVENT_STATS_REMOVE = "qc_statistics.remove"
+
+BASELINE_POINTS = 20
+ROLLING_WINDOWS = (20, 30)
+
+
+class RunningStats:
+    """Acumulador de Welford com remoção (para janelas deslizantes)."""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @classmethod
+    def from_values(cls, values: Iterable[float]) -> "RunningStats":
+        stats = cls()
+        for v in values:
+            stats.add(v)
+        return stats
+
+    def add(self, x: float):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x: float):
+        if self.n <= 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        delta = x - self.mean
+        self.n -= 1
+        self.mean -= delta / self.n
+        self.m2 = max(self.m2 - delta * (x - self.mean), 0.0)
+
+    @property
+    def sd(self) -> float:
+        """Desvio padrão amostral (n-1)."""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def cv(self) -> float:
+        return self.sd / abs(self.mean) * 100 if self.mean else 0.0
+
+    def as_dict(self, prefix: str = "") -> Dict[str, float]:
+        return {
+            f"{prefix}n": self.n,
+            f"{prefix}mean": round(self.mean, 4),
+            f"{prefix}sd": round(self.sd, 4),
+            f"{prefix}cv": round(self.cv, 2),
+        }
+
+
+class _Window:
+    """Janela das últimas `size` corridas."""
+
+    __slots__ = ("values", "stats")
+
+    def __init__(self, size: int):
+        self.values: deque = deque(maxlen=size)
+        self.stats = RunningStats()
+
+    def push(self, x: float):
+        if len(self.values) == self.values.maxlen:
+            self.stats.remove(self.values[0])
+        self.values.append(x)
+        self.stats.add(x)
+
+
+class SeriesStatistics:
+    """Estatísticas de uma série exame/nível/lote."""
+
+    def __init__(self):
+        # (data, id, valor) em ordem cronológica
+        self.points: List[Tuple[str, str, float]] = []
+        self._reset()
+
+    def _reset(self):
+        self.total = RunningStats()
+        self.windows = {size: _Window(size) for size in ROLLING_WINDOWS}
+        self.month = ""
+        self.month_stats = RunningStats()
+
+    def _accumulate(self, date: str, value: float):
+        self.total.add(value)
+        for window in self.windows.values():
+            window.push(value)
+        month = date[:7]
+        if month != self.month:
+            self.month = month
+            self.month_stats = RunningStats()
+        self.month_stats.add(value)
+
+    def _recompute(self):
+        self._reset()
+        for date, _, value in self.points:
+            self._accumulate(date, value)
+
+    def add(self, record_id: str, date: str, value: float):
+        point = (date, record_id, value)
+        if not self.points or point >= self.points[-1]:
+            self.points.append(point)
+            self._accumulate(date, value)
+        else:
+            bisect.insort(self.points, point)
+            self._recompute()
+
+    def remove(self, record_id: str) -> bool:
+        remaining = [p for p in self.points if p[1] != record_id]
+        if len(remaining) == len(self.points):
+            return False
+        self.points = remaining
+        self._recompute()
+        return True
+
+    def baseline(self) -> Optional[Dict[str, float]]:
+        """Média/DP das primeiras 20 corridas (alvo derivado do laboratório)."""
+        if len(self.points) < BASELINE_POINTS:
+            return None
+        stats = RunningStats.from_values(p[2] for p in self.points[:BASELINE_POINTS])
+        return stats.as_dict()
+
+    def snapshot(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = self.total.as_dict()
+        for size, window in self.windows.items():
+            data.update(window.stats.as_dict(f"last{size}_"))
+        data.update(self.month_stats.as_dict("month_"))
+        data["month"] = self.month
+        baseline = self.baseline()
+        data["baseline_ready"] = baseline is not None
+        for k, v in (baseline or RunningStats().as_dict()).items():
+            data[f"baseline_{k}"] = v
+        return data
+
+
+def _key(exam_name: str, level: str, lot_number: str) -> Tuple[str, str, str]:
+    return (
+        (exam_name or "").strip().upper(),
+        (level or "").strip().upper(),
+        (lot_number or "").strip().upper(),
+    )
+
+
+class QCStatisticsEngine:
+    """Séries de CQ do processo, alimentadas pelos registros carregados/gravados."""
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str, str], SeriesStatistics] = {}
+        self._series_by_id: Dict[str, Tuple[str, str, str]] = {}
+
+    def rebuild(self, records: Iterable[Any]):
+        """Recria todas as séries a partir de registros QCRecord (qualquer ordem)."""
+        self._series = {}
+        self._series_by_id = {}
+        for r in sorted(records, key=lambda r: (r.date or "", str(r.id))):
+            self._add(r)
+
+    def add_record(self, record: Any):
+        self._add(record)
+        cluster.publish(EVENT_STATS_ADD, {
+            "id": str(record.id), "exam_name": record.exam_name, "level": record.level,
+            "lot_number": record.lot_number, "date": record.date, "value": record.value,
+        })
+
+    def remove_record(self, record_id: str) -> bool:
+        removed = self._remove(record_id)
+        cluster.publish(EVENT_STATS_REMOVE, str(record_id))
+        return removed
+
+    def _add(self, record: Any):
+        record_id = str(record.id)
+        if record_id in self._series_by_id:
+            self._remove(record_id)
+        key = _key(record.exam_name, record.level, record.lot_number)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = SeriesStatistics()
+        series.add(record_id, record.date or "", float(record.value or 0))
+        self._series_by_id[record_id] = key
+
+    def _remove(self, record_id: str) -> bool:
+        key = self._series_by_id.pop(str(record_id), None)
+        if key is None:
+            return False
+        series = self._series[key]
+        series.remove(str(record_id))
+        if not series.points:
+            del self._series[key]
+        return True
+
+    def get(self, exam_name: str, level: str, lot_number: str) -> Optional[SeriesStatistics]:
+        return self._series.get(_key(exam_name, level, lot_number))
+
+    def snapshot(self, exam_name: str, level: str, lot_number: str) -> Dict[str, Any]:
+        series = self.get(exam_name, level, lot_number)
+        return series.snapshot() if series else {}
+
+    def baseline(self, exam_name: str, level: str, lot_number: str) -> Optional[Dict[str, float]]:
+        series = self.get(exam_name, level, lot_number)
+        return series.baseline() if series else None
+
+
+# Instância do processo — reconstruída a cada carga do banco
+qc_statistics = QCStatisticsEngine()
+cluster.on(EVENT_STATS_ADD, lambda payload: qc_statistics._add(SimpleNamespace(**payload)))
+cluster.on(EVENT_STATS_REMOVE, qc_statistics._remove)
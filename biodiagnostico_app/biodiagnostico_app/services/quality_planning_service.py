@@ -0,0 +1,186 @@
+"""
+Planejamento da qualidade: métrica Sigma por exame/nível.
+
+Sigma = (TEa − |bias|) / CV, com bias e CV derivados dos registros de CQ em
+uma única passada vetorizada (numpy) sobre um snapshot colunar. A troca de
+lote muda média e alvo, então o DP é o combinado das variâncias dentro de cada
+lote e o bias é a média dos bias por lote ponderada pelo n. O resultado
+define as regras de Westgard recomendadas para cada série e é guardado em
+cache pela versão dos dados.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Erro total permitido (TEa, %) — limites CLIA 2024 para os exames de bioquímica da rotina.
+# Pode ser sobrescrito/estendido por um JSON {"EXAME": tea_pct} em QC_TEA_PATH.
+DEFAULT_TEA_PCT: Dict[str, float] = {
+    "GLICOSE": 8.0,
+    "COLESTEROL TOTAL": 10.0,
+    "COLESTEROL HDL": 20.0,
+    "COLESTEROL LDL": 20.0,
+    "TRIGLICERIDEOS": 15.0,
+    "UREIA": 9.0,
+    "CREATININA": 10.0,
+    "ACIDO URICO": 10.0,
+    "GOT": 15.0,
+    "GPT": 15.0,
+    "GAMA GT": 15.0,
+    "FOSFATASE ALCALINA": 20.0,
+    "AMILASE": 20.0,
+    "CREATINOFOSFOQUINASE": 20.0,
+    "ALBUMINA": 8.0,
+    "PROTEINAS TOTAIS": 8.0,
+    "FERRO": 15.0,
+    "MAGNESIO": 15.0,
+    "BILIRRUBINA TOTAL": 20.0,
+}
+QC_TEA_PATH = os.environ.get("QC_TEA_PATH", "")
+
+# Regras de Westgard por faixa de Sigma (Westgard Sigma Rules). Abaixo de 5σ
+# entram também as equivalentes para três níveis (2of3-2s, 3-1s e 6x), já que
+# evaluate_runs percorre os controles atravessando níveis.
+SIGMA_RULES: List[Tuple[float, List[str]]] = [
+    (6.0, ["1-3s"]),
+    (5.0, ["1-3s", "2-2s", "R-4s"]),
+    (4.0, ["1-3s", "2-2s", "R-4s", "4-1s", "2of3-2s", "3-1s"]),
+    (float("-inf"), ["1-3s", "2-2s", "R-4s", "4-1s", "2of3-2s", "3-1s", "6x", "10x"]),
+]
+
+_CACHE_SIZE = 8
+
+
+def load_tea_table() -> Dict[str, float]:
+    """TEa por exame: padrão + overrides do arquivo em QC_TEA_PATH (se houver)."""
+    table = dict(DEFAULT_TEA_PCT)
+    if QC_TEA_PATH:
+        try:
+            with open(QC_TEA_PATH, encoding="utf-8") as f:
+                table.update({str(k).strip().upper(): float(v) for k, v in json.load(f).items()})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Tabela de TEa em {QC_TEA_PATH} ignorada: {e}")
+    return table
+
+
+def select_rules(sigma: Optional[float]) -> List[str]:
+    """Regras recomendadas para o Sigma (sem Sigma: multirregra completa)."""
+    if sigma is None:
+        return list(SIGMA_RULES[-1][1])
+    for threshold, rules in SIGMA_RULES:
+        if sigma >= threshold:
+            return list(rules)
+    return list(SIGMA_RULES[-1][1])
+
+
+def _data_version(records: List[Any], tea: Dict[str, float]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for r in records:
+        h.update(f"{r.id}|{r.exam_name}|{r.level}|{r.lot_number}|{r.value}|{r.target_value}\n".encode())
+    h.update(json.dumps(tea, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+class QualityPlanner:
+    """Calcula e guarda o plano de qualidade (bias, CV, Sigma, regras) por série."""
+
+    def __init__(self, tea_table: Optional[Dict[str, float]] = None):
+        self.tea_table = tea_table if tea_table is not None else load_tea_table()
+        self._cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._rules: Dict[Tuple[str, str], List[str]] = {}
+
+    def plan(self, records: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Tabela ranqueada (pior Sigma primeiro) para todas as séries exame/nível."""
+        records = [r for r in records if r.exam_name]
+        version = _data_version(records, self.tea_table)
+        cached = self._cache.get(version)
+        if cached is None:
+            cached = self._compute(records)
+            if len(self._cache) >= _CACHE_SIZE:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[version] = cached
+        self._rules = {(row["exam_name"], row["level"]): row["rules"] for row in cached}
+        return [dict(row) for row in cached]
+
+    def rules_for(self, exam_name: str, level: str) -> Optional[List[str]]:
+        """Regras do último plano calculado para a série (None se não houver plano)."""
+        return self._rules.get(((exam_name or "").strip().upper(), level or ""))
+
+    def _compute(self, records: List[Any]) -> List[Dict[str, Any]]:
+        if not records:
+            return []
+        keys = np.array([f"{(r.exam_name or '').strip().upper()}\x1f{r.level or ''}" for r in records])
+        values = np.fromiter((float(r.value or 0) for r in records), dtype=float, count=len(records))
+        targets = np.fromiter((float(r.target_value or 0) for r in records), dtype=float, count=len(records))
+
+        lot_keys = np.array([f"{k}\x1f{r.lot_number or ''}" for k, r in zip(keys, records)])
+
+        series, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse).astype(float)
+        mean = np.bincount(inverse, weights=values) / counts
+
+        # Estatística por (exame, nível, lote), agregada depois na série
+        lots, lot_inverse = np.unique(lot_keys, return_inverse=True)
+        lot_series = np.zeros(len(lots), dtype=int)
+        lot_series[lot_inverse] = inverse
+        lot_counts = np.bincount(lot_inverse).astype(float)
+        lot_mean = np.bincount(lot_inverse, weights=values) / lot_counts
+        lot_target_mean = np.bincount(lot_inverse, weights=targets) / lot_counts
+        deviations = values - lot_mean[lot_inverse]
+        ss = np.bincount(lot_series, weights=np.bincount(lot_inverse, weights=deviations * deviations), minlength=len(series))
+        dof = np.bincount(lot_series, weights=lot_counts - 1, minlength=len(series))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sd = np.where(dof > 0, np.sqrt(ss / dof), np.nan)
+            cv = np.where(mean != 0, sd / np.abs(mean) * 100, np.nan)
+            lot_bias = np.where(lot_target_mean > 0, (lot_mean - lot_target_mean) / lot_target_mean * 100, np.nan)
+            has_bias = np.isfinite(lot_bias)
+            bias = (
+                np.bincount(lot_series, weights=np.where(has_bias, lot_bias * lot_counts, 0.0), minlength=len(series))
+                / np.bincount(lot_series, weights=np.where(has_bias, lot_counts, 0.0), minlength=len(series))
+            )
+            exams = [s.split("\x1f", 1)[0] for s in series]
+            tea = np.array([self.tea_table.get(e, np.nan) for e in exams], dtype=float)
+            sigma = (tea - np.abs(bias)) / cv
+        sigma = np.where(np.isfinite(sigma), sigma, np.nan)
+
+        rows: List[Dict[str, Any]] = []
+        for i, key in enumerate(series):
+            exam_name, level = key.split("\x1f", 1)
+            s = None if np.isnan(sigma[i]) else round(float(sigma[i]), 2)
+            rows.append({
+                "exam_name": exam_name,
+                "level": level,
+                "n": int(counts[i]),
+                "mean": round(float(mean[i]), 4),
+                "sd": None if np.isnan(sd[i]) else round(float(sd[i]), 4),
+                "cv": None if np.isnan(cv[i]) else round(float(cv[i]), 2),
+                "bias": None if np.isnan(bias[i]) else round(float(bias[i]), 2),
+                "tea": None if np.isnan(tea[i]) else float(tea[i]),
+                "sigma": s,
+                "rules": select_rules(s),
+            })
+        # Pior desempenho primeiro; séries sem Sigma (sem TEa/CV) ao final
+        rows.sort(key=lambda r: (r["sigma"] is None, r["sigma"] if r["sigma"] is not None else 0, r["exam_name"], r["level"]))
+        return rows
+
+
+def apply_rule_selection(violations: List[Dict[str, Any]], rules: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Rebaixa para alerta as rejeições de regras fora do conjunto selecionado pelo Sigma."""
+    if rules is None:
+        return violations
+    selected = []
+    for v in violations:
+        if v.get("severity") == "rejection" and v.get("rule") not in rules:
+            v = dict(v, severity="warning", description=f"{v.get('description', '')} (regra não exigida pelo Sigma do exame)")
+        selected.append(v)
+    return selected
+
+
+# Instância do processo
+quality_planner = QualityPlanner()
@@ -0,0 +1,324 @@
+"""
+Modo de profiling do estado Reflex (opt-in: STATE_PROFILE=1).
+
+Para cada evento despachado registra, agrupado pelo handler:
+  - quais computed vars foram recalculadas e quanto tempo cada uma levou
+    (tempo inclusivo; vars que chamam outras aparecem aninhadas nas pilhas)
+  - o tamanho serializado (JSON, como vai ao frontend) de cada var no delta
+e gera um relatório ordenado (JSON) e pilhas no formato "folded"
+(evento;(delta);var microssegundos), aceito por flamegraph.pl e speedscope.
+
+A instalação acontece na lifespan task, depois que o app já compilou e
+validou as dependências das computed vars: as funções das vars são trocadas
+por wrappers de medição e o Reflex não deve analisar o bytecode delas
+depois disso. Relatórios em STATE_PROFILE_DIR, a cada
+STATE_PROFILE_DUMP_INTERVAL segundos e no desligamento, e em
+GET /api/profile/state. Com vários workers, cada um grava no próprio
+subdiretório (STATE_PROFILE_DIR-worker<N>).
+"""
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cluster_service import worker_suffixed
+
+logger = logging.getLogger(__name__)
+
+STATE_PROFILE = os.environ.get("STATE_PROFILE", "").lower() in ("1", "true", "yes")
+STATE_PROFILE_DIR = worker_suffixed(os.environ.get("STATE_PROFILE_DIR", "") or "state_profile")
+STATE_PROFILE_DUMP_INTERVAL = float(os.environ.get("STATE_PROFILE_DUMP_INTERVAL") or 60)
+
+FIELD_MARKER = "_rx_state_"
+DELTA_FRAME = "(delta)"
+
+
+def _json_size(value: Any) -> int:
+    try:
+        from reflex.utils.format import json_dumps
+        return len(json_dumps(value).encode("utf-8"))
+    except Exception:
+        return len(json.dumps(value, default=str).encode("utf-8"))
+
+
+class _EventProfile:
+    """Amostras de um único evento: pilha de frames [nome, início, tempo dos filhos]."""
+
+    __slots__ = ("event", "stack", "vars", "delta", "folded")
+
+    def __init__(self, event: str):
+        self.event = event
+        self.stack: List[list] = [[event, time.perf_counter(), 0.0]]
+        self.vars: Dict[str, List[float]] = {}
+        self.delta: Dict[str, List[int]] = {}
+        self.folded: Dict[str, float] = {}
+
+    def enter(self, name: str):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self) -> float:
+        name, start, children = self.stack.pop()
+        inclusive = time.perf_counter() - start
+        path = ";".join([f[0] for f in self.stack] + [name])
+        self.folded[path] = self.folded.get(path, 0.0) + inclusive - children
+        if self.stack:
+            self.stack[-1][2] += inclusive
+        return inclusive
+
+
+_current: ContextVar[Optional[_EventProfile]] = ContextVar("qc_state_profile", default=None)
+
+
+class StateProfiler:
+    """Agregados por tipo de evento; tudo roda no event loop, sem lock."""
+
+    def __init__(self, enabled: bool = STATE_PROFILE):
+        self.enabled = enabled
+        self._events: Dict[str, Dict[str, Any]] = {}
+        self._folded: Dict[str, float] = {}
+        # (objeto, atributo, valor original, congelado) para desfazer a instalação
+        self._patched: List[Tuple[Any, str, Any, bool]] = []
+
+    def reset(self):
+        self._events.clear()
+        self._folded.clear()
+
+    # ── Instalação ──
+
+    def install(self, state_cls) -> int:
+        """Envolve as computed vars da árvore de estados, o despacho de eventos e o delta. Retorna o nº de vars."""
+        if self._patched:
+            return 0
+        from reflex.state import BaseState
+        from reflex_base.vars.base import ComputedVar
+
+        seen = set()
+        pending = [state_cls.get_root_state()]
+        classes = []
+        while pending:
+            cls = pending.pop()
+            classes.extend(c for c in cls.__mro__ if isinstance(c, type) and issubclass(c, BaseState))
+            pending.extend(cls.get_substates())
+        count = 0
+        for cls in dict.fromkeys(classes):
+            for var in [*vars(cls).values(), *cls.computed_vars.values()]:
+                if not isinstance(var, ComputedVar) or id(var) in seen or var._fget is None:
+                    continue
+                seen.add(id(var))
+                owner = getattr(var, "_owner", None) or cls
+                self._patch(var, "_fget", self._wrap_var(f"{owner.__name__}.{var._name}", var._fget), frozen=True)
+                count += 1
+
+        try:
+            from reflex_base.event.processor import base_state_processor
+        except ImportError:
+            logger.warning("Profiling: versão do Reflex sem base_state_processor; eventos não serão agrupados")
+        else:
+            self._patch(base_state_processor, "process_event", self._wrap_process_event(base_state_processor.process_event))
+        self._patch(BaseState, "_get_resolved_delta", self._wrap_resolved_delta(BaseState._get_resolved_delta))
+        logger.info(f"Profiling de estado ativo: {count} computed vars instrumentadas")
+        return count
+
+    def uninstall(self):
+        for obj, attr, original, frozen in reversed(self._patched):
+            self._set(obj, attr, original, frozen)
+        self._patched.clear()
+
+    def _patch(self, obj: Any, attr: str, value: Any, frozen: bool = False):
+        self._patched.append((obj, attr, getattr(obj, attr), frozen))
+        self._set(obj, attr, value, frozen)
+
+    @staticmethod
+    def _set(obj: Any, attr: str, value: Any, frozen: bool):
+        if frozen:
+            # ComputedVar é um dataclass congelado; o próprio Reflex atribui _fget assim
+            object.__setattr__(obj, attr, value)
+        else:
+            setattr(obj, attr, value)
+
+    def _wrap_var(self, label: str, fget):
+        if inspect.iscoroutinefunction(fget):
+            @functools.wraps(fget)
+            async def async_timed(instance):
+                profile = _current.get()
+                if profile is None:
+                    return await fget(instance)
+                profile.enter(label)
+                try:
+                    return await fget(instance)
+                finally:
+                    self._count_var(profile, label, profile.exit())
+            return async_timed
+
+        @functools.wraps(fget)
+        def timed(instance):
+            profile = _current.get()
+            if profile is None:
+                return fget(instance)
+            profile.enter(label)
+            try:
+                return fget(instance)
+            finally:
+                self._count_var(profile, label, profile.exit())
+        return timed
+
+    def _wrap_process_event(self, original):
+        @functools.wraps(original)
+        async def process_event(handler, payload, state, root_state):
+            with self.event(getattr(handler.fn, "__qualname__", str(handler))):
+                await original(handler=handler, payload=payload, state=state, root_state=root_state)
+        return process_event
+
+    def _wrap_resolved_delta(self, original):
+        @functools.wraps(original)
+        async def _get_resolved_delta(state):
+            profile = _current.get()
+            if profile is None:
+                return await original(state)
+            profile.enter(DELTA_FRAME)
+            try:
+                delta = await original(state)
+            finally:
+                profile.exit()
+            self.record_delta(delta)
+            return delta
+        return _get_resolved_delta
+
+    # ── Coleta ──
+
+    @staticmethod
+    def _count_var(profile: _EventProfile, label: str, seconds: float):
+        stats = profile.vars.setdefault(label, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+
+    @contextmanager
+    def event(self, name: str):
+        """Agrupa as medições feitas dentro do bloco sob o evento `name`."""
+        if _current.get() is not None:
+            # Handler chamado de dentro de outro: as medições vão para o evento externo
+            yield
+            return
+        profile = _EventProfile(name)
+        token = _current.set(profile)
+        try:
+            yield
+        finally:
+            _current.reset(token)
+            self._merge(profile, profile.exit())
+
+    def record_delta(self, delta: Dict[str, Dict[str, Any]]):
+        profile = _current.get()
+        if profile is None:
+            return
+        for subdelta in delta.values():
+            for key, value in subdelta.items():
+                stats = profile.delta.setdefault(key.removesuffix(FIELD_MARKER), [0, 0, 0])
+                size = _json_size(value)
+                stats[0] += 1
+                stats[1] += size
+                stats[2] = max(stats[2], size)
+
+    def _merge(self, profile: _EventProfile, seconds: float):
+        agg = self._events.setdefault(profile.event, {"count": 0, "total_s": 0.0, "max_s": 0.0, "vars": {}, "delta": {}})
+        agg["count"] += 1
+        agg["total_s"] += seconds
+        agg["max_s"] = max(agg["max_s"], seconds)
+        for label, (n, total, peak) in profile.vars.items():
+            stats = agg["vars"].setdefault(label, [0, 0.0, 0.0])
+            stats[0] += n
+            stats[1] += total
+            stats[2] = max(stats[2], peak)
+        for var, (n, total, peak) in profile.delta.items():
+            stats = agg["delta"].setdefault(var, [0, 0, 0])
+            stats[0] += n
+            stats[1] += total
+            stats[2] = max(stats[2], peak)
+        for path, value in profile.folded.items():
+            self._folded[path] = self._folded.get(path, 0.0) + value
+
+    # ── Relatórios ──
+
+    def report(self, top: int = 25) -> Dict[str, Any]:
+        """Eventos ordenados por tempo total, com as vars e os campos do delta que mais pesam."""
+        events = []
+        overall: Dict[str, List[float]] = {}
+        for name, agg in self._events.items():
+            count, total = agg["count"], agg["total_s"]
+            computed = sorted(agg["vars"].items(), key=lambda kv: kv[1][1], reverse=True)
+            delta = sorted(agg["delta"].items(), key=lambda kv: kv[1][1], reverse=True)
+            for label, (n, seconds, _) in computed:
+                stats = overall.setdefault(label, [0, 0.0])
+                stats[0] += n
+                stats[1] += seconds
+            events.append({
+                "event": name,
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total / count * 1000, 3),
+                "max_ms": round(agg["max_s"] * 1000, 3),
+                "computed_vars": [
+                    {
+                        "var": label,
+                        "recomputes": n,
+                        "per_event": round(n / count, 2),
+                        "total_ms": round(seconds * 1000, 3),
+                        "max_ms": round(peak * 1000, 3),
+                        "share": round(seconds / total, 3) if total else 0.0,
+                    }
+                    for label, (n, seconds, peak) in computed[:top]
+                ],
+                "delta": [
+                    {"var": var, "sends": n, "total_bytes": size, "mean_bytes": size // n, "max_bytes": peak}
+                    for var, (n, size, peak) in delta[:top]
+                ],
+                "delta_bytes_per_event": sum(s[1] for s in agg["delta"].values()) // count,
+            })
+        events.sort(key=lambda e: e["total_ms"], reverse=True)
+        ranking = sorted(overall.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+        return {
+            "events": events,
+            "computed_vars": [{"var": label, "recomputes": n, "total_ms": round(s * 1000, 3)} for label, (n, s) in ranking],
+        }
+
+    def folded(self) -> str:
+        """Pilhas "a;b;c <µs>" (tempo próprio de cada frame), uma por linha."""
+        return "".join(
+            f"{path} {round(seconds * 1_000_000)}\n"
+            for path, seconds in sorted(self._folded.items())
+            if seconds > 0
+        )
+
+    def dump(self, directory: str = STATE_PROFILE_DIR) -> Tuple[str, str]:
+        os.makedirs(directory, exist_ok=True)
+        report_path = os.path.join(directory, "state_profile.json")
+        folded_path = os.path.join(directory, "state_profile.folded")
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+        with open(folded_path, "w", encoding="utf-8") as f:
+            f.write(self.folded())
+        return report_path, folded_path
+
+    async def run_forever(self, state_cls, interval: float = STATE_PROFILE_DUMP_INTERVAL):
+        """Instala e grava os relatórios periodicamente (registrado como lifespan task do app)."""
+        self.install(state_cls)
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                if self._events:
+                    self.dump()
+        finally:
+            if self._events:
+                paths = self.dump()
+                logger.info(f"Profiling de estado gravado em {paths[0]}")
+
+
+# Instância do processo
+state_profiler = StateProfiler()
@@ -1,41 +1,73 @@
 """
 Cliente Supabase Singleton - inicialização lazy para não falhar em build time.
+O pacote supabase (httpx, postgrest, gotrue: ~0,5 s) também só é importado no
+primeiro acesso, fora do caminho de inicialização do backend.
 """
-from supabase import create_client, Client
+import asyncio
+from typing import TYPE_CHECKING
+
 from ..config import Config
 
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+def _create_client(url: str, key: str) -> "Client":
+    from supabase import create_client
+    return create_client(url, key)
+
 
 class SupabaseClient:
-    _instance: Client = None
-    _admin_instance: Client = None
+    _instance: "Client" = None
+    _admin_instance: "Client" = None
+
+    @classmethod
+    def install(cls, client, admin_client=None):
+        """Substitui os clientes do processo (ex: InMemorySupabase em testes, benchmarks e carga)"""
+        cls._instance = client
+        cls._admin_instance = admin_client or client
 
     @classmethod
-    def get_client(cls) -> Client:
+    def reset(cls):
+        """Descarta os clientes; o próximo acesso volta a criá-los a partir da Config"""
+        cls._instance = None
+        cls._admin_instance = None
+
+    @classmethod
+    def _install_fake(cls) -> bool:
+        if not Config.SUPABASE_FAKE:
+            return False
+        from .supabase_fake import InMemorySupabase
+        cls.install(InMemorySupabase.from_env())
+        return True
+
+    @classmethod
+    def get_client(cls) -> "Client":
         """Retorna instância única do cliente Supabase (anon key — respeita RLS)"""
-        if cls._instance is None:
+        if cls._instance is None and not cls._install_fake():
             Config.validate()
             if Config.SUPABASE_URL and Config.SUPABASE_KEY:
-                cls._instance = create_client(
-                    Config.SUPABASE_URL,
-                    Config.SUPABASE_KEY,
-                )
+                cls._instance = _create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)
         return cls._instance
 
     @classmethod
-    def get_admin_client(cls) -> Client:
+    def get_admin_client(cls) -> "Client":
         """Retorna cliente Supabase com service_role key (ignora RLS).
         Se service_role key não estiver configurada, retorna o client normal."""
-        if cls._admin_instance is None:
+        if cls._admin_instance is None and not cls._install_fake():
             Config.validate()
             key = Config.SUPABASE_SERVICE_ROLE_KEY or Config.SUPABASE_KEY
             if Config.SUPABASE_URL and key:
-                cls._admin_instance = create_client(
-                    Config.SUPABASE_URL,
-                    key,
-                )
+                cls._admin_instance = _create_client(Config.SUPABASE_URL, key)
         return cls._admin_instance
 
 
+async def warm_up():
+    """Lifespan task: importa o pacote e cria o cliente em thread, com o backend já respondendo,
+    para o primeiro login não pagar esse custo"""
+    await asyncio.to_thread(SupabaseClient.get_client)
+
+
 class _LazySupabase:
     """Proxy que só inicializa o cliente Supabase no primeiro acesso real."""
 
@@ -0,0 +1,482 @@
+"""
+Supabase em memória para testes, benchmarks e carga sem um projeto real.
+
+Implementa o subconjunto do query builder do PostgREST usado pelos services
+(select/eq/neq/gt/gte/lt/lte/in_/order/limit/range/insert/upsert/update/delete,
+count="exact") e as RPCs do banco: qc_dashboard_kpis e
+<área>_register_qc_measurement (hematologia e outras áreas), além da view
+v_hematology_qc_parameters_resolved. As tabelas mantêm índices hash por
+coluna, criados sob demanda no primeiro filtro de igualdade, para que
+consultas por id/exame continuem baratas com milhões de linhas.
+
+Latência e falhas são injetáveis por cliente (ou por variável de ambiente
+quando ativado via SUPABASE_FAKE=1):
+    SUPABASE_FAKE_LATENCY_MS    atraso por execute() (padrão 0)
+    SUPABASE_FAKE_FAILURE_RATE  fração de execute() que falham com ConnectionError
+    SUPABASE_FAKE_FIXTURE       JSON {tabela: [linhas]} carregado na criação
+
+Uso:
+    fake = InMemorySupabase()
+    SupabaseClient.install(fake)
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from postgrest import APIResponse
+from postgrest.exceptions import APIError
+
+from .maintenance_scheduler_service import MaintenanceScheduler
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_FAKE_LATENCY_MS = float(os.environ.get("SUPABASE_FAKE_LATENCY_MS") or 0)
+SUPABASE_FAKE_FAILURE_RATE = float(os.environ.get("SUPABASE_FAKE_FAILURE_RATE") or 0)
+SUPABASE_FAKE_FIXTURE = os.environ.get("SUPABASE_FAKE_FIXTURE", "")
+
+# Tabelas de CQ por área que têm a RPC <prefixo>_register_qc_measurement
+AREA_PREFIXES = ("hematology", "immunology", "parasitology", "microbiology", "urine")
+
+
+def _now_iso() -> str:
+    return datetime.now().isoformat()
+
+
+def _api_error(message: str, code: str = "P0001") -> APIError:
+    return APIError({"message": message, "code": code, "details": None, "hint": None})
+
+
+class _Table:
+    """Linhas por id (ordem de inserção) + índices hash por coluna"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        # valor -> ids (dict como conjunto ordenado)
+        self._indexes: Dict[str, Dict[Any, Dict[str, None]]] = {}
+
+    def index(self, column: str) -> Dict[Any, Dict[str, None]]:
+        index = self._indexes.get(column)
+        if index is None:
+            index = {}
+            for row_id, row in self.rows.items():
+                index.setdefault(row.get(column), {})[row_id] = None
+            self._indexes[column] = index
+        return index
+
+    def put(self, row: Dict[str, Any]):
+        row_id = row["id"]
+        old = self.rows.get(row_id)
+        for column, index in self._indexes.items():
+            value = row.get(column)
+            if old is not None:
+                if old.get(column) == value:
+                    continue
+                index.get(old.get(column), {}).pop(row_id, None)
+            index.setdefault(value, {})[row_id] = None
+        self.rows[row_id] = row
+
+    def remove(self, row_id: str):
+        old = self.rows.pop(row_id, None)
+        if old is None:
+            return
+        for column, index in self._indexes.items():
+            index.get(old.get(column), {}).pop(row_id, None)
+
+    def candidates(self, filters: List[Tuple[str, str, Any]]) -> List[Dict[str, Any]]:
+        """Linhas que podem satisfazer os filtros (usa o índice do primeiro eq/in)"""
+        for column, op, value in filters:
+            if op == "eq":
+                return [self.rows[i] for i in self.index(column).get(value, ())]
+            if op == "in":
+                index = self.index(column)
+                return [self.rows[i] for v in value for i in index.get(v, ())]
+        return list(self.rows.values())
+
+
+def _matches(row: Dict[str, Any], filters: List[Tuple[str, str, Any]]) -> bool:
+    for column, op, value in filters:
+        current = row.get(column)
+        if op == "eq":
+            ok = current == value
+        elif op == "neq":
+            ok = current is not None and current != value
+        elif op == "in":
+            ok = current in value
+        elif current is None:
+            ok = False
+        elif op == "gt":
+            ok = current > value
+        elif op == "gte":
+            ok = current >= value
+        elif op == "lt":
+            ok = current < value
+        else:  # lte
+            ok = current <= value
+        if not ok:
+            return False
+    return True
+
+
+def _project(row: Dict[str, Any], columns: str) -> Dict[str, Any]:
+    if columns.strip() == "*":
+        return dict(row)
+    return {c.strip(): row.get(c.strip()) for c in columns.split(",") if c.strip()}
+
+
+class _Query:
+    """Query builder no formato do postgrest-py (cada método devolve o próprio builder)"""
+
+    def __init__(self, client: "InMemorySupabase", table: str):
+        self._client = client
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._count: Optional[str] = None
+        self._payload: Any = None
+        self._on_conflict = "id"
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._order: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+
+    # ── Operação ──
+
+    def select(self, columns: str = "*", count: Optional[str] = None):
+        if self._op == "select":
+            self._columns = columns or "*"
+        self._count = count
+        return self
+
+    def insert(self, payload, count: Optional[str] = None, **_):
+        self._op, self._payload, self._count = "insert", payload, count
+        return self
+
+    def upsert(self, payload, on_conflict: str = "id", count: Optional[str] = None, **_):
+        self._op, self._payload, self._on_conflict, self._count = "upsert", payload, on_conflict or "id", count
+        return self
+
+    def update(self, payload: Dict[str, Any], count: Optional[str] = None, **_):
+        self._op, self._payload, self._count = "update", payload, count
+        return self
+
+    def delete(self, count: Optional[str] = None, **_):
+        self._op, self._count = "delete", count
+        return self
+
+    # ── Filtros e modificadores ──
+
+    def _filter(self, column: str, op: str, value: Any):
+        self._filters.append((column, op, value))
+        return self
+
+    def eq(self, column: str, value: Any):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any):
+        return self._filter(column, "lte", value)
+
+    def in_(self, column: str, values: Iterable[Any]):
+        return self._filter(column, "in", set(values))
+
+    def order(self, column: str, desc: bool = False, **_):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int, **_):
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int, **_):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def execute(self) -> APIResponse:
+        return self._client._execute(lambda: self._run())
+
+    # ── Execução ──
+
+    def _run(self) -> APIResponse:
+        client = self._client
+        if self._op == "insert":
+            return client._insert(self._table, self._payload, upsert=False, on_conflict="id")
+        if self._op == "upsert":
+            return client._insert(self._table, self._payload, upsert=True, on_conflict=self._on_conflict)
+
+        table = client._table(self._table)
+        rows = [r for r in table.candidates(self._filters) if _matches(r, self._filters)]
+        if self._op == "update":
+            updated = []
+            for row in rows:
+                new_row = {**row, **self._payload}
+                if "updated_at" in row:
+                    new_row["updated_at"] = _now_iso()
+                table.put(new_row)
+                updated.append(dict(new_row))
+            return APIResponse.model_construct(data=updated, count=len(updated) if self._count else None)
+        if self._op == "delete":
+            for row in rows:
+                table.remove(row["id"])
+            return APIResponse.model_construct(data=[dict(r) for r in rows], count=len(rows) if self._count else None)
+
+        view = client.views.get(self._table)
+        if view is not None:
+            rows = [view(r) for r in rows]
+        total = len(rows)
+        # Ordenações estáveis da última para a primeira chave; nulos no fim (asc) / início (desc)
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column) if r.get(column) is not None else 0), reverse=desc)
+        end = None if self._limit is None else self._offset + self._limit
+        rows = rows[self._offset:end]
+        return APIResponse.model_construct(data=[_project(r, self._columns) for r in rows], count=total if self._count else None)
+
+
+class _RPCCall:
+    def __init__(self, client: "InMemorySupabase", name: str, params: Dict[str, Any]):
+        self._client = client
+        self._name = name
+        self._params = params or {}
+
+    def execute(self) -> APIResponse:
+        fn = self._client.rpcs.get(self._name)
+        if fn is None:
+            raise _api_error(f"Could not find the function public.{self._name}", code="PGRST202")
+        return self._client._execute(lambda: APIResponse.model_construct(data=fn(self._client, **self._params), count=None))
+
+
+class _FakeAuth:
+    """Supabase Auth mínimo: qualquer e-mail/senha não vazios autenticam"""
+
+    def __init__(self):
+        self._session = None
+
+    def sign_in_with_password(self, credentials: Dict[str, str]):
+        email, password = credentials.get("email", ""), credentials.get("password", "")
+        if not email or not password:
+            raise Exception("Invalid login credentials")
+        user = SimpleNamespace(id=str(uuid.uuid5(uuid.NAMESPACE_URL, email)), email=email)
+        self._session = SimpleNamespace(user=user, access_token=uuid.uuid4().hex)
+        return SimpleNamespace(user=user, session=self._session)
+
+    def get_session(self):
+        return self._session
+
+    def sign_out(self):
+        self._session = None
+
+    def reset_password_email(self, email: str):
+        return None
+
+
+# ── RPCs do banco ──
+
+def _qc_generated_columns(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Colunas geradas de qc_records (cv e status padrão)"""
+    target = float(row.get("target_value") or 0)
+    if row.get("cv") in (None, "") and target > 0:
+        row["cv"] = abs(float(row.get("value") or 0) - target) / target * 100
+    row.setdefault("status", "OK")
+    return row
+
+
+def _resolve_parameter(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Linha de v_hematology_qc_parameters_resolved (min/max/% sempre calculados)"""
+    alvo = float(row.get("alvo_valor") or 0)
+    if row.get("modo") == "INTERVALO":
+        min_calc, max_calc = row.get("min_valor"), row.get("max_valor")
+        pct = max(abs(max_calc - alvo), abs(alvo - min_calc)) / alvo * 100.0 if alvo > 0 else 0
+    else:
+        tol = float(row.get("tolerancia_percentual") or 0)
+        min_calc, max_calc, pct = alvo * (1 - tol / 100.0), alvo * (1 + tol / 100.0), tol
+    return {**row, "min_calc": min_calc, "max_calc": max_calc, "percentual_equivalente": pct}
+
+
+def _register_measurement(prefix: str) -> Callable[..., Dict[str, Any]]:
+    def rpc(client: "InMemorySupabase", p_data_medicao, p_analito, p_valor_medido, p_equipamento=None,
+            p_lote_controle=None, p_nivel_controle=None, p_observacao=None):
+        params = [
+            r for r in client._table(f"{prefix}_qc_parameters").candidates([("analito", "eq", p_analito)])
+            if r.get("analito") == p_analito and r.get("is_active", True)
+        ]
+
+        def specificity(r):
+            score = sum(
+                1 for column, value in (("equipamento", p_equipamento), ("lote_controle", p_lote_controle),
+                                        ("nivel_controle", p_nivel_controle))
+                if r.get(column) is not None and r.get(column) == value
+            )
+            return score, r.get("created_at") or ""
+
+        if not params:
+            raise _api_error(
+                f'Nenhum parâmetro ativo encontrado para o analito "{p_analito}". '
+                "Cadastre um parâmetro antes de registrar medições."
+            )
+        param = max(params, key=specificity)
+        resolved = _resolve_parameter(param)
+        v_min, v_max = resolved["min_calc"], resolved["max_calc"]
+        status = "APROVADO" if v_min <= float(p_valor_medido) <= v_max else "REPROVADO"
+        inserted = client._insert(f"{prefix}_qc_measurements", {
+            "data_medicao": str(p_data_medicao), "analito": p_analito, "valor_medido": float(p_valor_medido),
+            "parameter_id": param["id"], "modo_usado": param.get("modo"), "min_aplicado": v_min,
+            "max_aplicado": v_max, "status": status, "observacao": p_observacao,
+        }, upsert=False, on_conflict="id").data[0]
+        return {
+            "measurement_id": inserted["id"], "status": status,
+            "min_aplicado": v_min, "max_aplicado": v_max, "parametro_id": param["id"],
+        }
+
+    return rpc
+
+
+def _qc_dashboard_kpis(client: "InMemorySupabase", p_today: Optional[str] = None) -> Dict[str, Any]:
+    today = date.fromisoformat(str(p_today)[:10]) if p_today else date.today()
+    month_start, tomorrow = today.replace(day=1).isoformat(), (today + timedelta(days=1)).isoformat()
+    today_str = today.isoformat()
+    month = [
+        r for r in client._table("qc_records").rows.values()
+        if month_start <= (r.get("date") or "") < tomorrow
+    ]
+    approved = sum(1 for r in month if r.get("status") == "OK")
+    today_rows = [r for r in month if (r.get("date") or "") >= today_str]
+    limit = (today + timedelta(days=30)).isoformat()
+    expiring = sum(
+        1 for r in client._table("reagent_lots").rows.values()
+        if r.get("expiry_date") and r["expiry_date"] <= limit
+    )
+    # Última manutenção por equipamento/tipo, com a projeção dos recorrentes (migração 009)
+    schedule = MaintenanceScheduler()
+    schedule.rebuild(client._table("maintenance_records").rows.values())
+    pending = schedule.pending_count(today)
+    return {
+        "date": today_str,
+        "total_today": len(today_rows),
+        "alerts_today": sum(1 for r in today_rows if r.get("status") != "OK"),
+        "total_month": len(month),
+        "approved_month": approved,
+        "approval_rate_month": round(approved * 100.0 / len(month), 1) if month else 0,
+        "expiring_lots": expiring,
+        "pending_maintenances": pending,
+    }
+
+
+class InMemorySupabase:
+    """Cliente Supabase em memória (mesma interface usada pelos services)"""
+
+    def __init__(self, latency_ms: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.auth = _FakeAuth()
+        self.calls = 0
+        self._tables: Dict[str, _Table] = {}
+        self._lock = threading.RLock()
+        self._random = random.Random(seed)
+        self._fail_next: List[BaseException] = []
+        self.generated: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {"qc_records": _qc_generated_columns}
+        self.views: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+        self._view_sources: Dict[str, str] = {"v_hematology_qc_parameters_resolved": "hematology_qc_parameters"}
+        self.views["v_hematology_qc_parameters_resolved"] = _resolve_parameter
+        self.rpcs: Dict[str, Callable[..., Any]] = {"qc_dashboard_kpis": _qc_dashboard_kpis}
+        for prefix in AREA_PREFIXES:
+            self.rpcs[f"{prefix}_register_qc_measurement"] = _register_measurement(prefix)
+
+    @classmethod
+    def from_env(cls) -> "InMemorySupabase":
+        client = cls(latency_ms=SUPABASE_FAKE_LATENCY_MS, failure_rate=SUPABASE_FAKE_FAILURE_RATE)
+        if SUPABASE_FAKE_FIXTURE:
+            with open(SUPABASE_FAKE_FIXTURE, encoding="utf-8") as f:
+                for table, rows in json.load(f).items():
+                    client.load_rows(table, rows)
+            logger.info(f"Supabase em memória carregado de {SUPABASE_FAKE_FIXTURE}")
+        return client
+
+    # ── Interface do cliente ──
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _RPCCall:
+        return _RPCCall(self, name, params or {})
+
+    # ── Dados e injeção de falhas ──
+
+    def load_rows(self, table: str, rows: Iterable[Dict[str, Any]]):
+        """Carga direta (sem latência/falhas), para preparar cenários"""
+        with self._lock:
+            self._insert(table, list(rows), upsert=True, on_conflict="id")
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(r) for r in self._table(table).rows.values()]
+
+    def fail_next(self, count: int = 1, error: Optional[BaseException] = None):
+        """As próximas `count` execuções falham com `error` (padrão: ConnectionError)"""
+        for _ in range(count):
+            self._fail_next.append(error or ConnectionError("Falha injetada no Supabase em memória"))
+
+    def _table(self, name: str) -> _Table:
+        name = self._view_sources.get(name, name)
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = _Table(name)
+        return table
+
+    def _execute(self, run: Callable[[], APIResponse]) -> APIResponse:
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+        with self._lock:
+            self.calls += 1
+            if self._fail_next:
+                raise self._fail_next.pop(0)
+            if self.failure_rate > 0 and self._random.random() < self.failure_rate:
+                raise ConnectionError("Falha injetada no Supabase em memória")
+            return run()
+
+    def _insert(self, table_name: str, payload, upsert: bool, on_conflict: str) -> APIResponse:
+        table = self._table(table_name)
+        generated = self.generated.get(table_name)
+        out = []
+        for item in payload if isinstance(payload, list) else [payload]:
+            row = dict(item)
+            existing = None
+            if upsert and row.get(on_conflict) is not None:
+                if on_conflict == "id":
+                    existing = table.rows.get(str(row["id"]))
+                else:
+                    ids = table.index(on_conflict).get(row[on_conflict])
+                    existing = table.rows[next(iter(ids))] if ids else None
+            if existing is not None:
+                row = {**existing, **row, "id": existing["id"]}
+                if "updated_at" in existing:
+                    row["updated_at"] = _now_iso()
+            else:
+                row["id"] = str(row.get("id") or uuid.uuid4())
+                if row["id"] in table.rows:
+                    raise _api_error(f'duplicate key value violates unique constraint "{table_name}_pkey"', code="23505")
+                row.setdefault("created_at", _now_iso())
+            if generated is not None:
+                row = generated(row)
+            table.put(row)
+            out.append(dict(row))
+        return APIResponse.model_construct(data=out, count=None)
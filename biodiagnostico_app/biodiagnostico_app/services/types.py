@@ -5,6 +5,17 @@ Cada TypedDict espelha as colunas da respectiva tabela no banco.
 from typing import TypedDict, Optional
 
 
+class DashboardKPIs(TypedDict, total=False):
+    date: str
+    total_today: int
+    alerts_today: int
+    total_month: int
+    approved_month: int
+    approval_rate_month: float
+    expiring_lots: int
+    pending_maintenances: int
+
+
 class QCRecordRow(TypedDict, total=False):
     id: str
     date: str
@@ -1,15 +1,37 @@
 """
 Servico de Voz-para-Formulario via Gemini AI
-Recebe audio base64, envia ao Gemini com prompt form-specific, retorna JSON estruturado.
+Recebe o audio (bytes do spool ou base64), envia ao Gemini com prompt form-specific, retorna JSON estruturado.
+
+Chamadas ao modelo passam por um semaforo do processo (VOICE_AI_CONCURRENCY) e
+tem prazo total (VOICE_AI_TIMEOUT_SECONDS, incluindo a espera na fila). Reenvios
+do mesmo audio (hash do conteudo + formulario) aproveitam a chamada em andamento
+ou o resultado em cache por VOICE_AI_CACHE_TTL_SECONDS. GEMINI_BASE_URL aponta o
+cliente para outro servidor (ex.: um modelo local de testes).
 """
+import asyncio
+import hashlib
 import json
 import logging
 import base64
-from typing import Dict, Any
+import os
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from pydantic import ValidationError
+
 from ..config import Config
+from .voice_schemas import FORM_SCHEMAS, postprocess_voice_fields
+from .metrics_service import instrument_service
 
 logger = logging.getLogger(__name__)
 
+VOICE_AI_MODEL = os.environ.get("VOICE_AI_MODEL", "gemini-2.5-flash")
+VOICE_AI_CONCURRENCY = int(os.environ.get("VOICE_AI_CONCURRENCY", "4"))
+VOICE_AI_TIMEOUT_SECONDS = float(os.environ.get("VOICE_AI_TIMEOUT_SECONDS", "30"))
+VOICE_AI_CACHE_TTL_SECONDS = float(os.environ.get("VOICE_AI_CACHE_TTL_SECONDS", "300"))
+VOICE_AI_CACHE_SIZE = int(os.environ.get("VOICE_AI_CACHE_SIZE", "128"))
+
 FORM_PROMPTS: Dict[str, str] = {
     "registro": """Voce e um assistente de laboratorio de analises clinicas. O usuario esta ditando dados para registrar um controle de qualidade (CQ).
 
@@ -35,7 +57,7 @@ Extraia os seguintes campos:
 - name: Nome do registro de referencia (ex: "Kit ControlLab Jan/2026").
 - exam_name: Nome do exame. Sempre em MAIUSCULAS.
 - level: Nivel do controle (opcoes: "Normal", "N1", "N2", "N3"). Default "Normal".
-- valid_from: Data de inicio de validade (formato YYYY-MM-DD). Se o usuario disser "hoje", use a data atual.
+- valid_from: Data de inicio de validade (formato YYYY-MM-DD). Datas relativas ("hoje", "amanha", "daqui a 30 dias") podem ser retornadas como faladas.
 - valid_until: Data de fim de validade (formato YYYY-MM-DD). Pode ser vazio.
 - target_value: Valor-alvo (numero decimal).
 - cv_max: CV% maximo aceito (numero decimal, geralmente 5.0 a 15.0).
@@ -76,7 +98,7 @@ Formato de resposta (JSON puro):
 Extraia os seguintes campos:
 - equipment: Nome do equipamento (ex: "Cobas c111", "Mindray BS-120", "Centrifuga Eppendorf").
 - type: Tipo de manutencao. DEVE ser um destes: "Preventiva", "Corretiva", "Calibração".
-- date: Data da manutencao (formato YYYY-MM-DD). Se o usuario disser "hoje", use a data atual.
+- date: Data da manutencao (formato YYYY-MM-DD). Datas relativas ("hoje", "amanha", "daqui a 30 dias") podem ser retornadas como faladas.
 - next_date: Data da proxima manutencao prevista (formato YYYY-MM-DD). Pode ser vazio.
 - notes: Descricao do que foi feito ou observacoes.
 
@@ -91,10 +113,26 @@ Formato de resposta (JSON puro):
 }
 
 
+@instrument_service
 class VoiceAIService:
     """Processa audio via Gemini e retorna dados estruturados para formularios"""
 
     _client = None
+    _http_options = None
+    # Um semaforo por event loop (asyncio.Semaphore fica preso ao loop em que e usado)
+    _semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+    _inflight: Dict[str, "asyncio.Future"] = {}
+    _results: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @classmethod
+    def configure(cls, base_url: Optional[str] = None, http_options: Any = None):
+        """Troca o destino do cliente (servidor local, proxy) e descarta o cliente atual"""
+        if base_url and http_options is None:
+            from google.genai import types
+            http_options = types.HttpOptions(base_url=base_url)
+        cls._http_options = http_options
+        cls._client = None
+        cls._results.clear()
 
     @classmethod
     def _get_client(cls):
@@ -106,63 +144,134 @@ class VoiceAIService:
                 raise RuntimeError(
                     "GEMINI_API_KEY nao configurada. Adicione ao arquivo .env"
                 )
-            cls._client = genai.Client(api_key=api_key)
+            if cls._http_options is None and Config.GEMINI_BASE_URL:
+                from google.genai import types
+                cls._http_options = types.HttpOptions(base_url=Config.GEMINI_BASE_URL)
+            cls._client = genai.Client(api_key=api_key, http_options=cls._http_options)
         return cls._client
 
+    @classmethod
+    def _semaphore(cls) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = cls._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = cls._semaphores[loop] = asyncio.Semaphore(VOICE_AI_CONCURRENCY)
+        return semaphore
+
+    @classmethod
+    def _cached(cls, key: str) -> Optional[Dict[str, Any]]:
+        entry = cls._results.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del cls._results[key]
+            return None
+        cls._results.move_to_end(key)
+        return dict(entry[1])
+
+    @classmethod
+    def _store(cls, key: str, result: Dict[str, Any]):
+        cls._results[key] = (time.monotonic() + VOICE_AI_CACHE_TTL_SECONDS, dict(result))
+        cls._results.move_to_end(key)
+        while len(cls._results) > VOICE_AI_CACHE_SIZE:
+            cls._results.popitem(last=False)
+
     @staticmethod
     async def process_audio(
-        audio_base64: str,
-        form_type: str,
+        audio_base64: str = "",
+        form_type: str = "",
         mime_type: str = "audio/webm",
+        audio_bytes: Optional[bytes] = None,
     ) -> Dict[str, Any]:
         """
         Envia audio ao Gemini e retorna dados estruturados.
 
         Args:
-            audio_base64: Audio codificado em base64
+            audio_base64: Audio codificado em base64 (ignorado se audio_bytes vier preenchido)
             form_type: Tipo do formulario ("registro", "referencia", "reagente", "manutencao")
             mime_type: Tipo MIME do audio (padrao: audio/webm do MediaRecorder)
+            audio_bytes: Audio bruto, lido do spool de upload binario
 
         Returns:
             Dict com os campos extraidos ou {"error": "mensagem"}
         """
-        raw_text = ""
+        prompt = FORM_PROMPTS.get(form_type)
+        if not prompt:
+            return {"error": f"Tipo de formulario desconhecido: {form_type}"}
+
+        if audio_bytes is None:
+            try:
+                audio_bytes = base64.b64decode(audio_base64)
+            except ValueError:
+                return {"error": "Audio invalido. Tente novamente."}
+        # "audio/webm;codecs=opus" -> "audio/webm"
+        mime_type = (mime_type or "audio/webm").split(";")[0].strip()
+
+        if len(audio_bytes) < 100:
+            return {"error": "Audio muito curto. Tente novamente."}
+
+        cls = VoiceAIService
+        key = f"{form_type}:{mime_type}:{hashlib.sha256(audio_bytes).hexdigest()}"
+        cached = cls._cached(key)
+        if cached is not None:
+            return cached
+
+        # Mesmo audio ja em processamento: aguarda a mesma chamada
+        pending = cls._inflight.get(key)
+        if pending is not None and pending.get_loop() is asyncio.get_running_loop():
+            return dict(await asyncio.shield(pending))
+
+        task = asyncio.ensure_future(cls._call_model(audio_bytes, prompt, form_type, mime_type))
+        cls._inflight[key] = task
         try:
-            client = VoiceAIService._get_client()
+            result = await asyncio.shield(task)
+        finally:
+            if cls._inflight.get(key) is task:
+                del cls._inflight[key]
+        if "error" not in result:
+            cls._store(key, result)
+        return dict(result)
 
-            prompt = FORM_PROMPTS.get(form_type)
-            if not prompt:
-                return {"error": f"Tipo de formulario desconhecido: {form_type}"}
-
-            audio_bytes = base64.b64decode(audio_base64)
+    @staticmethod
+    async def _call_model(audio_bytes: bytes, prompt: str, form_type: str, mime_type: str) -> Dict[str, Any]:
+        """Chamada ao modelo com fila limitada e prazo total"""
+        raw_text = ""
 
-            if len(audio_bytes) < 100:
-                return {"error": "Audio muito curto. Tente novamente."}
+        async def generate():
+            async with VoiceAIService._semaphore():
+                client = VoiceAIService._get_client()
+                from google.genai import types
+
+                return await client.aio.models.generate_content(
+                    model=VOICE_AI_MODEL,
+                    contents=[
+                        types.Content(
+                            parts=[
+                                types.Part.from_bytes(
+                                    data=audio_bytes,
+                                    mime_type=mime_type,
+                                ),
+                                types.Part.from_text(text=prompt),
+                            ]
+                        )
+                    ],
+                    config=types.GenerateContentConfig(
+                        temperature=0.1,
+                        max_output_tokens=1024,
+                        # Saída estruturada: JSON no esquema do formulário
+                        response_mime_type="application/json",
+                        response_schema=FORM_SCHEMAS[form_type],
+                    ),
+                )
 
-            from google.genai import types
+        try:
+            response = await asyncio.wait_for(generate(), timeout=VOICE_AI_TIMEOUT_SECONDS)
 
-            response = await client.aio.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=[
-                    types.Content(
-                        parts=[
-                            types.Part.from_bytes(
-                                data=audio_bytes,
-                                mime_type=mime_type,
-                            ),
-                            types.Part.from_text(text=prompt),
-                        ]
-                    )
-                ],
-                config=types.GenerateContentConfig(
-                    temperature=0.1,
-                    max_output_tokens=1024,
-                ),
-            )
-
-            raw_text = response.text.strip()
+            raw_text = (response.text or "").strip()
             logger.info(f"Gemini voice response ({form_type}): {raw_text[:200]}")
 
+            # Com response_schema a resposta ja vem como JSON puro; limpeza abaixo
+            # fica como salvaguarda para modelos/servidores sem saida estruturada.
             # Limpar markdown fences se Gemini envolver em ```json
             if raw_text.startswith("```"):
                 raw_text = raw_text.split("\n", 1)[-1]
@@ -177,9 +286,14 @@ class VoiceAIService:
                     raw_text = raw_text[start:end + 1]
 
             parsed = json.loads(raw_text)
-            return parsed
-
-        except json.JSONDecodeError as e:
+            if not isinstance(parsed, dict):
+                raise json.JSONDecodeError("Resposta nao e um objeto JSON", raw_text, 0)
+            return postprocess_voice_fields(form_type, parsed)
+
+        except asyncio.TimeoutError:
+            logger.error(f"Voice AI timeout ({VOICE_AI_TIMEOUT_SECONDS}s, {form_type})")
+            return {"error": "O servico de IA demorou demais para responder. Tente novamente."}
+        except (json.JSONDecodeError, ValidationError) as e:
             logger.error(f"JSON parse error: {e}. Raw: {raw_text[:300]}")
             return {"error": "Nao foi possivel interpretar a resposta. Tente falar mais claramente."}
         except RuntimeError as e:
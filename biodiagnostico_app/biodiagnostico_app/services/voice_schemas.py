@@ -0,0 +1,185 @@
+"""
+Esquemas de resposta do Voice-to-Form e pós-processamento determinístico.
+
+Cada formulário tem um modelo pydantic enviado ao Gemini como response_schema
+(saída estruturada em JSON, sem prosa nem markdown). A resposta passa por um
+pós-processamento local antes da validação: vírgula decimal brasileira
+("95,5", "1.234,5"), datas relativas ("hoje", "amanhã", "daqui a 30 dias"),
+datas faladas ("março de 2026" -> último dia do mês), nível do controle e
+tipo de manutenção.
+"""
+import calendar
+import re
+import unicodedata
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Literal, Optional, Type
+
+from pydantic import BaseModel
+
+from ..utils.numeric import parse_decimal
+
+
+class VoiceRegistro(BaseModel):
+    exam_name: str = ""
+    value: Optional[float] = None
+    target_value: Optional[float] = None
+    equipment: str = ""
+    analyst: str = ""
+
+
+class VoiceReferencia(BaseModel):
+    name: str = ""
+    exam_name: str = ""
+    level: Literal["Normal", "N1", "N2", "N3"] = "Normal"
+    valid_from: str = ""
+    valid_until: str = ""
+    target_value: Optional[float] = None
+    cv_max: Optional[float] = None
+    lot_number: str = ""
+    manufacturer: str = ""
+    notes: str = ""
+
+
+class VoiceReagente(BaseModel):
+    name: str = ""
+    lot_number: str = ""
+    expiry_date: str = ""
+    initial_stock: Optional[float] = None
+    daily_consumption: Optional[float] = None
+    manufacturer: str = ""
+
+
+class VoiceManutencao(BaseModel):
+    equipment: str = ""
+    type: Literal["Preventiva", "Corretiva", "Calibração", ""] = ""
+    date: str = ""
+    next_date: str = ""
+    notes: str = ""
+
+
+FORM_SCHEMAS: Dict[str, Type[BaseModel]] = {
+    "registro": VoiceRegistro,
+    "referencia": VoiceReferencia,
+    "reagente": VoiceReagente,
+    "manutencao": VoiceManutencao,
+}
+
+DATE_FIELDS = {"valid_from", "valid_until", "expiry_date", "date", "next_date"}
+UPPER_FIELDS = {"exam_name"}
+
+_MONTHS = {
+    "JANEIRO": 1, "FEVEREIRO": 2, "MARCO": 3, "ABRIL": 4, "MAIO": 5, "JUNHO": 6,
+    "JULHO": 7, "AGOSTO": 8, "SETEMBRO": 9, "OUTUBRO": 10, "NOVEMBRO": 11, "DEZEMBRO": 12,
+}
+_NUMBER_WORDS = {
+    "UM": 1, "UMA": 1, "DOIS": 2, "DUAS": 2, "TRES": 3, "QUATRO": 4, "CINCO": 5, "SEIS": 6, "SETE": 7,
+    "OITO": 8, "NOVE": 9, "DEZ": 10, "ONZE": 11, "DOZE": 12, "QUINZE": 15, "VINTE": 20, "TRINTA": 30,
+    "QUARENTA": 40, "CINQUENTA": 50, "SESSENTA": 60, "NOVENTA": 90,
+}
+_RELATIVE_DAYS = {"HOJE": 0, "AMANHA": 1, "DEPOIS DE AMANHA": 2, "ONTEM": -1, "ANTEONTEM": -2}
+_OFFSET = re.compile(r"^(?:DAQUI A |DAQUI |EM |DENTRO DE )?(\w+) (DIA|DIAS|SEMANA|SEMANAS|MES|MESES|ANO|ANOS)$")
+_MONTH_YEAR = re.compile(r"^(?:(\d{1,2}) (?:DE )?)?([A-Z]+) (?:DE )?(\d{4})$")
+_NUMERIC_DATE = re.compile(r"^(\d{1,2})[/.-](\d{1,2})[/.-](\d{2}|\d{4})$")
+_NUMERIC_MONTH = re.compile(r"^(\d{1,2})[/.-](\d{4})$")
+
+
+def _plain(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().upper()
+    return " ".join(text.replace(",", " ").split())
+
+
+def _add_months(day: date, months: int) -> date:
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _last_day(year: int, month: int) -> date:
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def parse_spoken_date(value: Any, today: Optional[date] = None) -> str:
+    """Data falada/relativa em YYYY-MM-DD; texto não reconhecido vira ""."""
+    if value is None:
+        return ""
+    today = today or date.today()
+    raw = str(value).strip()
+    if not raw:
+        return ""
+    try:
+        return datetime.strptime(raw[:10], "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        pass
+    text = _plain(raw)
+    try:
+        if text in _RELATIVE_DAYS:
+            return (today + timedelta(days=_RELATIVE_DAYS[text])).isoformat()
+        match = _NUMERIC_DATE.match(text)
+        if match:
+            day, month, year = (int(g) for g in match.groups())
+            return date(year + 2000 if year < 100 else year, month, day).isoformat()
+        match = _NUMERIC_MONTH.match(text)
+        if match:
+            return _last_day(int(match[2]), int(match[1])).isoformat()
+        match = _MONTH_YEAR.match(text)
+        if match and match[2] in _MONTHS:
+            year, month = int(match[3]), _MONTHS[match[2]]
+            return (date(year, month, int(match[1])) if match[1] else _last_day(year, month)).isoformat()
+        match = _OFFSET.match(text)
+        if match:
+            amount = int(match[1]) if match[1].isdigit() else _NUMBER_WORDS.get(match[1])
+            if amount is None:
+                return ""
+            unit = match[2]
+            if unit.startswith("DIA"):
+                return (today + timedelta(days=amount)).isoformat()
+            if unit.startswith("SEMANA"):
+                return (today + timedelta(weeks=amount)).isoformat()
+            if unit.startswith("MES"):
+                return _add_months(today, amount).isoformat()
+            return _add_months(today, 12 * amount).isoformat()
+    except ValueError:
+        return ""
+    return ""
+
+
+def _level(value: Any) -> str:
+    text = _plain(str(value or "")).replace("NIVEL ", "N").replace(" ", "")
+    return {"N1": "N1", "N2": "N2", "N3": "N3", "1": "N1", "2": "N2", "3": "N3"}.get(text, "Normal")
+
+
+def _maintenance_type(value: Any) -> str:
+    text = _plain(str(value or ""))
+    if text.startswith("PREVENT"):
+        return "Preventiva"
+    if text.startswith("CORRET"):
+        return "Corretiva"
+    if text.startswith("CALIBR"):
+        return "Calibração"
+    return ""
+
+
+def postprocess_voice_fields(form_type: str, data: Dict[str, Any], today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Normaliza a resposta do modelo e valida no esquema do formulário.
+
+    Raises:
+        KeyError: formulário desconhecido
+        pydantic.ValidationError: resposta incompatível com o esquema
+    """
+    schema = FORM_SCHEMAS[form_type]
+    clean: Dict[str, Any] = {}
+    for name, field in schema.model_fields.items():
+        value = data.get(name)
+        if name in DATE_FIELDS:
+            clean[name] = parse_spoken_date(value, today)
+        elif name == "level":
+            clean[name] = _level(value)
+        elif name == "type" and schema is VoiceManutencao:
+            clean[name] = _maintenance_type(value)
+        elif field.annotation == Optional[float]:
+            clean[name] = None if value in (None, "") else parse_decimal(value, default=None)
+        else:
+            text = "" if value is None else str(value).strip()
+            clean[name] = text.upper() if name in UPPER_FIELDS else text
+    return schema(**clean).model_dump()
@@ -0,0 +1,113 @@
+"""
+Spool de áudio do Voice-to-Form.
+
+O navegador envia o áudio em blocos binários (MediaRecorder com timeslice)
+para POST /api/voice/{handle}, que grava direto num arquivo temporário. No
+estado do Reflex fica só o handle — o áudio não passa pelo websocket nem por
+base64, e os bytes vão do disco para o cliente Gemini.
+
+Handles são emitidos pelo servidor (token aleatório) ao abrir a gravação; o
+endpoint só aceita handles existentes e limita o tamanho total. Arquivos
+abandonados expiram após VOICE_SPOOL_TTL_SECONDS.
+"""
+import logging
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+VOICE_SPOOL_DIR = os.environ.get("VOICE_SPOOL_DIR", "") or os.path.join(tempfile.gettempdir(), "biodiagnostico_voice")
+VOICE_MAX_BYTES = int(os.environ.get("VOICE_MAX_BYTES", str(20 * 1024 * 1024)))
+VOICE_SPOOL_TTL_SECONDS = int(os.environ.get("VOICE_SPOOL_TTL_SECONDS", "900"))
+
+_HANDLE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+class VoiceSpool:
+    """Arquivos temporários de gravação, um por handle."""
+
+    def __init__(self, directory: str = VOICE_SPOOL_DIR, max_bytes: int = VOICE_MAX_BYTES,
+                 ttl_seconds: int = VOICE_SPOOL_TTL_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def _path(self, handle: str) -> str:
+        if not _HANDLE.match(handle or ""):
+            raise KeyError(handle)
+        return os.path.join(self.directory, f"{handle}.part")
+
+    def create(self) -> str:
+        """Novo handle com arquivo vazio (aproveita para limpar gravações abandonadas)."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.purge_expired()
+        handle = secrets.token_urlsafe(24)
+        open(self._path(handle), "wb").close()
+        return handle
+
+    def exists(self, handle: str) -> bool:
+        try:
+            return os.path.exists(self._path(handle))
+        except KeyError:
+            return False
+
+    def size(self, handle: str) -> int:
+        return os.path.getsize(self._path(handle))
+
+    def append(self, handle: str, data: bytes) -> int:
+        """
+        Acrescenta um bloco ao arquivo do handle.
+
+        Raises:
+            KeyError: handle inválido ou desconhecido
+            ValueError: gravação excede VOICE_MAX_BYTES
+        """
+        path = self._path(handle)
+        with self._lock:
+            if not os.path.exists(path):
+                raise KeyError(handle)
+            size = os.path.getsize(path) + len(data)
+            if size > self.max_bytes:
+                raise ValueError(f"Gravacao excede o limite de {self.max_bytes // (1024 * 1024)} MB")
+            with open(path, "ab") as f:
+                f.write(data)
+        return size
+
+    def read(self, handle: str) -> bytes:
+        with open(self._path(handle), "rb") as f:
+            return f.read()
+
+    def discard(self, handle: Optional[str]):
+        if not handle:
+            return
+        try:
+            os.remove(self._path(handle))
+        except (KeyError, FileNotFoundError):
+            pass
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        if not os.path.isdir(self.directory):
+            return 0
+        cutoff = (now or time.time()) - self.ttl_seconds
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".part") and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"Spool de voz: {removed} gravacoes abandonadas removidas")
+        return removed
+
+
+# Instância do processo — diretório compartilhado entre workers da mesma máquina
+voice_spool = VoiceSpool()
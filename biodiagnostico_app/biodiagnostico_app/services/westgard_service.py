@@ -1,6 +1,72 @@
-from typing import List, Dict, Any, Optional
+import json
+import logging
+import os
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
 from ..models import QCRecord
 
+logger = logging.getLogger(__name__)
+
+# Regras avaliadas pelo motor multirregra (por corrida × nível)
+DEFAULT_MULTIRULES: List[str] = ["1-2s", "1-3s", "2-2s", "R-4s", "2of3-2s", "3-1s", "4-1s", "10x"]
+# Regras por exame: JSON {"EXAME": ["1-3s", "2-2s", ...]} em QC_WESTGARD_RULES_PATH
+QC_WESTGARD_RULES_PATH = os.environ.get("QC_WESTGARD_RULES_PATH", "")
+# Campos que identificam uma corrida (além do exame)
+RUN_KEY_FIELDS: Tuple[str, ...] = ("date", "equipment", "lot_number")
+
+_WARNING_RULES = {"1-2s", "10x", "8x", "12x"}
+
+_RULE_DESCRIPTIONS = {
+    "1-2s": "Alerta: valor excede 2 Desvios Padrão.",
+    "1-3s": "Erro Aleatório: valor excede 3 Desvios Padrão.",
+    "2-2s": "Erro Sistemático: dois controles excedem 2 SD do mesmo lado.",
+    "R-4s": "Erro Aleatório: amplitude entre níveis da corrida excede 4 SD.",
+    "2of3-2s": "Erro Sistemático: 2 de 3 controles consecutivos excedem 2 SD do mesmo lado.",
+    "3-1s": "Erro Sistemático: três controles consecutivos excedem 1 SD do mesmo lado.",
+    "4-1s": "Erro Sistemático: quatro controles consecutivos excedem 1 SD do mesmo lado.",
+}
+
+
+def load_exam_rule_sets() -> Dict[str, List[str]]:
+    """Conjuntos de regras configurados por exame (vazio = padrão para todos)."""
+    if not QC_WESTGARD_RULES_PATH:
+        return {}
+    try:
+        with open(QC_WESTGARD_RULES_PATH, encoding="utf-8") as f:
+            return {str(k).strip().upper(): list(v) for k, v in json.load(f).items()}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Regras de Westgard em {QC_WESTGARD_RULES_PATH} ignoradas: {e}")
+        return {}
+
+
+EXAM_RULE_SETS: Dict[str, List[str]] = load_exam_rule_sets()
+
+
+def _run_key(record: QCRecord) -> Tuple[str, ...]:
+    parts = []
+    for field in RUN_KEY_FIELDS:
+        value = str(getattr(record, field, "") or "")
+        parts.append(value[:10] if field == "date" else value.strip().upper())
+    return tuple(parts)
+
+
+def _runs(mask: np.ndarray, k: int) -> np.ndarray:
+    """Índices finais de sequências de `k` verdadeiros consecutivos em um vetor booleano."""
+    if mask.size < k:
+        return np.empty(0, dtype=int)
+    windows = np.lib.stride_tricks.sliding_window_view(mask, k)
+    return np.nonzero(windows.all(axis=1))[0] + k - 1
+
+
+def _count_in_window(mask: np.ndarray, k: int, needed: int) -> np.ndarray:
+    """Índices finais de janelas de tamanho `k` com ao menos `needed` verdadeiros."""
+    if mask.size < k:
+        return np.empty(0, dtype=int)
+    windows = np.lib.stride_tricks.sliding_window_view(mask, k)
+    return np.nonzero(windows.sum(axis=1) >= needed)[0] + k - 1
+
 class WestgardService:
     """
     Serviço especializado na verificação das Regras de Westgard para Controle de Qualidade.
@@ -142,3 +208,123 @@ class WestgardService:
                 })
 
         return violations
+
+    @staticmethod
+    def build_run_matrix(records: List[QCRecord]) -> Tuple[List[Tuple[str, ...]], List[str], np.ndarray, np.ndarray]:
+        """
+        Agrupa os registros de um exame em corridas (data + equipamento + lote) × níveis.
+
+        Returns:
+            (corridas em ordem cronológica, níveis, matriz Z [corridas × níveis] com NaN
+            onde o nível não foi dosado, matriz de índices dos registros [-1 = vazio])
+        """
+        ordered = sorted(records, key=lambda r: (r.date or "", str(r.id)))
+        run_index: Dict[Tuple[str, ...], int] = {}
+        level_index: Dict[str, int] = {}
+        for r in ordered:
+            run_index.setdefault(_run_key(r), len(run_index))
+            level_index.setdefault(r.level or "", len(level_index))
+
+        z = np.full((len(run_index), len(level_index)), np.nan)
+        idx = np.full(z.shape, -1, dtype=int)
+        pos = {id(r): i for i, r in enumerate(records)}
+        for r in ordered:
+            if r.target_sd and r.target_sd > 0:
+                i, j = run_index[_run_key(r)], level_index[r.level or ""]
+                # Repetição do mesmo nível na corrida: vale a medição mais recente
+                z[i, j] = (r.value - r.target_value) / r.target_sd
+                idx[i, j] = pos[id(r)]
+        return list(run_index), list(level_index), z, idx
+
+    @staticmethod
+    def evaluate_runs(records: List[QCRecord], rules: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Avalia regras dentro da corrida (entre níveis) e entre corridas para um exame.
+
+        As regras sequenciais (2of3-2s, 3-1s, 4-1s, Nx) percorrem os controles em ordem
+        corrida → nível, atravessando níveis e corridas. Cada violação indica a corrida
+        em que a regra se completou e os IDs dos registros envolvidos.
+        """
+        if not records:
+            return []
+        exam = (records[0].exam_name or "").strip().upper()
+        rules = rules or EXAM_RULE_SETS.get(exam) or DEFAULT_MULTIRULES
+        runs, levels, z, idx = WestgardService.build_run_matrix(records)
+        found: List[Dict[str, Any]] = []
+
+        def add(rule: str, run: int, cells: List[int], scope: str):
+            ids = [str(records[k].id) for k in cells if k >= 0]
+            description = _RULE_DESCRIPTIONS.get(rule) or f"Erro Sistemático: {rule[:-1]} controles consecutivos do mesmo lado da média."
+            found.append({
+                "rule": rule,
+                "description": description,
+                "severity": "warning" if rule in _WARNING_RULES else "rejection",
+                "scope": scope,
+                "run": run,
+                "run_key": list(runs[run]),
+                "record_ids": ids,
+            })
+
+        with np.errstate(invalid="ignore"):
+            above2, below2 = z > 2, z < -2
+
+            # Dentro da corrida (células individuais e entre níveis)
+            for rule, mask in (("1-3s", np.abs(z) > 3), ("1-2s", np.abs(z) > 2)):
+                if rule in rules:
+                    for i, j in zip(*np.nonzero(mask)):
+                        add(rule, int(i), [int(idx[i, j])], "within-run")
+            if "2-2s" in rules:
+                for side in (above2, below2):
+                    for i in np.nonzero(side.sum(axis=1) >= 2)[0]:
+                        add("2-2s", int(i), [int(k) for k in idx[i][side[i]]], "within-run")
+                    # Mesmo nível em corridas consecutivas
+                    both = side[1:] & side[:-1]
+                    for i, j in zip(*np.nonzero(both)):
+                        add("2-2s", int(i) + 1, [int(idx[i, j]), int(idx[i + 1, j])], "across-runs")
+            if "R-4s" in rules and z.shape[1] > 1:
+                has_both = above2.any(axis=1) & below2.any(axis=1)
+                spread = np.nanmax(np.where(np.isnan(z), -np.inf, z), axis=1) - np.nanmin(np.where(np.isnan(z), np.inf, z), axis=1)
+                for i in np.nonzero(has_both & (spread > 4))[0]:
+                    add("R-4s", int(i), [int(k) for k in idx[i][above2[i] | below2[i]]], "within-run")
+
+            # Sequência corrida → nível (atravessa níveis e corridas)
+            flat = z.ravel()
+            present = ~np.isnan(flat)
+            seq, seq_idx = flat[present], idx.ravel()[present]
+            seq_run = np.repeat(np.arange(z.shape[0]), z.shape[1])[present]
+
+            def add_sequence(rule: str, ends: np.ndarray, length: int):
+                for end in ends:
+                    start = end - length + 1
+                    scope = "within-run" if seq_run[start] == seq_run[end] else "across-runs"
+                    add(rule, int(seq_run[end]), [int(k) for k in seq_idx[start:end + 1]], scope)
+
+            if "2of3-2s" in rules:
+                for side in (seq > 2, seq < -2):
+                    add_sequence("2of3-2s", _count_in_window(side, 3, 2), 3)
+            if "3-1s" in rules:
+                for side in (seq > 1, seq < -1):
+                    add_sequence("3-1s", _runs(side, 3), 3)
+            if "4-1s" in rules:
+                for side in (seq > 1, seq < -1):
+                    add_sequence("4-1s", _runs(side, 4), 4)
+            for rule in rules:
+                if rule.endswith("x") and rule[:-1].isdigit():
+                    n = int(rule[:-1])
+                    for side in (seq > 0, seq < 0):
+                        add_sequence(rule, _runs(side, n), n)
+
+        found.sort(key=lambda v: (v["run"], v["severity"] != "rejection", v["rule"]))
+        return found
+
+    @staticmethod
+    def evaluate_all(records: List[QCRecord], rule_sets: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Reavalia todo o histórico (ex: um ano multinível) agrupando por exame em uma chamada."""
+        by_exam: Dict[str, List[QCRecord]] = {}
+        for r in records:
+            by_exam.setdefault((r.exam_name or "").strip().upper(), []).append(r)
+        rule_sets = rule_sets or {}
+        return {
+            exam: WestgardService.evaluate_runs(items, rule_sets.get(exam))
+            for exam, items in by_exam.items()
+        }
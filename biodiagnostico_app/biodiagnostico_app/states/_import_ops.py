@@ -6,9 +6,9 @@ import io
 import logging
 from datetime import datetime
 
-import pandas as pd
-
+from ..models import QCRecord
 from ..services.qc_service import QCService
+from ..services.drift_detection_service import drift_detector
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +19,9 @@ ALLOWED_EXTENSIONS = (".xlsx", ".xls")
 
 async def handle_proin_upload(state, files):
     """Handle upload of ProIn Excel file"""
+    # pandas (~0,3 s de import) só no primeiro upload, fora da inicialização do backend
+    import pandas as pd
+
     state.is_importing = True
     state.upload_progress = 10
 
@@ -58,6 +61,30 @@ async def handle_proin_upload(state, files):
         state.is_importing = False
 
 
+def proin_row_to_record(row: dict) -> dict:
+    """Mapeia uma linha da planilha ProIn (cabeçalhos pt/en) para o payload de qc_records"""
+    record_data = {
+        "date": str(row.get("date", row.get("data", row.get("DATA", datetime.now().isoformat())))),
+        "exam_name": str(row.get("exam_name", row.get("exame", row.get("EXAME", "")))),
+        "level": str(row.get("level", row.get("nivel", row.get("NIVEL", "Normal")))),
+        "lot_number": str(row.get("lot_number", row.get("lote", row.get("LOTE", "")))),
+        "value": float(row.get("value", row.get("valor", row.get("VALOR", 0)))),
+        "target_value": float(row.get("target_value", row.get("alvo", row.get("ALVO", 0)))),
+        "target_sd": float(row.get("target_sd", row.get("dp", row.get("DP", 0)))),
+        "equipment": str(row.get("equipment", row.get("equipamento", row.get("EQUIPAMENTO", "")))),
+        "analyst": str(row.get("analyst", row.get("analista", row.get("ANALISTA", "")))),
+    }
+    val = record_data["value"]
+    target = record_data["target_value"]
+    if target > 0:
+        record_data["cv"] = round((abs(val - target) / target) * 100, 2)
+    else:
+        record_data["cv"] = 0.0
+    record_data["status"] = "OK"
+    record_data["needs_calibration"] = False
+    return record_data
+
+
 async def process_proin_import(state):
     """Process the imported data and save to DB"""
     try:
@@ -65,33 +92,16 @@ async def process_proin_import(state):
             state.qc_error_message = "Nenhum dado para importar."
             return
 
-        records_to_save = []
-        for row in state.proin_import_data:
-            record_data = {
-                "date": str(row.get("date", row.get("data", row.get("DATA", datetime.now().isoformat())))),
-                "exam_name": str(row.get("exam_name", row.get("exame", row.get("EXAME", "")))),
-                "level": str(row.get("level", row.get("nivel", row.get("NIVEL", "Normal")))),
-                "lot_number": str(row.get("lot_number", row.get("lote", row.get("LOTE", "")))),
-                "value": float(row.get("value", row.get("valor", row.get("VALOR", 0)))),
-                "target_value": float(row.get("target_value", row.get("alvo", row.get("ALVO", 0)))),
-                "target_sd": float(row.get("target_sd", row.get("dp", row.get("DP", 0)))),
-                "equipment": str(row.get("equipment", row.get("equipamento", row.get("EQUIPAMENTO", "")))),
-                "analyst": str(row.get("analyst", row.get("analista", row.get("ANALISTA", "")))),
-            }
-            val = record_data["value"]
-            target = record_data["target_value"]
-            if target > 0:
-                record_data["cv"] = round((abs(val - target) / target) * 100, 2)
-            else:
-                record_data["cv"] = 0.0
-            record_data["status"] = "OK"
-            record_data["needs_calibration"] = False
-            records_to_save.append(record_data)
+        records_to_save = [proin_row_to_record(row) for row in state.proin_import_data]
 
         result = await QCService.create_qc_records_batch(records_to_save)
         count = len(records_to_save)
 
         if result:
+            # Detectores de deriva avançam com o lote importado (caminho vetorizado)
+            await state._update_drift(
+                drift_detector.update_records, [QCRecord(**r) for r in records_to_save]
+            )
             state.qc_success_message = f"{count} registros importados com sucesso!"
             await state.load_data_from_db(force=True)
         else:
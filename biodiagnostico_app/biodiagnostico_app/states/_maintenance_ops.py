@@ -7,6 +7,7 @@ from datetime import datetime
 
 from ..models import MaintenanceRecord
 from ..services.maintenance_service import MaintenanceService
+from ..services.maintenance_scheduler_service import maintenance_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,12 @@ async def save_maintenance_record(state):
             state.maintenance_error_message = "Data é obrigatória."
             return
 
+        # Preventiva/calibração sem próxima data: mesmo intervalo da anterior do equipamento
+        if not state.maintenance_next_date:
+            state.maintenance_next_date = maintenance_scheduler.suggest_next_date(
+                state.maintenance_equipment, state.maintenance_type, state.maintenance_date
+            )
+
         db_result = await MaintenanceService.create_record({
             "equipment": state.maintenance_equipment,
             "type": state.maintenance_type,
@@ -47,6 +54,9 @@ async def save_maintenance_record(state):
             created_at=datetime.now().isoformat()
         )
         state.maintenance_records.insert(0, new_record)
+        maintenance_scheduler.add(new_record)
+        await state.load_dashboard_kpis(force=True)
+        state._refresh_maintenance_schedule()
         state.maintenance_success_message = "Manutenção registrada!"
         state.maintenance_equipment = ""
         state.maintenance_notes = ""
@@ -63,3 +73,6 @@ async def delete_maintenance_record(state, record_id: str):
     except Exception as e:
         logger.error(f"Erro ao deletar manutenção: {e}")
     state.maintenance_records = [r for r in state.maintenance_records if r.id != record_id]
+    maintenance_scheduler.remove(record_id)
+    await state.load_dashboard_kpis(force=True)
+    state._refresh_maintenance_schedule()
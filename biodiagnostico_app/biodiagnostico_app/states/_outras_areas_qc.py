@@ -3,6 +3,8 @@ import reflex as rx
 from typing import List, Dict, Any
 from datetime import datetime
 from ..services.generic_qc_service import QC_SERVICES
+from ..services.qc_outbox_service import qc_outbox, STATUS_SYNCED, STATUS_FAILED
+from ..services.drift_detection_service import drift_detector
 
 
 class OutrasAreasQCMixin:
@@ -208,16 +210,29 @@ class OutrasAreasQCMixin:
             valor_float = float(valor.replace(",", "."))
             data_obj = datetime.strptime(data, "%Y-%m-%d").date()
 
-            result = await service.register_measurement(
+            # Grava no outbox local e tenta enviar já; se a rede falhar, sincroniza depois
+            entry_id = service.enqueue_measurement(
                 data_medicao=data_obj,
                 analito=analito,
                 valor_medido=valor_float,
                 observacao=getattr(self, f"{prefix}_meas_observacao") or None,
             )
+            sync = await qc_outbox.submit(entry_id)
+            if sync == STATUS_FAILED:
+                raise Exception(qc_outbox.last_error(entry_id))
 
             # Limpar formulário
             self._clear_area_meas_form(prefix)
 
+            if sync != STATUS_SYNCED:
+                return rx.toast.warning("Sem conexão: medição salva localmente e pendente de sincronização.")
+            result = qc_outbox.result(entry_id) or {}
+            if result.get("min_aplicado") is not None:
+                await self._update_drift(
+                    drift_detector.update_area_measurement,
+                    area_id, analito, data, valor_float, result["min_aplicado"], result["max_aplicado"],
+                )
+
             # Recarregar medições
             await self.load_area_data(area_id)
 
@@ -8,6 +8,7 @@ from datetime import datetime
 
 from ..models import QCRecord, PostCalibrationRecord
 from ..services.post_calibration_service import PostCalibrationService
+from ..services.qc_history_index_service import qc_history_index
 from ..services.qc_service import QCService
 from ..utils.numeric import parse_decimal
 
@@ -125,9 +126,12 @@ async def save_post_calibration(state):
                     z_score=r.z_score,
                     reference_id=r.reference_id,
                     needs_calibration=False,
-                    post_calibration_id=new_record.id
+                    post_calibration_id=new_record.id,
+                    sync_status=r.sync_status,
                 )
                 state.qc_records[i] = updated_record
+                # A tabela do histórico lê o índice: substitui a versão antiga do registro
+                qc_history_index.add_record(updated_record)
                 await QCService.update_qc_record(qc_record_id, {"needs_calibration": False})
                 break
 
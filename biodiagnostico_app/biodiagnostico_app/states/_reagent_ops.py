@@ -7,6 +7,7 @@ from datetime import datetime
 
 from ..models import ReagentLot
 from ..services.reagent_service import ReagentService
+from ..services.alert_engine_service import alert_engine, EVENT_LOT_SAVED, EVENT_LOT_DELETED
 
 logger = logging.getLogger(__name__)
 
@@ -38,14 +39,6 @@ async def save_reagent_lot(state):
             "estimated_consumption": float(state.reagent_daily_consumption or 0),
         })
 
-        days_left = 0
-        if state.reagent_expiry_date:
-            try:
-                expiry_dt = datetime.strptime(state.reagent_expiry_date, "%Y-%m-%d").date()
-                days_left = (expiry_dt - datetime.now().date()).days
-            except ValueError:
-                pass
-
         new_lot = ReagentLot(
             id=str(db_result.get("id", "")),
             name=state.reagent_name,
@@ -57,9 +50,11 @@ async def save_reagent_lot(state):
             current_stock=float(state.reagent_initial_stock or 0),
             estimated_consumption=float(state.reagent_daily_consumption or 0),
             created_at=datetime.now().isoformat(),
-            days_left=days_left,
         )
         state.reagent_lots.insert(0, new_lot)
+        state._update_reagent_forecast()
+        alert_engine.publish(EVENT_LOT_SAVED, new_lot)
+        await state.load_dashboard_kpis(force=True)
         state.reagent_success_message = "Lote salvo com sucesso!"
         state.reagent_name = ""
         state.reagent_lot_number = ""
@@ -76,3 +71,6 @@ async def delete_reagent_lot(state, lot_id: str):
     except Exception as e:
         logger.error(f"Erro ao deletar lote: {e}")
     state.reagent_lots = [lot for lot in state.reagent_lots if lot.id != lot_id]
+    state._update_reagent_forecast()
+    alert_engine.publish(EVENT_LOT_DELETED, lot_id)
+    await state.load_dashboard_kpis(force=True)
@@ -8,6 +8,10 @@ import calendar
 import logging
 from datetime import datetime, timedelta
 
+from ..services.analytics_mirror_service import monthly_summary_from_records
+from ..services.qc_history_index_service import qc_history_index
+from ..services.quality_planning_service import quality_planner
+
 logger = logging.getLogger(__name__)
 
 
@@ -57,25 +61,29 @@ async def generate_pdf_bytes(state):
             state.qc_error_message = "Ano inválido"
             return None, None
 
-    records = state.qc_records
-
-    filtered_records = []
-    if start_date and end_date:
-        for r in records:
-            if r.date >= start_date and r.date <= (end_date + "T23:59:59"):
-                filtered_records.append(r)
+    if not state.qc_records:
+        filtered_records = []
+    elif start_date and end_date:
+        # Período pelo índice temporal do histórico (crescente -> mais recente primeiro)
+        filtered_records = qc_history_index.between(start_date, end_date + "T23:59:59")[::-1]
     else:
-        filtered_records = records
-
-    filtered_records.sort(key=lambda x: x.date, reverse=True)
+        filtered_records = sorted(state.qc_records, key=lambda x: x.date, reverse=True)
 
     if not filtered_records:
         state.qc_error_message = "Nenhum registro encontrado no período."
 
+    # Resumo mensal dos mesmos registros do detalhe (o espelho pode estar atrás da memória)
+    monthly_summary = monthly_summary_from_records(filtered_records)
+
+    quality_plan = quality_planner.plan(filtered_records)
+
     loop = asyncio.get_event_loop()
     pdf_bytes = await loop.run_in_executor(
         None,
-        lambda: generate_qc_pdf(filtered_records, period_desc, state.post_calibration_records)
+        lambda: generate_qc_pdf(
+            filtered_records, period_desc, state.post_calibration_records,
+            monthly_summary=monthly_summary, quality_plan=quality_plan,
+        )
     )
 
     filename = f"QC_Report_{period_desc.replace('/', '_').replace(' ', '_')}.pdf"
@@ -3,18 +3,64 @@ Operações de Voice-to-Form extraídas do QCState.
 Cada função recebe `state` (instância do QCState) como primeiro argumento.
 """
 import asyncio
+import json
 import logging
 from typing import Dict, Any
 
+import reflex as rx
+
+from ..services.voice_spool_service import voice_spool
+
 logger = logging.getLogger(__name__)
 
+# Grava em blocos de 1s e envia cada bloco binario ao spool (POST /api/voice/{handle}),
+# em sequencia; o audio nao passa pelo websocket.
+RECORDER_START_JS = """
+(async () => {
+    try {
+        const url = %s;
+        const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+        window._voiceStream = stream;
+        const mimeType = MediaRecorder.isTypeSupported('audio/webm;codecs=opus')
+            ? 'audio/webm;codecs=opus' : 'audio/mp4';
+        window._voiceRecorder = new MediaRecorder(stream, { mimeType });
+        window._voiceUpload = Promise.resolve();
+        window._voiceUploadError = "";
+        window._voiceRecorder.ondataavailable = (e) => {
+            if (e.data.size === 0) return;
+            const chunk = e.data;
+            window._voiceUpload = window._voiceUpload
+                .then(() => window._voiceUploadError ? null : fetch(url, {
+                    method: "POST", body: chunk, headers: { "Content-Type": "application/octet-stream" },
+                }))
+                .then((r) => { if (r && !r.ok) window._voiceUploadError = "HTTP " + r.status; })
+                .catch((err) => { window._voiceUploadError = err.message; });
+        };
+        window._voiceRecorder.start(1000);
+        return "ok";
+    } catch(err) {
+        return "error:" + err.message;
+    }
+})()
+"""
+
+
+def _upload_url(handle: str) -> str:
+    return f"{rx.config.get_config().api_url.rstrip('/')}/api/voice/{handle}"
+
+
+def _reset_audio(state):
+    voice_spool.discard(state._voice_audio_handle)
+    state._voice_audio_handle = ""
+    state._voice_audio_mime = ""
+
 
 def open_voice_modal(state, form_type: str):
     state.show_voice_modal = True
     state.voice_form_target = form_type
     state.voice_is_recording = False
     state.voice_is_processing = False
-    state.voice_audio_base64 = ""
+    _reset_audio(state)
     state.voice_status_message = "Toque no microfone para iniciar"
     state.voice_error_message = ""
 
@@ -24,7 +70,7 @@ def close_voice_modal(state):
     state.voice_form_target = ""
     state.voice_is_recording = False
     state.voice_is_processing = False
-    state.voice_audio_base64 = ""
+    _reset_audio(state)
     state.voice_status_message = ""
     state.voice_error_message = ""
 
@@ -38,13 +84,40 @@ def set_voice_recording(state, is_recording: bool):
         state.voice_status_message = "Gravacao finalizada"
 
 
-def receive_voice_audio(state, audio_base64: str):
-    state.voice_audio_base64 = audio_base64
+def start_voice_recording(state) -> str:
+    """Abre um spool novo e devolve o script que grava e envia os blocos para ele"""
+    _reset_audio(state)
+    state._voice_audio_handle = voice_spool.create()
+    set_voice_recording(state, True)
+    return RECORDER_START_JS % json.dumps(_upload_url(state._voice_audio_handle))
+
+
+def voice_recording_started(state, result: str):
+    if isinstance(result, str) and result.startswith("error:"):
+        state.voice_is_recording = False
+        state.voice_status_message = ""
+        state.voice_error_message = f"Microfone indisponivel: {result[6:]}"
+        _reset_audio(state)
+
+
+def receive_voice_audio(state, result: str) -> bool:
+    """Callback do stop: tipo MIME da gravacao (blocos ja estao no spool) ou "error:..." """
     state.voice_is_recording = False
+    result = result if isinstance(result, str) else ""
+    if result.startswith("error:"):
+        logger.error(f"Voice upload error: {result}")
+        state.voice_status_message = ""
+        state.voice_error_message = "Falha ao enviar o audio. Tente novamente."
+        _reset_audio(state)
+        return False
+    if result:
+        state._voice_audio_mime = result
+    return True
 
 
 async def process_voice_audio(state):
-    if not state.voice_audio_base64:
+    handle = state._voice_audio_handle
+    if not handle or not state._voice_audio_mime or not voice_spool.exists(handle) or voice_spool.size(handle) == 0:
         state.voice_error_message = "Nenhum audio capturado. Tente novamente."
         return
 
@@ -55,8 +128,9 @@ async def process_voice_audio(state):
     try:
         from ..services.voice_ai_service import VoiceAIService
         result = await VoiceAIService.process_audio(
-            audio_base64=state.voice_audio_base64,
+            audio_bytes=voice_spool.read(handle),
             form_type=state.voice_form_target,
+            mime_type=state._voice_audio_mime,
         )
 
         if "error" in result:
@@ -76,6 +150,7 @@ async def process_voice_audio(state):
         return False
     finally:
         state.voice_is_processing = False
+        _reset_audio(state)
 
 
 def apply_voice_data(state, data: Dict[str, Any]):
@@ -1,7 +1,16 @@
+import asyncio
+import logging
 import reflex as rx
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
 from datetime import datetime
 from .auth_state import AuthState
+from ..services.analytics_mirror_service import analytics_mirror
+from ..services.qc_service import QCService
+from ..services.qc_outbox_service import STATUS_PENDING
+from ..services.drift_detection_service import drift_detector
+from ..services.qc_history_index_service import qc_history_index
+
+logger = logging.getLogger(__name__)
 
 
 class DashboardState(AuthState):
@@ -12,29 +21,122 @@ class DashboardState(AuthState):
     total_qc_month: int = 0
     qc_approval_rate: float = 0.0
     pending_maintenances: int = 0
+    expiring_lots_count: int = 0
+    dashboard_kpis_loaded: bool = False
+    # Séries em deriva (EWMA/CUSUM), já formatadas para o painel de alertas
+    drift_alerts: List[Dict[str, str]] = []
+
+    def _apply_dashboard_kpis(self, kpis: Dict[str, Any]):
+        """Copia o resultado de QCService.get_dashboard_kpis para o estado"""
+        self.total_qc_today = kpis.get("total_today", 0)
+        self.total_qc_month = kpis.get("total_month", 0)
+        self.qc_approval_rate = kpis.get("approval_rate_month", 0.0)
+        self.pending_maintenances = kpis.get("pending_maintenances", 0)
+        self.expiring_lots_count = kpis.get("expiring_lots", 0)
+        self.dashboard_kpis_loaded = True
+
+    async def load_dashboard_kpis(self, force: bool = False):
+        """Carrega os KPIs do dashboard (uma RPC, cache compartilhado entre sessões)"""
+        try:
+            kpis = await QCService.get_dashboard_kpis(force=force)
+        except Exception as e:
+            # Sem a função no banco: os KPIs seguem calculados sobre os registros em memória
+            logger.warning(f"KPIs do dashboard indisponíveis: {e}")
+            return
+        self._apply_dashboard_kpis(kpis)
+
+    def _refresh_drift_alerts(self):
+        """Atualiza a lista de séries em deriva a partir do estado persistido dos detectores"""
+        try:
+            alerts = drift_detector.alerts()
+        except Exception as e:
+            logger.warning(f"Detectores de deriva indisponíveis: {e}")
+            return
+        self._set_drift_alerts(alerts)
+
+    async def _update_drift(self, update: Optional[Callable[..., Any]] = None, *args) -> Any:
+        """
+        Escrita nos detectores de deriva + releitura dos alarmes numa thread: a transação
+        SQLite pode esperar o lock de outro worker e não deve parar o event loop.
+        """
+        def run():
+            result = update(*args) if update is not None else None
+            try:
+                return result, drift_detector.alerts()
+            except Exception as e:
+                logger.warning(f"Detectores de deriva indisponíveis: {e}")
+                return result, None
+
+        result, alerts = await asyncio.to_thread(run)
+        if alerts is not None:
+            self._set_drift_alerts(alerts)
+        return result
+
+    def _set_drift_alerts(self, alerts: List[Dict[str, Any]]):
+        self.drift_alerts = [
+            {
+                "exam_name": a["exam_name"],
+                "detail": " · ".join(p for p in (a["level"], a["lot_number"], a["equipment"]) if p),
+                "alarm": a["alarm"],
+                "last_date": a["last_date"][:10],
+            }
+            for a in alerts
+        ]
+
+    @rx.var
+    def has_drift_alerts(self) -> bool:
+        return len(self.drift_alerts) > 0
+
+    def _local_records(self, date_prefix: str, pending_only: bool) -> List[Any]:
+        if not hasattr(self, 'qc_records') or not self.qc_records:
+            return []
+        # Dia/mês pelo índice temporal do histórico (só os registros do período)
+        records = qc_history_index.with_date_prefix(date_prefix)
+        if not pending_only:
+            return records
+        return [r for r in records if r.sync_status == STATUS_PENDING]
+
+    def _count_local_records(self, date_prefix: str, pending_only: bool) -> int:
+        return len(self._local_records(date_prefix, pending_only))
 
     @rx.var
     def dashboard_total_today(self) -> str:
         """Total de registros de QC hoje"""
         today = datetime.now().strftime("%Y-%m-%d")
-        if not hasattr(self, 'qc_records'):
-            return "0"
-        return str(len([r for r in self.qc_records if r.date.startswith(today)]))
+        if self.dashboard_kpis_loaded:
+            # KPI do banco + gravações ainda no outbox local
+            return str(self.total_qc_today + self._count_local_records(today, True))
+        return str(self._count_local_records(today, False))
 
     @rx.var
     def dashboard_total_month(self) -> str:
         """Total de registros de QC no mês"""
         today = datetime.now()
         month_str = f"{today.year}-{today.month:02d}"
-        if not hasattr(self, 'qc_records'):
-            return "0"
-        return str(len([r for r in self.qc_records if r.date.startswith(month_str)]))
+        if self.dashboard_kpis_loaded:
+            return str(self.total_qc_month + self._count_local_records(month_str, True))
+        return str(self._count_local_records(month_str, False))
 
     @rx.var
     def dashboard_approval_rate(self) -> float:
         """Taxa de aprovação (status OK)"""
+        if self.dashboard_kpis_loaded:
+            # KPI do mês no banco + gravações do mês ainda no outbox local
+            today = datetime.now()
+            pending = self._local_records(f"{today.year}-{today.month:02d}", True)
+            total = self.total_qc_month + len(pending)
+            if not total:
+                return 100.0
+            approved = self.qc_approval_rate / 100 * self.total_qc_month + len([r for r in pending if r.status == "OK"])
+            return round(approved / total * 100, 1)
         if not hasattr(self, 'qc_records') or not self.qc_records:
             return 100.0
+        # Espelho só quando em dia com a memória (sync periódico, sem o outbox local)
+        try:
+            if analytics_mirror.covers(self.qc_records):
+                return analytics_mirror.approval_rate()
+        except Exception as e:
+            logger.warning(f"Espelho analítico indisponível, usando registros em memória: {e}")
         ok_count = len([r for r in self.qc_records if r.status == "OK"])
         return round((ok_count / len(self.qc_records)) * 100, 1)
 
@@ -65,20 +167,18 @@ class DashboardState(AuthState):
 
     @rx.var
     def dashboard_pending_maintenances(self) -> str:
-        """Manutenções pendentes"""
-        if not hasattr(self, 'maintenance_records'):
-            return "0"
-        return str(len(self.maintenance_records))
+        """Manutenções vencidas ou para hoje (KPI do banco ou índice da agenda)"""
+        return str(self.pending_maintenances)
 
     @rx.var
     def has_pending_maintenances(self) -> bool:
-        if not hasattr(self, 'maintenance_records'):
-            return False
-        return len(self.maintenance_records) > 0
+        return self.pending_maintenances > 0
 
     @rx.var
     def dashboard_expiring_lots(self) -> str:
         """Lotes vencendo em 30 dias"""
+        if self.dashboard_kpis_loaded:
+            return str(self.expiring_lots_count)
         if not hasattr(self, 'reagent_lots'):
             return "0"
         return str(len([lot for lot in self.reagent_lots if lot.days_left <= 30]))
@@ -90,14 +190,11 @@ class DashboardState(AuthState):
     @rx.var
     def westgard_violations_month(self) -> str:
         """Contagem de registros com violações Westgard no mês"""
-        if not hasattr(self, 'qc_records'):
+        if not hasattr(self, 'qc_records') or not self.qc_records:
             return "0"
         today = datetime.now()
         month_str = f"{today.year}-{today.month:02d}"
-        count = len([
-            r for r in self.qc_records
-            if r.date.startswith(month_str) and r.westgard_violations
-        ])
+        count = len([r for r in qc_history_index.with_date_prefix(month_str) if r.westgard_violations])
         return str(count)
 
     @rx.var
@@ -113,6 +210,12 @@ class DashboardState(AuthState):
         """Top 5 exames com maior CV% médio"""
         if not hasattr(self, 'qc_records') or not self.qc_records:
             return []
+        # Espelho só quando em dia com a memória (sync periódico, sem o outbox local)
+        try:
+            if analytics_mirror.covers(self.qc_records):
+                return analytics_mirror.top_high_cv_exams(5)
+        except Exception as e:
+            logger.warning(f"Espelho analítico indisponível, usando registros em memória: {e}")
         exam_cvs: Dict[str, List[float]] = {}
         for r in self.qc_records:
             if r.exam_name and r.cv > 0:
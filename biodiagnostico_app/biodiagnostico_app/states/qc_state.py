@@ -19,7 +19,21 @@ from ..services.maintenance_service import MaintenanceService
 from ..services.post_calibration_service import PostCalibrationService
 from ..services.qc_exam_service import QCExamService
 from ..services.qc_registry_name_service import QCRegistryNameService
+from ..services.qc_outbox_service import (
+    qc_outbox, series_key, STATUS_PENDING, STATUS_SYNCED, STATUS_FAILED, OUTBOX_FLUSH_INTERVAL_SECONDS,
+)
+from ..services.exceptions import ServiceError
+from ..services.qc_statistics_service import qc_statistics, RunningStats
+from ..services.qc_history_index_service import qc_history_index
+from ..services.quality_planning_service import quality_planner, apply_rule_selection
+from ..services.drift_detection_service import drift_detector, series_of
+from ..services.reagent_forecast_service import reagent_forecaster, at_risk
+from ..services.maintenance_scheduler_service import maintenance_scheduler, MAINTENANCE_DUE_SOON_DAYS
+from ..services.alert_engine_service import (
+    alert_engine, EVENT_QC_SAVED, EVENT_QC_DELETED,
+)
 from ..utils.numeric import parse_decimal
+from ..utils.time_index import desc_insert_position
 from . import (
     _voice_ops, _report_ops, _reagent_ops, _maintenance_ops,
     _reference_ops, _post_calibration_ops, _import_ops,
@@ -27,6 +41,56 @@ from . import (
 from .dashboard_state import DashboardState
 from ._outras_areas_qc import OutrasAreasQCMixin
 
+
+def build_qc_records(
+    db_records: List[Dict[str, Any]],
+    refs_by_id: Dict[str, Dict[str, Any]],
+    pending_ids: set,
+) -> List[QCRecord]:
+    """Converte linhas de qc_records (banco + outbox) em QCRecord, na ordem recebida"""
+    records: List[QCRecord] = []
+    for r in db_records:
+        reference_id = r.get("reference_id", "") or ""
+        ref = refs_by_id.get(reference_id, {}) or {}
+        cv = float(r.get("cv", 0)) if r.get("cv") else 0.0
+        if not cv and r.get("id") in pending_ids:
+            # cv é coluna gerada no banco: calcular localmente enquanto pendente
+            target = float(r.get("target_value") or 0)
+            if target > 0:
+                cv = abs(float(r.get("value") or 0) - target) / target * 100
+        cv_max_threshold = float(ref.get("cv_max_threshold") or 10.0)
+        status = r.get("status", "OK") or "OK"
+        needs_calibration = bool(r.get("needs_calibration", False))
+
+        records.append(
+            QCRecord(
+                id=str(r.get("id") or ""),
+                date=r.get("date") or "",
+                exam_name=r.get("exam_name") or "",
+                level=r.get("level") or "Normal",
+                lot_number=r.get("lot_number") or "",
+                value=float(r.get("value") or 0),
+                target_value=float(r.get("target_value") or 0),
+                target_sd=float(r.get("target_sd") or 0),
+                cv=cv,
+                cv_max_threshold=cv_max_threshold,
+                status=status,
+                equipment=r.get("equipment_name") or "",
+                analyst=r.get("analyst_name") or "",
+                westgard_violations=[],
+                reference_id=reference_id,
+                needs_calibration=needs_calibration,
+                post_calibration_id=r.get("post_calibration_id") or "",
+                sync_status=STATUS_PENDING if r.get("id") in pending_ids else "",
+            )
+        )
+    return records
+
+
+def _record_date(record: QCRecord) -> str:
+    return record.date or ""
+
+
 class QCState(OutrasAreasQCMixin, DashboardState):
     """Estado responsável pelo Controle de Qualidade (ProIn), Reagentes e Manutenções"""
     
@@ -48,6 +112,7 @@ class QCState(OutrasAreasQCMixin, DashboardState):
     qc_analyst: str = ""
     qc_date: str = ""
     is_saving_qc: bool = False
+    qc_outbox_pending: int = 0  # Escritas no outbox local aguardando envio ao Supabase
     qc_success_message: str = ""
     qc_warning_message: str = ""
     qc_error_message: str = ""
@@ -98,6 +163,19 @@ class QCState(OutrasAreasQCMixin, DashboardState):
     levey_jennings_exam: str = ""
     levey_jennings_level: str = "Todos"
     levey_jennings_period: str = "30"
+    # Estatísticas do período exibido (calculadas uma vez por atualização do gráfico)
+    lj_mean: float = 0.0
+    lj_sd: float = 0.0
+    lj_cv_mean: float = 0.0
+    # Série exame/nível/lote mais recente do gráfico: acumulado, janelas 20/30, mês e baseline
+    lj_series_stats: Dict[str, Any] = {}
+    # Planejamento da qualidade (Sigma por exame/nível), já formatado para a tabela
+    quality_plan: List[Dict[str, str]] = []
+    # Lotes com ruptura prevista ou sobra na validade (painel do dashboard)
+    reagent_forecast: List[Dict[str, str]] = []
+    # Agenda de manutenção: vencidas + a vencer (índice por próxima data)
+    maintenance_schedule: List[Dict[str, str]] = []
+    next_maintenance: str = ""
 
     # Alertas do Dashboard (QC related)
     qc_alerts: List[QCRecord] = []
@@ -165,7 +243,9 @@ class QCState(OutrasAreasQCMixin, DashboardState):
     voice_form_target: str = ""       # "registro", "referencia", "reagente", "manutencao"
     voice_is_recording: bool = False
     voice_is_processing: bool = False
-    voice_audio_base64: str = ""
+    # Audio fica no spool em disco; no estado so o handle (backend-only)
+    _voice_audio_handle: str = ""
+    _voice_audio_mime: str = ""
     voice_status_message: str = ""
     voice_error_message: str = ""
 
@@ -289,6 +369,8 @@ class QCState(OutrasAreasQCMixin, DashboardState):
 
     # Data cache timestamp
     _last_loaded: str = ""
+    # Loop de flush_qc_outbox já ativo nesta sessão (gravações seguidas não abrem outro)
+    _qc_flush_running: bool = False
 
     def set_qc_report_type(self, value: str):
         """Define o tipo de relatório (Mês Atual, Específico, etc)"""
@@ -391,32 +473,13 @@ class QCState(OutrasAreasQCMixin, DashboardState):
         except (ValueError, TypeError):
             return 0.0
 
-    @rx.var
-    def filtered_qc_records(self) -> List[QCRecord]:
-        """Registros filtrados por busca e status"""
-        records = self.qc_records
-        # Filtro por nome do exame
-        search = (self.qc_search_term or "").strip().upper()
-        if search:
-            records = [r for r in records if search in (r.exam_name or "").upper()]
-        # Filtro por status (baseado em CV% vs threshold)
-        status_filter = self.qc_status_filter or "Todos"
-        if status_filter == "OK":
-            records = [r for r in records if r.cv <= r.cv_max_threshold]
-        elif status_filter == "ALERTA":
-            records = [r for r in records if r.cv > r.cv_max_threshold]
-        elif status_filter == "ERRO":
-            records = [r for r in records if r.cv > r.cv_max_threshold]
-        return records
-
     @rx.var
     def paginated_qc_records(self) -> List[QCRecord]:
-        """Retorna registros filtrados pelo dia selecionado"""
-        records = self.filtered_qc_records
-        target_date = (self.qc_history_date or "").strip()
-        if target_date:
-            records = [r for r in records if (r.date or "")[:10] == target_date]
-        return records
+        """Registros do dia selecionado que casam com a busca e o status (só esta visão vai ao frontend)"""
+        if not self.qc_records:
+            return []
+        # Índice do histórico do processo (exame, lote, equipamento, analista) com cache por (termo, status, dia)
+        return qc_history_index.query(self.qc_search_term, self.qc_status_filter, self.qc_history_date)
 
     @rx.var
     def qc_history_date_display(self) -> str:
@@ -435,20 +498,24 @@ class QCState(OutrasAreasQCMixin, DashboardState):
         self.qc_history_date = value
 
     def next_qc_day(self):
-        """Avança um dia no histórico"""
+        """Avança para o próximo dia com registros (sem registros adiante, um dia de calendário)"""
         try:
             current = datetime.strptime(self.qc_history_date, "%Y-%m-%d")
-            self.qc_history_date = (current + timedelta(days=1)).strftime("%Y-%m-%d")
         except (ValueError, TypeError):
             self.qc_history_date = datetime.now().strftime("%Y-%m-%d")
+            return
+        next_day = qc_history_index.next_day(self.qc_history_date) if self.qc_records else None
+        self.qc_history_date = next_day or (current + timedelta(days=1)).strftime("%Y-%m-%d")
 
     def prev_qc_day(self):
-        """Retrocede um dia no histórico"""
+        """Volta para o dia anterior com registros (sem registros antes, um dia de calendário)"""
         try:
             current = datetime.strptime(self.qc_history_date, "%Y-%m-%d")
-            self.qc_history_date = (current - timedelta(days=1)).strftime("%Y-%m-%d")
         except (ValueError, TypeError):
             self.qc_history_date = datetime.now().strftime("%Y-%m-%d")
+            return
+        prev_day = qc_history_index.prev_day(self.qc_history_date) if self.qc_records else None
+        self.qc_history_date = prev_day or (current - timedelta(days=1)).strftime("%Y-%m-%d")
 
     # ── Reagent pagination ──
     @rx.var
@@ -537,24 +604,14 @@ class QCState(OutrasAreasQCMixin, DashboardState):
         """Verifica se há referência ativa para o exame selecionado"""
         return self.current_exam_reference is not None
         
-    # Levey-Jennings Stats (Legacy props for older chart components)
-    @rx.var
-    def lj_mean(self) -> float:
-        if not self.levey_jennings_data: return 0.0
-        return sum(p.value for p in self.levey_jennings_data) / len(self.levey_jennings_data)
-        
     @rx.var
-    def lj_sd(self) -> float:
-        # Simplificação para evitar numpy
-        if not self.levey_jennings_data: return 0.0
-        mean = self.lj_mean
-        variance = sum((p.value - mean) ** 2 for p in self.levey_jennings_data) / len(self.levey_jennings_data)
-        return variance ** 0.5
-        
+    def has_reagent_forecast(self) -> bool:
+        return len(self.reagent_forecast) > 0
+
     @rx.var
-    def lj_cv_mean(self) -> float:
-        if not self.levey_jennings_data: return 0.0
-        return sum(p.cv for p in self.levey_jennings_data) / len(self.levey_jennings_data)
+    def lj_has_lab_baseline(self) -> bool:
+        """Série do gráfico já tem 20 corridas para alvo/DP do laboratório"""
+        return bool(self.lj_series_stats.get("baseline_ready"))
 
     # Levey-Jennings Bounds (Mock or Calculated based on target)
     @rx.var 
@@ -761,6 +818,16 @@ class QCState(OutrasAreasQCMixin, DashboardState):
             # Carregar registros de QC
             db_records = await QCService.get_qc_records(limit=10000)
 
+            # Incluir registros ainda no outbox local (salvos, mas não sincronizados)
+            pending_rows = qc_outbox.pending_payloads("qc_records")
+            pending_ids = {r.get("id") for r in pending_rows}
+            if pending_rows:
+                loaded_ids = {str(r.get("id")) for r in db_records or []}
+                db_records = list(db_records or []) + [
+                    r for r in pending_rows if r.get("id") not in loaded_ids
+                ]
+            self.qc_outbox_pending = qc_outbox.pending_count()
+
             if db_records:
                 refs_by_id = {}
                 ref_ids = [r.get("reference_id") for r in db_records if r.get("reference_id")]
@@ -769,69 +836,41 @@ class QCState(OutrasAreasQCMixin, DashboardState):
                         refs_by_id = await QCReferenceService.get_references_by_ids(ref_ids)
                     except Exception as e:
                         logger.error(f"Erro ao buscar referências por ID: {e}")
-                records: List[QCRecord] = []
-                for r in db_records:
-                    reference_id = r.get("reference_id", "") or ""
-                    ref = refs_by_id.get(reference_id, {}) or {}
-                    cv = float(r.get("cv", 0)) if r.get("cv") else 0.0
-                    cv_max_threshold = float(ref.get("cv_max_threshold") or 10.0)
-                    status = r.get("status", "OK") or "OK"
-                    needs_calibration = bool(r.get("needs_calibration", False))
-
-                    records.append(
-                        QCRecord(
-                            id=str(r.get("id") or ""),
-                            date=r.get("date") or "",
-                            exam_name=r.get("exam_name") or "",
-                            level=r.get("level") or "Normal",
-                            lot_number=r.get("lot_number") or "",
-                            value=float(r.get("value") or 0),
-                            target_value=float(r.get("target_value") or 0),
-                            target_sd=float(r.get("target_sd") or 0),
-                            cv=cv,
-                            cv_max_threshold=cv_max_threshold,
-                            status=status,
-                            equipment=r.get("equipment_name") or "",
-                            analyst=r.get("analyst_name") or "",
-                            westgard_violations=[],
-                            reference_id=reference_id,
-                            needs_calibration=needs_calibration,
-                            post_calibration_id=r.get("post_calibration_id") or ""
-                        )
-                    )
+                records = build_qc_records(db_records, refs_by_id, pending_ids)
 
                 self.qc_records = records
                 self.qc_records = sorted(self.qc_records, key=lambda x: x.date, reverse=True)
+                qc_statistics.rebuild(self.qc_records)
+                qc_history_index.rebuild(self.qc_records)
+                self._update_quality_plan()
+                # Primeira execução: estado dos detectores a partir do histórico
+                await self._update_drift(drift_detector.seed, list(self.qc_records))
                 logger.info(f"Carregados {len(self.qc_records)} registros de QC do banco")
+            else:
+                await self._update_drift()
+
+            await self.load_dashboard_kpis()
 
             # Carregar lotes de reagentes
             try:
                 db_lots = await ReagentService.get_lots()
-                today = datetime.now().date()
-                lots = []
-                for r in db_lots:
-                    expiry_str = r.get("expiry_date") or ""
-                    days_left = 0
-                    if expiry_str:
-                        try:
-                            expiry_dt = datetime.strptime(expiry_str, "%Y-%m-%d").date()
-                            days_left = (expiry_dt - today).days
-                        except ValueError:
-                            pass
-                    lots.append(ReagentLot(
+                self.reagent_lots = [
+                    ReagentLot(
                         id=str(r.get("id") or ""),
                         name=r.get("name") or "",
                         lot_number=r.get("lot_number") or "",
-                        expiry_date=expiry_str,
+                        expiry_date=r.get("expiry_date") or "",
                         quantity=r.get("quantity") or "",
                         manufacturer=r.get("manufacturer") or "",
                         storage_temp=r.get("storage_temp") or "",
                         current_stock=float(r.get("current_stock") or 0),
                         estimated_consumption=float(r.get("estimated_consumption") or 0),
                         created_at=str(r.get("created_at") or ""),
-                        days_left=days_left,
-                    ))
-                self.reagent_lots = lots
+                    )
+                    for r in db_lots
+                ]
+                # days_left e previsão de consumo para todos os lotes de uma vez
+                self._update_reagent_forecast()
                 logger.info(f"Carregados {len(self.reagent_lots)} lotes de reagentes")
             except Exception as e:
                 logger.error(f"Erro ao carregar reagentes: {e}")
@@ -853,9 +892,14 @@ class QCState(OutrasAreasQCMixin, DashboardState):
                     for r in db_maint
                 ]
                 logger.info(f"Carregados {len(self.maintenance_records)} registros de manutenção")
+                maintenance_scheduler.rebuild(self.maintenance_records)
+                self._refresh_maintenance_schedule()
             except Exception as e:
                 logger.error(f"Erro ao carregar manutenções: {e}")
 
+            # Motor de alertas parte do que acabou de ser carregado
+            alert_engine.seed(self.qc_records, self.reagent_lots)
+
             # Carregar registros de pós-calibração
             try:
                 db_postcal = await PostCalibrationService.get_records()
@@ -913,8 +957,16 @@ class QCState(OutrasAreasQCMixin, DashboardState):
 
     # Lógica de cálculo SD/CV para formulário
     def calculate_sd(self):
-        """Calcula o Desvio Padrão (Diferença Absoluta) automaticamente"""
+        """Preenche o DP: baseline de 20 corridas da série, ou diferença absoluta sem histórico"""
         try:
+            baseline = qc_statistics.baseline(self.qc_exam_name, self.qc_level, self.qc_lot_number)
+            if baseline:
+                # Alvo/DP derivados do laboratório (primeiras 20 corridas do lote)
+                if not (self.qc_target_value or "").strip():
+                    self.qc_target_value = f"{baseline['mean']:.2f}"
+                self.qc_target_sd = f"{baseline['sd']:.2f}"
+                return
+
             if not self.qc_value or not self.qc_target_value:
                 return
             
@@ -967,22 +1019,18 @@ class QCState(OutrasAreasQCMixin, DashboardState):
         """Atualiza dados do gráfico LJ com filtro de período"""
         if not self.levey_jennings_exam: return
 
-        filtered = [r for r in self.qc_records if r.exam_name == self.levey_jennings_exam]
-
-        # Aplicar filtro de nível
-        if self.levey_jennings_level and self.levey_jennings_level != "Todos":
-            filtered = [r for r in filtered if r.level == self.levey_jennings_level]
-
-        # Aplicar filtro de período (dias)
+        # Período (dias) pelo índice temporal: já em ordem crescente (mais antigo primeiro)
         try:
             period_days = int(self.levey_jennings_period or 30)
             cutoff_date = (datetime.now() - timedelta(days=period_days)).isoformat()
-            filtered = [r for r in filtered if r.date >= cutoff_date]
         except (ValueError, TypeError):
-            pass
+            cutoff_date = None
+        period = qc_history_index.between(cutoff_date) if self.qc_records else []
+        filtered = [r for r in period if r.exam_name == self.levey_jennings_exam]
 
-        # Ordenar por data crescente (mais antigo primeiro) para o gráfico mostrar progressão temporal
-        filtered = sorted(filtered, key=lambda x: x.date, reverse=False)
+        # Aplicar filtro de nível
+        if self.levey_jennings_level and self.levey_jennings_level != "Todos":
+            filtered = [r for r in filtered if r.level == self.levey_jennings_level]
 
         self.levey_jennings_data = [
             LeveyJenningsPoint(
@@ -994,6 +1042,15 @@ class QCState(OutrasAreasQCMixin, DashboardState):
             ) for r in filtered
         ]
 
+        period_stats = RunningStats.from_values(r.value for r in filtered)
+        self.lj_mean = round(period_stats.mean, 4)
+        self.lj_sd = round(period_stats.sd, 4)
+        self.lj_cv_mean = sum(r.cv for r in filtered) / len(filtered) if filtered else 0.0
+        latest = filtered[-1] if filtered else None
+        self.lj_series_stats = (
+            qc_statistics.snapshot(latest.exam_name, latest.level, latest.lot_number) if latest else {}
+        )
+
     # QC CRUD Actions
     async def save_qc_record(self):
         self.is_saving_qc = True
@@ -1068,14 +1125,25 @@ class QCState(OutrasAreasQCMixin, DashboardState):
                  cv=cv,
                  cv_max_threshold=cv_max_threshold,
                  status="OK",
+                 equipment=self.qc_equipment,
+                 analyst=self.qc_analyst,
                  westgard_violations=[],
                  reference_id=reference_id,
                  needs_calibration=False,
                  post_calibration_id=""
              )
              
-             # Validação Westgard
+             # Validação Westgard (regras exigidas conforme o Sigma da série)
              violations = WestgardService.check_rules(new_record, history)
+             # Regras entre níveis/corridas (2-2s e R-4s na corrida, 2of3-2s, 3-1s, 4-1s...)
+             seen_rules = {v["rule"] for v in violations}
+             for v in WestgardService.evaluate_runs(history + [new_record]):
+                 if new_record.id in v["record_ids"] and v["rule"] not in seen_rules:
+                     seen_rules.add(v["rule"])
+                     violations.append(v)
+             violations = apply_rule_selection(
+                 violations, quality_planner.rules_for(canonical_name, self.qc_level)
+             )
              
              _toast_msg = ""
              _toast_level = "success"
@@ -1122,52 +1190,42 @@ class QCState(OutrasAreasQCMixin, DashboardState):
                      _toast_msg = "CV acima do limite. Calibração necessária."
                      _toast_level = "warning"
 
-             # Persistir no banco de dados
-             db_saved = False
+             # Persistir no outbox local (durável); o envio ao Supabase ocorre em background
              try:
-                 db_record = await QCService.create_qc_record({
-                     "date": new_record.date,
-                     "exam_name": new_record.exam_name,
-                     "level": new_record.level,
-                     "lot_number": new_record.lot_number,
-                     "value": new_record.value,
-                     "target_value": new_record.target_value,
-                     "target_sd": new_record.target_sd,
-                     "equipment": self.qc_equipment,
-                     "analyst": self.qc_analyst,
-                     "cv": new_record.cv,
-                     "status": new_record.status,
-                     "reference_id": new_record.reference_id,
-                     "needs_calibration": new_record.needs_calibration
-                 })
-                 # Atualizar ID com o ID do banco
-                 if db_record and db_record.get("id"):
-                     new_record = QCRecord(
-                         id=str(db_record.get("id")),
-                         date=new_record.date,
-                         exam_name=new_record.exam_name,
-                         level=new_record.level,
-                         lot_number=new_record.lot_number,
-                         value=new_record.value,
-                         target_value=new_record.target_value,
-                         target_sd=new_record.target_sd,
-                         cv=new_record.cv,
-                         cv_max_threshold=new_record.cv_max_threshold,
-                         status=new_record.status,
-                         westgard_violations=new_record.westgard_violations,
-                         reference_id=new_record.reference_id,
-                         needs_calibration=new_record.needs_calibration,
-                         post_calibration_id=""
-                     )
-                     db_saved = True
+                 new_record.id = qc_outbox.enqueue_insert(
+                     "qc_records",
+                     QCService.build_qc_record_row({
+                         "date": new_record.date,
+                         "exam_name": new_record.exam_name,
+                         "level": new_record.level,
+                         "lot_number": new_record.lot_number,
+                         "value": new_record.value,
+                         "target_value": new_record.target_value,
+                         "target_sd": new_record.target_sd,
+                         "equipment": self.qc_equipment,
+                         "analyst": self.qc_analyst,
+                         "reference_id": new_record.reference_id,
+                         "needs_calibration": new_record.needs_calibration
+                     }),
+                     series=series_key(new_record.exam_name, new_record.level, new_record.lot_number),
+                 )
+                 new_record.sync_status = STATUS_PENDING
+                 self.qc_records.insert(desc_insert_position(self.qc_records, _record_date(new_record), _record_date), new_record)
+                 qc_statistics.add_record(new_record)
+                 qc_history_index.add_record(new_record)
+                 alert_engine.publish(EVENT_QC_SAVED, new_record)
+                 drift = await self._update_drift(drift_detector.update_records, [new_record])
+                 if drift and _toast_level == "success":
+                     self.qc_warning_message = f"Tendência detectada ({drift[0]['alarm']}): verifique calibração e reagentes."
+                     self.qc_success_message = ""
+                     _toast_msg = f"Salvo — tendência detectada ({drift[0]['alarm']})"
+                     _toast_level = "warning"
+                 self.qc_outbox_pending = qc_outbox.pending_count()
              except Exception as db_error:
-                 logger.error(f"Erro ao salvar no banco: {db_error}")
-                 self.qc_error_message = f"Erro ao salvar no banco: {db_error}"
-
-             # Only append to local state if DB save succeeded
-             if db_saved:
-                 self.qc_records.append(new_record)
-                 self.qc_records = sorted(self.qc_records, key=lambda x: x.date, reverse=True)
+                 logger.error(f"Erro ao gravar no outbox local: {db_error}")
+                 self.qc_error_message = f"Erro ao salvar: {db_error}"
+                 _toast_msg = f"Erro ao salvar: {db_error}"
+                 _toast_level = "error"
 
              self.qc_value = ""
              self.is_saving_qc = False
@@ -1179,6 +1237,7 @@ class QCState(OutrasAreasQCMixin, DashboardState):
                  yield rx.toast.warning(_toast_msg, duration=6000, position="bottom-right")
              elif _toast_level == "error":
                  yield rx.toast.error(_toast_msg, duration=8000, position="bottom-right")
+             yield QCState.flush_qc_outbox
              return
 
         except Exception as e:
@@ -1186,7 +1245,133 @@ class QCState(OutrasAreasQCMixin, DashboardState):
             self.is_saving_qc = False
             yield rx.toast.error(f"Erro ao salvar: {e}", duration=8000, position="bottom-right")
 
+    @rx.event(background=True)
+    async def flush_qc_outbox(self):
+        """Envia o outbox local ao Supabase e atualiza o status de sincronização dos registros"""
+        async with self:
+            if self._qc_flush_running:
+                return
+            self._qc_flush_running = True
+        try:
+            await self._flush_qc_outbox_loop()
+        finally:
+            async with self:
+                self._qc_flush_running = False
+
+    async def _flush_qc_outbox_loop(self):
+        while True:
+            try:
+                await qc_outbox.flush()
+            except Exception as e:
+                logger.error(f"Erro ao sincronizar outbox: {e}")
+            async with self:
+                still_pending = self._refresh_qc_sync_status()
+            if not still_pending:
+                # Registros sincronizados entram nos KPIs do banco (e saem da contagem local)
+                try:
+                    kpis = await QCService.get_dashboard_kpis(force=True)
+                except Exception as e:
+                    logger.warning(f"KPIs do dashboard indisponíveis: {e}")
+                    return
+                async with self:
+                    self._apply_dashboard_kpis(kpis)
+                return
+            await asyncio.sleep(OUTBOX_FLUSH_INTERVAL_SECONDS)
+
+    def _update_quality_plan(self):
+        """Recalcula a tabela Sigma (cache por versão dos dados: sem mudanças, não recalcula)"""
+        try:
+            rows = quality_planner.plan(self.qc_records)
+        except Exception as e:
+            logger.error(f"Erro no planejamento da qualidade: {e}")
+            return
+        self.quality_plan = [
+            {
+                "exam_name": row["exam_name"],
+                "level": row["level"],
+                "n": str(row["n"]),
+                "bias": "-" if row["bias"] is None else f"{row['bias']:.2f}",
+                "cv": "-" if row["cv"] is None else f"{row['cv']:.2f}",
+                "tea": "-" if row["tea"] is None else f"{row['tea']:g}",
+                "sigma": "-" if row["sigma"] is None else f"{row['sigma']:.1f}",
+                "rules": " / ".join(row["rules"]),
+            }
+            for row in rows
+        ]
+
+    def _update_reagent_forecast(self):
+        """Validade, consumo previsto e ruptura de todos os lotes (cache diário por versão dos dados)"""
+        try:
+            rows = reagent_forecaster.forecast(self.reagent_lots, self.qc_records)
+        except Exception as e:
+            logger.error(f"Erro na previsão de reagentes: {e}")
+            return
+        for lot, row in zip(self.reagent_lots, rows):
+            lot.days_left = row["days_left"]
+            lot.days_to_rupture = row["days_to_rupture"]
+            lot.stockout_date = row["stockout_date"]
+            lot.forecast_daily_consumption = row["daily_rate"]
+            lot.expiry_waste = row["expiry_waste"]
+        self.reagent_lots = list(self.reagent_lots)
+        self.reagent_forecast = [
+            {
+                "name": f"{row['name']} {row['lot_number']}".strip(),
+                "detail": (
+                    f"Ruptura em {row['days_to_rupture']} dias ({row['stockout_date']}) · {row['daily_rate']:g}/dia"
+                    if row["days_to_rupture"] is not None and row["expiry_waste"] <= 0
+                    else f"Sobra prevista de {row['expiry_waste']:g} na validade ({row['days_left']} dias)"
+                ),
+                "severity": "error" if row["days_to_rupture"] is not None and row["days_to_rupture"] <= 5 else "warning",
+            }
+            for row in at_risk(rows)
+        ]
+
+    def _refresh_maintenance_schedule(self):
+        """Pendências de manutenção a partir do índice da agenda (sem varrer os registros)"""
+        today = datetime.now().date()
+        self.pending_maintenances = maintenance_scheduler.pending_count(today)
+        overdue = maintenance_scheduler.overdue(today)
+        due_soon = maintenance_scheduler.due_within(MAINTENANCE_DUE_SOON_DAYS, today)
+        self.maintenance_schedule = [
+            {
+                "equipment": m["equipment"],
+                "type": m["type"],
+                "next_date": m["next_date"],
+                "status": status,
+                "projected": "Sim" if m["projected"] else "",
+            }
+            for status, items in (("Vencida", overdue), ("A vencer", due_soon))
+            for m in items
+        ]
+        upcoming = maintenance_scheduler.next_upcoming(today)
+        self.next_maintenance = f"{upcoming['equipment']} — {upcoming['type']} em {upcoming['next_date']}" if upcoming else ""
+
+    def _refresh_qc_sync_status(self) -> bool:
+        """Atualiza sync_status dos registros locais; retorna True se ainda há pendências"""
+        unsynced = [r for r in self.qc_records if r.sync_status]
+        statuses = qc_outbox.statuses(r.id for r in unsynced)
+        changed = False
+        for r in unsynced:
+            status = statuses.get(r.id, STATUS_SYNCED)
+            new_status = "" if status == STATUS_SYNCED else status
+            if new_status != r.sync_status:
+                r.sync_status = new_status
+                qc_history_index.add_record(r)
+                changed = True
+        if changed:
+            self.qc_records = list(self.qc_records)
+        self.qc_outbox_pending = qc_outbox.pending_count()
+        return any(r.sync_status == STATUS_PENDING for r in self.qc_records)
+
+    async def _rebuild_drift_series(self, *changed: Optional[QCRecord]):
+        """Recria, fora do event loop, só os detectores de deriva das séries dos registros alterados"""
+        keys = {series_of(r.exam_name, r.level, r.lot_number, r.equipment) for r in changed if r is not None}
+        await self._update_drift(drift_detector.rebuild_series, list(self.qc_records), keys)
+
     async def delete_qc_record(self, id: str):
+        deleted = next((r for r in self.qc_records if r.id == id), None)
+        # Ainda no outbox: sai da fila antes que o flush o grave de volta no banco
+        qc_outbox.discard([id])
         # Deletar do banco de dados
         try:
             await QCService.delete_qc_record(id)
@@ -1194,6 +1379,11 @@ class QCState(OutrasAreasQCMixin, DashboardState):
             logger.error(f"Erro ao deletar do banco: {e}")
         # Remover da lista local
         self.qc_records = [r for r in self.qc_records if r.id != id]
+        qc_statistics.remove_record(id)
+        qc_history_index.remove_record(id)
+        alert_engine.publish(EVENT_QC_DELETED, id)
+        await self._rebuild_drift_series(deleted)
+        await self.load_dashboard_kpis(force=True)
 
     def open_clear_all_modal(self):
         """Abre modal de confirmação para limpar todos os registros"""
@@ -1206,6 +1396,7 @@ class QCState(OutrasAreasQCMixin, DashboardState):
     async def confirm_clear_all_qc_records(self):
         """Confirma e executa limpeza de todos os registros"""
         self.show_clear_all_modal = False
+        qc_outbox.clear("qc_records")
         errors = 0
         for record in self.qc_records:
             try:
@@ -1214,6 +1405,11 @@ class QCState(OutrasAreasQCMixin, DashboardState):
                 logger.error(f"Erro ao deletar registro {record.id}: {e}")
                 errors += 1
         self.qc_records = []
+        qc_statistics.rebuild([])
+        qc_history_index.rebuild([])
+        alert_engine.seed([], self.reagent_lots)
+        await self._update_drift(drift_detector.rebuild, [])
+        await self.load_dashboard_kpis(force=True)
         if errors > 0:
             self.qc_warning_message = f"Histórico limpo, mas {errors} registros falharam ao ser removidos do banco."
         else:
@@ -1292,9 +1488,16 @@ class QCState(OutrasAreasQCMixin, DashboardState):
             self.last_deleted_qc_record = deleted_record.dict()
 
         try:
-            success = await QCService.delete_qc_record(self.delete_qc_record_id)
+            # Registro só no outbox (ainda não sincronizado): excluir é tirá-lo da fila
+            discarded = qc_outbox.discard([self.delete_qc_record_id])
+            success = await QCService.delete_qc_record(self.delete_qc_record_id) or discarded
             if success:
                 self.qc_records = [r for r in self.qc_records if r.id != self.delete_qc_record_id]
+                qc_statistics.remove_record(self.delete_qc_record_id)
+                qc_history_index.remove_record(self.delete_qc_record_id)
+                alert_engine.publish(EVENT_QC_DELETED, self.delete_qc_record_id)
+                await self._rebuild_drift_series(deleted_record)
+                await self.load_dashboard_kpis(force=True)
                 self.close_delete_qc_record_modal()
                 yield rx.toast.info("Registro excluído. Use 'Desfazer' para restaurar.", duration=8000, position="bottom-right")
                 return
@@ -1337,6 +1540,8 @@ class QCState(OutrasAreasQCMixin, DashboardState):
                     value=float(record_data.get("value", 0)),
                     target_value=float(record_data.get("target_value", 0)),
                     target_sd=float(record_data.get("target_sd", 0)),
+                    equipment=record_data.get("equipment", ""),
+                    analyst=record_data.get("analyst", ""),
                     cv=float(record_data.get("cv", 0)),
                     cv_max_threshold=float(record_data.get("cv_max_threshold", 10.0)),
                     status=record_data.get("status", "OK"),
@@ -1345,8 +1550,11 @@ class QCState(OutrasAreasQCMixin, DashboardState):
                     needs_calibration=record_data.get("needs_calibration", False),
                     post_calibration_id=record_data.get("post_calibration_id", ""),
                 )
-                self.qc_records.append(restored)
-                self.qc_records = sorted(self.qc_records, key=lambda x: x.date, reverse=True)
+                self.qc_records.insert(desc_insert_position(self.qc_records, _record_date(restored), _record_date), restored)
+                qc_statistics.add_record(restored)
+                qc_history_index.add_record(restored)
+                alert_engine.publish(EVENT_QC_SAVED, restored)
+                await self._rebuild_drift_series(restored)
             self.last_deleted_qc_record = None
             yield rx.toast.success("Registro restaurado!", duration=3000, position="bottom-right")
         except Exception as e:
@@ -1588,14 +1796,23 @@ class QCState(OutrasAreasQCMixin, DashboardState):
         """Chamado pelo JS callback quando gravacao inicia/para"""
         _voice_ops.set_voice_recording(self, is_recording)
 
-    def receive_voice_audio(self, audio_base64: str):
-        """Recebe audio base64 do JS MediaRecorder callback"""
-        _voice_ops.receive_voice_audio(self, audio_base64)
-        return QCState.process_voice_audio
+    def start_voice_recording(self):
+        """Abre o spool de upload e inicia o MediaRecorder apontando para ele"""
+        script = _voice_ops.start_voice_recording(self)
+        return rx.call_script(script, callback=QCState.voice_recording_started)
+
+    def voice_recording_started(self, result: str):
+        """Callback do JS de inicio ("ok" ou "error:...")"""
+        _voice_ops.voice_recording_started(self, result)
+
+    def receive_voice_audio(self, result: str):
+        """Callback do JS de parada: blocos ja enviados ao spool, recebe o tipo MIME"""
+        if _voice_ops.receive_voice_audio(self, result):
+            return QCState.process_voice_audio
 
     async def process_voice_audio(self):
         """Envia audio ao Gemini e preenche campos do formulario"""
-        if not self.voice_audio_base64:
+        if not self._voice_audio_handle or not self._voice_audio_mime:
             self.voice_error_message = "Nenhum audio capturado. Tente novamente."
             return
         self.voice_is_processing = True
@@ -2336,8 +2553,27 @@ class QCState(OutrasAreasQCMixin, DashboardState):
                 "observacao": self.hqc_meas_observacao.strip() or None,
             }
 
-            result = await HematologyQCService.register_measurement(data)
+            # Grava no outbox local e tenta enviar já; se a rede falhar, sincroniza depois
+            entry_id = HematologyQCService.enqueue_measurement(data)
+            sync = await qc_outbox.submit(entry_id)
+            if sync == STATUS_FAILED:
+                raise ServiceError(qc_outbox.last_error(entry_id))
+            if sync != STATUS_SYNCED:
+                self.qc_outbox_pending = qc_outbox.pending_count()
+                self.hqc_meas_success = "Medição salva localmente — será sincronizada quando a conexão voltar."
+                self.hqc_meas_valor = ""
+                self.hqc_meas_observacao = ""
+                yield rx.toast.warning("Sem conexão: medição pendente de sincronização.", duration=6000, position="bottom-right")
+                yield QCState.flush_qc_outbox
+                return
+
+            result = qc_outbox.result(entry_id)
             self.hqc_last_result = result if isinstance(result, dict) else result
+            if isinstance(result, dict) and result.get("min_aplicado") is not None:
+                await self._update_drift(
+                    drift_detector.update_area_measurement, "hematologia", analito, data["data_medicao"], valor,
+                    result["min_aplicado"], result["max_aplicado"],
+                )
 
             status = result.get("status", "") if isinstance(result, dict) else "?"
             if status == "APROVADO":
@@ -0,0 +1,502 @@
+"""
+Conciliação COMPULAB × SIMUS (faturamento de exames por paciente).
+
+Motor vetorizado em pandas:
+- normalização de paciente/nome de exame feita uma vez por valor distinto;
+- valores convertidos para centavos inteiros (somas exatas, sem erro de float;
+  aceita "1.234,56" e "6,15");
+- pareamento por hash join em etapas: (paciente, código do exame), depois
+  (paciente, nome canônico) e, opcionalmente, similaridade de nome só entre as
+  sobras de cada paciente. Exames repetidos são pareados pela ordem de
+  ocorrência dentro da chave (cumcount), sem laços aninhados;
+- repetições detectadas por contagem agrupada.
+
+DataFrames de entrada usam as colunas Paciente, Nome_Exame, Codigo_Exame e Valor.
+Exportações grandes podem ser lidas em blocos com read_billing_export().
+"""
+import json
+import logging
+import os
+from decimal import Decimal
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .exam_name_index import _strip_accents, normalize_name, normalize_series
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["Paciente", "Nome_Exame", "Codigo_Exame", "Valor"]
+CHUNK_ROWS = 50_000
+# Diferença residual (R$) abaixo da qual a conciliação é considerada explicada
+RESIDUAL_TOLERANCE = 0.01
+
+
+# ── Normalização ──
+
+def normalize_patient(name: Any) -> str:
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return ""
+    return " ".join(_strip_accents(str(name)).upper().split())
+
+
+def normalize_exam_name(name: Any) -> str:
+    """Maiúsculas, sem acentos/pontuação e sem prefixos genéricos ("DOSAGEM DE", "PESQUISA DE"...)."""
+    return normalize_name(name)
+
+
+def normalize_code(code: Any) -> str:
+    if code is None or (isinstance(code, float) and np.isnan(code)):
+        return ""
+    text = str(code).strip()
+    return text[:-2] if text.endswith(".0") else text
+
+
+def normalize_synonyms(synonyms: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Chaves e valores no mesmo formato de normalize_exam_name."""
+    return {
+        normalize_exam_name(k): normalize_exam_name(v)
+        for k, v in (synonyms or {}).items()
+        if normalize_exam_name(k)
+    }
+
+
+def load_synonyms(source: Union[str, bytes, Dict[str, str], Iterable[Dict[str, str]], None]) -> Dict[str, str]:
+    """
+    Sinônimos a partir de JSON (texto ou caminho de arquivo), dict {original: canônico}
+    ou lista de {"original_name", "canonical_name"} (formato da tabela exam_mappings).
+    """
+    if source is None:
+        return {}
+    if isinstance(source, (str, bytes)):
+        text = source.decode() if isinstance(source, bytes) else source
+        if not text.lstrip().startswith(("[", "{")) and os.path.exists(text):
+            with open(text, encoding="utf-8") as f:
+                text = f.read()
+        source = json.loads(text)
+    if isinstance(source, dict):
+        return normalize_synonyms(source)
+    return normalize_synonyms({
+        item.get("original_name", ""): item.get("canonical_name", "")
+        for item in source
+        if item.get("original_name") and item.get("canonical_name")
+    })
+
+
+def map_to_canonical(name: Any, synonyms: Optional[Dict[str, str]] = None) -> str:
+    normalized = normalize_exam_name(name)
+    return (synonyms or {}).get(normalized, normalized)
+
+
+def to_cents(values: pd.Series) -> np.ndarray:
+    """Valores (números ou texto "1.234,56" / "6,15" / "3.45") em centavos inteiros."""
+    if pd.api.types.is_numeric_dtype(values):
+        numbers = values.astype(float)
+    else:
+        text = values.astype(str).str.strip().str.replace("R$", "", regex=False).str.strip()
+        brazilian = text.str.contains(",", regex=False)
+        text = text.where(~brazilian, text.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+        numbers = pd.to_numeric(text, errors="coerce")
+    return np.rint(numbers.fillna(0).to_numpy(dtype=float) * 100).astype(np.int64)
+
+
+def _money(cents: Union[int, np.integer]) -> float:
+    return float(Decimal(int(cents)) / 100)
+
+
+def _map_unique(series: pd.Series, func) -> pd.Series:
+    """Aplica `func` uma vez por valor distinto (nomes se repetem muito em faturamento)."""
+    uniques = pd.unique(series)
+    return series.map(dict(zip(uniques, (func(u) for u in uniques))))
+
+
+def prepare_billing(df: pd.DataFrame, synonyms: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Colunas de trabalho: _pac, _code, _canon (nome canônico) e _cents."""
+    if df is None:
+        df = pd.DataFrame(columns=COLUMNS)
+    out = df.reset_index(drop=True).copy()
+    for col in COLUMNS:
+        if col not in out.columns:
+            out[col] = "" if col != "Valor" else 0.0
+    out["_pac"] = _map_unique(out["Paciente"], normalize_patient)
+    out["_code"] = _map_unique(out["Codigo_Exame"], normalize_code)
+    normalized = normalize_series(out["Nome_Exame"])
+    out["_canon"] = normalized.map(synonyms).fillna(normalized) if synonyms else normalized
+    out["_cents"] = to_cents(out["Valor"])
+    return out
+
+
+def read_billing_export(source, synonyms: Optional[Dict[str, str]] = None, chunksize: int = CHUNK_ROWS,
+                        **read_csv_kwargs) -> pd.DataFrame:
+    """Lê um CSV de faturamento em blocos, normalizando cada bloco (memória limitada ao bloco)."""
+    read_csv_kwargs.setdefault("sep", None)
+    read_csv_kwargs.setdefault("engine", "python" if read_csv_kwargs["sep"] is None else "c")
+    read_csv_kwargs.setdefault("dtype", str)
+    chunks = [
+        prepare_billing(chunk, synonyms)
+        for chunk in pd.read_csv(source, chunksize=chunksize, **read_csv_kwargs)
+    ]
+    if not chunks:
+        return prepare_billing(None)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _prepared(df: pd.DataFrame, synonyms: Optional[Dict[str, str]]) -> pd.DataFrame:
+    return df if "_cents" in getattr(df, "columns", ()) else prepare_billing(df, synonyms)
+
+
+# ── Pareamento ──
+
+def _hash_join(comp: pd.DataFrame, sim: pd.DataFrame, keys: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pares (linha COMPULAB, linha SIMUS) com a mesma chave; repetições pareadas por ocorrência (valores iguais primeiro)."""
+    if comp.empty or sim.empty:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    left = comp.sort_values(keys + ["_cents"], kind="stable")
+    right = sim.sort_values(keys + ["_cents"], kind="stable")
+    left = left[keys].assign(_occ=left.groupby(keys, sort=False).cumcount().to_numpy(), _row=left.index.to_numpy())
+    right = right[keys].assign(_occ=right.groupby(keys, sort=False).cumcount().to_numpy(), _row=right.index.to_numpy())
+    merged = left.merge(right, on=keys + ["_occ"], how="inner", suffixes=("_c", "_s"))
+    return merged["_row_c"].to_numpy(dtype=np.int64), merged["_row_s"].to_numpy(dtype=np.int64)
+
+
+def _fuzzy_pairs(comp: pd.DataFrame, sim: pd.DataFrame, threshold: float) -> Tuple[List[int], List[int]]:
+    """Sobras do mesmo paciente com nomes parecidos (guloso pela maior similaridade)."""
+    pairs_c: List[int] = []
+    pairs_s: List[int] = []
+    sim_by_patient = {p: g for p, g in sim.groupby("_pac", sort=False)}
+    for patient, group in comp.groupby("_pac", sort=False):
+        candidates = sim_by_patient.get(patient)
+        if candidates is None:
+            continue
+        scored = sorted(
+            (
+                (SequenceMatcher(None, c_name, s_name).ratio(), c_row, s_row)
+                for c_row, c_name in zip(group.index, group["_canon"])
+                for s_row, s_name in zip(candidates.index, candidates["_canon"])
+            ),
+            reverse=True,
+        )
+        used_c, used_s = set(), set()
+        for score, c_row, s_row in scored:
+            if score < threshold:
+                break
+            if c_row in used_c or s_row in used_s:
+                continue
+            used_c.add(c_row)
+            used_s.add(s_row)
+            pairs_c.append(c_row)
+            pairs_s.append(s_row)
+    return pairs_c, pairs_s
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    return [
+        {"Paciente": p, "Nome_Exame": n, "Codigo_Exame": normalize_code(c), "Valor": _money(v)}
+        for p, n, c, v in zip(df["Paciente"], df["Nome_Exame"], df["Codigo_Exame"], df["_cents"])
+    ]
+
+
+def compare_exams(compulab_df: pd.DataFrame, simus_df: pd.DataFrame, synonyms: Optional[Dict[str, str]] = None,
+                  tolerance: float = 0.01, enable_fuzzy: bool = False, fuzzy_threshold: float = 0.90) -> Dict[str, Any]:
+    """
+    Concilia os dois faturamentos.
+
+    Returns:
+        {"summary": {...}, "missing_in_simus": [...], "missing_in_compulab": [...], "value_divergences": [...]}
+    """
+    comp = _prepared(compulab_df, synonyms)
+    sim = _prepared(simus_df, synonyms)
+
+    matched_c: List[np.ndarray] = []
+    matched_s: List[np.ndarray] = []
+
+    # 1. Código do exame (quando os dois lados têm)
+    c_rows, s_rows = _hash_join(comp[comp["_code"] != ""], sim[sim["_code"] != ""], ["_pac", "_code"])
+    matched_c.append(c_rows)
+    matched_s.append(s_rows)
+
+    # 2. Nome canônico, só para as sobras
+    rest_c = comp.drop(index=c_rows)
+    rest_s = sim.drop(index=s_rows)
+    c_rows, s_rows = _hash_join(rest_c, rest_s, ["_pac", "_canon"])
+    matched_c.append(c_rows)
+    matched_s.append(s_rows)
+    rest_c = rest_c.drop(index=c_rows)
+    rest_s = rest_s.drop(index=s_rows)
+
+    # 3. Similaridade de nome (opcional), só entre sobras do mesmo paciente
+    if enable_fuzzy and not rest_c.empty and not rest_s.empty:
+        c_list, s_list = _fuzzy_pairs(rest_c, rest_s, fuzzy_threshold)
+        matched_c.append(np.array(c_list, dtype=np.int64))
+        matched_s.append(np.array(s_list, dtype=np.int64))
+        rest_c = rest_c.drop(index=c_list)
+        rest_s = rest_s.drop(index=s_list)
+
+    pair_c = np.concatenate(matched_c)
+    pair_s = np.concatenate(matched_s)
+    cents_c = comp["_cents"].to_numpy()[pair_c]
+    cents_s = sim["_cents"].to_numpy()[pair_s]
+    diff = cents_c - cents_s
+    divergent = np.abs(diff) > int(round(tolerance * 100))
+
+    div_c = comp.iloc[pair_c[divergent]]
+    div_s = sim.iloc[pair_s[divergent]]
+    value_divergences = [
+        {
+            "Paciente": p,
+            "Nome_Exame": n,
+            "Nome_Exame_SIMUS": ns,
+            "Codigo_Exame": normalize_code(c) or normalize_code(cs),
+            "Valor_COMPULAB": _money(vc),
+            "Valor_SIMUS": _money(vs),
+            "Diferenca": _money(vc - vs),
+        }
+        for p, n, ns, c, cs, vc, vs in zip(
+            div_c["Paciente"], div_c["Nome_Exame"], div_s["Nome_Exame"], div_c["Codigo_Exame"],
+            div_s["Codigo_Exame"], div_c["_cents"], div_s["_cents"],
+        )
+    ]
+
+    missing_in_simus = _records(rest_c)
+    missing_in_compulab = _records(rest_s)
+    return {
+        "summary": {
+            "compulab_total": _money(comp["_cents"].sum()),
+            "simus_total": _money(sim["_cents"].sum()),
+            "matched_count": int(len(pair_c)),
+            "missing_in_simus_count": len(missing_in_simus),
+            "missing_in_simus_total": _money(rest_c["_cents"].sum()),
+            "missing_in_compulab_count": len(missing_in_compulab),
+            "missing_in_compulab_total": _money(rest_s["_cents"].sum()),
+            "value_divergences_count": len(value_divergences),
+            "divergences_total": _money(diff[divergent].sum()),
+        },
+        "missing_in_simus": missing_in_simus,
+        "missing_in_compulab": missing_in_compulab,
+        "value_divergences": value_divergences,
+    }
+
+
+# ── Análise profunda ──
+
+def _patient_totals(df: pd.DataFrame, patients: pd.Index) -> List[Dict[str, Any]]:
+    subset = df[df["_pac"].isin(patients)]
+    grouped = subset.groupby("_pac", sort=True).agg(
+        Paciente=("Paciente", "first"), exams_count=("_cents", "size"), cents=("_cents", "sum"),
+    )
+    grouped = grouped.sort_values("cents", ascending=False, kind="stable")
+    return [
+        {"patient": p, "exams_count": int(n), "value": _money(c)}
+        for p, n, c in zip(grouped["Paciente"], grouped["exams_count"], grouped["cents"])
+    ]
+
+
+def analyze_patient_count_difference(compulab_df: pd.DataFrame, simus_df: pd.DataFrame,
+                                     synonyms: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Pacientes presentes em só um dos sistemas e o valor faturado para eles."""
+    comp = _prepared(compulab_df, synonyms)
+    sim = _prepared(simus_df, synonyms)
+    comp_patients = pd.Index(pd.unique(comp.loc[comp["_pac"] != "", "_pac"]))
+    sim_patients = pd.Index(pd.unique(sim.loc[sim["_pac"] != "", "_pac"]))
+    only_comp = comp_patients.difference(sim_patients)
+    only_sim = sim_patients.difference(comp_patients)
+    extra_comp = _patient_totals(comp, only_comp)
+    extra_sim = _patient_totals(sim, only_sim)
+    return {
+        "compulab_count": int(len(comp_patients)),
+        "simus_count": int(len(sim_patients)),
+        "difference": int(len(comp_patients) - len(sim_patients)),
+        "extra_patients_compulab": extra_comp,
+        "extra_patients_simus": extra_sim,
+        "extra_patients_count": len(extra_comp),
+        "extra_patients_value": _money(comp.loc[comp["_pac"].isin(only_comp), "_cents"].sum()),
+        "extra_patients_simus_count": len(extra_sim),
+        "extra_patients_simus_value": _money(sim.loc[sim["_pac"].isin(only_sim), "_cents"].sum()),
+        "has_extra_in_compulab": len(extra_comp) > 0,
+        "has_extra_in_simus": len(extra_sim) > 0,
+    }
+
+
+def _repeated(df: pd.DataFrame) -> Tuple[List[Dict[str, Any]], int, int, int]:
+    """Exames lançados mais de uma vez para o mesmo paciente (chave: código, ou nome canônico sem código)."""
+    if df.empty:
+        return [], 0, 0, 0
+    exam_key = df["_code"].where(df["_code"] != "", "N:" + df["_canon"])
+    occurrence = df.groupby([df["_pac"], exam_key], sort=False).cumcount()
+    extras = df[occurrence.to_numpy() > 0]
+    if extras.empty:
+        return [], 0, 0, 0
+    extras_key = exam_key[extras.index]
+    grouped = extras.groupby([extras["_pac"], extras_key], sort=False).agg(
+        Paciente=("Paciente", "first"), Nome_Exame=("Nome_Exame", "first"), Codigo_Exame=("Codigo_Exame", "first"),
+        canon=("_canon", "first"), extra_count=("_cents", "size"), cents=("_cents", "sum"),
+    )
+    items = [
+        {
+            "Paciente": p, "Nome_Exame": n, "Codigo_Exame": normalize_code(c),
+            "occurrences": int(k) + 1, "extra_count": int(k), "extra_value": _money(v),
+        }
+        for p, n, c, k, v in zip(grouped["Paciente"], grouped["Nome_Exame"], grouped["Codigo_Exame"],
+                                 grouped["extra_count"], grouped["cents"])
+    ]
+    return items, int(grouped["canon"].nunique()), int(len(extras)), int(extras["_cents"].sum())
+
+
+def detect_repeated_exams(compulab_df: pd.DataFrame, simus_df: pd.DataFrame,
+                          synonyms: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Repetições dentro de cada sistema; conta e valora só as ocorrências excedentes."""
+    comp_items, comp_types, comp_count, comp_cents = _repeated(_prepared(compulab_df, synonyms))
+    sim_items, sim_types, sim_count, sim_cents = _repeated(_prepared(simus_df, synonyms))
+    return {
+        "has_repeated": bool(comp_items or sim_items),
+        "total_types": comp_types + sim_types,
+        "total_repeated_count": comp_count + sim_count,
+        "total_repeated_value": _money(comp_cents + sim_cents),
+        "compulab_repeated": comp_items,
+        "compulab_repeated_count": comp_count,
+        "compulab_repeated_value": _money(comp_cents),
+        "simus_repeated": sim_items,
+        "simus_repeated_count": sim_count,
+        "simus_repeated_value": _money(sim_cents),
+    }
+
+
+def _brl(value: float) -> str:
+    text = f"{abs(value):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return f"{'-' if value < 0 else ''}R$ {text}"
+
+
+def calculate_difference_breakdown(compulab_total: float, simus_total: float, analysis_results: Dict[str, Any],
+                                   repeated_analysis: Dict[str, Any], patient_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Decompõe a diferença bruta (COMPULAB − SIMUS) em componentes explicados:
+    pacientes só no COMPULAB, exames ausentes no SIMUS de pacientes comuns, repetições,
+    divergências de valor e (subtraindo) exames só no SIMUS. O restante é o resíduo.
+    """
+    summary = (analysis_results or {}).get("summary", {})
+    d = lambda v: Decimal(str(v or 0))  # noqa: E731 — somas em Decimal, sem erro de float
+
+    gross = d(compulab_total) - d(simus_total)
+    extra_patients = d(patient_analysis.get("extra_patients_value"))
+    if "compulab_repeated_value" in repeated_analysis:
+        repeated = d(repeated_analysis["compulab_repeated_value"]) - d(repeated_analysis.get("simus_repeated_value"))
+    else:
+        repeated = d(repeated_analysis.get("total_repeated_value"))
+    missing_common = max(d(summary.get("missing_in_simus_total")) - extra_patients - max(repeated, Decimal(0)), Decimal(0))
+    divergences = d(summary.get("divergences_total"))
+    only_simus = d(summary.get("missing_in_compulab_total"))
+
+    explained = extra_patients + missing_common + repeated + divergences - only_simus
+    residual = gross - explained
+    if gross != 0:
+        percent = float(explained / gross * 100)
+    else:
+        percent = 100.0 if explained == 0 else 0.0
+
+    components = {
+        "extra_patients": {"label": "Pacientes apenas COMPULAB", "value": float(extra_patients)},
+        "missing_exams": {"label": "Exames ausentes no SIMUS (pacientes comuns)", "value": float(missing_common)},
+        "repeated_exams": {"label": "Exames repetidos", "value": float(repeated)},
+        "value_divergences": {"label": "Divergências de valor", "value": float(divergences)},
+        "missing_in_compulab": {"label": "Exames apenas no SIMUS", "value": float(-only_simus)},
+    }
+    steps = [f"Diferença Bruta (COMPULAB − SIMUS): {_brl(float(gross))}"]
+    steps += [f"(−) {c['label']}: {_brl(c['value'])}" for c in components.values()]
+    steps.append(f"(=) Resíduo não explicado: {_brl(float(residual))}")
+
+    return {
+        "gross_difference": float(gross),
+        "explained_components": components,
+        "total_explained": float(explained),
+        "residual": float(residual),
+        "percent_explained": round(percent, 2),
+        "is_fully_explained": abs(residual) <= Decimal(str(RESIDUAL_TOLERANCE)),
+        "formula_steps": steps,
+    }
+
+
+def generate_executive_summary(compulab_total: float, simus_total: float, patient_analysis: Dict[str, Any],
+                               repeated_analysis: Dict[str, Any], difference_breakdown: Dict[str, Any]) -> Dict[str, Any]:
+    """Status (ok / warning / critical), métricas-chave, achados e ações priorizadas."""
+    net = float(Decimal(str(compulab_total or 0)) - Decimal(str(simus_total or 0)))
+    percent = round(net / simus_total * 100, 2) if simus_total else (100.0 if net else 0.0)
+    extra_count = int(patient_analysis.get("extra_patients_count", 0) or 0)
+    extra_value = float(patient_analysis.get("extra_patients_value", 0) or 0)
+    repeated_count = int(repeated_analysis.get("total_repeated_count", 0) or 0)
+    repeated_value = float(repeated_analysis.get("total_repeated_value", 0) or 0)
+    residual = float(difference_breakdown.get("residual", 0) or 0)
+    explained_pct = float(difference_breakdown.get("percent_explained", 0) or 0)
+    fully_explained = bool(difference_breakdown.get("is_fully_explained", False))
+
+    if abs(percent) <= 1.0:
+        status = "ok"
+    elif abs(percent) <= 5.0 or fully_explained:
+        status = "warning"
+    else:
+        status = "critical"
+
+    findings: List[str] = []
+    actions: List[Dict[str, Any]] = []
+    if extra_count:
+        findings.append(f"{extra_count} pacientes faturados apenas no COMPULAB ({_brl(extra_value)}).")
+        actions.append({"priority": "alta", "action": "Lançar no SIMUS os pacientes ausentes", "value": extra_value})
+    if repeated_count:
+        findings.append(f"{repeated_count} exames lançados em duplicidade ({_brl(repeated_value)}).")
+        actions.append({"priority": "alta", "action": "Revisar e estornar exames repetidos", "value": repeated_value})
+    if not fully_explained and abs(residual) > RESIDUAL_TOLERANCE:
+        findings.append(f"Resíduo não explicado de {_brl(residual)} ({explained_pct:.1f}% da diferença explicada).")
+        actions.append({"priority": "media", "action": "Auditar manualmente o resíduo não explicado", "value": residual})
+    actions.sort(key=lambda a: abs(a["value"]), reverse=True)
+
+    recommendations = [a["action"] for a in actions] or ["Faturamentos conciliados; nenhuma ação necessária."]
+    text = (
+        f"COMPULAB {_brl(float(compulab_total or 0))} × SIMUS {_brl(float(simus_total or 0))}: "
+        f"diferença de {_brl(net)} ({percent:.1f}%), {explained_pct:.1f}% explicada."
+    )
+    return {
+        "status": status,
+        "executive_summary": text,
+        "key_metrics": {
+            "faturamento_compulab": float(compulab_total or 0),
+            "faturamento_simus": float(simus_total or 0),
+            "diferenca_liquida": net,
+            "diferenca_percentual": percent,
+            "pacientes_extras": extra_count,
+            "valor_pacientes_extras": extra_value,
+            "exames_repetidos": repeated_count,
+            "valor_exames_repetidos": repeated_value,
+            "residuo": residual,
+            "percentual_explicado": explained_pct,
+        },
+        "critical_findings": findings,
+        "recommendations": recommendations,
+        "action_items": actions,
+    }
+
+
+def run_deep_analysis(compulab_df: pd.DataFrame, simus_df: pd.DataFrame, compulab_total: Optional[float] = None,
+                      simus_total: Optional[float] = None, analysis_results: Optional[Dict[str, Any]] = None,
+                      synonyms: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Fluxo completo; prepara os DataFrames uma vez e reaproveita em todas as etapas."""
+    comp = _prepared(compulab_df, synonyms)
+    sim = _prepared(simus_df, synonyms)
+    if analysis_results is None:
+        analysis_results = compare_exams(comp, sim, synonyms)
+    if compulab_total is None:
+        compulab_total = _money(comp["_cents"].sum())
+    if simus_total is None:
+        simus_total = _money(sim["_cents"].sum())
+
+    patient_analysis = analyze_patient_count_difference(comp, sim)
+    repeated = detect_repeated_exams(comp, sim)
+    breakdown = calculate_difference_breakdown(compulab_total, simus_total, analysis_results, repeated, patient_analysis)
+    summary = generate_executive_summary(compulab_total, simus_total, patient_analysis, repeated, breakdown)
+    return {
+        "patient_analysis": patient_analysis,
+        "repeated_exams": repeated,
+        "difference_breakdown": breakdown,
+        "executive_summary": summary,
+        "analysis_results": analysis_results,
+    }
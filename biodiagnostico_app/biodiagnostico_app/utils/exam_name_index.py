@@ -0,0 +1,135 @@
+"""
+Índice de nomes de exames: normalização compilada + sinônimos + busca aproximada.
+
+- Regras de normalização (acentos, pontuação, prefixos genéricos como
+  "DOSAGEM DE" / "PESQUISA LABORATORIAL DE") compiladas uma vez no import;
+- LRU limitado para nomes quentes e API em lote que normaliza uma coluna
+  pandas inteira aplicando as regras só uma vez por valor distinto;
+- mapa exato nome normalizado -> nome canônico e índice de trigramas de
+  caracteres para o fallback aproximado (só compara candidatos que
+  compartilham trigramas, sem varrer todos os sinônimos).
+"""
+import os
+import re
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+EXAM_NAME_CACHE_SIZE = int(os.environ.get("EXAM_NAME_CACHE_SIZE", "8192"))
+FUZZY_THRESHOLD = 0.90
+NGRAM = 3
+
+_GENERIC_PREFIX = re.compile(
+    r"^(?:DOSAGEM|DETERMINACAO|PESQUISA|EXAME|ANALISE|TESTE|AVALIACAO|QUANTIFICACAO)"
+    r"(?: LABORATORIAL)?(?: (?:DE|DA|DO|DAS|DOS))? "
+)
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+
+def _strip_accents(text: str) -> str:
+    if text.isascii():
+        return text
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+
+
+def _normalize(name: str) -> str:
+    text = _NON_ALNUM.sub(" ", _strip_accents(name).upper()).strip()
+    stripped = _GENERIC_PREFIX.sub("", text + " ", count=1).strip()
+    return stripped or text
+
+
+@lru_cache(maxsize=EXAM_NAME_CACHE_SIZE)
+def _normalize_cached(name: str) -> str:
+    return _normalize(name)
+
+
+def normalize_name(name: Any) -> str:
+    """"Dosagem de Glicemia em Jejum" -> "GLICEMIA EM JEJUM"; "G-O-T" -> "G O T"."""
+    if name is None or (isinstance(name, float) and name != name):
+        return ""
+    return _normalize_cached(str(name))
+
+
+def normalize_series(names: pd.Series) -> pd.Series:
+    """Normaliza uma coluna inteira: fatoriza e aplica as regras uma vez por valor distinto."""
+    codes, uniques = pd.factorize(names, use_na_sentinel=True)
+    normalized = [normalize_name(u) for u in uniques]
+    normalized.append("")  # sentinela -1 (NaN/None)
+    return pd.Series(pd.Index(normalized).take(codes).to_numpy(dtype=object), index=names.index, name=names.name)
+
+
+def _ngrams(text: str) -> Set[str]:
+    padded = f" {text} "
+    return {padded[i:i + NGRAM] for i in range(max(len(padded) - NGRAM + 1, 1))}
+
+
+class ExamNameIndex:
+    """Sinônimos (nome original -> canônico) com busca exata e aproximada."""
+
+    def __init__(self, synonyms: Optional[Dict[str, str]] = None):
+        self._exact: Dict[str, str] = {}
+        self._keys: List[str] = []
+        self._grams: Dict[str, List[int]] = {}
+        if synonyms:
+            self.update(synonyms)
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def update(self, synonyms: Dict[str, str]):
+        """Adiciona/atualiza sinônimos. O próprio nome canônico também vira chave."""
+        for original, canonical in synonyms.items():
+            canonical = (canonical or "").strip()
+            if not canonical:
+                continue
+            for key in (normalize_name(original), normalize_name(canonical)):
+                if not key:
+                    continue
+                if key not in self._exact:
+                    self._keys.append(key)
+                    for gram in _ngrams(key):
+                        self._grams.setdefault(gram, []).append(len(self._keys) - 1)
+                if key == normalize_name(original) or key not in self._exact:
+                    self._exact[key] = canonical
+
+    def exact(self, name: Any) -> Optional[str]:
+        return self._exact.get(normalize_name(name))
+
+    def fuzzy(self, name: Any, threshold: float = FUZZY_THRESHOLD, candidates: int = 8) -> Optional[Tuple[str, float]]:
+        """Canônico mais parecido (razão do SequenceMatcher) entre as chaves que mais compartilham trigramas."""
+        key = normalize_name(name)
+        if not key or not self._keys:
+            return None
+        shared = Counter(i for gram in _ngrams(key) for i in self._grams.get(gram, ()))
+        best: Optional[Tuple[str, float]] = None
+        for i, _ in shared.most_common(candidates):
+            score = SequenceMatcher(None, key, self._keys[i]).ratio()
+            if score >= threshold and (best is None or score > best[1]):
+                best = (self._exact[self._keys[i]], score)
+        return best
+
+    def lookup(self, name: Any, fuzzy: bool = False, threshold: float = FUZZY_THRESHOLD) -> Optional[str]:
+        found = self.exact(name)
+        if found is None and fuzzy:
+            match = self.fuzzy(name, threshold)
+            found = match[0] if match else None
+        return found
+
+    def canonical_series(self, names: pd.Series, fuzzy: bool = False,
+                         threshold: float = FUZZY_THRESHOLD) -> pd.Series:
+        """Canônico de cada nome da coluna; sem sinônimo, devolve o nome normalizado."""
+        normalized = normalize_series(names)
+        mapped = normalized.map(self._exact)
+        if fuzzy:
+            missing = pd.unique(normalized[mapped.isna() & (normalized != "")])
+            found = {k: m[0] for k in missing if (m := self.fuzzy(k, threshold))}
+            if found:
+                mapped = mapped.fillna(normalized.map(found))
+        return mapped.fillna(normalized)
+
+    def items(self) -> Iterable[Tuple[str, str]]:
+        return self._exact.items()
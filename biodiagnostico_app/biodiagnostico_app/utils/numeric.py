@@ -6,6 +6,8 @@ Utilitários de conversão numérica para locale brasileiro.
 def parse_decimal(value, default: float = 0.0) -> float:
     """Converte string para float, tratando vírgula brasileira como separador decimal.
 
+    Com vírgula presente, pontos são separadores de milhar ("1.234,5" -> 1234.5).
+
     Args:
         value: Valor a converter (str, int, float ou None).
         default: Valor retornado se a conversão falhar.
@@ -19,7 +21,10 @@ def parse_decimal(value, default: float = 0.0) -> float:
         return float(value)
     if not isinstance(value, str) or not value.strip():
         return default
+    text = value.strip()
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
     try:
-        return float(value.strip().replace(",", "."))
+        return float(text)
     except (ValueError, TypeError):
         return default
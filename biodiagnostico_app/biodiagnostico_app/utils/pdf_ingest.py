@@ -0,0 +1,282 @@
+"""
+Leitura de relatórios de faturamento COMPULAB / SIMUS em PDF.
+
+Pipeline em streaming com memória limitada:
+- as páginas são extraídas sob demanda, em lotes, por um pool de processos
+  (cada worker abre o arquivo e lê só as páginas do seu lote);
+- no máximo 2 lotes por worker ficam em voo, e os resultados são consumidos
+  em ordem, então o uso de memória não cresce com o tamanho do relatório;
+- uma página corrompida ou ilegível vira um erro no relatório de ingestão
+  (com o número da página) sem derrubar as demais;
+- as linhas seguem direto para o DataFrame da conciliação
+  (analysis_module.prepare_billing) ou para uma planilha XLSX em modo write-only.
+
+A biblioteca de PDF é opcional: usa pdfplumber ou pypdf, o que estiver
+instalado. Arquivos .txt (saída do `pdftotext -layout`, páginas separadas por
+form feed) são lidos sem dependência extra.
+"""
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Pattern, Tuple
+
+import pandas as pd
+
+from .analysis_module import COLUMNS, prepare_billing
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "0")) or (os.cpu_count() or 1)
+PDF_BATCH_PAGES = int(os.environ.get("PDF_BATCH_PAGES", "16"))
+
+# Cabeçalho de paciente e linha de exame ("202020380  HEMOGRAMA COMPLETO   4,11")
+PATIENT_PATTERN = re.compile(r"^\s*(?:PACIENTE|NOME(?: DO PACIENTE)?)\s*[:\-]?\s*(?P<name>\D.*?)\s*$", re.IGNORECASE)
+EXAM_PATTERN = re.compile(
+    r"^\s*(?P<code>\d{4,12})\s+(?P<name>.+?)\s+(?:R\$\s*)?(?P<value>-?(?:\d{1,3}(?:\.\d{3})+|\d+),\d{2})\s*$"
+)
+
+Row = Tuple[int, Optional[str], str, str, str]  # (página, paciente, código, exame, valor)
+
+
+@dataclass
+class PageError:
+    page: int
+    error: str
+
+
+@dataclass
+class PdfIngestReport:
+    path: str
+    pages_total: int = 0
+    pages_ok: int = 0
+    rows: int = 0
+    errors: List[PageError] = field(default_factory=list)
+
+    @property
+    def has_errors(self) -> bool:
+        return bool(self.errors)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "pages_total": self.pages_total,
+            "pages_ok": self.pages_ok,
+            "rows": self.rows,
+            "errors": [{"page": e.page, "error": e.error} for e in self.errors],
+        }
+
+
+# ── Backends de extração (importados só quando usados) ──
+
+class _TextBackend:
+    """Texto já extraído: páginas separadas por form feed (\\f)."""
+
+    def open(self, path: str):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read().split("\f")
+
+    def page_count(self, doc) -> int:
+        return len(doc)
+
+    def page_text(self, doc, index: int) -> str:
+        return doc[index]
+
+    def close(self, doc):
+        pass
+
+
+class _PdfPlumberBackend:
+    def open(self, path: str):
+        import pdfplumber
+        return pdfplumber.open(path)
+
+    def page_count(self, doc) -> int:
+        return len(doc.pages)
+
+    def page_text(self, doc, index: int) -> str:
+        page = doc.pages[index]
+        try:
+            return page.extract_text() or ""
+        finally:
+            # Libera o cache de objetos da página (memória constante)
+            if hasattr(page, "close"):
+                page.close()
+
+    def close(self, doc):
+        doc.close()
+
+
+class _PyPdfBackend:
+    def open(self, path: str):
+        from pypdf import PdfReader
+        return PdfReader(path)
+
+    def page_count(self, doc) -> int:
+        return len(doc.pages)
+
+    def page_text(self, doc, index: int) -> str:
+        return doc.pages[index].extract_text() or ""
+
+    def close(self, doc):
+        pass
+
+
+BACKENDS = {"text": _TextBackend, "pdfplumber": _PdfPlumberBackend, "pypdf": _PyPdfBackend}
+
+
+def resolve_backend(path: str, backend: str = "auto") -> str:
+    if backend != "auto":
+        return backend
+    if path.lower().endswith(".txt"):
+        return "text"
+    for name, module in (("pdfplumber", "pdfplumber"), ("pypdf", "pypdf")):
+        try:
+            __import__(module)
+            return name
+        except ImportError:
+            continue
+    raise ImportError("Leitura de PDF requer 'pdfplumber' ou 'pypdf' (pip install pdfplumber).")
+
+
+# ── Parsing ──
+
+def parse_page(text: str, page: int, patient_pattern: Pattern = PATIENT_PATTERN,
+               exam_pattern: Pattern = EXAM_PATTERN) -> Tuple[List[Row], Optional[str]]:
+    """
+    Linhas de exame de uma página. Exames antes do primeiro cabeçalho de paciente
+    ficam sem paciente (continuação da página anterior) e são resolvidos na junção.
+
+    Returns:
+        (linhas, último paciente visto na página)
+    """
+    rows: List[Row] = []
+    patient: Optional[str] = None
+    for line in (text or "").splitlines():
+        exam = exam_pattern.match(line)
+        if exam:
+            rows.append((page, patient, exam["code"], exam["name"].strip(), exam["value"]))
+            continue
+        header = patient_pattern.match(line)
+        if header:
+            patient = header["name"]
+    return rows, patient
+
+
+def _parse_batch(path: str, backend: str, pages: List[int]) -> List[Tuple[int, List[Row], Optional[str], Optional[str]]]:
+    """Worker: abre o arquivo e processa só as páginas do lote; erro de página fica isolado."""
+    reader = BACKENDS[backend]()
+    results = []
+    doc = reader.open(path)
+    try:
+        for index in pages:
+            try:
+                rows, last_patient = parse_page(reader.page_text(doc, index), index + 1)
+                results.append((index + 1, rows, last_patient, None))
+            except Exception as e:
+                results.append((index + 1, [], None, f"{type(e).__name__}: {e}"))
+    finally:
+        reader.close(doc)
+    return results
+
+
+def _page_count(path: str, backend: str) -> int:
+    reader = BACKENDS[backend]()
+    doc = reader.open(path)
+    try:
+        return reader.page_count(doc)
+    finally:
+        reader.close(doc)
+
+
+def _pool_context():
+    # fork evita reimportar o app inteiro em cada worker
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else None)
+
+
+def iter_pdf_rows(path: str, report: Optional[PdfIngestReport] = None, backend: str = "auto",
+                  workers: Optional[int] = None, batch_pages: int = PDF_BATCH_PAGES) -> Iterator[pd.DataFrame]:
+    """
+    Gera um DataFrame (Paciente, Nome_Exame, Codigo_Exame, Valor, Pagina) por lote de páginas,
+    em ordem. `workers=0` processa no próprio processo.
+    """
+    report = report if report is not None else PdfIngestReport(path=path)
+    backend = resolve_backend(path, backend)
+    try:
+        total = _page_count(path, backend)
+    except Exception as e:
+        report.errors.append(PageError(page=0, error=f"Arquivo ilegível: {type(e).__name__}: {e}"))
+        return
+    report.pages_total = total
+    batches = [list(range(i, min(i + batch_pages, total))) for i in range(0, total, batch_pages)]
+    workers = PDF_WORKERS if workers is None else workers
+    current_patient: Optional[str] = None
+
+    def consume(results) -> pd.DataFrame:
+        nonlocal current_patient
+        batch_rows = []
+        for page, rows, last_patient, error in results:
+            if error:
+                logger.warning(f"{path}: página {page} ignorada ({error})")
+                report.errors.append(PageError(page=page, error=error))
+                continue
+            report.pages_ok += 1
+            for _, patient, code, name, value in rows:
+                if patient is not None:
+                    current_patient = patient
+                batch_rows.append((current_patient or "", name, code, value, page))
+            current_patient = last_patient or current_patient
+        report.rows += len(batch_rows)
+        return pd.DataFrame(batch_rows, columns=COLUMNS + ["Pagina"])
+
+    if workers <= 1 or len(batches) <= 1:
+        for pages in batches:
+            yield consume(_parse_batch(path, backend, pages))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        in_flight = []
+        pending = iter(batches)
+        for pages in pending:
+            in_flight.append(pool.submit(_parse_batch, path, backend, pages))
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            future = in_flight.pop(0)
+            next_pages = next(pending, None)
+            if next_pages is not None:
+                in_flight.append(pool.submit(_parse_batch, path, backend, next_pages))
+            yield consume(future.result())
+
+
+def pdf_to_dataframe(path: str, synonyms: Optional[Dict[str, str]] = None, **kwargs) -> Tuple[pd.DataFrame, PdfIngestReport]:
+    """DataFrame pronto para compare_exams/run_deep_analysis (normalizado lote a lote)."""
+    report = PdfIngestReport(path=path)
+    chunks = [prepare_billing(chunk, synonyms) for chunk in iter_pdf_rows(path, report, **kwargs)]
+    df = pd.concat(chunks, ignore_index=True) if chunks else prepare_billing(None)
+    logger.info(f"{path}: {report.rows} linhas de {report.pages_ok}/{report.pages_total} páginas")
+    return df, report
+
+
+def pdf_to_xlsx(path: str, output, **kwargs) -> PdfIngestReport:
+    """Converte o relatório em planilha (write-only, linha a linha); páginas com erro vão para outra aba."""
+    from openpyxl import Workbook
+
+    report = PdfIngestReport(path=path)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Exames")
+    ws.append(["Paciente", "Nome do Exame", "Código", "Valor", "Página"])
+    for chunk in iter_pdf_rows(path, report, **kwargs):
+        values = prepare_billing(chunk[COLUMNS])["_cents"].to_numpy() / 100
+        for (patient, name, code, _, page), value in zip(chunk.itertuples(index=False), values):
+            ws.append([patient, name, code, float(value), int(page)])
+    if report.errors:
+        errors = wb.create_sheet("Páginas com erro")
+        errors.append(["Página", "Erro"])
+        for e in report.errors:
+            errors.append([e.page, e.error])
+    wb.save(output)
+    return report
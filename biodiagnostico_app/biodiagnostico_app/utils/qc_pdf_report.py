@@ -12,7 +12,13 @@ from io import BytesIO
 from typing import Optional, List, Dict, Any
 from ..styles import Color
 
-def generate_qc_pdf(qc_records: list, period_description: str, post_calibration_records: Optional[list] = None) -> bytes:
+def generate_qc_pdf(
+    qc_records: list,
+    period_description: str,
+    post_calibration_records: Optional[list] = None,
+    monthly_summary: Optional[List[Dict[str, Any]]] = None,
+    quality_plan: Optional[List[Dict[str, Any]]] = None,
+) -> bytes:
     """
     Gera PDF com tabelas de Controle de Qualidade
     
@@ -20,6 +26,8 @@ def generate_qc_pdf(qc_records: list, period_description: str, post_calibration_
         qc_records: Lista de dicionários ou objetos QCRecord
         period_description: Descrição do período (ex: "Janeiro 2024")
         post_calibration_records: Lista de registros de pos-calibracao (opcional)
+        monthly_summary: Resumo por exame/nível/mês (opcional)
+        quality_plan: Tabela Sigma por exame/nível, pior primeiro (opcional)
         
     Returns:
         bytes: Conteúdo do PDF em bytes
@@ -154,6 +162,71 @@ def generate_qc_pdf(qc_records: list, period_description: str, post_calibration_
         ]))
         
         story.append(table)
+
+        if monthly_summary:
+            story.append(Spacer(1, 0.8*cm))
+            story.append(Paragraph("Resumo Mensal por Exame/Nível", styles['Heading2']))
+            summary_data = [['Mês', 'Exame', 'Nível', 'N', 'Média', 'DP', 'CV%', 'CV% médio', 'Aprovação %']]
+            for row in monthly_summary:
+                summary_data.append([
+                    row.get('month', ''),
+                    row.get('exam_name', ''),
+                    row.get('level', ''),
+                    str(row.get('n', 0)),
+                    f"{row.get('mean_value', 0):.2f}",
+                    f"{row.get('sd', 0):.2f}",
+                    f"{row.get('cv_pct', 0):.2f}",
+                    f"{row.get('mean_cv', 0):.2f}",
+                    f"{row.get('approval_rate', 0):.1f}",
+                ])
+            summary_table = Table(
+                summary_data,
+                colWidths=[2.2*cm, 6.0*cm, 2.2*cm, 1.6*cm, 2.6*cm, 2.4*cm, 2.2*cm, 2.6*cm, 2.8*cm],
+                repeatRows=1,
+            )
+            summary_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(Color.SECONDARY)),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('ALIGN', (3, 1), (-1, -1), 'RIGHT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 9),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor(Color.BACKGROUND)]),
+            ]))
+            story.append(summary_table)
+
+        if quality_plan:
+            story.append(Spacer(1, 0.8*cm))
+            story.append(Paragraph("Planejamento da Qualidade (Sigma)", styles['Heading2']))
+            plan_data = [['Exame', 'Nível', 'N', 'Bias %', 'CV %', 'TEa %', 'Sigma', 'Regras Recomendadas']]
+            for row in quality_plan:
+                plan_data.append([
+                    row.get('exam_name', ''),
+                    row.get('level', ''),
+                    str(row.get('n', 0)),
+                    '-' if row.get('bias') is None else f"{row['bias']:.2f}",
+                    '-' if row.get('cv') is None else f"{row['cv']:.2f}",
+                    '-' if row.get('tea') is None else f"{row['tea']:g}",
+                    '-' if row.get('sigma') is None else f"{row['sigma']:.1f}",
+                    ' / '.join(row.get('rules', [])),
+                ])
+            plan_table = Table(
+                plan_data,
+                colWidths=[5.5*cm, 2.2*cm, 1.6*cm, 2.2*cm, 2.2*cm, 2.2*cm, 2.0*cm, 7.0*cm],
+                repeatRows=1,
+            )
+            plan_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(Color.SECONDARY)),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('ALIGN', (2, 1), (6, -1), 'RIGHT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 9),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor(Color.BACKGROUND)]),
+            ]))
+            story.append(plan_table)
         
         # Rodapé com total
         story.append(Spacer(1, 1*cm))
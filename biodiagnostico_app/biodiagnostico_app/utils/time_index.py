@@ -0,0 +1,109 @@
+"""
+Índice temporal de registros: chaves de data ISO ordenadas + mapa dia -> IDs.
+
+- chaves ("AAAA-MM-DD..." ou "AAAA-MM-DDTHH:MM:SS...") em lista ordenada,
+  mantida com bisect/insort: intervalo, prefixo (dia/mês/ano) e "depois de"
+  em O(log n + k)
+- dias com registro em lista ordenada, para saltar ao próximo/anterior dia
+  com dados sem percorrer o calendário
+- desc_insert_position: posição de um novo registro em uma lista ordenada do
+  mais recente ao mais antigo (como QCState.qc_records), sem reordenar tudo
+"""
+import bisect
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Maior que qualquer caractere de uma data ISO: limite superior de prefixo
+_PREFIX_END = "\uffff"
+
+
+def desc_insert_position(items: List[Any], key_value: str, key: Callable[[Any], str]) -> int:
+    """Posição de inserção em lista decrescente por `key`, depois dos itens de mesma chave"""
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key(items[mid]) >= key_value:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class TimeIndex:
+    """IDs ordenados por data (estável: mesma data mantém a ordem de inclusão)."""
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._ids: List[str] = []
+        self._ids_by_day: Dict[str, List[str]] = {}
+        self._days: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def rebuild(self, items: Iterable[Tuple[str, str]]):
+        """Recria a partir de pares (id, data) em qualquer ordem."""
+        pairs = sorted(((date or "", str(record_id)) for record_id, date in items), key=lambda p: p[0])
+        self._keys = [date for date, _ in pairs]
+        self._ids = [record_id for _, record_id in pairs]
+        self._ids_by_day = {}
+        for date, record_id in pairs:
+            if date:
+                self._ids_by_day.setdefault(date[:10], []).append(record_id)
+        self._days = list(self._ids_by_day)  # já em ordem crescente
+
+    def add(self, record_id: str, date: str):
+        date = date or ""
+        pos = bisect.bisect_right(self._keys, date)
+        self._keys.insert(pos, date)
+        self._ids.insert(pos, str(record_id))
+        if not date:
+            return
+        ids = self._ids_by_day.get(date[:10])
+        if ids is None:
+            ids = self._ids_by_day[date[:10]] = []
+            bisect.insort(self._days, date[:10])
+        ids.append(str(record_id))
+
+    def remove(self, record_id: str, date: str) -> bool:
+        date = date or ""
+        lo, hi = bisect.bisect_left(self._keys, date), bisect.bisect_right(self._keys, date)
+        try:
+            pos = self._ids.index(str(record_id), lo, hi)
+        except ValueError:
+            return False
+        del self._keys[pos]
+        del self._ids[pos]
+        ids = self._ids_by_day.get(date[:10])
+        if ids is not None:
+            ids.remove(str(record_id))
+            if not ids:
+                del self._ids_by_day[date[:10]]
+                del self._days[bisect.bisect_left(self._days, date[:10])]
+        return True
+
+    # ── Consultas (IDs em ordem crescente de data) ──
+
+    def ids_between(self, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+        """IDs com start <= data <= end (comparação de strings ISO; None = sem limite)"""
+        lo = bisect.bisect_left(self._keys, start) if start else 0
+        hi = bisect.bisect_right(self._keys, end) if end is not None else len(self._keys)
+        return self._ids[lo:hi]
+
+    def ids_with_prefix(self, prefix: str) -> List[str]:
+        """IDs cuja data começa com `prefix` ("AAAA-MM-DD", "AAAA-MM", "AAAA")"""
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + _PREFIX_END, lo)
+        return self._ids[lo:hi]
+
+    def ids_on(self, day: str) -> List[str]:
+        return list(self._ids_by_day.get(day, ()))
+
+    def next_day(self, day: str) -> Optional[str]:
+        """Primeiro dia com registros depois de `day`"""
+        i = bisect.bisect_right(self._days, day)
+        return self._days[i] if i < len(self._days) else None
+
+    def prev_day(self, day: str) -> Optional[str]:
+        """Último dia com registros antes de `day`"""
+        i = bisect.bisect_left(self._days, day)
+        return self._days[i - 1] if i else None
@@ -0,0 +1,66 @@
+-- Migracao: KPIs do dashboard em uma unica chamada
+-- Data: 2026-10-19
+-- Descricao: Funcao qc_dashboard_kpis() substitui as varias consultas count="exact"
+-- (hoje, mes, aprovacao, lotes vencendo, manutencoes pendentes) por um round-trip.
+-- IMPORTANTE: Executar no SQL Editor do Supabase Dashboard.
+
+-- =====================================================
+-- 1. Indices para os predicados de intervalo
+-- =====================================================
+-- qc_records.date guarda ISO 8601 em texto (YYYY-MM-DDTHH:MM): intervalos por prefixo de data usam o indice
+CREATE INDEX IF NOT EXISTS idx_qc_records_date ON public.qc_records(date);
+CREATE INDEX IF NOT EXISTS idx_maintenance_records_next_date ON public.maintenance_records(next_date);
+-- reagent_lots(expiry_date) ja indexado em supabase_migration_qc_tables.sql
+
+-- =====================================================
+-- 2. Funcao de KPIs
+-- =====================================================
+CREATE OR REPLACE FUNCTION public.qc_dashboard_kpis(p_today date DEFAULT current_date)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    WITH month_qc AS (
+        SELECT
+            count(*) AS total_month,
+            count(*) FILTER (WHERE status = 'OK') AS approved_month,
+            count(*) FILTER (WHERE date >= p_today::text) AS total_today,
+            count(*) FILTER (WHERE date >= p_today::text AND status <> 'OK') AS alerts_today
+        FROM public.qc_records
+        WHERE date >= date_trunc('month', p_today)::date::text
+          AND date < (p_today + 1)::text
+    ),
+    lots AS (
+        -- Vencidos ou vencendo nos proximos 30 dias
+        SELECT count(*) AS expiring_lots
+        FROM public.reagent_lots
+        WHERE expiry_date IS NOT NULL
+          AND expiry_date <> ''
+          AND expiry_date <= (p_today + 30)::text
+    ),
+    maint AS (
+        -- Proxima manutencao vencida ou para hoje
+        SELECT count(*) AS pending_maintenances
+        FROM public.maintenance_records
+        WHERE next_date IS NOT NULL
+          AND next_date <> ''
+          AND next_date <= p_today::text
+    )
+    SELECT jsonb_build_object(
+        'date', p_today,
+        'total_today', month_qc.total_today,
+        'alerts_today', month_qc.alerts_today,
+        'total_month', month_qc.total_month,
+        'approved_month', month_qc.approved_month,
+        'approval_rate_month', CASE
+            WHEN month_qc.total_month = 0 THEN 0
+            ELSE round(month_qc.approved_month * 100.0 / month_qc.total_month, 1)
+        END,
+        'expiring_lots', lots.expiring_lots,
+        'pending_maintenances', maint.pending_maintenances
+    )
+    FROM month_qc, lots, maint;
+$$;
+
+-- SECURITY INVOKER (padrao): as politicas RLS das tabelas continuam valendo
+GRANT EXECUTE ON FUNCTION public.qc_dashboard_kpis(date) TO authenticated;
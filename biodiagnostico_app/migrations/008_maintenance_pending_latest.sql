@@ -0,0 +1,64 @@
+-- Migracao: manutencoes pendentes consideram so a ultima manutencao de cada equipamento/tipo
+-- Data: 2026-10-19
+-- Descricao: Uma manutencao registrada "fecha" a pendencia anterior do mesmo equipamento/tipo.
+-- Alinha o KPI pending_maintenances de qc_dashboard_kpis() com o indice da agenda do app
+-- (services/maintenance_scheduler_service.py).
+-- IMPORTANTE: Executar no SQL Editor do Supabase Dashboard, depois da 007.
+
+CREATE INDEX IF NOT EXISTS idx_maintenance_records_equipment_type_date
+    ON public.maintenance_records(upper(trim(equipment)), upper(trim(type)), date DESC);
+
+CREATE OR REPLACE FUNCTION public.qc_dashboard_kpis(p_today date DEFAULT current_date)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    WITH month_qc AS (
+        SELECT
+            count(*) AS total_month,
+            count(*) FILTER (WHERE status = 'OK') AS approved_month,
+            count(*) FILTER (WHERE date >= p_today::text) AS total_today,
+            count(*) FILTER (WHERE date >= p_today::text AND status <> 'OK') AS alerts_today
+        FROM public.qc_records
+        WHERE date >= date_trunc('month', p_today)::date::text
+          AND date < (p_today + 1)::text
+    ),
+    lots AS (
+        -- Vencidos ou vencendo nos proximos 30 dias
+        SELECT count(*) AS expiring_lots
+        FROM public.reagent_lots
+        WHERE expiry_date IS NOT NULL
+          AND expiry_date <> ''
+          AND expiry_date <= (p_today + 30)::text
+    ),
+    latest_maint AS (
+        -- Ultima manutencao de cada equipamento/tipo
+        SELECT DISTINCT ON (upper(trim(equipment)), upper(trim(type))) next_date
+        FROM public.maintenance_records
+        ORDER BY upper(trim(equipment)), upper(trim(type)), date DESC, created_at DESC
+    ),
+    maint AS (
+        -- Proxima manutencao vencida ou para hoje
+        SELECT count(*) AS pending_maintenances
+        FROM latest_maint
+        WHERE next_date IS NOT NULL
+          AND next_date <> ''
+          AND next_date <= p_today::text
+    )
+    SELECT jsonb_build_object(
+        'date', p_today,
+        'total_today', month_qc.total_today,
+        'alerts_today', month_qc.alerts_today,
+        'total_month', month_qc.total_month,
+        'approved_month', month_qc.approved_month,
+        'approval_rate_month', CASE
+            WHEN month_qc.total_month = 0 THEN 0
+            ELSE round(month_qc.approved_month * 100.0 / month_qc.total_month, 1)
+        END,
+        'expiring_lots', lots.expiring_lots,
+        'pending_maintenances', maint.pending_maintenances
+    )
+    FROM month_qc, lots, maint;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.qc_dashboard_kpis(date) TO authenticated;
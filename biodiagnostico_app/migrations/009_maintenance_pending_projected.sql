@@ -0,0 +1,92 @@
+-- Migracao: pendencia de manutencoes recorrentes sem proxima data informada
+-- Data: 2026-10-19
+-- Descricao: Tipos recorrentes (preventiva, calibracao) registrados sem next_date herdam
+-- o intervalo da manutencao anterior do mesmo equipamento/tipo: o ultimo intervalo
+-- informado (date -> next_date) ou, sem ele, a distancia entre as duas ultimas datas.
+-- Mesma projecao de services/maintenance_scheduler_service.py, para que o KPI
+-- pending_maintenances de qc_dashboard_kpis() e o indice da agenda do app contem igual.
+-- IMPORTANTE: Executar no SQL Editor do Supabase Dashboard, depois da 008.
+
+CREATE OR REPLACE FUNCTION public.qc_dashboard_kpis(p_today date DEFAULT current_date)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    WITH month_qc AS (
+        SELECT
+            count(*) AS total_month,
+            count(*) FILTER (WHERE status = 'OK') AS approved_month,
+            count(*) FILTER (WHERE date >= p_today::text) AS total_today,
+            count(*) FILTER (WHERE date >= p_today::text AND status <> 'OK') AS alerts_today
+        FROM public.qc_records
+        WHERE date >= date_trunc('month', p_today)::date::text
+          AND date < (p_today + 1)::text
+    ),
+    lots AS (
+        -- Vencidos ou vencendo nos proximos 30 dias
+        SELECT count(*) AS expiring_lots
+        FROM public.reagent_lots
+        WHERE expiry_date IS NOT NULL
+          AND expiry_date <> ''
+          AND expiry_date <= (p_today + 30)::text
+    ),
+    maint_hist AS (
+        -- Historico de cada equipamento/tipo, rn = 1 na manutencao mais recente
+        SELECT
+            upper(trim(equipment)) AS equipment,
+            upper(trim(type)) AS type,
+            CASE WHEN left(date, 10) ~ '^\d{4}-\d{2}-\d{2}$' THEN left(date, 10)::date END AS day,
+            CASE WHEN left(next_date, 10) ~ '^\d{4}-\d{2}-\d{2}$' THEN left(next_date, 10)::date END AS next_day,
+            row_number() OVER (
+                PARTITION BY upper(trim(equipment)), upper(trim(type))
+                ORDER BY date DESC, created_at DESC
+            ) AS rn
+        FROM public.maintenance_records
+    ),
+    latest_maint AS (
+        -- Proxima data da ultima manutencao: informada ou projetada (tipos recorrentes)
+        SELECT
+            CASE
+                WHEN l.next_day IS NOT NULL THEN l.next_day
+                WHEN l.type IN ('PREVENTIVA', 'CALIBRACAO', 'CALIBRAÇÃO') THEN l.day + coalesce(
+                    (
+                        SELECT p.next_day - p.day
+                        FROM maint_hist p
+                        WHERE p.equipment = l.equipment AND p.type = l.type AND p.rn > 1
+                          AND p.next_day > p.day
+                        ORDER BY p.rn
+                        LIMIT 1
+                    ),
+                    (
+                        SELECT nullif(greatest(l.day - p.day, 0), 0)
+                        FROM maint_hist p
+                        WHERE p.equipment = l.equipment AND p.type = l.type AND p.rn = 2
+                    )
+                )
+            END AS next_day
+        FROM maint_hist l
+        WHERE l.rn = 1
+    ),
+    maint AS (
+        -- Proxima manutencao vencida ou para hoje
+        SELECT count(*) AS pending_maintenances
+        FROM latest_maint
+        WHERE next_day <= p_today
+    )
+    SELECT jsonb_build_object(
+        'date', p_today,
+        'total_today', month_qc.total_today,
+        'alerts_today', month_qc.alerts_today,
+        'total_month', month_qc.total_month,
+        'approved_month', month_qc.approved_month,
+        'approval_rate_month', CASE
+            WHEN month_qc.total_month = 0 THEN 0
+            ELSE round(month_qc.approved_month * 100.0 / month_qc.total_month, 1)
+        END,
+        'expiring_lots', lots.expiring_lots,
+        'pending_maintenances', maint.pending_maintenances
+    )
+    FROM month_qc, lots, maint;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.qc_dashboard_kpis(date) TO authenticated;
@@ -33,5 +33,7 @@ config = rx.Config(
     frontend_port=3000,
     backend_port=8000,
     api_url=API_URL,
+    # Gerenciador de estado no Redis: obrigatório com mais de um worker (start.sh, BACKEND_WORKERS)
+    redis_url=os.getenv("REDIS_URL") or None,
     cors_allowed_origins=_parse_cors_origins(os.getenv("CORS_ALLOWED_ORIGINS", "")),
 )
@@ -2,11 +2,33 @@
 
 echo "Aguardando Reflex iniciar em background..."
 
-# Iniciar Reflex em background
-# Iniciar Reflex em background (apenas backend)
-# Iniciar Reflex em background (apenas backend)
-reflex run --env prod --backend-only --backend-port 8000 &
-REFLEX_PID=$!
+# Workers do backend: um processo Reflex por porta (8000, 8001, ...) atrás do nginx.
+# Mais de um worker exige REDIS_URL (estado das sessões e eventos entre workers no Redis).
+BACKEND_WORKERS=${BACKEND_WORKERS:-1}
+BACKEND_BASE_PORT=8000
+if [ "$BACKEND_WORKERS" -gt 1 ] && [ -z "$REDIS_URL" ]; then
+    echo "AVISO: BACKEND_WORKERS=$BACKEND_WORKERS exige REDIS_URL; iniciando 1 worker"
+    BACKEND_WORKERS=1
+fi
+
+# Upstream do nginx com sessão fixa por token (incluído pelo nginx.conf)
+{
+    echo "upstream reflex_backend {"
+    echo "    hash \$reflex_upstream_key consistent;"
+    for i in $(seq 0 $((BACKEND_WORKERS - 1))); do
+        echo "    server 127.0.0.1:$((BACKEND_BASE_PORT + i));"
+    done
+    echo "}"
+} > /etc/nginx/reflex_upstream.conf
+
+START_TS=$(date +%s%N)
+BACKEND_PIDS=()
+for i in $(seq 0 $((BACKEND_WORKERS - 1))); do
+    # GRANIAN_WORKERS=1: com Redis o Reflex abriria 2*CPU+1 workers por processo
+    WORKER_ID=$i GRANIAN_WORKERS=1 reflex run --env prod --backend-only --backend-port $((BACKEND_BASE_PORT + i)) &
+    BACKEND_PIDS+=($!)
+done
+echo "Backend: $BACKEND_WORKERS worker(s) nas portas $BACKEND_BASE_PORT-$((BACKEND_BASE_PORT + BACKEND_WORKERS - 1))"
 
 # Debug: Verificar estrutura do build (importante para assets)
 echo "=== Debug: Verificando estrutura do build em /app/.web/build/client ==="
@@ -20,19 +42,29 @@ else
 fi
 echo "======================================"
 
-# Aguardar Backend estar pronto (máximo 60 segundos)
-echo "Aguardando backend (porta 8000)..."
-for i in {1..60}; do
-    if curl -s http://127.0.0.1:8000/ping > /dev/null 2>&1; then
-        echo "Backend pronto!"
+# Aguardar todos os workers (máximo 60 segundos, checando a cada 0,2 s)
+echo "Aguardando backend..."
+for attempt in $(seq 1 300); do
+    ready=0
+    for i in $(seq 0 $((BACKEND_WORKERS - 1))); do
+        if curl -sf --max-time 1 "http://127.0.0.1:$((BACKEND_BASE_PORT + i))/ping" > /dev/null 2>&1; then
+            ready=$((ready + 1))
+        elif ! kill -0 "${BACKEND_PIDS[$i]}" 2>/dev/null; then
+            echo "ERRO: worker $i terminou antes de ficar pronto"
+            kill "${BACKEND_PIDS[@]}" 2>/dev/null
+            exit 1
+        fi
+    done
+    if [ "$ready" -eq "$BACKEND_WORKERS" ]; then
+        echo "Backend pronto em $(( ($(date +%s%N) - START_TS) / 1000000 )) ms"
         break
     fi
-    sleep 1
+    sleep 0.2
 done
 
 echo "Iniciando Nginx..."
 nginx -g "daemon off;" &
 NGINX_PID=$!
 
-# Manter o container rodando
-wait $REFLEX_PID
+# Manter o container rodando; se um worker cair, o container sai e é reiniciado
+wait -n "${BACKEND_PIDS[@]}"
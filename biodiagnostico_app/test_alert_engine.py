@@ -0,0 +1,142 @@
+"""Testes do motor de alertas em processo."""
+import asyncio
+from datetime import datetime
+
+from biodiagnostico_app.models import MaintenanceRecord, QCRecord, ReagentLot
+from biodiagnostico_app.services.alert_engine_service import (
+    AlertEngine, EVENT_LOT_DELETED, EVENT_LOT_SAVED, EVENT_QC_DELETED, EVENT_QC_SAVED,
+)
+from biodiagnostico_app.services.maintenance_scheduler_service import MaintenanceScheduler
+
+# Quarta-feira, depois do prazo do CQ
+NOW = datetime(2026, 10, 14, 15, 0)
+
+
+class _MemorySink:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    async def send(self, alerts):
+        if self.fail:
+            raise RuntimeError("webhook fora do ar")
+        self.batches.append(alerts)
+
+
+def _engine(**kwargs):
+    sink = _MemorySink(**kwargs)
+    return AlertEngine(sinks=[sink], scheduler=MaintenanceScheduler()), sink
+
+
+def _qc(id, date, exam="GLICOSE", level="N1", violations=None):
+    return QCRecord(id=id, date=date, exam_name=exam, level=level, value=100.0,
+                    westgard_violations=violations or [])
+
+
+def test_westgard_rejection_alerts_once():
+    engine, _ = _engine()
+    engine.publish(EVENT_QC_SAVED, _qc("1", "2026-10-14T09:00", violations=[
+        {"rule": "1-3s", "severity": "rejection"},
+    ]))
+    alerts = engine.evaluate(NOW)
+    assert [a["rule"] for a in alerts] == ["westgard_rejection"]
+    assert "1-3s" in alerts[0]["message"]
+    assert engine.evaluate(NOW) == []
+
+
+def test_warning_only_violation_does_not_alert():
+    engine, _ = _engine()
+    engine.publish(EVENT_QC_SAVED, _qc("1", "2026-10-14T09:00", violations=[
+        {"rule": "1-2s", "severity": "warning"},
+    ]))
+    assert engine.evaluate(NOW) == []
+
+
+def test_qc_missing_today_clears_when_run():
+    engine, _ = _engine()
+    engine.seed(qc_records=[_qc("1", "2026-10-13T08:00"), _qc("2", "2026-10-13T08:00", level="N2"),
+                            _qc("3", "2026-09-01T08:00", exam="FERRO")])
+    engine.publish(EVENT_QC_SAVED, _qc("4", "2026-10-14T08:30", level="N2"))
+    alerts = engine.evaluate(NOW)
+    # Só N1 está pendente; FERRO está fora da rotina (sem CQ há mais de 7 dias)
+    assert [a["data"]["level"] for a in alerts] == ["N1"]
+    assert engine.evaluate(datetime(2026, 10, 14, 10, 0)) == []
+
+
+def test_qc_missing_not_checked_before_deadline_or_weekend():
+    engine, _ = _engine()
+    engine.seed(qc_records=[_qc("1", "2026-10-13T08:00")])
+    assert engine.evaluate(datetime(2026, 10, 14, 9, 0)) == []
+    assert engine.evaluate(datetime(2026, 10, 17, 15, 0)) == []
+
+
+def test_deleting_todays_record_reopens_pending_qc():
+    engine, _ = _engine()
+    engine.seed(qc_records=[_qc("1", "2026-10-13T08:00"), _qc("2", "2026-10-14T08:00")])
+    assert engine.evaluate(NOW) == []
+    engine.publish(EVENT_QC_DELETED, "2")
+    assert [a["rule"] for a in engine.evaluate(NOW)] == ["qc_missing_today"]
+
+
+def test_lot_and_maintenance_rules():
+    engine, _ = _engine()
+    engine.publish(EVENT_LOT_SAVED, ReagentLot(id="l1", name="Glicose", lot_number="A1", expiry_date="2026-10-20"))
+    engine.publish(EVENT_LOT_SAVED, ReagentLot(id="l2", name="Ureia", lot_number="B2", expiry_date="2027-06-01"))
+    engine.snapshot.maintenances.add(MaintenanceRecord(id="m1", equipment="CMD800", type="Preventiva",
+                                                       date="2026-09-10", next_date="2026-10-10"))
+    rules = sorted(a["rule"] for a in engine.evaluate(NOW))
+    assert rules == ["lot_expiring", "maintenance_overdue"]
+
+    engine.publish(EVENT_LOT_DELETED, "l1")
+    assert engine.evaluate(datetime(2026, 10, 21, 15, 0)) == []
+
+
+def test_dispatch_batches_and_retries_after_sink_failure():
+    engine, sink = _engine(fail=True)
+    engine.snapshot.maintenances.rebuild([
+        MaintenanceRecord(id="m1", equipment="CMD800", type="Preventiva", next_date="2026-10-10"),
+        MaintenanceRecord(id="m2", equipment="XT1800", type="Preventiva", next_date="2026-10-12"),
+    ])
+    asyncio.run(engine.dispatch(engine.evaluate(NOW)))
+    assert sink.batches == []
+
+    sink.fail = False
+    asyncio.run(engine.dispatch(engine.evaluate(NOW)))
+    assert len(sink.batches) == 1 and len(sink.batches[0]) == 2
+    asyncio.run(engine.dispatch(engine.evaluate(NOW)))
+    assert len(sink.batches) == 1
+
+
+def test_rejection_kept_until_delivered():
+    engine, sink = _engine(fail=True)
+    engine.publish(EVENT_QC_SAVED, _qc("1", "2026-10-14T09:00", violations=[
+        {"rule": "1-3s", "severity": "rejection"},
+    ]))
+    asyncio.run(engine.dispatch(engine.evaluate(NOW)))
+    assert sink.batches == [] and engine.snapshot.new_rejections == ["1"]
+
+    sink.fail = False
+    asyncio.run(engine.dispatch(engine.evaluate(NOW)))
+    assert [a["rule"] for a in sink.batches[0]] == ["westgard_rejection"]
+    assert engine.snapshot.new_rejections == []
+
+
+def test_non_leader_only_tracks_state(monkeypatch):
+    from biodiagnostico_app.services import alert_engine_service
+
+    async def not_leader(name, ttl):
+        return False
+
+    async def one_cycle(engine):
+        task = asyncio.create_task(engine.run_forever(interval=0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    monkeypatch.setattr(alert_engine_service.cluster, "is_leader", not_leader)
+    engine, sink = _engine()
+    engine.publish(EVENT_QC_SAVED, _qc("1", "2026-10-13T09:00", violations=[
+        {"rule": "1-3s", "severity": "rejection"},
+    ]))
+    asyncio.run(one_cycle(engine))
+    assert sink.batches == [] and engine._sent == {}
+    assert "1" in engine.snapshot.qc_by_id and engine.snapshot.new_rejections == []
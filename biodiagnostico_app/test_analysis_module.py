@@ -1,16 +1,9 @@
 import json
-import importlib.util
-from pathlib import Path
 
 import pandas as pd
 
+from biodiagnostico_app.utils import analysis_module
 
-MODULE_PATH = (
-    Path(__file__).resolve().parent / "biodiagnostico_app" / "utils" / "analysis_module.py"
-)
-spec = importlib.util.spec_from_file_location("analysis_module", MODULE_PATH)
-analysis_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(analysis_module)
 
 compare_exams = analysis_module.compare_exams
 load_synonyms = analysis_module.load_synonyms
@@ -0,0 +1,106 @@
+"""
+Testes unitários para o espelho analítico local
+"""
+import asyncio
+
+from biodiagnostico_app.models import QCRecord
+from biodiagnostico_app.services.analytics_mirror_service import (
+    AnalyticsMirror, monthly_summary_from_records,
+)
+
+
+ROWS = [
+    {"id": "1", "created_at": "2026-01-05T10:00:00+00:00", "date": "2026-01-05T10:00", "exam_name": "GLICOSE",
+     "level": "N1", "value": 98.0, "cv": 2.0, "status": "OK"},
+    {"id": "2", "created_at": "2026-01-06T10:00:00+00:00", "date": "2026-01-06T10:00", "exam_name": "GLICOSE",
+     "level": "N1", "value": 102.0, "cv": 2.0, "status": "OK"},
+    {"id": "3", "created_at": "2026-02-01T10:00:00+00:00", "date": "2026-02-01T10:00", "exam_name": "GLICOSE",
+     "level": "N1", "value": 110.0, "cv": 10.0, "status": "ERRO"},
+    {"id": "4", "created_at": "2026-02-02T10:00:00+00:00", "date": "2026-02-02T10:00", "exam_name": "UREIA",
+     "level": "N1", "value": 40.0, "cv": 4.0, "status": "OK"},
+]
+
+
+class FakeFetcher:
+    """Fetcher de teste: serve linhas de qc_records filtradas pelo cursor"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.calls = []
+
+    def __call__(self, table, columns, cursor, since, offset, limit):
+        self.calls.append((table, since))
+        if table != "qc_records":
+            return []
+        rows = [r for r in self.rows if not cursor or r[cursor] >= since]
+        return rows[offset:offset + limit]
+
+
+def make_mirror(tmp_path, fetcher):
+    return AnalyticsMirror(str(tmp_path / "mirror.db"), fetcher=fetcher)
+
+
+class TestSync:
+
+    def test_incremental_uses_watermark(self, tmp_path):
+        fetcher = FakeFetcher(ROWS)
+        mirror = make_mirror(tmp_path, fetcher)
+        assert not mirror.is_ready()
+        asyncio.run(mirror.sync(reconcile=False))
+        assert mirror.is_ready()
+        fetcher.calls.clear()
+        asyncio.run(mirror.sync(reconcile=False))
+        since = dict(fetcher.calls)["qc_records"]
+        # Relê apenas a janela recente antes do último created_at
+        assert "2026-01-26" <= since < "2026-02-02"
+
+    def test_reconcile_removes_deleted_rows(self, tmp_path):
+        fetcher = FakeFetcher(ROWS)
+        mirror = make_mirror(tmp_path, fetcher)
+        asyncio.run(mirror.sync(reconcile=False))
+        fetcher.rows = ROWS[:3]
+        asyncio.run(mirror.sync(reconcile=True))
+        assert [r["id"] for r in mirror.query("SELECT id FROM qc_records ORDER BY id")] == ["1", "2", "3"]
+
+
+class TestQueries:
+
+    def test_top_high_cv_and_approval(self, tmp_path):
+        mirror = make_mirror(tmp_path, FakeFetcher(ROWS))
+        mirror.upsert_rows("qc_records", ROWS)
+        top = mirror.top_high_cv_exams(5)
+        assert top[0] == {"exam_name": "GLICOSE", "avg_cv": 4.67, "count": 3}
+        assert mirror.approval_rate() == 75.0
+        assert mirror.approval_rate("2026-01-01", "2026-01-31") == 100.0
+
+    def test_monthly_summary_matches_python_fallback(self, tmp_path):
+        mirror = make_mirror(tmp_path, FakeFetcher(ROWS))
+        mirror.upsert_rows("qc_records", ROWS)
+        records = [
+            QCRecord(id=r["id"], date=r["date"], exam_name=r["exam_name"], level=r["level"],
+                     lot_number="", value=r["value"], target_value=100.0, target_sd=2.0,
+                     cv=r["cv"], status=r["status"])
+            for r in ROWS
+        ]
+        sql_rows = mirror.monthly_summary()
+        assert sql_rows == monthly_summary_from_records(records)
+        jan = sql_rows[0]
+        assert (jan["month"], jan["n"], jan["mean_value"], jan["approval_rate"]) == ("2026-01", 2, 100.0, 100.0)
+        assert jan["sd"] == 2.8284
+
+    def test_covers_only_when_in_sync_with_memory(self, tmp_path):
+        mirror = make_mirror(tmp_path, FakeFetcher(ROWS[:3]))
+        records = [
+            QCRecord(id=r["id"], date=r["date"], exam_name=r["exam_name"], level=r["level"],
+                     value=r["value"], cv=r["cv"], status=r["status"])
+            for r in ROWS
+        ]
+        # Antes do primeiro sync
+        assert not mirror.covers(records[:3])
+        asyncio.run(mirror.sync(reconcile=False))
+        assert mirror.covers(records[:3])
+        # Registro salvo depois do último sync
+        assert not mirror.covers(records)
+        # Registro ainda no outbox local
+        pending = records[:3] + [records[3].copy(update={"sync_status": "pending"})]
+        assert not mirror.covers(pending)
@@ -0,0 +1,103 @@
+"""Testes do gerador sintético, da comparação de resultados dos benchmarks, do gerador de carga e do orçamento de import."""
+import random
+from datetime import datetime
+
+from benchmarks.import_time import measure_imports, parse_importtime, summarize
+from benchmarks.loadgen import bench_terminal_script, capacity, decode_packet, delta_has, encode_packet, percentiles, scaling
+from benchmarks.run_benchmarks import compare, parse_size
+from benchmarks.synthetic_data import generate_qc_rows, references_by_id
+from biodiagnostico_app.states.qc_state import build_qc_records
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+def test_generator_is_deterministic_and_db_shaped():
+    rows = generate_qc_rows(3600, seed=7, now=NOW)
+    assert rows == generate_qc_rows(3600, seed=7, now=NOW)
+    assert len({(r["exam_name"], r["level"]) for r in rows}) == 36
+    assert max(r["date"] for r in rows) == "2026-10-19T12:00:00"
+    assert min(r["date"] for r in rows) >= "2025-10-19"
+
+    records = build_qc_records(rows, references_by_id(rows), set())
+    assert len(records) == 3600
+    assert records[0].equipment == rows[0]["equipment_name"] and records[0].cv_max_threshold == 5.0
+
+
+def test_generator_injects_out_of_control_points():
+    rows = generate_qc_rows(36_000, seed=1, now=NOW)
+    z = [abs(r["value"] - r["target_value"]) / r["target_sd"] for r in rows]
+    beyond_3sd = sum(1 for v in z if v > 3) / len(z)
+    # Ruído puro daria ~0,27% além de 3 DP; shifts e tendências elevam bem acima disso
+    assert beyond_3sd > 0.01
+
+
+def test_compare_flags_regressions():
+    def run(median):
+        return {"results": {"1k": {"westgard.check_rules": {"n": 1000, "median_s": median}}}}
+
+    assert compare(run(0.011), run(0.010), threshold=1.2) == []
+    assert compare(run(0.013), run(0.010), threshold=1.2) == ["1k westgard.check_rules: x1.30"]
+    assert parse_size("1M") == 1_000_000 and parse_size("10k") == 10_000
+
+
+def test_loadgen_protocol_and_summary():
+    assert encode_packet("ping") == '42/_event,["ping"]'
+    assert decode_packet('42/_event,["ping","pong"]') == ("event", ["ping", "pong"])
+    assert decode_packet('40/_event,{"sid":"a"}') == ("connect", {"sid": "a"})
+    assert decode_packet("2") == ("ping", None)
+
+    delta = {"reflex___state____state.qc": {"is_saving_qc_rx_state_": False}}
+    assert delta_has(delta, "is_saving_qc", False) and not delta_has(delta, "is_saving_qc", True)
+    assert not delta_has(delta, "qc_value")
+
+    stats = percentiles([float(v) for v in range(1, 101)])
+    assert (stats["p50"], stats["p95"], stats["p99"], stats["max"]) == (50, 95, 99, 100)
+
+    def level(sessions, p95, timeouts=0):
+        return {"sessions": sessions, "timeouts": timeouts, "errors": 0, "latency_ms": {"all": {"count": 10, "p95": p95}}}
+
+    levels = {"5": level(5, 120), "10": level(10, 300), "25": level(25, 200, timeouts=1), "50": level(50, 900)}
+    assert capacity(levels, 500) == 10 and capacity(levels, 100) is None
+
+    def report(workers, events_per_s, cap):
+        return {"meta": {"workers": workers}, "capacity": cap, "levels": {"10": {"events_per_s": events_per_s}}}
+
+    rows = scaling([report(4, 300.0, 60), report(1, 100.0, 20)])
+    assert [r["workers"] for r in rows] == [1, 4]
+    assert rows[1]["speedup"] == 3.0 and rows[1]["efficiency"] == 0.75
+
+    handlers = [s.handler for s in bench_terminal_script(random.Random(1), "a@b.c", "pw")]
+    assert handlers.index("attempt_login") < handlers.index("save_qc_record") < handlers.index("generate_qc_report_pdf")
+
+
+IMPORTTIME_SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     numpy._core
+import time:       300 |        420 |   numpy
+import time:        50 |        470 | biodiagnostico_app.services.westgard_service
+import time:        80 |         80 |   pandas.io
+import time:       900 |        980 | pandas
+"""
+
+
+def test_importtime_parser_and_summary():
+    records = parse_importtime(IMPORTTIME_SAMPLE)
+    assert [(r.name, r.depth, r.parent) for r in records] == [
+        ("numpy._core", 2, "numpy"),
+        ("numpy", 1, "biodiagnostico_app.services.westgard_service"),
+        ("biodiagnostico_app.services.westgard_service", 0, ""),
+        ("pandas.io", 1, "pandas"),
+        ("pandas", 0, ""),
+    ]
+    summary = summarize(records, module="biodiagnostico_app.services.westgard_service")
+    assert summary["total_ms"] == 0.5 and summary["app_self_ms"] == 0.1
+    assert summary["external_from_app"] == [
+        {"module": "numpy", "imported_by": "biodiagnostico_app.services.westgard_service", "cumulative_ms": 0.4},
+    ]
+    assert summary["lazy_violations"] == ["pandas"]
+
+
+def test_state_import_keeps_heavy_modules_lazy():
+    # Processo limpo: pandas/supabase/reportlab só no primeiro uso
+    summary = summarize(measure_imports("biodiagnostico_app.state"), module="biodiagnostico_app.state")
+    assert summary["lazy_violations"] == []
@@ -0,0 +1,97 @@
+"""Testes da coordenação entre workers (services/cluster_service.py) sem Redis."""
+import asyncio
+import fcntl
+import json
+import os
+
+from biodiagnostico_app.models import QCRecord
+from biodiagnostico_app.services.cluster_service import ClusterBus, cluster
+from biodiagnostico_app.services.drift_detection_service import DriftDetector, series_of
+from biodiagnostico_app.services.qc_outbox_service import QCOutbox
+from biodiagnostico_app.services.qc_statistics_service import EVENT_STATS_ADD, qc_statistics
+
+
+def make_record(i, value, exam="CLUSTERTESTE"):
+    return QCRecord(
+        id=f"cluster-{i}", date=f"2026-02-{i + 1:02d}", exam_name=exam, level="N1", lot_number="L1",
+        value=value, target_value=100.0, target_sd=2.0, equipment="CMD800",
+    )
+
+
+def drain(bus):
+    messages = []
+    while not bus._outgoing.empty():
+        messages.append(bus._outgoing.get_nowait())
+    return messages
+
+
+def test_disabled_bus_is_local_only():
+    bus = ClusterBus(url="", worker_id="0")
+    bus.publish("x", {"a": 1})
+    assert drain(bus) == []
+    assert asyncio.run(bus.is_leader("alerts", ttl=30)) is True
+
+
+def test_deliver_skips_own_messages():
+    received = []
+    bus = ClusterBus(url="redis://cluster-test", worker_id="0")
+    bus.on("x", received.append)
+    bus.publish("x", {"a": 1})
+    [own] = drain(bus)
+    assert bus.deliver(own) is False and received == []
+
+    other = json.dumps({"origin": "1", "event": "x", "payload": {"a": 2}})
+    assert bus.deliver(other) is True and received == [{"a": 2}]
+    assert bus.deliver("não é json") is False
+
+
+def test_statistics_write_replicates_to_other_worker(monkeypatch):
+    monkeypatch.setattr(cluster, "url", "redis://cluster-test")
+    monkeypatch.setattr(cluster, "worker_id", "0")
+    drain(cluster)
+    try:
+        qc_statistics.add_record(make_record(0, 101.0))
+        [message] = drain(cluster)
+        assert json.loads(message)["event"] == EVENT_STATS_ADD
+
+        # O outro worker ainda não tem a série; aplica o evento recebido
+        qc_statistics.remove_record("cluster-0")
+        drain(cluster)
+        assert qc_statistics.get("CLUSTERTESTE", "N1", "L1") is None
+        monkeypatch.setattr(cluster, "worker_id", "1")
+        assert cluster.deliver(message) is True
+        assert qc_statistics.snapshot("CLUSTERTESTE", "N1", "L1")["n"] == 1
+    finally:
+        qc_statistics._remove("cluster-0")
+        drain(cluster)
+
+
+def test_drift_state_shared_between_workers(tmp_path):
+    path = str(tmp_path / "drift.db")
+    worker_a, worker_b = DriftDetector(path), DriftDetector(path)
+    records = [make_record(i, 100.0 + i % 2) for i in range(6)]
+    # Cada worker grava metade; o estado de cada um parte do que o outro já persistiu
+    for i, record in enumerate(records):
+        (worker_a if i % 2 else worker_b).update_records([record])
+
+    single = DriftDetector(str(tmp_path / "single.db"))
+    single.update_records(records)
+    key = series_of("CLUSTERTESTE", "N1", "L1", "CMD800")
+    assert single._load([key])
+    assert worker_a._load([key]) == single._load([key])
+
+
+def test_outbox_flush_skips_while_other_worker_holds_lock(tmp_path):
+    sent = []
+    outbox = QCOutbox(str(tmp_path / "outbox.db"), sender=lambda kind, target, payloads: sent.extend(payloads) or payloads)
+    outbox.enqueue_insert("qc_records", {"value": 1.0}, series="s")
+
+    fd = os.open(outbox.path + ".lock", os.O_CREAT | os.O_RDWR)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        assert asyncio.run(outbox.flush()) == {"synced": 0, "failed": 0}
+        assert sent == []
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+    assert asyncio.run(outbox.flush())["synced"] == 1
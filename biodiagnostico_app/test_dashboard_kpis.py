@@ -0,0 +1,74 @@
+"""
+Testes unitários para os KPIs do dashboard (RPC única + cache compartilhado)
+"""
+import asyncio
+import time
+from datetime import datetime
+
+from biodiagnostico_app.models import QCRecord
+from biodiagnostico_app.services import qc_service
+from biodiagnostico_app.services.qc_history_index_service import qc_history_index
+from biodiagnostico_app.services.qc_outbox_service import STATUS_PENDING, STATUS_SYNCED
+from biodiagnostico_app.services.qc_service import QCService
+from biodiagnostico_app.state import State
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeRPC:
+    def __init__(self, client):
+        self.client = client
+
+    def execute(self):
+        self.client.calls += 1
+        time.sleep(0.05)
+        return FakeResponse({"total_today": 3, "total_month": 40, "approved_month": 38,
+                             "approval_rate_month": 95.0, "pending_maintenances": 1})
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    def rpc(self, name, params):
+        assert name == "qc_dashboard_kpis"
+        return FakeRPC(self)
+
+
+def test_concurrent_loads_share_one_rpc(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(qc_service, "get_supabase", lambda: client)
+    QCService.invalidate_dashboard_kpis()
+
+    async def run():
+        qc_service._kpi_lock = None
+        return await asyncio.gather(*(QCService.get_dashboard_kpis() for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert client.calls == 1
+    assert all(r["total_month"] == 40 and r["alerts_today"] == 0 for r in results)
+    assert asyncio.run(QCService.get_qc_statistics_month()) == 40
+    assert client.calls == 1
+
+    QCService.invalidate_dashboard_kpis()
+    assert asyncio.run(QCService.get_approval_rate_month()) == 95.0
+    assert client.calls == 2
+
+
+def test_approval_rate_uses_kpi_plus_pending_records():
+    today = datetime.now().strftime("%Y-%m-%dT08:00")
+    state = State(_reflex_internal_init=True)
+    state.qc_records = [
+        QCRecord(id="p1", date=today, exam_name="GLICOSE", status="ALERTA", sync_status=STATUS_PENDING),
+        QCRecord(id="s1", date=today, exam_name="GLICOSE", status="OK", sync_status=STATUS_SYNCED),
+    ]
+    qc_history_index.rebuild(state.qc_records)
+    try:
+        state._apply_dashboard_kpis({"total_month": 40, "approval_rate_month": 95.0})
+        # 38 aprovados de 40 no banco + 1 reprovado pendente
+        assert state.dashboard_approval_rate == round(38 / 41 * 100, 1)
+    finally:
+        qc_history_index.rebuild([])
@@ -0,0 +1,105 @@
+"""Testes dos detectores EWMA/CUSUM persistidos por série de CQ."""
+from biodiagnostico_app.models import QCRecord
+from biodiagnostico_app.services.drift_detection_service import DriftDetector, series_of
+
+
+def _records(values, exam="GLICOSE", level="N1", lot="L1", equipment="CMD800"):
+    return [
+        QCRecord(
+            id=str(i), date=f"2026-01-{i + 1:02d}", exam_name=exam, level=level, lot_number=lot,
+            value=v, target_value=100.0, target_sd=2.0, equipment=equipment,
+        )
+        for i, v in enumerate(values)
+    ]
+
+
+IN_CONTROL = [100.5, 99.0, 101.0, 100.0, 98.5, 101.5, 99.5, 100.0, 100.8, 99.2]
+# Deslocamento de +1.5 SD a partir da 11ª corrida — nenhuma violação 1-3s
+SHIFTED = IN_CONTROL + [103.0] * 8
+
+
+def test_in_control_has_no_alarm(tmp_path):
+    det = DriftDetector(str(tmp_path / "drift.db"))
+    assert det.update_records(_records(IN_CONTROL)) == []
+    assert det.alerts() == []
+
+
+def test_step_shift_triggers_cusum_and_ewma(tmp_path):
+    det = DriftDetector(str(tmp_path / "drift.db"))
+    alerts = det.update_records(_records(SHIFTED))
+    assert len(alerts) == 1
+    assert "CUSUM+" in alerts[0]["alarm"]
+    assert "EWMA+" in alerts[0]["alarm"]
+    assert alerts[0]["exam_name"] == "GLICOSE"
+    assert alerts[0]["last_date"] == "2026-01-18"
+
+
+def test_state_persists_across_reopen(tmp_path):
+    path = str(tmp_path / "drift.db")
+    records = _records(SHIFTED)
+    det = DriftDetector(path)
+    det.update_records(records[:12])
+    det.close()
+
+    reopened = DriftDetector(path)
+    assert not reopened.is_empty()
+    alerts = reopened.update_records(records[12:])
+    assert alerts and "CUSUM+" in alerts[0]["alarm"]
+
+
+def test_streaming_matches_rebuild(tmp_path):
+    records = _records(SHIFTED) + _records(IN_CONTROL, level="N2")
+    streaming = DriftDetector(str(tmp_path / "a.db"))
+    for r in records:
+        streaming.update_records([r])
+    batch = DriftDetector(str(tmp_path / "b.db"))
+    batch.rebuild(list(reversed(records)))
+
+    key = series_of("GLICOSE", "N1", "L1", "CMD800")
+    assert streaming._load([key]) == batch._load([key])
+    assert streaming.alerts() == batch.alerts()
+
+
+def test_rebuild_keeps_area_series(tmp_path):
+    det = DriftDetector(str(tmp_path / "drift.db"))
+    for day in range(1, 13):
+        det.update_area_measurement("imunologia", "TSH", f"2026-01-{day:02d}", 2.6, 1.0, 3.0)
+    alerts = det.update_area_measurement("imunologia", "TSH", "2026-01-13", 2.6, 1.0, 3.0)
+    assert alerts and alerts[0]["exam_name"] == "IMUNOLOGIA:TSH"
+
+    det.rebuild(_records(IN_CONTROL))
+    assert [a["exam_name"] for a in det.alerts()] == ["IMUNOLOGIA:TSH"]
+
+
+def test_series_without_target_sd_is_ignored(tmp_path):
+    det = DriftDetector(str(tmp_path / "drift.db"))
+    records = _records(SHIFTED)
+    for r in records:
+        r.target_sd = 0.0
+    assert det.update_records(records) == []
+    assert det.is_empty()
+
+
+def test_rebuild_series_matches_full_rebuild(tmp_path):
+    n1, n2 = _records(SHIFTED), _records(IN_CONTROL, level="N2")
+    det = DriftDetector(str(tmp_path / "a.db"))
+    det.rebuild(n1 + n2)
+    untouched = det._load([series_of("GLICOSE", "N2", "L1", "CMD800")])
+
+    # Exclusão de um ponto de N1: só a série dele é recalculada
+    remaining = n1[:-1] + n2
+    det.rebuild_series(remaining, [series_of("GLICOSE", "N1", "L1", "CMD800")])
+    full = DriftDetector(str(tmp_path / "b.db"))
+    full.rebuild(remaining)
+    keys = [series_of("GLICOSE", level, "L1", "CMD800") for level in ("N1", "N2")]
+    assert det._load(keys) == full._load(keys)
+    assert det._load([keys[1]]) == untouched
+
+
+def test_seed_only_fills_empty_state(tmp_path):
+    det = DriftDetector(str(tmp_path / "drift.db"))
+    assert det.seed(_records(SHIFTED)) and not det.is_empty()
+    key = series_of("GLICOSE", "N1", "L1", "CMD800")
+    before = det._load([key])
+    assert det.seed(_records(IN_CONTROL)) == []
+    assert det._load([key]) == before
@@ -0,0 +1,48 @@
+"""Testes do índice de nomes de exames e do MappingService."""
+import time
+
+import pandas as pd
+
+from biodiagnostico_app.services.mapping_service import MappingService
+from biodiagnostico_app.utils.exam_name_index import ExamNameIndex, normalize_name, normalize_series
+
+
+def test_normalize_rules():
+    assert normalize_name("Dosagem de Glicemia em Jejum") == "GLICEMIA EM JEJUM"
+    assert normalize_name("PESQUISA LABORATORIAL DE ANTÍGENO (HBsAg)") == "ANTIGENO HBSAG"
+    assert normalize_name("g-o-t") == "G O T"
+    assert normalize_name("Dosagem") == "DOSAGEM"
+    assert normalize_name(None) == ""
+
+
+def test_exact_and_fuzzy_lookup():
+    index = ExamNameIndex({"DOSAGEM DE HORMONIO TIREOESTIMULANTE (TSH)": "TIREOTROFINA (TSH)", "G O T": "GOT"})
+    assert index.lookup("hormônio tireoestimulante tsh") == "TIREOTROFINA (TSH)"
+    assert index.lookup("Tireotrofina TSH") == "TIREOTROFINA (TSH)"
+    assert index.lookup("HORMONIO TIREOESTIMULANT TSH") is None
+    assert index.lookup("HORMONIO TIREOESTIMULANT TSH", fuzzy=True) == "TIREOTROFINA (TSH)"
+    assert index.lookup("UREIA", fuzzy=True) is None
+
+
+def test_bulk_column_is_fast_and_keeps_nan():
+    index = ExamNameIndex({"HEMOGRAMA COMPLETO": "HEMOGRAMA"})
+    names = pd.Series([f"Dosagem de Exame {i % 2000}" for i in range(100_000)] + ["Hemograma completo", None])
+    started = time.perf_counter()
+    result = index.canonical_series(names)
+    assert time.perf_counter() - started < 1.0
+    assert result.iloc[0] == "EXAME 0"
+    assert result.iloc[-2] == "HEMOGRAMA"
+    assert result.iloc[-1] == ""
+    assert normalize_series(names).iloc[1] == "EXAME 1"
+
+
+def test_mapping_service_cache():
+    MappingService._cache = {"HEMOGRAMA COMPLETO": "HEMOGRAMA", "G O T": "GOT"}
+    MappingService._is_loaded = True
+    assert MappingService.get_canonical_name_sync("hemograma completo ") == "HEMOGRAMA"
+    assert MappingService.get_canonical_name_sync("G O T") == "GOT"
+    assert MappingService.get_canonical_name_sync("Exame inexistente") == "EXAME INEXISTENTE"
+
+    MappingService._cache = {"DOSAGEM DE GLICOSE": "GLICOSE"}
+    assert MappingService.get_canonical_name_sync("glicose") == "GLICOSE"
+    assert MappingService.get_canonical_name_sync("G O T") == "G O T"
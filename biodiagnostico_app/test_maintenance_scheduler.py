@@ -0,0 +1,73 @@
+"""Testes da agenda de manutenção (índice por próxima data)."""
+from datetime import date
+
+from biodiagnostico_app.models import MaintenanceRecord
+from biodiagnostico_app.services.maintenance_scheduler_service import MaintenanceScheduler
+
+TODAY = date(2026, 10, 19)
+
+
+def _m(id, equipment, type_, day, next_date=""):
+    return MaintenanceRecord(id=id, equipment=equipment, type=type_, date=day, next_date=next_date)
+
+
+def _scheduler():
+    s = MaintenanceScheduler()
+    s.rebuild([
+        _m("1", "CMD800", "Preventiva", "2026-08-01", "2026-09-01"),
+        # Preventiva mais recente do CMD800 fecha a pendência de 2026-09-01
+        _m("2", "CMD800", "Preventiva", "2026-09-02", "2026-10-25"),
+        _m("3", "XT1800", "Calibração", "2026-09-15", "2026-10-15"),
+        _m("4", "XT1800", "Corretiva", "2026-10-01"),
+        _m("5", "Centrífuga", "Preventiva", "2026-10-01", "2026-10-19"),
+        _m("6", "Banho-maria", "Preventiva", "2026-10-10", "2027-01-10"),
+    ])
+    return s
+
+
+def test_latest_record_per_equipment_and_type_wins():
+    s = _scheduler()
+    assert [m["equipment"] for m in s.overdue(TODAY)] == ["XT1800"]
+    assert s.pending_count(TODAY) == 2
+    assert [m["id"] for m in s.pending(TODAY)] == ["3", "5"]
+
+
+def test_due_within_and_next_upcoming():
+    s = _scheduler()
+    assert [m["id"] for m in s.due_within(7, TODAY)] == ["5", "2"]
+    assert s.next_upcoming(TODAY)["id"] == "5"
+    assert s.next_upcoming(date(2026, 10, 20))["id"] == "2"
+    assert s.next_upcoming(date(2027, 2, 1)) is None
+
+
+def test_add_and_remove_update_index():
+    s = _scheduler()
+    s.add(_m("7", "XT1800", "Calibração", "2026-10-18", "2026-11-18"))
+    assert s.overdue(TODAY) == []
+    s.remove("7")
+    assert [m["id"] for m in s.overdue(TODAY)] == ["3"]
+    s.remove("2")
+    # Sem a preventiva de setembro, volta a valer a de agosto (vencida)
+    assert [m["id"] for m in s.overdue(TODAY)] == ["1", "3"]
+
+
+def test_recurring_projection_and_suggestion():
+    s = MaintenanceScheduler()
+    s.rebuild([
+        _m("1", "CMD800", "Preventiva", "2026-07-01", "2026-08-01"),
+        _m("2", "CMD800", "Preventiva", "2026-08-03"),
+        _m("3", "CMD800", "Corretiva", "2026-08-04"),
+    ])
+    current = s.for_equipment("cmd800")
+    assert len(current) == 1
+    assert current[0]["next_date"] == "2026-09-03" and current[0]["projected"]
+    assert s.suggest_next_date("CMD800", "Preventiva", "2026-10-19") == "2026-11-19"
+    assert s.suggest_next_date("CMD800", "Corretiva", "2026-10-19") == ""
+
+
+def test_rollover_summary():
+    s = _scheduler()
+    summary = s.rollover(TODAY)
+    assert summary["date"] == "2026-10-19"
+    assert (summary["overdue"], summary["pending"], summary["due_soon"]) == (1, 2, 2)
+    assert summary["next"]["id"] == "5"
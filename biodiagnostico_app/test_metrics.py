@@ -0,0 +1,148 @@
+"""Testes da instrumentação de services/event handlers e do endpoint de métricas."""
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from benchmarks.synthetic_data import generate_qc_rows
+from biodiagnostico_app.api_routes import api
+from biodiagnostico_app.services import metrics_service
+from biodiagnostico_app.services.metrics_service import instrument_service, metrics, state_size_bytes
+from biodiagnostico_app.state import State
+from biodiagnostico_app.states.qc_state import build_qc_records
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@instrument_service
+class FakeService:
+    @staticmethod
+    async def list_rows(n):
+        return [{"id": i} for i in range(n)]
+
+    @classmethod
+    def fail(cls):
+        raise ValueError("boom")
+
+    def _private(self):
+        return "fora da instrumentação"
+
+
+def test_service_methods_are_timed():
+    assert asyncio.run(FakeService.list_rows(3)) == [{"id": 0}, {"id": 1}, {"id": 2}]
+    asyncio.run(FakeService.list_rows(2))
+    with pytest.raises(ValueError):
+        FakeService.fail()
+    FakeService()._private()
+
+    rows = metrics.snapshot("service", "FakeService.list_rows")
+    assert rows["calls"] == 2 and rows["rows"] == 5 and rows["errors"] == 0
+    assert metrics.snapshot("service", "FakeService.fail")["errors"] == 1
+    assert metrics.snapshot("service", "FakeService._private")["calls"] == 0
+
+
+def test_event_processing_wrapper(monkeypatch):
+    from reflex_base.event.processor import base_state_processor
+
+    calls = []
+
+    async def original(handler, payload, state, root_state):
+        calls.append(payload)
+        if payload.get("fail"):
+            raise RuntimeError("handler")
+
+    def handler():
+        pass
+
+    class Handler:
+        fn = handler
+
+    monkeypatch.setattr(base_state_processor, "process_event", original)
+    assert metrics_service.instrument_event_processing()
+    assert metrics_service.instrument_event_processing()  # idempotente
+    wrapped = base_state_processor.process_event
+
+    asyncio.run(wrapped(handler=Handler, payload={}, state=None, root_state=None))
+    with pytest.raises(RuntimeError):
+        asyncio.run(wrapped(handler=Handler, payload={"fail": True}, state=None, root_state=None))
+    stats = metrics.snapshot("event_handler", handler.__qualname__)
+    assert len(calls) == 2 and stats["calls"] == 2 and stats["errors"] == 1
+
+
+def test_event_processing_samples_state_before_releasing_lock(monkeypatch):
+    from reflex_base.event.processor import base_state_processor
+
+    async def original(handler, payload, state, root_state):
+        pass
+
+    def handler():
+        pass
+
+    class Handler:
+        fn = handler
+
+    monkeypatch.setattr(base_state_processor, "process_event", original)
+    assert metrics_service.instrument_event_processing()
+    state = State(_reflex_internal_init=True)
+    state.router_data = {"token": "tab-lock"}
+
+    # O Reflex libera o lock assim que process_event retorna: a amostra já tem de estar feita
+    asyncio.run(base_state_processor.process_event(
+        handler=Handler, payload={}, state=state, root_state=state,
+    ))
+    assert "qc_session_state_bytes_count 1" in metrics.render()
+
+
+def test_state_size_sampled_once_per_window():
+    state = State(_reflex_internal_init=True)
+    state.router_data = {"token": "tab-1"}
+    empty = state_size_bytes(state)
+    state.qc_records = build_qc_records(generate_qc_rows(360, seed=5), {}, set())
+    assert state_size_bytes(state) > empty > 0
+
+    asyncio.run(metrics.sample_state(state))
+    asyncio.run(metrics.sample_state(state))
+    text = metrics.render()
+    assert "qc_session_state_bytes_count 1" in text
+    assert "qc_sessions_tracked 1" in text
+
+
+def test_loop_lag_and_prometheus_endpoint():
+    async def sample():
+        task = asyncio.create_task(metrics.run_forever(interval=0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(sample())
+    asyncio.run(FakeService.list_rows(1))
+
+    response = TestClient(api, client=("127.0.0.1", 50000)).get("/api/metrics")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'qc_service_calls_total{method="FakeService.list_rows"} 1' in body
+    assert 'qc_service_duration_seconds_bucket{method="FakeService.list_rows",le="+Inf"} 1' in body
+    assert "# TYPE qc_event_loop_lag_seconds histogram" in body
+    assert int(body.split("qc_event_loop_lag_seconds_count ")[1].split()[0]) >= 2
+
+
+def test_endpoint_token(monkeypatch):
+    from biodiagnostico_app import api_routes
+
+    monkeypatch.setattr(api_routes, "METRICS_TOKEN", "segredo")
+    client = TestClient(api)
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer segredo"}).status_code == 200
+
+
+def test_endpoint_without_token_is_local_only():
+    local = TestClient(api, client=("127.0.0.1", 50000))
+    assert local.get("/api/metrics").status_code == 200
+    # Pelo nginx a conexão é local, mas o cliente original não
+    assert local.get("/api/metrics", headers={"X-Forwarded-For": "127.0.0.1, 203.0.113.7"}).status_code == 401
+    assert TestClient(api, client=("10.0.0.5", 50000)).get("/api/metrics").status_code == 401
+    assert TestClient(api, client=("10.0.0.5", 50000)).get("/api/profile/state").status_code == 401
@@ -0,0 +1,75 @@
+"""Testes do pipeline de leitura de relatórios de faturamento em PDF."""
+from openpyxl import load_workbook
+
+from biodiagnostico_app.utils import pdf_ingest
+from biodiagnostico_app.utils.analysis_module import compare_exams
+from biodiagnostico_app.utils.pdf_ingest import iter_pdf_rows, parse_page, pdf_to_dataframe, pdf_to_xlsx
+
+
+class _CorruptAwareBackend(pdf_ingest._TextBackend):
+    """Texto com páginas marcadas como corrompidas (simula falha do extrator)."""
+
+    def page_text(self, doc, index):
+        if "CORROMPIDA" in doc[index]:
+            raise ValueError("xref quebrado")
+        return doc[index]
+
+
+pdf_ingest.BACKENDS["corrupt_text"] = _CorruptAwareBackend
+
+
+def _report(tmp_path, pages, name="compulab.txt"):
+    path = tmp_path / name
+    path.write_text("\f".join(pages), encoding="utf-8")
+    return str(path)
+
+
+def _page(patient, n_exams, first_code=1000):
+    lines = [f"Paciente: {patient}"]
+    lines += [f"{first_code + i}   EXAME {i}   1.00{i % 10},50" for i in range(n_exams)]
+    return "\n".join(lines)
+
+
+def test_parse_page_and_patient_carried_across_pages(tmp_path):
+    rows, last = parse_page("Paciente: ANA SOUZA\n202020380  HEMOGRAMA COMPLETO  R$ 4,11\nTOTAL 4,11", 1)
+    assert rows == [(1, "ANA SOUZA", "202020380", "HEMOGRAMA COMPLETO", "4,11")]
+    assert last == "ANA SOUZA"
+
+    path = _report(tmp_path, ["Paciente: ANA\n1001  GLICOSE  1,85", "1002  UREIA  1.234,56\nPaciente: BIA\n1001  GLICOSE  1,85"])
+    df, report = pdf_to_dataframe(path, workers=0)
+    assert list(df["Paciente"]) == ["ANA", "ANA", "BIA"]
+    assert df["_cents"].sum() == 185 + 123456 + 185
+    assert report.pages_ok == 2 and not report.has_errors
+
+
+def test_corrupted_pages_are_isolated_in_process_pool(tmp_path):
+    pages = [_page(f"PACIENTE {i}", 20) for i in range(40)]
+    pages[7] = "CORROMPIDA"
+    pages[31] = "CORROMPIDA"
+    path = _report(tmp_path, pages)
+    report = pdf_ingest.PdfIngestReport(path=path)
+    chunks = list(iter_pdf_rows(path, report, backend="corrupt_text", workers=2, batch_pages=4))
+    assert len(chunks) == 10
+    assert [e.page for e in report.errors] == [8, 32]
+    assert report.pages_ok == 38 and report.rows == 38 * 20
+    # Ordem preservada entre lotes
+    assert chunks[-1]["Paciente"].iloc[-1] == "PACIENTE 39"
+
+
+def test_unreadable_file_is_reported(tmp_path):
+    report = pdf_ingest.PdfIngestReport(path="nao_existe.txt")
+    assert list(iter_pdf_rows(str(tmp_path / "nao_existe.txt"), report)) == []
+    assert report.errors[0].page == 0
+
+
+def test_xlsx_conversion_and_reconciliation(tmp_path):
+    comp = _report(tmp_path, [_page("ANA", 3), _page("BIA", 2)], "compulab.txt")
+    sim = _report(tmp_path, [_page("ANA", 3)], "simus.txt")
+    out = tmp_path / "compulab.xlsx"
+    report = pdf_to_xlsx(comp, out, workers=0)
+    assert report.rows == 5
+    sheet = load_workbook(out)["Exames"]
+    assert [c.value for c in sheet[2]] == ["ANA", "EXAME 0", "1000", 1000.5, 1]
+
+    result = compare_exams(pdf_to_dataframe(comp, workers=0)[0], pdf_to_dataframe(sim, workers=0)[0])
+    assert result["summary"]["missing_in_simus_count"] == 2
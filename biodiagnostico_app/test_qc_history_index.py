@@ -0,0 +1,172 @@
+"""Testes do índice do histórico de CQ (services/qc_history_index_service.py e utils/time_index.py)."""
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from benchmarks.synthetic_data import generate_qc_rows, references_by_id
+from biodiagnostico_app.models import QCRecord
+from biodiagnostico_app.services.qc_history_index_service import QCHistoryIndex, qc_history_index
+from biodiagnostico_app.states import _post_calibration_ops
+from biodiagnostico_app.states.qc_state import build_qc_records
+from biodiagnostico_app.utils.time_index import TimeIndex, desc_insert_position
+
+
+def make_record(i, exam="GLICOSE", lot="L1", equipment="CMD800", analyst="ANA", date="2026-03-01T08:00", cv=1.0):
+    return QCRecord(
+        id=str(i), date=date, exam_name=exam, level="N1", lot_number=lot, value=100.0,
+        target_value=100.0, target_sd=2.0, cv=cv, cv_max_threshold=5.0, equipment=equipment, analyst=analyst,
+    )
+
+
+def brute_force(records, search, status="Todos", day=""):
+    """Mesma semântica do índice, varrendo tudo"""
+    terms = search.upper().split()
+    result = []
+    for r in records:
+        fields = [f.upper() for f in (r.exam_name, r.lot_number, r.equipment, r.analyst) if f]
+        if not all(any(t in f for f in fields) for t in terms):
+            continue
+        if day and (r.date or "")[:10] != day:
+            continue
+        if status == "OK" and r.cv > r.cv_max_threshold:
+            continue
+        if status in ("ALERTA", "ERRO") and r.cv <= r.cv_max_threshold:
+            continue
+        result.append(r.id)
+    return sorted(result)
+
+
+def test_matches_brute_force_on_synthetic_history():
+    rows = generate_qc_rows(3000, seed=3)
+    records = build_qc_records(rows, references_by_id(rows), set())
+    index = QCHistoryIndex()
+    index.rebuild(records)
+    day = records[100].date[:10]
+    for search in ["", "g", "GLI", "glicose", "COL HDL", "xyz", records[0].lot_number, "  ure  "]:
+        for status in ("Todos", "OK", "ALERTA"):
+            for d in ("", day):
+                got = index.query(search, status, d)
+                assert sorted(r.id for r in got) == brute_force(records, search, status, d), (search, status, d)
+                assert [r.date for r in got] == sorted((r.date for r in got), reverse=True)
+
+
+def test_incremental_add_remove_and_cache():
+    index = QCHistoryIndex()
+    index.rebuild([make_record(1), make_record(2, exam="UREIA", analyst="BRUNO")])
+    assert [r.id for r in index.query("bru")] == ["2"]
+    first = index.query("gli")
+    assert index.query("GLI") is first  # mesma chave normalizada -> cache
+
+    index.add_record(make_record(3, exam="GLICOSE POS", date="2026-03-02T08:00", cv=9.0))
+    assert [r.id for r in index.query("gli")] == ["3", "1"]
+    assert [r.id for r in index.query("gli", "ALERTA")] == ["3"]
+
+    # Reinserção com outro exame troca os tokens do registro
+    index.add_record(make_record(1, exam="CREATININA"))
+    assert [r.id for r in index.query("gli")] == ["3"]
+    assert index.remove_record("3") and not index.remove_record("3")
+    assert index.query("gli") == []
+    assert "GLICOSE" not in index._ids_by_token and "GLI" not in index._tokens_by_gram
+    assert sorted(r.id for r in index.query("", day="2026-03-01")) == ["1", "2"]
+
+
+def test_query_over_100k_records_is_fast():
+    records = [
+        make_record(i, exam=f"EXAME {i % 300}", lot=f"LOTE{i % 40}", analyst=f"ANALISTA {i % 12}",
+                    date=f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}T08:00")
+        for i in range(100_000)
+    ]
+    index = QCHistoryIndex()
+    index.rebuild(records)
+    started = time.perf_counter()
+    result = index.query("exame 17", "Todos", "2026-06-06")
+    assert time.perf_counter() - started < 0.05
+    assert result and sorted(r.id for r in result) == brute_force(records, "exame 17", day="2026-06-06")
+
+
+def test_time_index_matches_sorted_scan():
+    rng = random.Random(7)
+    index = TimeIndex()
+    live = {}
+    for step in range(600):
+        if live and rng.random() < 0.3:
+            record_id = rng.choice(sorted(live))
+            assert index.remove(record_id, live.pop(record_id))
+        else:
+            record_id = str(step)
+            live[record_id] = f"2026-{rng.randint(1, 3):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00"
+            index.add(record_id, live[record_id])
+
+    assert not index.remove("inexistente", "2026-01-01")
+    ordered = sorted(live, key=lambda i: live[i])
+    assert [live[i] for i in index.ids_between()] == [live[i] for i in ordered]
+    assert sorted(index.ids_between("2026-02-01", "2026-02-10T23:59:59")) == sorted(
+        i for i in live if "2026-02-01" <= live[i] <= "2026-02-10T23:59:59"
+    )
+    assert sorted(index.ids_with_prefix("2026-03")) == sorted(i for i in live if live[i].startswith("2026-03"))
+    days = sorted({d[:10] for d in live.values()})
+    assert sorted(index.ids_on(days[3])) == sorted(i for i in live if live[i].startswith(days[3]))
+    assert index.next_day(days[3]) == days[4] and index.prev_day(days[3]) == days[2]
+    assert index.next_day(days[-1]) is None and index.prev_day(days[0]) is None
+    assert index.next_day("2025-12-31") == days[0]
+
+    # Reconstrução em lote dá o mesmo resultado que as inclusões uma a uma
+    rebuilt = TimeIndex()
+    rebuilt.rebuild(live.items())
+    assert [live[i] for i in rebuilt.ids_between()] == [live[i] for i in index.ids_between()]
+    assert rebuilt.next_day(days[3]) == days[4]
+
+
+def test_desc_insert_position_keeps_newest_first():
+    dates = ["2026-03-05", "2026-03-03", "2026-03-03", "2026-03-01"]
+    key = lambda d: d
+    assert desc_insert_position(dates, "2026-03-04", key) == 1
+    assert desc_insert_position(dates, "2026-03-03", key) == 3
+    assert desc_insert_position(dates, "2026-03-09", key) == 0
+    assert desc_insert_position(dates, "2026-01-01", key) == 4
+
+
+def test_history_navigation_and_ranges():
+    index = QCHistoryIndex()
+    index.rebuild([
+        make_record(1, date="2026-03-01T08:00"), make_record(2, date="2026-03-05T09:00"),
+        make_record(3, date="2026-04-02T07:00"),
+    ])
+    index.add_record(make_record(4, date="2026-03-05T07:30"))
+    assert [r.id for r in index.with_date_prefix("2026-03")] == ["1", "4", "2"]
+    assert [r.id for r in index.between("2026-03-02", "2026-04-02T23:59:59")] == ["4", "2", "3"]
+    assert index.next_day("2026-03-01") == "2026-03-05" and index.prev_day("2026-04-02") == "2026-03-05"
+    assert [r.id for r in index.query("", day="2026-03-05")] == ["2", "4"]
+    index.remove_record("3")
+    assert index.next_day("2026-03-05") is None
+
+
+def test_post_calibration_updates_history_rows(monkeypatch):
+    async def created(data):
+        return {"id": "pc1"}
+
+    async def updated(record_id, data):
+        return True
+
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(_post_calibration_ops.PostCalibrationService, "create_record", created)
+    monkeypatch.setattr(_post_calibration_ops.QCService, "update_qc_record", updated)
+    monkeypatch.setattr(_post_calibration_ops.asyncio, "sleep", no_sleep)
+    record = make_record(1)
+    record.needs_calibration = True
+    state = SimpleNamespace(
+        qc_records=[record], post_calibration_records=[], post_cal_value="101", post_cal_analyst="ANA",
+        post_cal_notes="", selected_qc_record_for_calibration={"id": "1", "exam_name": "GLICOSE", "value": 100.0,
+                                                              "cv": 1.0, "target_value": 100.0},
+    )
+    qc_history_index.rebuild(state.qc_records)
+    try:
+        assert qc_history_index.query("GLICOSE")[0].needs_calibration is True
+        asyncio.run(_post_calibration_ops.save_post_calibration(state))
+        [row] = qc_history_index.query("GLICOSE")
+        assert (row.needs_calibration, row.post_calibration_id) == (False, "pc1")
+    finally:
+        qc_history_index.rebuild([])
@@ -0,0 +1,143 @@
+"""
+Testes unitários para o outbox local de gravações de CQ
+"""
+import asyncio
+
+from postgrest.exceptions import APIError
+
+from biodiagnostico_app.services.qc_outbox_service import (
+    QCOutbox, series_key, STATUS_PENDING, STATUS_SYNCED, STATUS_FAILED,
+)
+
+
+class FakeSender:
+    """Sender de teste: registra chamadas e pode simular falhas"""
+
+    def __init__(self):
+        self.calls = []
+        self.offline = False
+        self.reject_values = set()
+
+    def __call__(self, kind, target, payloads):
+        if self.offline:
+            raise ConnectionError("rede indisponível")
+        for p in payloads:
+            if p.get("value") in self.reject_values:
+                raise APIError({"message": "violação de constraint", "code": "23514"})
+        self.calls.append((kind, target, [dict(p) for p in payloads]))
+        if kind == "rpc":
+            return [{"status": "APROVADO"} for _ in payloads]
+        return payloads
+
+
+def make_outbox(tmp_path, sender):
+    return QCOutbox(str(tmp_path / "outbox.db"), sender=sender)
+
+
+class TestEnqueue:
+
+    def test_assigns_client_uuid(self, tmp_path):
+        outbox = make_outbox(tmp_path, FakeSender())
+        entry_id = outbox.enqueue_insert("qc_records", {"value": 1.0}, series_key("GLICOSE", "N1", "L1"))
+        assert len(entry_id) == 36
+        assert outbox.status(entry_id) == STATUS_PENDING
+        assert outbox.pending_payloads("qc_records")[0]["id"] == entry_id
+
+    def test_keeps_existing_id(self, tmp_path):
+        outbox = make_outbox(tmp_path, FakeSender())
+        entry_id = outbox.enqueue_insert("qc_records", {"id": "abc", "value": 1.0}, "S")
+        assert entry_id == "abc"
+
+    def test_survives_reopen(self, tmp_path):
+        outbox = make_outbox(tmp_path, FakeSender())
+        entry_id = outbox.enqueue_insert("qc_records", {"value": 1.0}, "S")
+        outbox.close()
+        reopened = make_outbox(tmp_path, FakeSender())
+        assert reopened.status(entry_id) == STATUS_PENDING
+        assert reopened.pending_count() == 1
+
+
+class TestDiscard:
+
+    def test_discarded_entry_is_not_sent(self, tmp_path):
+        sender = FakeSender()
+        outbox = make_outbox(tmp_path, sender)
+        kept = outbox.enqueue_insert("qc_records", {"value": 1.0}, "S")
+        deleted = outbox.enqueue_insert("qc_records", {"value": 2.0}, "S")
+        assert outbox.discard([deleted, "inexistente"]) == 1
+        assert [p["id"] for p in outbox.pending_payloads("qc_records")] == [kept]
+        asyncio.run(outbox.flush())
+        assert [p["value"] for p in sender.calls[0][2]] == [1.0]
+
+    def test_synced_entry_is_not_discarded(self, tmp_path):
+        outbox = make_outbox(tmp_path, FakeSender())
+        entry_id = outbox.enqueue_insert("qc_records", {"value": 1.0}, "S")
+        asyncio.run(outbox.flush())
+        assert outbox.discard([entry_id]) == 0
+        assert outbox.status(entry_id) == STATUS_SYNCED
+
+    def test_clear_only_target(self, tmp_path):
+        sender = FakeSender()
+        outbox = make_outbox(tmp_path, sender)
+        for i in range(3):
+            outbox.enqueue_insert("qc_records", {"value": float(i)}, "S")
+        outbox.enqueue_insert("reagent_lots", {"value": 9.0}, "R")
+        assert outbox.clear("qc_records") == 3
+        assert outbox.pending_count() == 1
+        asyncio.run(outbox.flush())
+        assert [(c[1], len(c[2])) for c in sender.calls] == [("reagent_lots", 1)]
+
+
+class TestFlush:
+
+    def test_batches_inserts_per_table(self, tmp_path):
+        sender = FakeSender()
+        outbox = make_outbox(tmp_path, sender)
+        ids = [outbox.enqueue_insert("qc_records", {"value": float(i)}, f"S{i % 2}") for i in range(5)]
+        result = asyncio.run(outbox.flush())
+        assert result == {"synced": 5, "failed": 0}
+        assert len(sender.calls) == 1
+        assert [p["value"] for p in sender.calls[0][2]] == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert all(outbox.status(i) == STATUS_SYNCED for i in ids)
+
+    def test_offline_keeps_entries_pending(self, tmp_path):
+        sender = FakeSender()
+        sender.offline = True
+        outbox = make_outbox(tmp_path, sender)
+        entry_id = outbox.enqueue_insert("qc_records", {"value": 1.0}, "S")
+        asyncio.run(outbox.flush())
+        assert outbox.status(entry_id) == STATUS_PENDING
+        assert outbox.last_error(entry_id) == "rede indisponível"
+
+    def test_backoff_blocks_later_entries_of_same_series(self, tmp_path):
+        sender = FakeSender()
+        outbox = make_outbox(tmp_path, sender)
+        first = outbox.enqueue_rpc("hematology_register_qc_measurement", {"p_valor_medido": 1}, "A")
+        sender.offline = True
+        asyncio.run(outbox.flush())
+        sender.offline = False
+        second = outbox.enqueue_rpc("hematology_register_qc_measurement", {"p_valor_medido": 2}, "A")
+        other = outbox.enqueue_rpc("hematology_register_qc_measurement", {"p_valor_medido": 3}, "B")
+        asyncio.run(outbox.flush())
+        # "A" ainda em backoff: a segunda medição não pode passar à frente da primeira
+        assert outbox.status(first) == STATUS_PENDING
+        assert outbox.status(second) == STATUS_PENDING
+        assert outbox.status(other) == STATUS_SYNCED
+
+    def test_rejected_row_fails_alone(self, tmp_path):
+        sender = FakeSender()
+        sender.reject_values = {2.0}
+        outbox = make_outbox(tmp_path, sender)
+        good = outbox.enqueue_insert("qc_records", {"value": 1.0}, "S")
+        bad = outbox.enqueue_insert("qc_records", {"value": 2.0}, "S")
+        result = asyncio.run(outbox.flush())
+        assert result == {"synced": 1, "failed": 1}
+        assert outbox.status(good) == STATUS_SYNCED
+        assert outbox.status(bad) == STATUS_FAILED
+        assert outbox.pending_count() == 0
+
+    def test_rpc_result_available_after_submit(self, tmp_path):
+        outbox = make_outbox(tmp_path, FakeSender())
+        entry_id = outbox.enqueue_rpc("urine_register_qc_measurement", {"p_valor_medido": 1}, "S")
+        assert asyncio.run(outbox.submit(entry_id)) == STATUS_SYNCED
+        assert outbox.result(entry_id) == {"status": "APROVADO"}
@@ -0,0 +1,68 @@
+"""
+Testes unitários para o motor de estatísticas por série de CQ
+"""
+import random
+import statistics
+
+from biodiagnostico_app.models import QCRecord
+from biodiagnostico_app.services.qc_statistics_service import (
+    QCStatisticsEngine, RunningStats,
+)
+
+
+def make_record(i, value, date=None, lot="L1"):
+    return QCRecord(
+        id=str(i), date=date or f"2026-01-{(i % 28) + 1:02d}T{i % 24:02d}:00", exam_name="GLICOSE",
+        level="N1", lot_number=lot, value=value, target_value=100.0, target_sd=2.0, cv=0.0, status="OK",
+    )
+
+
+class TestRunningStats:
+
+    def test_matches_statistics_module(self):
+        values = [random.Random(1).gauss(100, 3) for _ in range(50)]
+        stats = RunningStats.from_values(values)
+        assert abs(stats.mean - statistics.mean(values)) < 1e-9
+        assert abs(stats.sd - statistics.stdev(values)) < 1e-9
+
+    def test_remove_reverses_add(self):
+        stats = RunningStats.from_values([1.0, 2.0, 3.0, 10.0])
+        stats.remove(10.0)
+        assert stats.n == 3
+        assert abs(stats.mean - 2.0) < 1e-12
+        assert abs(stats.sd - 1.0) < 1e-12
+
+
+class TestEngine:
+
+    def test_rolling_windows_and_month(self):
+        engine = QCStatisticsEngine()
+        values = [100.0 + (i % 5) for i in range(40)]
+        dates = [f"2026-{1 + i // 25:02d}-{(i % 25) + 1:02d}" for i in range(40)]
+        for i, (v, d) in enumerate(zip(values, dates)):
+            engine.add_record(make_record(i, v, d))
+        snap = engine.snapshot("glicose", "n1", "l1")
+        assert snap["n"] == 40
+        assert abs(snap["last20_sd"] - statistics.stdev(values[-20:])) < 1e-3
+        assert abs(snap["last30_mean"] - statistics.mean(values[-30:])) < 1e-3
+        assert snap["month"] == "2026-02"
+        assert snap["month_n"] == 15
+        assert snap["baseline_ready"] is True
+        assert abs(snap["baseline_mean"] - statistics.mean(values[:20])) < 1e-3
+
+    def test_delete_recomputes_exactly(self):
+        engine = QCStatisticsEngine()
+        records = [make_record(i, 100.0 + i, f"2026-01-{i + 1:02d}") for i in range(25)]
+        engine.rebuild(reversed(records))
+        assert engine.remove_record("3")
+        remaining = [r.value for r in records if r.id != "3"]
+        snap = engine.snapshot("GLICOSE", "N1", "L1")
+        assert snap["n"] == 24
+        assert abs(snap["sd"] - statistics.stdev(remaining)) < 1e-3
+        assert abs(snap["last20_mean"] - statistics.mean(remaining[-20:])) < 1e-3
+
+    def test_no_baseline_before_20_points(self):
+        engine = QCStatisticsEngine()
+        engine.rebuild([make_record(i, 100.0) for i in range(19)])
+        assert engine.baseline("GLICOSE", "N1", "L1") is None
+        assert engine.baseline("GLICOSE", "N1", "OUTRO") is None
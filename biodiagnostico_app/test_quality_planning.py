@@ -0,0 +1,88 @@
+"""
+Testes unitários para o planejamento da qualidade (Sigma)
+"""
+from biodiagnostico_app.models import QCRecord
+from biodiagnostico_app.services.quality_planning_service import (
+    QualityPlanner, select_rules, apply_rule_selection,
+)
+from biodiagnostico_app.services.westgard_service import WestgardService
+
+
+def make_records(exam, level, values, target):
+    return [
+        QCRecord(id=f"{exam}-{level}-{i}", date=f"2026-01-{i + 1:02d}", exam_name=exam, level=level,
+                 value=v, target_value=target, target_sd=1.0, cv=0.0, status="OK")
+        for i, v in enumerate(values)
+    ]
+
+
+class TestSigma:
+
+    def test_bias_cv_sigma(self):
+        # média 102, alvo 100 -> bias 2%; DP amostral 2 -> CV ~1.96%; TEa 10 -> Sigma ~4.08
+        records = make_records("GLICOSE", "N1", [100.0, 102.0, 104.0], 100.0)
+        planner = QualityPlanner({"GLICOSE": 10.0})
+        row = planner.plan(records)[0]
+        assert (row["n"], row["bias"], row["cv"]) == (3, 2.0, 1.96)
+        assert row["sigma"] == 4.08
+        assert row["rules"] == ["1-3s", "2-2s", "R-4s", "4-1s", "2of3-2s", "3-1s"]
+        assert planner.rules_for("glicose", "N1") == row["rules"]
+
+    def test_lot_change_does_not_inflate_cv(self):
+        # Dois lotes com médias 100 e 110: DP combinado dentro dos lotes, não entre eles
+        records = make_records("GLICOSE", "N1", [99.0, 100.0, 101.0], 100.0)
+        for i, v in enumerate([109.0, 110.0, 111.0]):
+            records.append(QCRecord(id=f"lote2-{i}", date=f"2026-02-{i + 1:02d}", exam_name="GLICOSE", level="N1",
+                                    lot_number="L2", value=v, target_value=110.0, target_sd=1.0))
+        row = QualityPlanner({"GLICOSE": 10.0}).plan(records)[0]
+        assert (row["n"], row["sd"], row["bias"]) == (6, 1.0, 0.0)
+        assert row["cv"] == round(1.0 / 105.0 * 100, 2)
+
+    def test_ranked_worst_first_and_missing_tea_last(self):
+        records = (
+            make_records("GLICOSE", "N1", [99.0, 100.0, 101.0], 100.0)
+            + make_records("UREIA", "N1", [90.0, 100.0, 110.0], 100.0)
+            + make_records("EXAME X", "N1", [1.0, 2.0], 1.5)
+        )
+        rows = QualityPlanner({"GLICOSE": 10.0, "UREIA": 9.0}).plan(records)
+        assert [r["exam_name"] for r in rows] == ["UREIA", "GLICOSE", "EXAME X"]
+        assert rows[-1]["sigma"] is None
+
+    def test_cached_per_data_version(self):
+        planner = QualityPlanner({"GLICOSE": 10.0})
+        records = make_records("GLICOSE", "N1", [100.0, 101.0], 100.0)
+        first = planner.plan(records)
+        calls = []
+        planner._compute = lambda recs: calls.append(recs) or []
+        assert planner.plan(records) == first
+        assert calls == []
+        planner.plan(records[:1])
+        assert len(calls) == 1
+
+
+class TestRuleSelection:
+
+    def test_select_rules_by_sigma(self):
+        assert select_rules(6.5) == ["1-3s"]
+        assert select_rules(None)[-1] == "10x"
+
+    def test_downgrades_unselected_rejections(self):
+        violations = [
+            {"rule": "1-3s", "description": "a", "severity": "rejection"},
+            {"rule": "2-2s", "description": "b", "severity": "rejection"},
+        ]
+        result = apply_rule_selection(violations, ["1-3s"])
+        assert [v["severity"] for v in result] == ["rejection", "warning"]
+        assert apply_rule_selection(violations, None) is violations
+
+    def test_2of3_2s_across_levels_stays_rejection_below_4_sigma(self):
+        # N2 da corrida 1 e N1 da corrida 2 acima de 2 DP: 2of3-2s atravessando níveis
+        records = [
+            QCRecord(id=str(i), date=f"2026-01-0{day}T08:00", exam_name="GLICOSE", level=level,
+                     lot_number="L1", value=100.0 + z * 2.0, target_value=100.0, target_sd=2.0, equipment="EQ1")
+            for i, (day, level, z) in enumerate([(1, "N1", 0.5), (1, "N2", 2.5), (2, "N1", 2.3), (2, "N2", 0.2)])
+        ]
+        violations = [v for v in WestgardService.evaluate_runs(records) if v["severity"] == "rejection"]
+        assert {v["rule"] for v in violations} == {"2of3-2s"}
+        result = apply_rule_selection(violations, select_rules(3.2))
+        assert {(v["rule"], v["severity"]) for v in result} == {("2of3-2s", "rejection")}
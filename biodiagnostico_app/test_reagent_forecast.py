@@ -0,0 +1,100 @@
+"""Testes da previsão vetorizada de consumo de reagentes."""
+import time
+from datetime import date, timedelta
+
+from biodiagnostico_app.models import QCRecord, ReagentLot
+from biodiagnostico_app.services.reagent_forecast_service import ReagentForecaster, at_risk, match_exam
+
+TODAY = date(2026, 10, 19)
+
+
+def _qc_daily(exam, days, per_day=1):
+    return [
+        QCRecord(id=f"{exam}{d}-{k}", date=(TODAY - timedelta(days=d)).isoformat() + "T08:00", exam_name=exam)
+        for d in range(days) for k in range(per_day)
+    ]
+
+
+def test_days_left_and_invalid_expiry():
+    rows = ReagentForecaster().forecast([
+        ReagentLot(id="a", name="X", expiry_date="2026-10-29"),
+        ReagentLot(id="b", name="Y", expiry_date="29/10/2026"),
+        ReagentLot(id="c", name="Z", expiry_date="2026-10-01"),
+    ], [], today=TODAY)
+    assert [r["days_left"] for r in rows] == [10, 0, -18]
+
+
+def test_manual_consumption_without_qc_activity():
+    lot = ReagentLot(id="a", name="Reagente sem CQ", current_stock=100, estimated_consumption=5,
+                     created_at=(TODAY - timedelta(days=4)).isoformat(), expiry_date="2027-06-01")
+    row = ReagentForecaster().forecast([lot], [], today=TODAY)[0]
+    assert row["remaining_stock"] == 80
+    assert row["days_to_rupture"] == 16
+    assert row["stockout_date"] == (TODAY + timedelta(days=16)).isoformat()
+
+
+def test_consumption_derived_from_qc_activity():
+    records = _qc_daily("GLICOSE", 56, per_day=2)
+    lot = ReagentLot(id="a", name="Glicose HK", current_stock=100,
+                     created_at=(TODAY - timedelta(days=10)).isoformat(), expiry_date="2027-06-01")
+    row = ReagentForecaster(usage_per_qc=1).forecast([lot], records, today=TODAY)[0]
+    assert row["exam_name"] == "GLICOSE"
+    assert row["daily_rate"] == 2.0
+    # 11 dias de atividade desde a criação (inclui hoje) × 2 registros/dia
+    assert row["remaining_stock"] == 78
+    assert row["days_to_rupture"] == 39
+
+
+def test_expiry_waste_and_risk_ranking():
+    records = _qc_daily("UREIA", 56)
+    lots = [
+        ReagentLot(id="sobra", name="Ureia", current_stock=500, expiry_date=(TODAY + timedelta(days=20)).isoformat(),
+                   created_at=TODAY.isoformat()),
+        ReagentLot(id="ruptura", name="Ureia UV", current_stock=3, estimated_consumption=1,
+                   expiry_date="2027-06-01", created_at=TODAY.isoformat()),
+        ReagentLot(id="ok", name="Ureia 2", current_stock=30, expiry_date="2027-06-01", created_at=TODAY.isoformat()),
+    ]
+    rows = ReagentForecaster().forecast(lots, records, today=TODAY)
+    assert rows[0]["expiry_waste"] > 450
+    assert [r["lot_id"] for r in at_risk(rows)] == ["ruptura", "sobra"]
+
+
+def test_match_exam_prefers_exact_then_longest():
+    exams = ["COLESTEROL", "COLESTEROL HDL", "GLICOSE"]
+    assert match_exam("Colesterol HDL Direto", exams) == 1
+    assert match_exam("glicose", exams) == 2
+    assert match_exam("Hemoglobina", exams) == -1
+
+
+def test_daily_cache_and_scale():
+    records = []
+    for i in range(60):
+        records += _qc_daily(f"EXAME {i}", 120)
+    lots = [
+        ReagentLot(id=str(i), name=f"Exame {i % 60}", current_stock=1000, expiry_date="2027-06-01",
+                   created_at=(TODAY - timedelta(days=i % 90)).isoformat())
+        for i in range(500)
+    ]
+    forecaster = ReagentForecaster()
+    started = time.perf_counter()
+    rows = forecaster.forecast(lots, records, today=TODAY)
+    assert time.perf_counter() - started < 2.0
+    assert len(rows) == 500 and all(r["daily_rate"] == 1.0 for r in rows)
+
+    forecaster._compute = None  # segunda chamada no mesmo dia, mesmos dados: cache
+    assert forecaster.forecast(lots, records, today=TODAY) == rows
+
+
+def test_cache_invalidated_when_record_replaced_same_day():
+    records = _qc_daily("GLICOSE", 56)
+    lot = ReagentLot(id="a", name="Glicose HK", current_stock=100,
+                     created_at=(TODAY - timedelta(days=10)).isoformat(), expiry_date="2027-06-01")
+    forecaster = ReagentForecaster(usage_per_qc=1)
+    before = forecaster.forecast([lot], records, today=TODAY)[0]
+
+    # Exclui um registro de GLICOSE de 3 dias atrás e grava outro hoje, de outro exame:
+    # mesma contagem e mesma data máxima, mas menos consumo desde a criação do lote
+    replaced = [r for r in records if r.id != "GLICOSE3-0"]
+    replaced.append(QCRecord(id="novo", date=TODAY.isoformat() + "T08:00", exam_name="UREIA"))
+    after = forecaster.forecast([lot], replaced, today=TODAY)[0]
+    assert after["remaining_stock"] == before["remaining_stock"] + 1
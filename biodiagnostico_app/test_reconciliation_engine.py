@@ -0,0 +1,53 @@
+"""Testes de escala e de entrada do motor de conciliação COMPULAB × SIMUS."""
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from biodiagnostico_app.utils.analysis_module import compare_exams, read_billing_export, run_deep_analysis
+
+
+def _export(n_patients, exams_per_patient, seed):
+    rng = np.random.default_rng(seed)
+    patients = np.repeat([f"Paciente {i}" for i in range(n_patients)], exams_per_patient)
+    codes = np.tile(np.arange(exams_per_patient), n_patients).astype(str)
+    return pd.DataFrame({
+        "Paciente": patients,
+        "Nome_Exame": np.char.add("Exame ", codes),
+        "Codigo_Exame": codes,
+        "Valor": rng.integers(500, 20000, len(patients)) / 100,
+    })
+
+
+def test_brazilian_decimal_strings_and_chunked_csv():
+    csv = "Paciente;Nome_Exame;Codigo_Exame;Valor\nAna;Glicose;1;6,15\nAna;Ureia;2;1.234,56\nBia;TSH;3;10,10\n"
+    comp = read_billing_export(io.StringIO(csv), sep=";", chunksize=2)
+    sim = pd.DataFrame({"Paciente": ["ANA", "Ana"], "Nome_Exame": ["Glicose", "Ureia"],
+                        "Codigo_Exame": [1, 2], "Valor": [6.15, 1234.50]})
+    result = compare_exams(comp, sim)
+    assert result["summary"]["compulab_total"] == 1250.81
+    assert result["summary"]["missing_in_simus_total"] == 10.10
+    assert result["value_divergences"][0]["Diferenca"] == 0.06
+
+
+def test_repeated_exams_pair_by_occurrence():
+    comp = pd.DataFrame({"Paciente": ["A"] * 3, "Nome_Exame": ["Creatinina"] * 3,
+                         "Codigo_Exame": ["9"] * 3, "Valor": [10.0, 10.0, 10.0]})
+    sim = comp.iloc[:1]
+    result = compare_exams(comp, sim)
+    assert result["summary"]["missing_in_simus_count"] == 2
+    assert result["summary"]["value_divergences_count"] == 0
+
+
+def test_200k_lines_reconcile_in_seconds():
+    comp = _export(20_000, 10, seed=1)
+    sim = _export(20_000, 10, seed=1).iloc[:-500]
+    sim.loc[sim.index[:1000], "Valor"] += 1
+    started = time.perf_counter()
+    result = run_deep_analysis(comp, sim)
+    assert time.perf_counter() - started < 5.0
+    summary = result["analysis_results"]["summary"]
+    assert summary["missing_in_simus_count"] == 500
+    assert summary["value_divergences_count"] == 1000
+    assert result["difference_breakdown"]["is_fully_explained"]
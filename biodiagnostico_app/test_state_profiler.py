@@ -0,0 +1,103 @@
+"""Testes do profiling de computed vars e deltas por evento (services/state_profiler.py)."""
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.synthetic_data import generate_qc_rows, references_by_id
+from biodiagnostico_app.services.state_profiler import StateProfiler
+from biodiagnostico_app.state import State
+from biodiagnostico_app.states.dashboard_state import DashboardState
+from biodiagnostico_app.states.qc_state import build_qc_records
+
+
+@pytest.fixture
+def profiler():
+    prof = StateProfiler(enabled=True)
+    assert prof.install(State) > 0
+    yield prof
+    prof.uninstall()
+
+
+def offline_state():
+    rows = generate_qc_rows(200, seed=5)
+    state = State(_reflex_internal_init=True)
+    state.qc_records = sorted(build_qc_records(rows, references_by_id(rows), set()), key=lambda x: x.date, reverse=True)
+    return state
+
+
+def test_computed_vars_grouped_by_event(profiler):
+    state = offline_state()
+    fget = DashboardState.computed_vars["dashboard_total_today"].fget
+    expected = fget(state)
+    # Fora de um evento nada é medido
+    assert profiler.report()["events"] == []
+
+    with profiler.event("DashboardState.refresh"):
+        assert fget(state) == expected
+        fget(state)
+    with profiler.event("DashboardState.refresh"):
+        fget(state)
+
+    report = profiler.report()
+    event = report["events"][0]
+    assert event["event"] == "DashboardState.refresh" and event["count"] == 2
+    var = event["computed_vars"][0]
+    assert var["var"] == "DashboardState.dashboard_total_today"
+    assert var["recomputes"] == 3 and var["per_event"] == 1.5
+    assert report["computed_vars"][0]["recomputes"] == 3
+    assert any(
+        line.startswith("DashboardState.refresh;DashboardState.dashboard_total_today ")
+        for line in profiler.folded().splitlines()
+    )
+
+
+def test_delta_sizes_and_nested_events(profiler):
+    with profiler.event("QCState.save_qc_record"):
+        profiler.record_delta({"reflex___state____state.qc": {
+            "qc_records_rx_state_": [{"id": str(i)} for i in range(50)],
+            "is_saving_rx_state_": False,
+        }})
+        # Handler disparado de dentro de outro conta para o evento externo
+        with profiler.event("QCState.load_data_from_db"):
+            profiler.record_delta({"reflex___state____state.qc": {"is_saving_rx_state_": True}})
+
+    event = profiler.report()["events"][0]
+    assert [e["event"] for e in profiler.report()["events"]] == ["QCState.save_qc_record"]
+    delta = {d["var"]: d for d in event["delta"]}
+    assert delta["qc_records"]["total_bytes"] > delta["is_saving"]["total_bytes"]
+    assert event["delta"][0]["var"] == "qc_records"
+    assert delta["is_saving"]["sends"] == 2
+    assert event["delta_bytes_per_event"] == sum(d["total_bytes"] for d in event["delta"])
+
+
+def test_resolved_delta_wrapper_and_dump(profiler, tmp_path):
+    state = offline_state()
+
+    async def resolve():
+        with profiler.event("State.set_current_page"):
+            state.current_page = "proin"
+            return await state._get_resolved_delta()
+
+    delta = asyncio.run(resolve())
+    assert delta
+    event = profiler.report()["events"][0]
+    assert any(d["var"] == "current_page" for d in event["delta"])
+    assert "State.set_current_page;(delta)" in profiler.folded()
+
+    report_path, folded_path = profiler.dump(str(tmp_path))
+    with open(report_path, encoding="utf-8") as f:
+        assert json.load(f)["events"][0]["event"] == "State.set_current_page"
+    with open(folded_path, encoding="utf-8") as f:
+        assert f.read() == profiler.folded()
+
+
+def test_uninstall_restores_originals():
+    var = DashboardState.computed_vars["dashboard_total_today"]
+    original = var._fget
+    prof = StateProfiler(enabled=True)
+    prof.install(State)
+    assert var._fget is not original
+    assert prof.install(State) == 0
+    prof.uninstall()
+    assert var._fget is original
@@ -0,0 +1,143 @@
+"""Testes do Supabase em memória, exercitando os services reais (sem rede)."""
+import asyncio
+import time
+from datetime import date
+
+import pytest
+from postgrest.exceptions import APIError
+
+from benchmarks.synthetic_data import generate_qc_rows, references_by_id
+from biodiagnostico_app.services.drift_detection_service import DriftDetector
+from biodiagnostico_app.services.hematology_qc_service import HematologyQCService
+from biodiagnostico_app.services.qc_outbox_service import QCOutbox, STATUS_FAILED, STATUS_SYNCED
+from biodiagnostico_app.services.qc_reference_service import QCReferenceService
+from biodiagnostico_app.services.qc_service import QCService
+from biodiagnostico_app.services.supabase_client import SupabaseClient, supabase
+from biodiagnostico_app.services.supabase_fake import InMemorySupabase
+from biodiagnostico_app.state import State
+from biodiagnostico_app.states import dashboard_state, qc_state
+
+
+@pytest.fixture
+def fake():
+    client = InMemorySupabase()
+    SupabaseClient.install(client)
+    yield client
+    SupabaseClient.reset()
+
+
+def qc_row(i, exam="GLICOSE", day="2026-10-19", value=100.0, status="OK"):
+    return {
+        "id": f"r{i}", "date": f"{day}T08:{i:02d}:00", "exam_name": exam, "level": "N1",
+        "value": value, "target_value": 100.0, "target_sd": 2.0, "status": status,
+    }
+
+
+def test_services_query_builder(fake):
+    fake.load_rows("qc_records", [qc_row(i, day=f"2026-10-{10 + i}") for i in range(5)])
+    fake.load_rows("qc_records", [qc_row(9, exam="UREIA")])
+
+    created = asyncio.run(QCService.create_qc_record({
+        "date": "2026-10-19T09:00", "exam_name": "GLICOSE", "level": "N1", "value": 110, "target_value": 100,
+    }))
+    assert created["id"] and created["cv"] == pytest.approx(10.0)
+
+    rows = asyncio.run(QCService.get_qc_records(limit=3, exam_name="GLICOSE", start_date="2026-10-12"))
+    assert [r["date"][:10] for r in rows] == ["2026-10-19", "2026-10-14", "2026-10-13"]
+
+    counted = supabase.table("qc_records").select("id", count="exact").neq("exam_name", "UREIA").limit(2).execute()
+    assert counted.count == 6 and len(counted.data) == 2 and set(counted.data[0]) == {"id"}
+
+    fake.load_rows("qc_reference_values", [{"id": "ref1", "cv_max_threshold": 5.0}, {"id": "ref2"}])
+    refs = asyncio.run(QCReferenceService.get_references_by_ids(["ref1", "ref3", ""]))
+    assert list(refs) == ["ref1"]
+
+    assert asyncio.run(QCService.delete_qc_record("r0")) is True
+    assert len(fake.rows("qc_records")) == 6
+
+
+def test_area_rpc_and_resolved_view(fake):
+    fake.load_rows("hematology_qc_parameters", [
+        {"id": "geral", "analito": "HGB", "modo": "PERCENTUAL", "alvo_valor": 14.0,
+         "tolerancia_percentual": 5.0, "is_active": True, "created_at": "2026-01-01"},
+        {"id": "lote", "analito": "HGB", "modo": "INTERVALO", "alvo_valor": 14.0, "min_valor": 13.0,
+         "max_valor": 15.0, "lote_controle": "L1", "is_active": True, "created_at": "2025-01-01"},
+    ])
+    result = asyncio.run(HematologyQCService.register_measurement(
+        {"data_medicao": "2026-10-19", "analito": "HGB", "valor_medido": 14.9, "lote_controle": "L1"}))
+    assert result["parametro_id"] == "lote" and result["status"] == "APROVADO"
+    result = asyncio.run(HematologyQCService.register_measurement(
+        {"data_medicao": "2026-10-19", "analito": "HGB", "valor_medido": 14.9}))
+    assert result["parametro_id"] == "geral" and result["status"] == "REPROVADO"
+    assert len(fake.rows("hematology_qc_measurements")) == 2
+
+    params = asyncio.run(HematologyQCService.get_parameters())
+    geral = next(p for p in params if p["id"] == "geral")
+    assert geral["min_calc"] == pytest.approx(13.3) and geral["max_calc"] == pytest.approx(14.7)
+
+    with pytest.raises(APIError):
+        supabase.rpc("immunology_register_qc_measurement", {
+            "p_data_medicao": "2026-10-19", "p_analito": "HCG", "p_valor_medido": 1.0,
+        }).execute()
+
+
+def test_dashboard_kpis_rpc(fake):
+    fake.load_rows("qc_records", [
+        qc_row(1), qc_row(2, status="ALERTA (CV)"), qc_row(3, day="2026-10-02"), qc_row(4, day="2026-09-30"),
+    ])
+    fake.load_rows("reagent_lots", [{"id": "a", "expiry_date": "2026-11-01"}, {"id": "b", "expiry_date": "2027-06-01"}])
+    fake.load_rows("maintenance_records", [
+        {"id": "m1", "equipment": "BS-200", "type": "Preventiva", "date": "2026-01-01", "next_date": "2026-07-01"},
+        {"id": "m2", "equipment": "bs-200 ", "type": "PREVENTIVA", "date": "2026-07-01", "next_date": "2027-01-01"},
+        {"id": "m3", "equipment": "COBAS", "type": "Calibração", "date": "2026-09-01", "next_date": "2026-10-19"},
+        # Recorrente sem próxima data: herda o intervalo anterior (01/06 -> 01/08 = 61 dias) -> 2026-10-01
+        {"id": "m4", "equipment": "XT", "type": "Preventiva", "date": "2026-06-01", "next_date": "2026-08-01"},
+        {"id": "m5", "equipment": "XT", "type": "Preventiva", "date": "2026-08-01", "next_date": ""},
+    ])
+    kpis = supabase.rpc("qc_dashboard_kpis", {"p_today": date(2026, 10, 19).isoformat()}).execute().data
+    assert (kpis["total_today"], kpis["alerts_today"], kpis["total_month"]) == (2, 1, 3)
+    assert kpis["approval_rate_month"] == pytest.approx(66.7)
+    assert kpis["expiring_lots"] == 1 and kpis["pending_maintenances"] == 2
+
+
+def test_injected_failures_go_through_outbox_retry(fake, tmp_path):
+    outbox = QCOutbox(path=str(tmp_path / "outbox.db"))
+    entry = outbox.enqueue_insert("qc_records", qc_row(1), series="GLICOSE|N1")
+    fake.fail_next(1)
+    asyncio.run(outbox.flush())
+    assert outbox.status(entry) != STATUS_SYNCED and not fake.rows("qc_records")
+
+    outbox._db().execute("UPDATE outbox SET next_attempt_at = 0")
+    asyncio.run(outbox.flush())
+    assert outbox.status(entry) == STATUS_SYNCED
+    assert fake.rows("qc_records")[0]["id"] == "r1"
+
+    bad = outbox.enqueue_rpc("hematology_register_qc_measurement", {
+        "p_data_medicao": "2026-10-19", "p_analito": "XYZ", "p_valor_medido": 1.0,
+    }, series="hematologia|XYZ")
+    asyncio.run(outbox.flush())
+    assert outbox.status(bad) == STATUS_FAILED
+    outbox.close()
+
+
+def test_latency_is_injected():
+    client = InMemorySupabase(latency_ms=20)
+    start = time.perf_counter()
+    client.table("qc_records").select("*").execute()
+    assert time.perf_counter() - start >= 0.02
+
+
+def test_state_loads_from_fake(fake, tmp_path, monkeypatch):
+    rows = generate_qc_rows(720, seed=3)
+    fake.load_rows("qc_records", rows)
+    fake.load_rows("qc_reference_values", references_by_id(rows).values())
+    monkeypatch.setattr(qc_state, "qc_outbox", QCOutbox(path=str(tmp_path / "outbox.db")))
+    detector = DriftDetector(path=str(tmp_path / "drift.db"))
+    monkeypatch.setattr(qc_state, "drift_detector", detector)
+    monkeypatch.setattr(dashboard_state, "drift_detector", detector)
+
+    state = State(_reflex_internal_init=True)
+    asyncio.run(qc_state.QCState.load_data_from_db.fn(state, force=True))
+    assert len(state.qc_records) == 720
+    assert state.qc_records[0].date == max(r["date"] for r in rows)
+    assert state.qc_records[0].cv_max_threshold == 5.0
@@ -0,0 +1,97 @@
+"""Testes do VoiceAIService contra um servidor de modelo local (ASGI, sem rede)."""
+import asyncio
+import json
+
+import httpx
+import pytest
+from google.genai import types
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from biodiagnostico_app.config import Config
+from biodiagnostico_app.services import voice_ai_service
+from biodiagnostico_app.services.voice_ai_service import VoiceAIService
+
+AUDIO = b"\x1aE\xdf\xa3" + b"\x00" * 400
+
+
+class _FakeModel:
+    """Responde generateContent como a API do Gemini, com atraso configurável."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def generate(self, request: Request):
+        self.calls += 1
+        self.last_request = await request.json()
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        body = {"exam_name": "glicose", "value": "95,5", "target_value": None, "equipment": "", "analyst": ""}
+        return JSONResponse({"candidates": [{"content": {"role": "model", "parts": [{"text": json.dumps(body)}]}}]})
+
+    def http_options(self):
+        app = Starlette(routes=[Route("/{version}/models/{model}:generateContent", self.generate, methods=["POST"])])
+        return types.HttpOptions(
+            base_url="http://modelo-local",
+            httpx_async_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://modelo-local"),
+        )
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setattr(Config, "GEMINI_API_KEY", "teste")
+    fake = _FakeModel()
+    VoiceAIService.configure(http_options=fake.http_options())
+    yield fake
+    VoiceAIService.configure()
+
+
+def test_result_is_parsed_and_cached_by_content(model):
+    async def run():
+        first = await VoiceAIService.process_audio(audio_bytes=AUDIO, form_type="registro")
+        again = await VoiceAIService.process_audio(audio_bytes=AUDIO, form_type="registro", mime_type="audio/webm;codecs=opus")
+        other = await VoiceAIService.process_audio(audio_bytes=AUDIO + b"\x01", form_type="registro")
+        return first, again, other
+
+    first, again, other = asyncio.run(run())
+    assert first["exam_name"] == "GLICOSE" and first["value"] == 95.5
+    generation = model.last_request["generationConfig"]
+    assert generation["responseMimeType"] == "application/json"
+    assert "value" in json.dumps(generation.get("responseSchema") or generation.get("responseJsonSchema"))
+    assert again == first and other == first
+    assert model.calls == 2
+
+
+def test_concurrent_resubmissions_are_coalesced_and_capped(model, monkeypatch):
+    monkeypatch.setattr(voice_ai_service, "VOICE_AI_CONCURRENCY", 2)
+    model.delay = 0.05
+
+    async def run():
+        same = [VoiceAIService.process_audio(audio_bytes=AUDIO, form_type="registro") for _ in range(5)]
+        distinct = [VoiceAIService.process_audio(audio_bytes=AUDIO + bytes([i]), form_type="registro") for i in range(6)]
+        return await asyncio.gather(*same, *distinct)
+
+    results = asyncio.run(run())
+    assert all(r["exam_name"] == "GLICOSE" for r in results)
+    assert model.calls == 7
+    assert model.peak <= 2
+
+
+def test_deadline_returns_error_and_is_not_cached(model, monkeypatch):
+    monkeypatch.setattr(voice_ai_service, "VOICE_AI_TIMEOUT_SECONDS", 0.05)
+    model.delay = 1.0
+    result = asyncio.run(VoiceAIService.process_audio(audio_bytes=AUDIO, form_type="registro"))
+    assert "demorou" in result["error"]
+
+    model.delay = 0.0
+    result = asyncio.run(VoiceAIService.process_audio(audio_bytes=AUDIO, form_type="registro"))
+    assert result["exam_name"] == "GLICOSE"
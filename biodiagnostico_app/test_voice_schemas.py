@@ -0,0 +1,55 @@
+"""Testes do pós-processamento determinístico das respostas do Voice-to-Form."""
+from datetime import date
+
+import pytest
+
+from biodiagnostico_app.services.voice_schemas import parse_spoken_date, postprocess_voice_fields
+from biodiagnostico_app.utils.numeric import parse_decimal
+
+TODAY = date(2026, 10, 19)
+
+
+@pytest.mark.parametrize("spoken, expected", [
+    ("2026-11-02", "2026-11-02"),
+    ("hoje", "2026-10-19"),
+    ("Amanhã", "2026-10-20"),
+    ("daqui a 30 dias", "2026-11-18"),
+    ("em seis meses", "2027-04-19"),
+    ("2 semanas", "2026-11-02"),
+    ("março de 2027", "2027-03-31"),
+    ("15 de marco de 2027", "2027-03-15"),
+    ("31/01/27", "2027-01-31"),
+    ("02/2027", "2027-02-28"),
+    ("31/02/2027", ""),
+    ("quando der", ""),
+])
+def test_parse_spoken_date(spoken, expected):
+    assert parse_spoken_date(spoken, TODAY) == expected
+
+
+def test_brazilian_decimals():
+    assert parse_decimal("95,5") == 95.5
+    assert parse_decimal("1.234,5") == 1234.5
+    assert parse_decimal("95.5") == 95.5
+    assert parse_decimal("abc", default=None) is None
+
+
+def test_postprocess_per_form():
+    registro = postprocess_voice_fields("registro", {"exam_name": " glicose ", "value": "95,5", "target_value": 100}, TODAY)
+    assert registro == {"exam_name": "GLICOSE", "value": 95.5, "target_value": 100.0, "equipment": "", "analyst": ""}
+
+    referencia = postprocess_voice_fields("referencia", {"level": "nível 2", "valid_from": "hoje", "cv_max": "7,5"}, TODAY)
+    assert referencia["level"] == "N2" and referencia["valid_from"] == "2026-10-19" and referencia["cv_max"] == 7.5
+
+    reagente = postprocess_voice_fields("reagente", {"expiry_date": "março 2027", "initial_stock": "1.200,0"}, TODAY)
+    assert reagente["expiry_date"] == "2027-03-31" and reagente["initial_stock"] == 1200.0
+
+    manutencao = postprocess_voice_fields("manutencao", {"type": "calibracao", "next_date": "daqui a um ano"}, TODAY)
+    assert manutencao["type"] == "Calibração" and manutencao["next_date"] == "2027-10-19"
+
+
+def test_postprocess_unknown_form_and_unparseable_values():
+    with pytest.raises(KeyError):
+        postprocess_voice_fields("outro", {})
+    result = postprocess_voice_fields("registro", {"value": "noventa e tantos", "extra": 1}, TODAY)
+    assert result["value"] is None and "extra" not in result
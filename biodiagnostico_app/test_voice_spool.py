@@ -0,0 +1,45 @@
+"""Testes do upload binário de áudio do Voice-to-Form (spool + endpoint)."""
+import os
+
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from biodiagnostico_app import api_routes
+from biodiagnostico_app.services.voice_spool_service import VoiceSpool
+
+
+def _client(spool, monkeypatch):
+    monkeypatch.setattr(api_routes, "voice_spool", spool)
+    return TestClient(Starlette(routes=[Route("/api/voice/{handle}", api_routes.voice_chunk, methods=["POST"])]))
+
+
+def test_chunks_are_appended_to_spool(tmp_path, monkeypatch):
+    spool = VoiceSpool(directory=str(tmp_path), max_bytes=1024)
+    client = _client(spool, monkeypatch)
+    handle = spool.create()
+    assert client.post(f"/api/voice/{handle}", content=b"a" * 100).json() == {"size": 100}
+    assert client.post(f"/api/voice/{handle}", content=b"b" * 50).json() == {"size": 150}
+    assert spool.read(handle) == b"a" * 100 + b"b" * 50
+
+
+def test_unknown_handle_and_size_limit(tmp_path, monkeypatch):
+    spool = VoiceSpool(directory=str(tmp_path), max_bytes=100)
+    client = _client(spool, monkeypatch)
+    assert client.post("/api/voice/desconhecido-123456789", content=b"x").status_code == 404
+    assert client.post("/api/voice/..%2F..%2Fetc", content=b"x").status_code == 404
+
+    handle = spool.create()
+    assert client.post(f"/api/voice/{handle}", content=b"x" * 101).status_code == 413
+    assert not spool.exists(handle)
+
+
+def test_expired_recordings_are_purged(tmp_path):
+    spool = VoiceSpool(directory=str(tmp_path), ttl_seconds=60)
+    old = spool.create()
+    path = os.path.join(str(tmp_path), f"{old}.part")
+    os.utime(path, (0, 0))
+    fresh = spool.create()
+    assert not spool.exists(old) and spool.exists(fresh)
+    spool.discard(fresh)
+    assert not spool.exists(fresh)
@@ -0,0 +1,73 @@
+"""
+Testes unitários para o motor multirregra de Westgard (corridas × níveis)
+"""
+import random
+import time
+
+from biodiagnostico_app.models import QCRecord
+from biodiagnostico_app.services.westgard_service import WestgardService
+
+
+def rec(rid, day, level, z, equipment="EQ1", exam="GLICOSE"):
+    return QCRecord(
+        id=str(rid), date=f"2026-01-{day:02d}T08:00", exam_name=exam, level=level, lot_number="L1",
+        value=100.0 + z * 2.0, target_value=100.0, target_sd=2.0, equipment=equipment, status="OK",
+    )
+
+
+def rules_of(violations):
+    return {(v["rule"], v["scope"]) for v in violations}
+
+
+class TestRunMatrix:
+
+    def test_groups_by_run_and_level(self):
+        records = [rec(1, 1, "N1", 0.5), rec(2, 1, "N2", -0.5), rec(3, 2, "N1", 1.0), rec(4, 2, "N1", 1.0, "EQ2")]
+        runs, levels, z, idx = WestgardService.build_run_matrix(records)
+        assert len(runs) == 3
+        assert levels == ["N1", "N2"]
+        assert z.shape == (3, 2)
+        assert idx[0].tolist() == [0, 1]
+
+
+class TestMultirules:
+
+    def test_2_2s_across_levels_in_same_run(self):
+        violations = WestgardService.evaluate_runs([rec(1, 1, "N1", 2.5), rec(2, 1, "N2", 2.2)])
+        assert ("2-2s", "within-run") in rules_of(violations)
+        assert ("1-3s", "within-run") not in rules_of(violations)
+
+    def test_r_4s_within_run(self):
+        violations = WestgardService.evaluate_runs([rec(1, 1, "N1", 2.5), rec(2, 1, "N2", -2.1)])
+        assert ("R-4s", "within-run") in rules_of(violations)
+
+    def test_4_1s_spans_runs_and_levels(self):
+        records = [rec(1, 1, "N1", 1.2), rec(2, 1, "N2", 1.5), rec(3, 2, "N1", 1.1), rec(4, 2, "N2", 1.3)]
+        violations = WestgardService.evaluate_runs(records)
+        four = [v for v in violations if v["rule"] == "4-1s"]
+        assert len(four) == 1
+        assert four[0]["scope"] == "across-runs"
+        assert four[0]["record_ids"] == ["1", "2", "3", "4"]
+
+    def test_2of3_2s_across_levels(self):
+        records = [rec(1, 1, "N1", 2.3), rec(2, 1, "N2", 0.4), rec(3, 1, "N3", 2.1)]
+        assert ("2of3-2s", "within-run") in rules_of(WestgardService.evaluate_runs(records))
+
+    def test_rule_set_per_exam(self):
+        records = [rec(1, 1, "N1", 3.5)]
+        assert rules_of(WestgardService.evaluate_runs(records, ["2-2s"])) == set()
+        assert ("1-3s", "within-run") in rules_of(WestgardService.evaluate_runs(records))
+
+    def test_year_of_multilevel_data_in_one_call(self):
+        rnd = random.Random(7)
+        records = []
+        for exam in ("GLICOSE", "UREIA", "CREATININA"):
+            for d in range(365):
+                for level in ("N1", "N2", "N3"):
+                    r = rec(len(records), 1, level, rnd.gauss(0, 1), exam=exam)
+                    r.date = f"2025-{d // 31 + 1:02d}-{d % 31 + 1:02d}T{d % 24:02d}:00"
+                    records.append(r)
+        start = time.perf_counter()
+        result = WestgardService.evaluate_all(records)
+        assert set(result) == {"GLICOSE", "UREIA", "CREATININA"}
+        assert time.perf_counter() - start < 5.0